@@ -4,7 +4,7 @@ import traceback
 import imswitch
 from imswitch.imcommon import prepareApp, launchApp
 from imswitch.imcommon.controller import ModuleCommunicationChannel, MultiModuleWindowController
-from imswitch.imcommon.model import modulesconfigtools, pythontools, initLogger
+from imswitch.imcommon.model import modulesconfigtools, pythontools, initLogger, startupProfile
 from imswitch.imcommon.view import MultiModuleWindow, ModuleLoadErrorView
 
 
@@ -20,8 +20,12 @@ def main():
         
         enabledModuleIds.append(enabledModuleIds.pop(enabledModuleIds.index('imscripting')))
 
-    modulePkgs = [importlib.import_module(pythontools.joinModulePath('imswitch', moduleId))
-                  for moduleId in modulesconfigtools.getEnabledModuleIds()]
+    modulePkgs = []
+    for moduleId in enabledModuleIds:
+        with startupProfile.measure('module import', moduleId):
+            modulePkgs.append(
+                importlib.import_module(pythontools.joinModulePath('imswitch', moduleId))
+            )
 
     moduleCommChannel = ModuleCommunicationChannel()
 
@@ -48,11 +52,12 @@ def main():
         moduleName = modulePkg.__title__ if hasattr(modulePkg, '__title__') else moduleId
 
         try:
-            view, controller = modulePkg.getMainViewAndController(
-                moduleCommChannel=moduleCommChannel,
-                multiModuleWindowController=multiModuleWindowController,
-                moduleMainControllers=moduleMainControllers
-            )
+            with startupProfile.measure('module', moduleId):
+                view, controller = modulePkg.getMainViewAndController(
+                    moduleCommChannel=moduleCommChannel,
+                    multiModuleWindowController=multiModuleWindowController,
+                    moduleMainControllers=moduleMainControllers
+                )
         except Exception as e:
             logger.error(f'Failed to initialize module {moduleId}')
             logger.error(traceback.format_exc())
@@ -67,6 +72,7 @@ def main():
             multiModuleWindow.updateLoadingProgress(i / len(modulePkgs))
             app.processEvents()  # Draw window before continuing
 
+    logger.info(startupProfile.report())
     launchApp(app, multiModuleWindow, moduleMainControllers.values())
 
 
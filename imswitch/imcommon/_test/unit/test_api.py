@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from imswitch.imcommon.model import APIExport, batchAPICalls, generateAPI
+
+
+class _Exported:
+    def __init__(self):
+        self.calls = []
+
+    @APIExport(runOnUIThread=True)
+    def add(self, a, b=0):
+        self.calls.append((threading.current_thread(), a, b))
+        return a + b
+
+    @APIExport(runOnUIThread=True)
+    def fail(self):
+        raise ValueError('failed')
+
+    @APIExport()
+    def direct(self):
+        return threading.current_thread()
+
+
+def callFromThread(func):
+    """ Calls func on a new thread and returns what it returned. """
+    results = []
+    thread = threading.Thread(target=lambda: results.append(func()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_returns_result_from_ui_thread(qtbot):
+    exported = _Exported()
+    api = generateAPI([exported])
+
+    future = callFromThread(lambda: api.add(1, b=2))
+    qtbot.waitUntil(future.done)
+    assert future.result() == 3
+    assert exported.calls[0][0] is threading.main_thread()
+    assert callFromThread(api.direct) is not threading.main_thread()
+
+
+def test_returns_exception(qtbot):
+    api = generateAPI([_Exported()])
+    future = callFromThread(api.fail)
+    qtbot.waitUntil(future.done)
+    with pytest.raises(ValueError):
+        future.result()
+
+
+def test_calls_on_ui_thread_run_immediately(qtbot):
+    api = generateAPI([_Exported()])
+    future = api.add(2)
+    assert future.done() and future.result() == 2
+
+
+def test_batch(qtbot):
+    exported = _Exported()
+    api = generateAPI([exported])
+
+    def callBatch():
+        with batchAPICalls():
+            futures = [api.add(i) for i in range(5)]
+            assert not any(future.done() for future in futures)
+        return futures
+
+    futures = callFromThread(callBatch)
+    qtbot.waitUntil(lambda: all(future.done() for future in futures))
+    assert [future.result() for future in futures] == list(range(5))
+    assert [a for _, a, _ in exported.calls] == list(range(5))
+
+
+def test_failed_batch_is_cancelled(qtbot):
+    exported = _Exported()
+    api = generateAPI([exported])
+    with pytest.raises(RuntimeError):
+        with batchAPICalls():
+            future = api.add(1)
+            raise RuntimeError
+    assert future.cancelled()
+    assert exported.calls == []
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
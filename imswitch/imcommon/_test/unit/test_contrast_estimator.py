@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from imswitch.imcommon.model import ContrastEstimator
+from imswitch.imcommon.model.ContrastEstimator import bestLevels, subsample
+
+
+def loopBestLevels(arr):
+    """ The previous, loop-based implementation of bestLevels. """
+    pixelCount = arr.size
+    limit = pixelCount / 10
+    threshold = pixelCount / 5000
+    hist, bin_edges = np.histogram(arr, 256)
+    i = 0
+    while True:
+        i += 1
+        count = hist[i]
+        if count > limit:
+            count = 0
+        if count > threshold or i >= 255:
+            break
+    hmin = i
+
+    i = 256
+    while True:
+        i -= 1
+        count = hist[i]
+        if count > limit:
+            count = 0
+        if count > threshold or i < 1:
+            break
+    hmax = i
+    return bin_edges[hmin], bin_edges[hmax]
+
+
+@pytest.mark.parametrize('image', [
+    np.random.default_rng(0).poisson(100, (256, 256)),
+    np.random.default_rng(0).normal(0, 1, (64, 64)),
+    np.zeros((32, 32)),
+], ids=['poisson', 'normal', 'zeros'])
+def test_best_levels_matches_loop(image):
+    assert bestLevels(image) == loopBestLevels(image)
+
+
+def test_subsample():
+    image = np.arange(2048 * 2048).reshape(2048, 2048)
+    sample = subsample(image, 2 ** 16)
+    assert sample.size <= 2 ** 16 * 1.1
+    assert np.shares_memory(sample, image)
+    assert subsample(image[:10, :10], 2 ** 16).shape == (10, 10)
+
+
+def test_smoothing_and_reset():
+    estimator = ContrastEstimator('minmax', smoothing=0.5)
+    assert estimator.estimate(np.full((8, 8), 98), 'A') == (0, 100)
+    assert estimator.estimate(np.full((8, 8), 198), 'A') == (0, 150)
+    assert estimator.estimate(np.full((8, 8), 198), 'B') == (0, 200)  # Separate per key
+    assert estimator.estimate(np.full((8, 8), 198), 'A', smooth=False) == (0, 200)
+
+    estimator.estimate(np.full((8, 8), 98), 'A')
+    estimator.reset('A')
+    assert estimator.estimate(np.full((8, 8), 398), 'A') == (0, 400)
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        ContrastEstimator('magic')
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,119 @@
+import json
+import os
+
+import h5py
+import pytest
+
+from imswitch.imcommon.model.DirectoryMonitor import DirectoryMonitor, getWritingState
+
+
+@pytest.fixture(params=[True, False], ids=['notifications', 'polling'])
+def useNotifications(request):
+    return request.param
+
+
+def pollUntilIdle(monitor, maxPolls=5):
+    """ Polls the monitor until nothing is pending, and returns everything
+    reported ready and removed. """
+    ready, removed = [], []
+    for _ in range(maxPolls):
+        newReady, newRemoved = monitor.poll(0.05)
+        ready.extend(newReady)
+        removed.extend(newRemoved)
+        if not monitor.pendingFiles:
+            break
+    return ready, removed
+
+
+def test_reports_new_files_once_settled(tmp_path, useNotifications):
+    (tmp_path / 'existing.py').write_text('pass')
+    monitor = DirectoryMonitor(str(tmp_path), 'py', settleTime=0,
+                               useNotifications=useNotifications)
+    try:
+        assert monitor.readyFiles == ['existing.py']
+
+        (tmp_path / 'new.py').write_text('pass')
+        (tmp_path / 'other.txt').write_text('')
+        assert monitor.poll(0.05) == ([], [])  # Seen, but not yet known to be settled
+        assert monitor.pendingFiles == ['new.py']
+        assert pollUntilIdle(monitor) == (['new.py'], [])
+        assert monitor.readyFiles == ['existing.py', 'new.py']
+        assert pollUntilIdle(monitor) == ([], [])
+    finally:
+        monitor.close()
+
+
+def test_waits_for_changing_files(tmp_path, useNotifications):
+    monitor = DirectoryMonitor(str(tmp_path), 'py', settleTime=60,
+                               useNotifications=useNotifications)
+    try:
+        (tmp_path / 'new.py').write_text('pass')
+        assert pollUntilIdle(monitor) == ([], [])
+        assert monitor.pendingFiles == ['new.py']
+    finally:
+        monitor.close()
+
+
+def test_reports_removed_files(tmp_path, useNotifications):
+    (tmp_path / 'existing.py').write_text('pass')
+    monitor = DirectoryMonitor(str(tmp_path), 'py', useNotifications=useNotifications)
+    try:
+        os.remove(tmp_path / 'existing.py')
+        assert pollUntilIdle(monitor) == ([], ['existing.py'])
+        assert monitor.readyFiles == []
+    finally:
+        monitor.close()
+
+
+def test_waits_for_writing_attribute(tmp_path, useNotifications):
+    monitor = DirectoryMonitor(str(tmp_path), 'hdf5', settleTime=0,
+                               useNotifications=useNotifications)
+    try:
+        path = tmp_path / 'recording.hdf5'
+        with h5py.File(path, 'w') as file:
+            file.create_dataset('data', (1,)).attrs['writing'] = True
+        assert pollUntilIdle(monitor) == ([], [])
+        assert monitor.pendingFiles == ['recording.hdf5']
+
+        with h5py.File(path, 'a') as file:
+            file['data'].attrs['writing'] = False
+        assert pollUntilIdle(monitor) == (['recording.hdf5'], [])
+    finally:
+        monitor.close()
+
+
+def test_recheck(tmp_path):
+    (tmp_path / 'existing.py').write_text('pass')
+    monitor = DirectoryMonitor(str(tmp_path), 'py', settleTime=0, useNotifications=False)
+    monitor.recheck(['existing.py'])
+    assert monitor.readyFiles == []
+    assert pollUntilIdle(monitor) == (['existing.py'], [])
+
+
+def test_zarr_writing_state(tmp_path):
+    store = tmp_path / 'recording.zarr'
+    os.makedirs(store / 'detector')
+    assert getWritingState(str(store)) is None
+
+    (store / 'detector' / '.zattrs').write_text(json.dumps({'writing': True}))
+    assert getWritingState(str(store)) is True
+
+    (store / 'detector' / '.zattrs').write_text(json.dumps({'writing': False}))
+    assert getWritingState(str(store)) is False
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from imswitch.imcommon.view.guitools.FileWatcher import FileWatcher
+
+
+def numOpenFileDescriptors():
+    return len(os.listdir('/proc/self/fd'))
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'),
+                    reason='Requires /proc to count file descriptors')
+@pytest.mark.parametrize('start', [False, True], ids=['notStarted', 'started'])
+def test_stop_releases_monitor(qtbot, tmp_path, start):
+    numOpenBefore = numOpenFileDescriptors()
+    (tmp_path / 'existing.py').write_text('pass')
+    watcher = FileWatcher(str(tmp_path), 'py', 0.05)
+    assert watcher.filesInDirectory() == ['existing.py']
+
+    if start:
+        watcher.start()
+        qtbot.waitUntil(lambda: watcher.active)
+    watcher.stop()
+    assert watcher.wait(5000)
+    assert numOpenFileDescriptors() == numOpenBefore
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,37 @@
+import numpy as np
+
+from imswitch.imcommon.view.guitools import decimationPyramid
+
+
+def test_decimation_pyramid():
+    image = np.arange(2048 * 1536).reshape(2048, 1536)
+    levels = decimationPyramid(image, minSize=512)
+    assert [level.shape for level in levels] == [(2048, 1536), (1024, 768), (512, 384)]
+    assert levels[0] is image
+    assert all(np.shares_memory(level, image) for level in levels)
+    assert np.array_equal(levels[2], image[::4, ::4])
+
+
+def test_decimation_pyramid_small_image():
+    image = np.zeros((100, 700))
+    assert [level.shape for level in decimationPyramid(image, minSize=512)] == [
+        (100, 700), (50, 350)
+    ]
+    assert len(decimationPyramid(np.zeros((1, 1)))) == 1
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,71 @@
+import sys
+import textwrap
+
+import pytest
+
+from imswitch.imcommon.model import StartupProfile
+
+
+@pytest.fixture
+def lazyPackage(tmp_path, monkeypatch):
+    package = tmp_path / 'lazypkg'
+    package.mkdir()
+    (package / '__init__.py').write_text(textwrap.dedent('''
+        from imswitch.imcommon.model import pythontools
+        pythontools.installLazyImports(__name__, {'Thing': 'Thing', 'Other': 'others'})
+    '''))
+    (package / 'Thing.py').write_text('class Thing:\n    pass\n')
+    (package / 'others.py').write_text('from .Thing import Thing\n\nOther = Thing\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in [name for name in sys.modules if name.startswith('lazypkg')]:
+        del sys.modules[name]
+
+
+def test_lazy_imports(lazyPackage):
+    import lazypkg
+    assert 'lazypkg.Thing' not in sys.modules
+    assert 'Thing' in dir(lazypkg)
+
+    # Importing others imports the Thing submodule, which must not hide the class
+    Other = lazypkg.Other
+    assert 'lazypkg.Thing' in sys.modules
+    assert isinstance(lazypkg.Thing, type)
+    assert Other is lazypkg.Thing
+
+    from lazypkg import Thing
+    assert Thing is lazypkg.Thing
+    with pytest.raises(AttributeError):
+        lazypkg.Missing
+
+
+def test_startup_profile_report():
+    profile = StartupProfile()
+    profile.record('manager', 'Fast', 0.001)
+    profile.record('manager', 'Slow', 2.0)
+    with profile.measure('module', 'imcontrol'):
+        pass
+
+    assert [entry[:2] for entry in profile.entries] == [
+        ('manager', 'Fast'), ('manager', 'Slow'), ('module', 'imcontrol')
+    ]
+    report = profile.report(minDuration=0.01)
+    assert 'manager (2, 2.00 s in total)' in report
+    assert 'Slow' in report and 'Fast' not in report
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
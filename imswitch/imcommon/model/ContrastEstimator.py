@@ -0,0 +1,108 @@
+import threading
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+
+class ContrastEstimator:
+    """ Estimates display levels (contrast limits) for live images. Levels
+    are computed from a strided subsample of at most maxSamples pixels
+    rather than from the whole image, and smoothed over time separately for
+    each key (e.g. detector name), so that they do not flicker from frame to
+    frame. method is "minmax" for levels from zero to the maximum, or "best"
+    for the ImageJ-style automatic levels of bestLevels. All methods may be
+    called from any thread. """
+
+    def __init__(self, method: str = 'minmax', maxSamples: int = 2 ** 16,
+                 smoothing: float = 0.7):
+        if method not in _levelFuncs:
+            raise ValueError(f'Unsupported contrast estimation method "{method}"')
+
+        self.method = method
+        self.maxSamples = maxSamples
+        self.smoothing = smoothing
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, image, key: Hashable = None, smooth: bool = True) -> Tuple[float, float]:
+        """ Returns the (minimum, maximum) display levels for image, which
+        may be any array-like (including lazily loaded arrays). Unless smooth
+        is false, the levels are an exponential moving average with those of
+        previous images of the same key, in which the previous levels have
+        weight smoothing. """
+        levels = _levelFuncs[self.method](subsample(image, self.maxSamples))
+        levels = float(levels[0]), float(levels[1])
+
+        with self._lock:
+            previous = self._levels.get(key)
+            if smooth and previous is not None:
+                levels = tuple(self.smoothing * p + (1 - self.smoothing) * l
+                               for p, l in zip(previous, levels))
+            self._levels[key] = levels
+        return levels
+
+    def reset(self, key: Optional[Hashable] = None) -> None:
+        """ Forgets the levels of the given key, or of all keys if key is
+        None, so that the levels of the next image are not smoothed. """
+        with self._lock:
+            if key is None:
+                self._levels.clear()
+            else:
+                self._levels.pop(key, None)
+
+
+def subsample(image, maxSamples: int) -> np.ndarray:
+    """ Returns every n-th element along every axis of image, with n chosen
+    so that at most about maxSamples elements remain. """
+    size = int(np.prod(image.shape))
+    if size <= maxSamples:
+        return np.asarray(image)
+
+    step = int(np.ceil((size / maxSamples) ** (1 / len(image.shape))))
+    return np.asarray(image[(slice(None, None, step),) * len(image.shape)])
+
+
+def bestLevels(arr):
+    # Best cmin, cmax algorithm taken from ImageJ routine:
+    # http://cmci.embl.de/documents/120206pyip_cooking/
+    # python_imagej_cookbook#automatic_brightnesscontrast_button
+    pixelCount = arr.size
+    limit = pixelCount / 10
+    threshold = pixelCount / 5000
+    hist, bin_edges = np.histogram(arr, 256)
+
+    # Bins with enough, but not too many (likely background), pixels
+    valid = (hist > threshold) & (hist <= limit)
+    validAbove0 = np.flatnonzero(valid[1:])
+    hmin = validAbove0[0] + 1 if len(validAbove0) > 0 else 255
+    validIndices = np.flatnonzero(valid)
+    hmax = validIndices[-1] if len(validIndices) > 0 else 0
+
+    return bin_edges[hmin], bin_edges[hmax]
+
+
+def minmaxLevels(arr):
+    minlevel = 0
+    maxlevel = arr.max() + 2
+
+    return minlevel, maxlevel
+
+
+_levelFuncs = {'minmax': minmaxLevels, 'best': bestLevels}
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,291 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import h5py
+
+
+class DirectoryMonitor:
+    """ Keeps track of the files (or directories, e.g. Zarr stores) with a
+    given extension in a directory, and reports them once they are ready to
+    be read, as well as when they are removed.
+
+    Changes to the directory are picked up through inotify where available
+    (Linux), and otherwise by listing the directory on every poll. A new
+    file is considered ready once its "writing" attribute (set by ImSwitch
+    recordings in HDF5 and Zarr files) is false, or, for files without such
+    an attribute, once its size and modification time (or, for directories,
+    their number of files and total size) have not changed for settleTime
+    seconds. """
+
+    def __init__(self, path, extension, settleTime=1.0, useNotifications=True):
+        self.path = path
+        self.extension = extension
+        self.settleTime = settleTime
+
+        self._ready = set()
+        self._pending = {}  # name -> (signature, time of last signature change)
+        self._lock = threading.Lock()
+
+        self._inotify = None
+        if useNotifications:
+            try:
+                self._inotify = _InotifyWatch(path)
+            except OSError:
+                self._inotify = None
+
+        # Files that already exist are not checked, to keep starting cheap for
+        # large directories; use recheck for those that turn out not to be ready
+        self._ready.update(self.listMatching())
+
+    @property
+    def usesNotifications(self):
+        """ Whether changes are picked up through OS change notifications
+        rather than by listing the directory. """
+        return self._inotify is not None
+
+    @property
+    def readyFiles(self):
+        """ The names of the files that are ready, sorted. """
+        with self._lock:
+            return sorted(self._ready)
+
+    @property
+    def pendingFiles(self):
+        """ The names of the files that are not yet ready, sorted. """
+        with self._lock:
+            return sorted(self._pending)
+
+    def listMatching(self):
+        """ Lists the names of the files in the directory that have the
+        watched extension. """
+        suffix = '.' + self.extension
+        with os.scandir(self.path) as entries:
+            return {entry.name for entry in entries
+                    if entry.name.endswith(suffix) and (entry.is_file() or entry.is_dir())}
+
+    def poll(self, timeout=0):
+        """ Waits up to timeout seconds for changes to the directory, and
+        returns a list of the names of the files that have become ready and a
+        list of the names of those that have been removed since the last
+        call. """
+        if self._inotify is not None:
+            created, removed, overflowed = self._inotify.read(timeout, self.extension)
+            if overflowed:
+                created, removed = self._rescan()
+        else:
+            if timeout > 0:
+                time.sleep(timeout)
+            created, removed = self._rescan()
+
+        with self._lock:
+            for name in removed:
+                self._ready.discard(name)
+                self._pending.pop(name, None)
+            now = time.monotonic()
+            for name in created:
+                if name not in self._ready and name not in self._pending:
+                    self._pending[name] = (None, now)
+            pendingNames = list(self._pending)
+
+        newReady = []
+        for name in pendingNames:
+            filePath = os.path.join(self.path, name)
+            try:
+                writingState = getWritingState(filePath)
+                signature = getSignature(filePath) if writingState is None else None
+            except OSError:
+                continue  # Removed since it was listed
+
+            if writingState is None:
+                with self._lock:
+                    if name not in self._pending:
+                        continue
+                    previousSignature, changeTime = self._pending[name]
+                    if signature != previousSignature:
+                        self._pending[name] = (signature, time.monotonic())
+                        continue
+                    if time.monotonic() - changeTime < self.settleTime:
+                        continue
+            elif writingState:
+                continue
+
+            with self._lock:
+                if name in self._pending:
+                    del self._pending[name]
+                    self._ready.add(name)
+                    newReady.append(name)
+
+        return sorted(newReady), sorted(set(removed))
+
+    def recheck(self, names):
+        """ Marks the given files as not ready, so that they are reported
+        again once they are ready. """
+        with self._lock:
+            now = time.monotonic()
+            for name in names:
+                self._ready.discard(name)
+                self._pending[name] = (None, now)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _rescan(self):
+        current = self.listMatching()
+        with self._lock:
+            known = self._ready | set(self._pending)
+        return current - known, known - current
+
+
+def getWritingState(path):
+    """ Returns the "writing" attribute of the HDF5 file or Zarr store at
+    path: True if any of its datasets is still being written, False if all
+    of them have been finished, and None if it has no such attribute (or is
+    not an HDF5 file or Zarr store). An HDF5 file that cannot be opened is
+    considered to be still being written. """
+    ext = os.path.splitext(path)[1]
+    states = []
+    if ext in ['.hdf5', '.hdf']:
+        try:
+            with h5py.File(path, 'r') as file:
+                if 'writing' in file.attrs:
+                    states.append(bool(file.attrs['writing']))
+                for dataset in file.values():
+                    if 'writing' in dataset.attrs:
+                        states.append(bool(dataset.attrs['writing']))
+        except OSError:
+            return True
+    elif ext == '.zarr' and os.path.isdir(path):
+        attrsPaths = [os.path.join(path, '.zattrs')]
+        with os.scandir(path) as entries:
+            attrsPaths.extend(os.path.join(entry.path, '.zattrs') for entry in entries
+                              if entry.is_dir())
+        for attrsPath in attrsPaths:
+            try:
+                with open(attrsPath, 'r') as attrsFile:
+                    attrs = json.load(attrsFile)
+            except (OSError, ValueError):
+                continue
+            if 'writing' in attrs:
+                states.append(bool(attrs['writing']))
+
+    return any(states) if states else None
+
+
+def getSignature(path):
+    """ Returns a value that changes whenever the file at path is written
+    to: its size and modification time, or, for a directory, the number of
+    files in it and their total size. """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    numFiles = 0
+    totalSize = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                totalSize += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+            numFiles += 1
+    return numFiles, totalSize
+
+
+class _InotifyWatch:
+    """ Minimal ctypes wrapper around Linux inotify that watches a single
+    directory for entries being created, removed or written to. """
+
+    _IN_MODIFY = 0x2
+    _IN_ATTRIB = 0x4
+    _IN_CLOSE_WRITE = 0x8
+    _IN_MOVED_FROM = 0x40
+    _IN_MOVED_TO = 0x80
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+    _eventHeader = struct.Struct('iIII')
+
+    def __init__(self, path):
+        if not hasattr(select, 'select') or not sys.platform.startswith('linux'):
+            raise OSError('inotify is not available on this platform')
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this platform')
+
+        self._fd = libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        mask = (self._IN_MODIFY | self._IN_ATTRIB | self._IN_CLOSE_WRITE | self._IN_MOVED_FROM |
+                self._IN_MOVED_TO | self._IN_CREATE | self._IN_DELETE)
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f'Failed to watch "{path}"')
+
+    def read(self, timeout, extension):
+        """ Waits up to timeout seconds for events, and returns the sets of
+        names with the given extension that were created and removed, and
+        whether events were lost. """
+        created, removed, overflowed = set(), set(), False
+        suffix = '.' + extension
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        while readable:
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset + self._eventHeader.size <= len(buffer):
+                _, mask, _, nameLength = self._eventHeader.unpack_from(buffer, offset)
+                offset += self._eventHeader.size
+                name = os.fsdecode(buffer[offset:offset + nameLength].rstrip(b'\0'))
+                offset += nameLength
+
+                if mask & self._IN_Q_OVERFLOW:
+                    overflowed = True
+                elif not name.endswith(suffix):
+                    continue
+                elif mask & (self._IN_DELETE | self._IN_MOVED_FROM):
+                    created.discard(name)
+                    removed.add(name)
+                else:
+                    removed.discard(name)
+                    created.add(name)
+
+            readable, _, _ = select.select([self._fd], [], [], 0)
+
+        return created, removed, overflowed
+
+    def close(self):
+        os.close(self._fd)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
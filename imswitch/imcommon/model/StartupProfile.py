@@ -0,0 +1,78 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """ Collects how long the steps of starting ImSwitch take, such as
+    importing and initializing modules, constructing device managers and
+    creating widget controllers, to report where startup time is spent.
+    Steps may run concurrently, so their durations can add up to more than
+    the total startup time. """
+
+    def __init__(self):
+        self._startTime = time.perf_counter()
+        self._entries = []  # (category, name, duration)
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        """ A list of (category, name, duration in seconds) of the recorded
+        steps, in the order they finished. """
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def elapsed(self):
+        """ Seconds since the profile was started. """
+        return time.perf_counter() - self._startTime
+
+    def record(self, category, name, duration):
+        with self._lock:
+            self._entries.append((category, name, duration))
+
+    @contextmanager
+    def measure(self, category, name):
+        """ Context manager that records how long its block takes to run. """
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(category, name, time.perf_counter() - startTime)
+
+    def report(self, minDuration=0.01):
+        """ Returns a human-readable report of the recorded steps that took at
+        least minDuration seconds, grouped by category and slowest first. """
+        lines = [f'Startup took {self.elapsed:.2f} s']
+        byCategory = {}
+        for category, name, duration in self.entries:
+            byCategory.setdefault(category, []).append((name, duration))
+
+        for category, steps in byCategory.items():
+            total = sum(duration for _, duration in steps)
+            lines.append(f'  {category} ({len(steps)}, {total:.2f} s in total):')
+            for name, duration in sorted(steps, key=lambda step: -step[1]):
+                if duration >= minDuration:
+                    lines.append(f'    {duration:7.2f} s  {name}')
+        return '\n'.join(lines)
+
+
+startupProfile = StartupProfile()
+""" The profile of the running ImSwitch instance. """
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,5 +1,7 @@
+from .ContrastEstimator import ContrastEstimator
 from .SharedAttributes import SharedAttributes
+from .StartupProfile import StartupProfile, startupProfile
 from .VFileCollection import VFileItem, VFileCollection
-from .api import APIExport, generateAPI
+from .api import APIExport, batchAPICalls, generateAPI
 from .logging import initLogger
 from .shortcut import shortcut, generateShortcuts
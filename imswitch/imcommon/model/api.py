@@ -1,10 +1,17 @@
 import inspect
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 
-from imswitch.imcommon.framework import Mutex, Signal, SignalInterface
+from imswitch.imcommon.framework import Signal, SignalInterface
+from .logging import initLogger
 
 
 class APIExport:
-    """ Decorator for methods that should be exported to API. """
+    """ Decorator for methods that should be exported to API. Methods
+    exported with runOnUIThread=True are executed on the UI thread, and
+    calling them through the API returns a concurrent.futures.Future for
+    their return value. """
 
     def __init__(self, *, runOnUIThread=False):
         self._APIExport = True
@@ -48,33 +55,101 @@ def generateAPI(objs, *, missingAttributeErrorMsg=None):
                                      missingAttributeErrorMsg=missingAttributeErrorMsg)
 
 
-class _UIThreadExecWrapper(SignalInterface):
-    """ Wrapper for executing the specified function on the UI thread. """
-
-    wrappingSignal = Signal()
+@contextmanager
+def batchAPICalls():
+    """ Context manager that collects the calls to API functions that run on
+    the UI thread made in it by the current thread, and executes them all in
+    one go, in the order they were made, when the block is exited. The
+    futures returned by the calls are resolved after that, so waiting for
+    them inside the block would never return. Nested blocks join the
+    outermost one, and if the block raises an exception, the collected calls
+    are cancelled. """
+
+    if getattr(_batchState, 'calls', None) is not None:
+        yield
+        return
+
+    _batchState.calls = calls = []
+    try:
+        yield
+    except BaseException:
+        for future, *_ in calls:
+            future.cancel()
+        raise
+    finally:
+        _batchState.calls = None
+
+    if calls:
+        _UIThreadExecutor.instance().submit(calls)
+
+
+class _UIThreadExecWrapper:
+    """ Wrapper for executing the specified function on the UI thread.
+    Calling it returns a concurrent.futures.Future that holds the return
+    value of the function, or the exception it raised, once it has been
+    executed; use asyncio.wrap_future to await it. """
 
     def __init__(self, apiFunc):
-        super().__init__()
-
         self.__name__ = apiFunc.__name__
         self.__signature__ = inspect.signature(apiFunc)
         self.__doc__ = apiFunc.__doc__
 
         self._apiFunc = apiFunc
-        self._execMutex = Mutex()
-        self.wrappingSignal.connect(self._apiCall)
+        self._executor = _UIThreadExecutor.instance()
 
     def __call__(self, *args, **kwargs):
-        self._execMutex.lock()
-        self._args = args
-        self._kwargs = kwargs
-        self.wrappingSignal.emit()
-
-    def _apiCall(self):
-        try:
-            self._apiFunc(*self._args, **self._kwargs)
-        finally:
-            self._execMutex.unlock()
+        call = (Future(), self._apiFunc, args, kwargs)
+        batch = getattr(_batchState, 'calls', None)
+        if batch is not None:
+            batch.append(call)
+        else:
+            self._executor.submit([call])
+        return call[0]
+
+
+class _UIThreadExecutor(SignalInterface):
+    """ Executes lists of calls on the thread it was created on. Every list
+    is passed with its own signal emission, so calls don't wait for each
+    other except on the UI thread itself. """
+
+    _sigExecute = Signal(object)  # (calls)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """ Returns the executor, creating it if needed; must first be called
+        from the UI thread. """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        super().__init__()
+        self.__logger = initLogger(self)
+        self._thread = threading.current_thread()
+        self._sigExecute.connect(self._execute)
+
+    def submit(self, calls):
+        if threading.current_thread() is self._thread:
+            self._execute(calls)  # Waiting for a queued call would deadlock
+        else:
+            self._sigExecute.emit(calls)
+
+    def _execute(self, calls):
+        for future, func, args, kwargs in calls:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.__logger.error(f'API function {func.__name__} failed: {e}')
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+_batchState = threading.local()
 
 
 # Copyright (C) 2020-2021 ImSwitch developers
@@ -46,7 +46,10 @@ def initLogger(obj, *, instanceName=None, tryInheritParent=False):
                 continue
 
             parent = frameLocals['self']
-            parentRef = weakref.ref(parent)
+            try:
+                parentRef = weakref.ref(parent)
+            except TypeError:
+                continue  # Can't have a logger if it can't be weakly referenced
             if parentRef not in objLoggers:
                 continue
 
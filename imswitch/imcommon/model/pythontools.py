@@ -1,8 +1,10 @@
+import importlib
 import re
 import sys
 import traceback
+import types
 
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.model import initLogger, startupProfile
 
 
 def joinModulePath(segment1, segment2):
@@ -51,6 +53,41 @@ def dictToROClass(src, *, missingAttributeErrorMsg=None):
     return ROClass()
 
 
+def installLazyImports(moduleName, lazyAttributes):
+    """ Makes the attributes of the already imported module moduleName that
+    are listed in the dict lazyAttributes (attribute name -> name of the
+    submodule that defines it) be imported from their submodules when they
+    are first accessed, rather than when the module is imported. Intended
+    to be called at the end of the __init__.py of a package. """
+    module = sys.modules[moduleName]
+    module.__class__ = _LazyModule
+    module.__dict__['_lazyAttributes'] = dict(lazyAttributes)
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name):
+        lazyAttributes = self.__dict__.get('_lazyAttributes', {})
+        if name not in lazyAttributes:
+            raise AttributeError(f'module "{self.__name__}" has no attribute "{name}"')
+
+        submoduleName = joinModulePath(self.__name__, lazyAttributes[name])
+        with startupProfile.measure('import', submoduleName):
+            value = getattr(importlib.import_module(submoduleName), name)
+        super().__setattr__(name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        # Importing a submodule sets it as an attribute of the package, which must
+        # not hide the lazily imported attribute of the same name
+        if isinstance(value, types.ModuleType) and name in self.__dict__.get('_lazyAttributes',
+                                                                              {}):
+            return
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.__dict__.get('_lazyAttributes', {})))
+
+
 def installExceptHook():
     if not (hasattr(sys.excepthook, 'implements')
             and sys.excepthook.implements('ExceptionHandler')):
@@ -1,62 +1,64 @@
-from os import listdir
-from os.path import isfile, join, isdir
-import time
 from qtpy import QtCore
 from datetime import datetime
 import os
 import json
 import socket
 
+from imswitch.imcommon.model.DirectoryMonitor import DirectoryMonitor
+
 
 class FileWatcher(QtCore.QThread):
+    """ Thread that watches a directory for new files with a given extension,
+    and emits them once they have been completely written. See
+    DirectoryMonitor for how changes are detected and when a file is
+    considered completely written. """
+
     sigNewFiles = QtCore.Signal(list)
+    sigFilesRemoved = QtCore.Signal(list)
 
-    def __init__(self, path, extension, pollTime):
+    def __init__(self, path, extension, pollTime, settleTime=None):
         super().__init__()
         self.path = path
         self.extension = extension
         self.pollTime = pollTime
-        self.list = self.filesInDirectory()
-        self.watching = False
+        self._monitor = DirectoryMonitor(
+            path, extension, settleTime=settleTime if settleTime is not None else pollTime
+        )
         self.active = False
         self._log = {}
         self.startLog()
 
     def filesInDirectory(self):
-        return [f for f in listdir(self.path) if ((isfile(join(self.path, f)) or isdir(join(self.path, f))) and f.endswith('.' + self.extension))]
-
-    def updateList(self, newList):
-        differencesList = [x for x in newList if
-                           x not in self.list]  # Note if files get deleted, this will not highlight them
-        self.list = newList
-        return differencesList
+        """ Returns the files in the directory that have been found to be
+        ready, sorted by name. """
+        return self._monitor.readyFiles
 
     def run(self):
         self.active = True
         while self.active:
-            if not self.watching:  # Check if this is the first time the function has run
-                self.list = self.filesInDirectory()
-                self.watching = True
-
-            time.sleep(self.pollTime)
-
-            newFileList = self.filesInDirectory()
-
-            fileDiff = self.updateList(newFileList)
-
-            if len(fileDiff) == 0:
-                continue
-
-            self.sigNewFiles.emit(fileDiff)
+            newFiles, removedFiles = self._monitor.poll(self.pollTime)
+            if not self.active:
+                break
+            if removedFiles:
+                self.sigFilesRemoved.emit(removedFiles)
+            if newFiles:
+                self.sigNewFiles.emit(newFiles)
+        self._monitor.close()
+
+    def __del__(self):
+        self._monitor.close()
 
     def stop(self):
         self.saveLog()
         self._log = {}
         self.active = False
+        if not self.isRunning():
+            self._monitor.close()  # Otherwise closed by run once it returns
 
     def removeFromList(self, files):
-        for f in files:
-            self.list.remove(f)
+        """ Forgets the given files, so that they are emitted again once they
+        are found to be ready. """
+        self._monitor.recheck(files)
 
     def startLog(self):
         self._log["Starting time"] = str(datetime.now())
@@ -3,7 +3,7 @@ from .BetterSlider import BetterSlider
 from .CheckableComboBox import CheckableComboBox
 from .FloatSlider import FloatSlider
 from .dialogtools import askYesNoQuestion, askForFilePath, askForFolderPath, askForTextInput
-from .imagetools import bestLevels, minmaxLevels
+from .imagetools import bestLevels, decimationPyramid, minmaxLevels
 from .stylesheet import getBaseStyleSheet
 from .texttools import ordinalSuffix
 from .FileWatcher import FileWatcher
@@ -1,46 +1,20 @@
 import numpy as np
 
-
-def bestLevels(arr):
-    # Best cmin, cmax algorithm taken from ImageJ routine:
-    # http://cmci.embl.de/documents/120206pyip_cooking/
-    # python_imagej_cookbook#automatic_brightnesscontrast_button
-    pixelCount = arr.size
-    limit = pixelCount / 10
-    threshold = pixelCount / 5000
-    hist, bin_edges = np.histogram(arr, 256)
-    i = 0
-    found = False
-    count = 0
-    while True:
-        i += 1
-        count = hist[i]
-        if count > limit:
-            count = 0
-        found = count > threshold
-        if found or i >= 255:
-            break
-    hmin = i
-
-    i = 256
-    while True:
-        i -= 1
-        count = hist[i]
-        if count > limit:
-            count = 0
-        found = count > threshold
-        if found or i < 1:
-            break
-    hmax = i
-
-    return bin_edges[hmin], bin_edges[hmax]
-
-
-def minmaxLevels(arr):
-    minlevel = 0
-    maxlevel = arr.max() + 2
-
-    return minlevel, maxlevel
+from imswitch.imcommon.model.ContrastEstimator import bestLevels, minmaxLevels, subsample
+
+
+def decimationPyramid(image, minSize=512):
+    """ Returns a list of image and views of every 2nd, 4th, etc. row and
+    column of it, ending with the first one whose largest side is at most
+    minSize pixels, for display as a multiscale image. The views share
+    memory with image, so building the pyramid copies nothing. """
+    image = np.asarray(image)
+    levels = [image]
+    factor = 1
+    while max(levels[-1].shape[-2:]) > minSize:
+        factor *= 2
+        levels.append(image[..., ::factor, ::factor])
+    return levels
 
 
 # Copyright (C) 2017 Federico Barabas
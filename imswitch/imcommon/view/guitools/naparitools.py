@@ -8,11 +8,11 @@ from vispy.color import Color
 from vispy.scene.visuals import Compound, Line, Markers
 from vispy.visuals.transforms import STTransform
 
-from .imagetools import minmaxLevels
+from imswitch.imcommon.model import ContrastEstimator
 
 
 def addNapariGrayclipColormap():
-    if hasattr(napari.utils.colormaps.AVAILABLE_COLORMAPS, 'grayclip'):
+    if 'grayclip' in napari.utils.colormaps.AVAILABLE_COLORMAPS:
         return
 
     grayclip = []
@@ -123,6 +123,7 @@ class NapariUpdateLevelsWidget(NapariBaseWidget):
 
     def __init__(self, napariViewer):
         super().__init__(napariViewer)
+        self._contrastEstimator = ContrastEstimator(maxSamples=2 ** 20)
 
         # Update levels button
         self.updateLevelsButton = QtWidgets.QPushButton('Update levels')
@@ -138,7 +139,10 @@ class NapariUpdateLevelsWidget(NapariBaseWidget):
 
     def _on_update_levels(self):
         for layer in self.viewer.layers.selected:
-            layer.contrast_limits = minmaxLevels(layer.data)
+            # Layers may hold large stacks, so estimate from a subsample (of the
+            # lowest resolution level of multiscale layers)
+            data = layer.data[-1] if layer.multiscale else layer.data
+            layer.contrast_limits = self._contrastEstimator.estimate(data, smooth=False)
 
 
 class NapariResetViewWidget(NapariBaseWidget):
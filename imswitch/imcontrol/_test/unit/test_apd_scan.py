@@ -0,0 +1,132 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.model import DetectorInfo
+from imswitch.imcontrol.model.managers.detectors.APDManager import APDManager, ScanWorker
+
+
+# 4x3 pixel frames at two z positions, two det samples per pixel. Each d3 step
+# starts with 4 samples of positioning, settling and acceleration, followed by
+# lines of 8 samples every 12 samples, and is realigned to 40 samples.
+scanInfoDict = {
+    'dwell_time': 2e-6,
+    'scan_time_step': 1e-6,
+    'img_dims': [4, 3, 2],
+    'scan_samples': [8, 8, 40],
+    'scan_samples_d2_period': 12,
+    'scan_samples_total': 92,
+    'scan_throw_startzero': 5,
+    'scan_throw_initpos': 2,
+    'scan_throw_settling': 1,
+    'scan_throw_startacc': 1,
+    'scan_throw_finalpos': 2,
+    'padlens': [0, 0, 0],
+    'phase_delay': 0,
+    'pixel_sizes': [0.1, 0.1, 0.2],
+}
+lineStarts = [9, 21, 33, 49, 61, 73]
+
+
+class FakeNidaqManager:
+    """ Serves the cumulative counts of a counter that starts just before
+    wrapping around. """
+
+    def __init__(self, counts):
+        self.sigScanBuilt = mock.Mock()
+        self.sigScanStarted = mock.Mock()
+        self.inputTaskDone = mock.Mock()
+        self.cumCounts = (np.cumsum(counts) + 2 ** 32 - 50).astype(np.uint32)
+        self.samplesRead = 0
+
+    def startInputTask(self, *args):
+        self.samplesRead = 0
+
+    def readCounterInputTask(self, taskName, data, timeout=10.0):
+        data[:] = self.cumCounts[self.samplesRead:self.samplesRead + len(data)]
+        self.samplesRead += len(data)
+        return data
+
+
+@pytest.fixture
+def counts():
+    return np.arange(scanInfoDict['scan_samples_total']) % 7
+
+
+def makeWorker(counts, ttlSignal=None, **kwargs):
+    nidaqManager = FakeNidaqManager(counts)
+    detectorInfo = DetectorInfo(analogChannel=None, digitalLine=None, managerName='APDManager',
+                                managerProperties={'ctrInputLine': 'Dev1/ctr0',
+                                                   'terminal': 'PFI0'},
+                                forAcquisition=True)
+    manager = APDManager(detectorInfo, 'APD', nidaqManager)
+    manager._ttlmultiplying = ttlSignal is not None
+    worker = ScanWorker(manager, scanInfoDict, {'TTLCycleSignalsDict': {'APD': ttlSignal}},
+                        **kwargs)
+    worker.scanning = True
+    return worker, manager, nidaqManager
+
+
+def expectedImage(counts):
+    lines = [[counts[start + 2 * i:start + 2 * i + 2].sum() for i in range(4)]
+             for start in lineStarts]
+    return np.array(lines, dtype=float).reshape(1, 2, 3, 4)
+
+
+@pytest.mark.parametrize('maxUpdateRate', [20, 1e6], ids=['oneBatch', 'lineBatches'])
+def test_scan_image(counts, maxUpdateRate):
+    worker, manager, nidaqManager = makeWorker(counts, maxUpdateRate=maxUpdateRate)
+    linesAcquired = []
+    worker.linesAcquired.connect(linesAcquired.append)
+    worker.linesAcquired.connect(manager.updateImage)
+    acqDone = mock.Mock()
+    worker.acqDoneSignal.connect(acqDone)
+    worker.run()
+
+    np.testing.assert_array_equal(manager._image, expectedImage(counts))
+    assert nidaqManager.samplesRead == scanInfoDict['scan_samples_total']
+    assert linesAcquired[-1] == 6
+    assert acqDone.call_count == 1
+    np.testing.assert_array_equal(manager.getChunk(), expectedImage(counts)[0, 0][np.newaxis])
+    assert manager.getChunk().size == 0
+
+
+def test_scan_image_ttl(counts):
+    ttlSignal = np.ones(scanInfoDict['scan_samples_total'], dtype=bool)
+    ttlSignal[22] = False  # Second line of the first frame, first pixel
+    ttlSignal[50:53] = False  # First line of the second frame, first two pixels
+    worker, manager, _ = makeWorker(counts, ttlSignal)
+    worker.run()
+
+    expected = expectedImage(counts)
+    expected[0, 0, 1, 0] = np.nan
+    expected[0, 1, 0, :2] = np.nan
+    np.testing.assert_array_equal(manager._image, expected)
+
+
+def test_scan_stop(counts):
+    worker, manager, nidaqManager = makeWorker(counts)
+    acqDone = mock.Mock()
+    worker.acqDoneSignal.connect(acqDone)
+    worker.scanning = False
+    worker.run()
+    assert nidaqManager.inputTaskDone.call_count == 1
+    assert acqDone.call_count == 0
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
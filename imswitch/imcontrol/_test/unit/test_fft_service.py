@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.model.FFTService import FFTService
+
+
+def referenceFFT(image):
+    return np.fft.fftshift(np.log10(abs(np.fft.fft2(image))))
+
+
+@pytest.mark.parametrize('shape', [(64, 64), (48, 33), (33, 48), (7, 5)])
+def test_matches_full_fft(shape):
+    rng = np.random.default_rng(0)
+    image = rng.poisson(100, size=shape).astype(np.uint16)
+
+    fftImage = FFTService().compute(image)
+    assert fftImage.dtype == np.float32
+    assert fftImage.shape == shape
+    assert np.allclose(fftImage, referenceFFT(image), atol=1e-4)
+
+
+def test_roi_and_decimation():
+    rng = np.random.default_rng(0)
+    image = rng.poisson(100, size=(64, 64)).astype(np.uint16)
+
+    service = FFTService(decimation=2, roi=(8, 0, 40, 64))
+    assert np.allclose(service.compute(image), referenceFFT(image[8:40:2, ::2]), atol=1e-4)
+
+
+def test_rolling_average_power_spectrum():
+    rng = np.random.default_rng(0)
+    images = rng.poisson(100, size=(5, 32, 32)).astype(np.uint16)
+
+    service = FFTService(numAverage=3)
+    for image in images:
+        fftImage = service.compute(image)
+    power = np.mean([abs(np.fft.fft2(image)) ** 2 for image in images[-3:]], axis=0)
+    assert np.allclose(fftImage, np.fft.fftshift(np.log10(np.sqrt(power))), atol=1e-4)
+
+    # Restarting the average forgets previous frames
+    service.resetAverage()
+    assert np.allclose(service.compute(images[0]), referenceFFT(images[0]), atol=1e-4)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.controller.controllers.FocusLockController import FocusSignalEstimator
+
+
+def makeFrame(shape, spots, sigma=6, background=100, seed=0):
+    rows, cols = np.indices(shape)
+    frame = np.full(shape, float(background))
+    for row, col, amplitude in spots:
+        frame += amplitude * np.exp(-((rows - row) ** 2 + (cols - col) ** 2) / (2 * sigma ** 2))
+    rng = np.random.default_rng(seed)
+    return rng.poisson(frame).astype(np.uint16)
+
+
+@pytest.mark.parametrize('refineMethod', ['centroid', 'gaussian'])
+@pytest.mark.parametrize('shape, spot', [((1024, 1280), (500.0, 640.3)),
+                                         ((300, 1500), (150.0, 1420.7)),
+                                         ((512, 512), (20.0, 25.5))])
+def test_subpixel_position(refineMethod, shape, spot):
+    estimator = FocusSignalEstimator(refineMethod=refineMethod)
+    frame = makeFrame(shape, [(*spot, 4000)])
+    assert estimator.estimate(frame) == pytest.approx(spot[1], abs=0.3)
+    assert set(estimator.timings) == {'decimate', 'coarse', 'refine', 'total'}
+
+
+def test_two_foci_picks_leftmost_spot():
+    estimator = FocusSignalEstimator()
+    frame = makeFrame((512, 640), [(250, 400, 4000), (260, 200, 3000), (100, 600, 500)])
+    assert estimator.estimate(frame, twoFoci=True) == pytest.approx(200, abs=0.5)
+    estimator.reset()
+    assert estimator.estimate(frame) == pytest.approx(400, abs=0.5)
+
+
+def test_tracks_previous_position():
+    estimator = FocusSignalEstimator(trackRadius=50)
+    assert estimator.estimate(makeFrame((512, 640), [(250, 300, 2000)])) == \
+        pytest.approx(300, abs=0.5)
+
+    # A brighter spot far away is ignored while the tracked spot is still there
+    frame = makeFrame((512, 640), [(250, 310, 2000), (250, 550, 6000)])
+    assert estimator.estimate(frame) == pytest.approx(310, abs=0.5)
+
+    # ...but found once the tracked spot is lost
+    frame = makeFrame((512, 640), [(250, 550, 6000)])
+    assert estimator.estimate(frame) == pytest.approx(550, abs=0.5)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
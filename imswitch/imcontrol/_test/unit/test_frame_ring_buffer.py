@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.model.managers.detectors.FrameRingBuffer import (
+    FrameRingBuffer, FrameStream
+)
+
+
+def makeFrames(start, stop, shape=(2, 3)):
+    return np.stack([np.full(shape, i, dtype=np.uint16) for i in range(start, stop)])
+
+
+def test_push_and_read_views():
+    frame = np.zeros((2, 3), dtype=np.uint16)
+    ring = FrameRingBuffer(maxBytes=4 * frame.nbytes)
+
+    assert ring.push(makeFrames(0, 3), timestamps=[1.0, 2.0, 3.0]) == 0
+    assert ring.capacity == 4
+    block = ring.read(0)
+    assert block.startIndex == 0 and block.stopIndex == 3
+    assert list(block.frames[:, 0, 0]) == [0, 1, 2]
+    assert list(block.timestamps) == [1.0, 2.0, 3.0]
+    assert np.shares_memory(block.frames, ring.getLatest())
+    assert ring.getLatest()[0, 0] == 2
+
+
+def test_overwrites_oldest_frames():
+    frame = np.zeros((2, 3), dtype=np.uint16)
+    ring = FrameRingBuffer(maxBytes=4 * frame.nbytes)
+
+    ring.push(makeFrames(0, 3))
+    assert ring.push(makeFrames(3, 6)) == 3
+    assert ring.oldestIndex == 2 and ring.nextIndex == 6 and ring.numFrames == 4
+
+    # Reads starting before the oldest frame start at the oldest frame, and
+    # views end where the frames wrap around the end of the ring
+    block = ring.read(0)
+    assert block.startIndex == 2
+    assert list(block.frames[:, 0, 0]) == [2, 3]
+    assert list(ring.read(block.stopIndex).frames[:, 0, 0]) == [4, 5]
+    assert list(ring.getFrames(0)[:, 0, 0]) == [2, 3, 4, 5]
+    assert list(ring.getFrames(3, 5)[:, 0, 0]) == [3, 4]
+    assert ring.read(6) is None
+
+
+def test_push_more_than_capacity_and_lists():
+    frame = np.zeros((2, 3), dtype=np.uint16)
+    ring = FrameRingBuffer(maxBytes=3 * frame.nbytes)
+
+    assert ring.push(list(makeFrames(0, 5))) == 0
+    assert ring.nextIndex == 5
+    assert list(ring.getFrames(0)[:, 0, 0]) == [2, 3, 4]
+
+
+def test_clear_and_reallocate():
+    ring = FrameRingBuffer(maxBytes=2 ** 20)
+    ring.push(makeFrames(0, 3))
+    ring.clear()
+    assert ring.numFrames == 0 and ring.getLatest() is None
+    assert ring.getFrames(0).shape == (0, 2, 3)
+
+    # A new frame shape discards the held frames, but indices keep counting
+    ring.push(makeFrames(3, 4, shape=(4, 4)))
+    assert ring.oldestIndex == 3
+    assert ring.getLatest().shape == (4, 4)
+
+
+def test_streams_read_independently():
+    ring = FrameRingBuffer(maxBytes=2 ** 20)
+    ring.push(makeFrames(0, 2))
+    streamA = FrameStream('A', ring)
+    streamB = FrameStream('B', ring)
+
+    ring.push(makeFrames(2, 5))
+    assert list(streamA.read(2)[:, 0, 0]) == [2, 3]
+    assert list(streamA.read()[:, 0, 0]) == [4]
+    assert len(streamA.read()) == 0
+    block = streamB.readBlock()
+    assert block.startIndex == 2 and list(block.frames[:, 0, 0]) == [2, 3, 4]
+    assert streamA.numOverrun == streamB.numOverrun == 0
+
+
+def test_stream_overrun_and_poll():
+    frame = np.zeros((2, 3), dtype=np.uint16)
+    ring = FrameRingBuffer(maxBytes=3 * frame.nbytes)
+    pending = [makeFrames(0, 5)]
+    stream = FrameStream('A', ring, poll=lambda: pending and ring.push(pending.pop()))
+
+    assert list(stream.read()[:, 0, 0]) == [2, 3, 4]
+    assert stream.numOverrun == 2
+    assert stream.readBlock() is None
+
+    closed = []
+    stream = FrameStream('B', ring, onClose=closed.append)
+    stream.close()
+    assert closed == [stream] and stream.closed
+    with pytest.raises(ValueError):
+        stream.read()
+
+
+def test_detector_streams_receive_all_frames(qapp):
+    from imswitch.imcontrol._test.unit import detectorInfosBasic
+    from imswitch.imcontrol.model.managers.detectors.HamamatsuManager import HamamatsuManager
+
+    detector = HamamatsuManager(detectorInfosBasic['CAM'], 'CAM')
+    detector.startAcquisition()
+    try:
+        streams = {'A': detector.openStream('A'), 'B': detector.openStream('B')}
+        frames = {'A': {}, 'B': {}}
+        while len(frames['B']) < 3:
+            for name, stream in streams.items():
+                block = stream.readBlock()
+                while block is not None:
+                    for index, frame in enumerate(block.frames, block.startIndex):
+                        frames[name][index] = frame.copy()
+                    block = stream.readBlock()
+            time.sleep(0.05)
+        for stream in streams.values():
+            stream.close()
+    finally:
+        detector.stopAcquisition()
+
+    # Each stream sees every frame from when it was opened
+    for name in frames:
+        indices = sorted(frames[name])
+        assert indices == list(range(indices[0], indices[-1] + 1))
+        assert streams[name].numOverrun == 0
+    assert all(np.array_equal(frame, frames['A'][index])
+               for index, frame in frames['B'].items() if index in frames['A'])
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.controller.server.FrameStreamServer import FrameStreamServer
+from imswitch.imcontrol.controller.server.framestream import (
+    FLAG_SHUFFLED, FLAG_ZLIB, FrameStreamClient, SharedFrameRing, decodeFrame, encodeFrame
+)
+from imswitch.imcontrol.model.managers.LiveFrameDispatcher import LiveFrameDispatcher
+
+
+@pytest.fixture
+def server(qtbot):
+    dispatcher = LiveFrameDispatcher()
+    server = FrameStreamServer(dispatcher, port=0)
+    server.start()
+    yield server, dispatcher
+    server.stop()
+
+
+def makeFrame(index, shape=(64, 48)):
+    return np.arange(np.prod(shape), dtype=np.uint16).reshape(shape) + np.uint16(index)
+
+
+def receiveFrame(qtbot, server, dispatcher, **request):
+    """ Connects a client with the given request and publishes frames until
+    it has received one, which is returned. """
+    received = []
+    with FrameStreamClient(*server.address, **request) as client:
+        reader = threading.Thread(target=lambda: received.append(client.readFrame()),
+                                  daemon=True)
+        reader.start()
+        qtbot.waitUntil(lambda: server.numClients == 1)
+        index = 0
+        while reader.is_alive() and index < 1000:
+            dispatcher.publish('CAM', makeFrame(index), False, [1, 1], True)
+            reader.join(0.01)
+            index += 1
+        assert received and received[0] is not None
+    qtbot.waitUntil(lambda: server.numClients == 0)
+    return received[0][2]
+
+
+@pytest.mark.parametrize('request_', [
+    {},
+    {'compression': 'zlib'},
+    {'sharedMemory': True},
+], ids=['raw', 'zlib', 'sharedMemory'])
+def test_stream_frames(qtbot, server, request_):
+    frame = receiveFrame(qtbot, *server, **request_)
+    assert frame.dtype == np.uint16
+    assert np.array_equal(frame, makeFrame(frame[0, 0]))
+
+
+def test_stream_view(qtbot, server):
+    frame = receiveFrame(qtbot, *server, decimation=2, roi=(8, 4, 40, 36))
+    published = makeFrame(frame[0, 0] - makeFrame(0)[8, 4])
+    assert np.array_equal(frame, published[8:40:2, 4:36:2])
+
+
+class EagerLiveFrames(LiveFrameDispatcher):
+    """ Publishes a frame right after subscribing, and gives the subscription
+    time to deliver it before subscribe returns. """
+
+    def subscribe(self, *args, **kwargs):
+        subscription = super().subscribe(*args, **kwargs)
+        self.publish('CAM', makeFrame(7), False, [1, 1], True)
+        time.sleep(0.2)
+        return subscription
+
+
+def test_frame_delivered_during_subscribe():
+    server = FrameStreamServer(EagerLiveFrames(), port=0)
+    server.start()
+    client = FrameStreamClient(*server.address)
+    received = []
+    try:
+        reader = threading.Thread(target=lambda: received.append(client.readFrame()),
+                                  daemon=True)
+        reader.start()
+        reader.join(5)
+    finally:
+        server.stop()  # Closing the connection also ends the read if no frame arrived
+        reader.join()
+        client.close()
+
+    assert received[0] is not None
+    frameIndex, _, frame = received[0]
+    assert frameIndex == 1
+    assert np.array_equal(frame, makeFrame(7))
+
+
+def test_refuses_invalid_request(server):
+    with pytest.raises(ConnectionError):
+        FrameStreamClient(*server[0].address, compression='lz4')
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.float32])
+def test_encode_round_trip(dtype):
+    frame = makeFrame(3)[::2, 1:].astype(dtype)
+    flags, payload = encodeFrame(frame, 'zlib')
+    assert flags & FLAG_ZLIB
+    assert bool(flags & FLAG_SHUFFLED) == (np.dtype(dtype).itemsize > 1)
+    assert len(payload) < frame.nbytes
+    assert np.array_equal(decodeFrame(flags, payload, frame.dtype, frame.shape), frame)
+
+    flags, payload = encodeFrame(frame)
+    assert np.array_equal(decodeFrame(flags, payload, frame.dtype, frame.shape), frame)
+
+
+def test_shared_frame_ring_detects_overwrite():
+    ring = SharedFrameRing(2, makeFrame(0).nbytes)
+    reader = SharedFrameRing(ring.numSlots, ring.slotBytes, name=ring.name)
+    try:
+        slot = ring.write(0, makeFrame(0))
+        assert np.array_equal(reader.read(slot, 0, np.uint16, (64, 48)), makeFrame(0))
+        ring.write(2, makeFrame(2))  # Same slot
+        assert reader.read(slot, 0, np.uint16, (64, 48)) is None
+    finally:
+        reader.close()
+        ring.close()
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
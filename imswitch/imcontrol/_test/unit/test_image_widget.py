@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from napari.components import ViewerModel
+
+from imswitch.imcommon.view.guitools import naparitools
+from imswitch.imcontrol.view.widgets.ImageWidget import ImageWidget
+
+
+class HeadlessNapari(ViewerModel):
+    """ napari viewer model with the add_image of EmbeddedNapari, which can
+    hold layers without an OpenGL context. """
+
+    def add_image(self, *args, protected=False, **kwargs):
+        layer = super().add_image(*args, **kwargs)
+        layer.protected = protected
+        return layer
+
+
+@pytest.fixture
+def imageWidget(qapp):
+    # Only the live view layers are under test, so skip setting up the Qt viewer
+    naparitools.addNapariGrayclipColormap()
+    widget = ImageWidget.__new__(ImageWidget)
+    widget.napariViewer = HeadlessNapari()
+    widget.imgLayers = {}
+    widget.setLiveViewLayers(['Camera', 'APD'])
+    return widget
+
+
+def test_set_image(imageWidget):
+    im = np.random.rand(1100, 900)
+    imageWidget.setImage('Camera', im, (0.1, 0.1))
+    layer = imageWidget.imgLayers['Camera']
+    assert layer.multiscale
+    assert [tuple(shape) for shape in layer.level_shapes] == [
+        (1100, 900), (550, 450), (275, 225)
+    ]
+    assert imageWidget.getImage('Camera') is im
+
+
+@pytest.mark.parametrize('shape', [(1, 100, 100), (3, 100, 100), (1, 1024, 1024), (1, 2, 3, 4)])
+def test_set_image_nd(imageWidget, shape):
+    imageWidget.setImageDisplayLevels('APD', 0, 50)
+    im = np.random.rand(*shape)
+    imageWidget.setImage('APD', im, (1,) * len(shape))
+    layer = imageWidget.imgLayers['APD']
+    assert layer.ndim == len(shape)
+    assert tuple(layer.level_shapes[-1][:-2]) == shape[:-2]
+    assert imageWidget.getImage('APD') is im
+
+    # The replaced layer keeps its place and display settings
+    assert imageWidget.napariViewer.layers.index(layer) == 1
+    assert len(imageWidget.napariViewer.layers) == 2
+    assert list(imageWidget.getImageDisplayLevels('APD')) == [0, 50]
+    assert layer.protected
+
+    imageWidget.clearImage('APD')
+    assert imageWidget.imgLayers['APD'].ndim == 2
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+
+from imswitch.imcontrol.model import DetectorsManager
+from imswitch.imcontrol.model.managers.LiveFrameDispatcher import LiveFrameDispatcher
+from . import detectorInfosMulti
+
+
+def makeFrame(index, shape=(8, 8)):
+    return np.full(shape, index, dtype=np.uint16)
+
+
+def test_views_and_detector_filter(qtbot):
+    dispatcher = LiveFrameDispatcher()
+    received = {'current': [], 'Camera 2': []}
+    dispatcher.subscribe(lambda *args: received['current'].append(args),
+                         decimation=2, roi=(2, 0, 8, 4))
+    dispatcher.subscribe(lambda *args: received['Camera 2'].append(args),
+                         detectorName='Camera 2')
+
+    image = np.arange(64).reshape(8, 8)
+    dispatcher.publish('Camera 1', image, False, [1, 1], True)
+    qtbot.waitUntil(lambda: len(received['current']) == 1)
+    detectorName, view, init, _, _ = received['current'][0]
+    assert detectorName == 'Camera 1' and not init
+    assert np.array_equal(view, image[2:8:2, 0:4:2])
+    assert np.shares_memory(view, image)
+
+    dispatcher.publish('Camera 2', image, True, [1, 1], False)
+    qtbot.waitUntil(lambda: len(received['Camera 2']) == 1)
+    assert len(received['current']) == 1
+
+
+def test_slow_subscriber_gets_newest_frame(qtbot):
+    dispatcher = LiveFrameDispatcher()
+    received = []
+    firstFrameDelivered = threading.Event()
+
+    def slowCallback(detectorName, image, init, scale, isCurrentDetector):
+        received.append(image[0, 0])
+        firstFrameDelivered.set()
+        time.sleep(0.1)
+
+    subscription = dispatcher.subscribe(slowCallback, background=True)
+    dispatcher.publish('CAM', makeFrame(0), True, [1, 1], True)
+    firstFrameDelivered.wait(5)
+    for index in range(1, 20):
+        dispatcher.publish('CAM', makeFrame(index), True, [1, 1], True)
+
+    # Frames published while the subscriber was busy are coalesced
+    qtbot.waitUntil(lambda: len(received) == 2)
+    time.sleep(0.2)
+    subscription.unsubscribe()
+    assert received == [0, 19]
+    assert subscription.numReceived == 20 and subscription.numDelivered == 2
+
+
+def test_max_rate(qtbot):
+    dispatcher = LiveFrameDispatcher()
+    received = []
+    subscription = dispatcher.subscribe(lambda *args: received.append(args[1][0, 0]),
+                                        maxRate=10)
+
+    # Publish at about 200 Hz from another thread for half a second
+    def publishFrames():
+        for index in range(100):
+            dispatcher.publish('CAM', makeFrame(index), True, [1, 1], True)
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=publishFrames)
+    startTime = time.monotonic()
+    thread.start()
+    qtbot.waitUntil(lambda: not thread.is_alive(), timeout=10000)
+    qtbot.waitUntil(lambda: received and received[-1] == 99, timeout=1000)
+    elapsed = time.monotonic() - startTime
+    subscription.unsubscribe()
+
+    assert len(received) <= elapsed * 10 + 1
+    assert received == sorted(received)
+
+
+def test_detectors_manager_publishes_live_frames(qtbot):
+    detectorsManager = DetectorsManager(detectorInfosMulti, updatePeriod=50)
+    detectorsManager.setCurrentDetector('Camera 2')
+    received = []
+    subscription = detectorsManager.liveFrames.subscribe(
+        lambda *args: received.append(args), background=True
+    )
+
+    handle = detectorsManager.startAcquisition(liveView=True)
+    try:
+        qtbot.waitUntil(lambda: len(received) >= 3, timeout=30000)
+    finally:
+        detectorsManager.stopAcquisition(handle, liveView=True)
+        subscription.unsubscribe()
+
+    for detectorName, image, _, _, isCurrentDetector in received:
+        assert detectorName == 'Camera 2' and isCurrentDetector
+        assert image.shape == (
+            detectorInfosMulti['Camera 2'].managerProperties['hamamatsu']['image_height'],
+            detectorInfosMulti['Camera 2'].managerProperties['hamamatsu']['image_width']
+        )
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -3,6 +3,7 @@ import pytest
 import h5py
 
 from imswitch.imcontrol.model import DetectorsManager, RecordingManager, RecMode, SaveMode
+from imswitch.imcontrol.model.managers.RecordingManager import HDF5StreamWriter
 from . import detectorInfosBasic, detectorInfosMulti, detectorInfosNonSquare
 
 
@@ -90,6 +91,63 @@ def test_recording_spec_time(qtbot, detectorInfos):
         assert savedToDisk is False
 
 
+def test_recording_until_stop(qtbot):
+    detectorInfos = detectorInfosBasic
+    detectorsManager = DetectorsManager(detectorInfos, updatePeriod=100)
+    recordingManager = RecordingManager(detectorsManager)
+
+    with qtbot.waitSignal(recordingManager.sigMemoryRecordingAvailable, timeout=30000) as blocker:
+        recordingManager.startRecording(
+            detectorNames=list(detectorInfos.keys()),
+            recMode=RecMode.UntilStop,
+            savename='test_until_stop',
+            saveMode=SaveMode.RAM,
+            attrs={detectorName: {} for detectorName in detectorInfos.keys()}
+        )
+        qtbot.wait(2000)
+        recordingManager.endRecording(wait=False)
+
+    _, file, _, savedToDisk = blocker.args
+    h5pyFile = h5py.File(file)
+    assert h5pyFile.get('CAM').shape[0] > 0
+    h5pyFile.close()  # Otherwise we can get segfaults
+    file.close()  # Otherwise we can get segfaults
+    assert savedToDisk is False
+
+    stats = recordingManager.getRecordingStats()['CAM']
+    assert stats['written'] + stats['dropped'] == stats['grabbed'] > 0
+
+
+def test_recording_writer_close_error(qtbot, monkeypatch):
+    detectorInfos = detectorInfosMulti
+    closeWriter = HDF5StreamWriter.close
+    closed = []
+
+    def failingClose(writer):
+        closeWriter(writer)
+        closed.append(writer)
+        if len(closed) == 1:
+            raise RuntimeError('Failed to close')
+
+    monkeypatch.setattr(HDF5StreamWriter, 'close', failingClose)
+    filePerDetector, _ = record(
+        qtbot,
+        detectorInfos,
+        detectorNames=list(detectorInfos.keys()),
+        recMode=RecMode.SpecFrames,
+        savename='test_writer_close_error',
+        saveMode=SaveMode.RAM,
+        attrs={detectorName: {} for detectorName in detectorInfos.keys()},
+        recFrames=3
+    )
+
+    # The other writers and all files are still closed
+    assert len(closed) == len(detectorInfos)
+    assert filePerDetector.keys() == detectorInfos.keys()
+    for file in filePerDetector.values():
+        file.close()  # Otherwise we can get segfaults
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+
+from imswitch.imcontrol.model.managers.RecordingPipeline import FrameRing, RecordingPipeline
+
+
+class ListWriter:
+    def __init__(self, delay=0):
+        self.frames = []
+        self.delay = delay
+
+    def write(self, frames):
+        time.sleep(self.delay)
+        self.frames.extend(frame.copy() for frame in frames)
+
+
+def frameSource(numFrames, shape=(4, 6), chunkSize=3):
+    frames = [np.full(shape, i, dtype=np.uint16) for i in range(numFrames)]
+
+    def getChunk():
+        chunk = frames[:chunkSize]
+        del frames[:chunkSize]
+        return np.array(chunk)
+
+    return getChunk
+
+
+def test_frame_ring_wraps_and_drops():
+    frame = np.zeros((2, 2), dtype=np.uint16)
+    ring = FrameRing(maxBytes=3 * frame.nbytes)
+
+    assert ring.push(np.stack([frame + i for i in range(2)])) == 2
+    ring.release(len(ring.peek(1)))
+    assert ring.push(np.stack([frame + i for i in range(2, 6)])) == 2
+    assert ring.numDropped == 2
+    assert ring.depth == 3 == ring.capacity
+
+    values = []
+    while ring.depth > 0:
+        frames = ring.peek(10)
+        values.extend(frames[:, 0, 0])
+        ring.release(len(frames))
+    assert values == [1, 2, 3]
+
+
+def test_pipeline_writes_all_frames_in_order():
+    pipeline = RecordingPipeline(numWriterThreads=2, maxFramesPerWrite=4)
+    writers = {name: ListWriter(delay=0.001) for name in ['A', 'B']}
+    for name, writer in writers.items():
+        pipeline.addStream(name, frameSource(50), writer, bufferBytes=2 ** 20)
+
+    pipeline.start(frameLimit=40)
+    pipeline.finish()
+
+    for name, writer in writers.items():
+        assert [frame[0, 0] for frame in writer.frames] == list(range(40))
+        stats = pipeline.getStats()[name]
+        assert stats['grabbed'] == stats['written'] == 40
+        assert stats['dropped'] == 0
+        assert stats['queueDepth'] == 0
+
+
+def test_pipeline_drops_frames_when_writer_is_slow():
+    frame = np.zeros((4, 6), dtype=np.uint16)
+    pipeline = RecordingPipeline(numWriterThreads=1, maxFramesPerWrite=1)
+    writer = ListWriter(delay=0.05)
+    pipeline.addStream('A', frameSource(30, chunkSize=10), writer,
+                       bufferBytes=2 * frame.nbytes)
+
+    pipeline.start(frameLimit=30)
+    pipeline.finish()
+
+    stats = pipeline.getStats()['A']
+    assert stats['grabbed'] == 30
+    assert stats['dropped'] > 0
+    assert stats['written'] + stats['dropped'] == 30
+    assert stats['maxQueueDepth'] == stats['capacity'] == 2
+    values = [frame[0, 0] for frame in writer.frames]
+    assert values == sorted(values)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -2,8 +2,10 @@ import os
 
 import numpy as np
 
+from imswitch.imcommon.model.dirtools import DataFileDirs
 from imswitch.imcontrol._test import setupInfoBasic
-from imswitch.imcontrol.model import ScanManagerBase
+from imswitch.imcontrol.model import ScanManagerBase, SetupInfo
+from imswitch.imcontrol.model.signaldesigners import SignalDesignerFactory
 
 
 def test_scan_signals():
@@ -50,6 +52,49 @@ def test_scan_signals():
     assert np.count_nonzero(fullsig['TTLCycleSignalsDict']['405']) == 51840
     assert np.all(~fullsig['TTLCycleSignalsDict']['488'])
 
+
+def test_point_scan_signals():
+    with open(os.path.join(DataFileDirs.UserDefaults, 'imcontrol_setups',
+                           'example_sted.json')) as file:
+        setupInfo = SetupInfo.from_json(file.read(), infer_missing=True)
+
+    scanParameters = {'target_device': ['ND-GalvoX', 'ND-GalvoY', 'ND-PiezoZ'],
+                      'axis_length': [1.0, 1.0, 0.3],
+                      'axis_step_size': [0.05, 0.05, 0.1],
+                      'axis_centerpos': [0, 0, 5],
+                      'axis_startpos': [[0], [0], [0]],
+                      'sequence_time': 10e-6,
+                      'phase_delay': 0}
+    TTLParameters = {'target_device': ['775', '640', 'Exc'],
+                     'TTL_sequence': ['h1', 'h1,l1', 'l1,h2'],
+                     'TTL_sequence_axis': ['None', 'ND-GalvoY', 'ND-PiezoZ'],
+                     'sequence_time': 10e-6}
+
+    scanSignals, positions, scanInfoDict = SignalDesignerFactory(
+        'GalvoScanDesigner'
+    ).make_signal(scanParameters, setupInfo)
+    TTLSignals = SignalDesignerFactory(
+        'PointScanTTLCycleDesigner'
+    ).make_signal(TTLParameters, setupInfo, scanInfoDict)
+
+    assert positions == [20, 20, 3]
+    numSamples = scanInfoDict['scan_samples_total']
+    for signal, (minPos, maxPos) in zip(scanSignals.values(), scanInfoDict['minmaxes']):
+        assert len(signal) == numSamples
+        assert minPos <= signal.min() and signal.max() <= maxPos
+    for signal in TTLSignals.values():
+        assert signal.dtype == bool
+        assert len(signal) == numSamples
+
+    def numPulses(signal):
+        return np.count_nonzero(np.diff(signal.astype(int), prepend=0) == 1)
+
+    # Lasers on every line are on in every other line when alternated per line
+    assert numPulses(TTLSignals['775']) == numPulses(TTLSignals['line_clock'])
+    assert numPulses(TTLSignals['640']) * 2 == numPulses(TTLSignals['775'])
+    assert np.all(TTLSignals['775'][TTLSignals['640']])
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
@@ -0,0 +1,144 @@
+import importlib
+from unittest import mock
+
+import nidaqmx
+import numpy as np
+import pytest
+
+from imswitch.imcontrol._test import setupInfoBasic
+from imswitch.imcontrol.model import NidaqManager, ScanManagerBase
+from imswitch.imcontrol.model.signaldesigners import SignalCache, contentHash
+
+nidaqManagerModule = importlib.import_module('imswitch.imcontrol.model.managers.NidaqManager')
+
+
+def test_content_hash():
+    assert contentHash({'a': [1, 2], 'b': np.arange(3)}) == \
+        contentHash({'b': np.arange(3), 'a': [1, 2]})
+    assert contentHash({'a': [1, 2]}) != contentHash({'a': (1, 2)})
+    assert contentHash([1]) != contentHash([1.0])
+    assert contentHash(np.arange(3)) != contentHash(np.arange(3, dtype=float))
+    assert contentHash(np.zeros((2, 3))) != contentHash(np.zeros((3, 2)))
+    with pytest.raises(TypeError):
+        contentHash(object())
+
+
+def test_signal_cache():
+    cache = SignalCache(maxEntries=2)
+    generate = mock.Mock(side_effect=lambda: ({'X': np.arange(5)}, {'n': 5}))
+
+    signals, info = cache.get('a', generate)
+    cachedSignals, cachedInfo = cache.get('a', generate)
+    assert generate.call_count == 1
+    assert (cache.numHits, cache.numMisses) == (1, 1)
+
+    # Arrays are shared but read-only, containers are copied
+    assert cachedSignals['X'] is signals['X']
+    assert not signals['X'].flags.writeable
+    cachedInfo['n'] = 6
+    assert cache.get('a', generate)[1] == {'n': 5}
+
+    # The least recently used entry is evicted
+    cache.get('b', generate)
+    cache.get('c', generate)
+    assert len(cache) == 2
+    cache.get('a', generate)
+    assert generate.call_count == 4
+
+
+def test_scan_signals_cached():
+    scanParameters = {'target_device': ['X'],
+                      'axis_length': [5],
+                      'axis_step_size': [1],
+                      'axis_startpos': [[0]],
+                      'axis_start_time': [[1]],
+                      'scan_time_edit': [[5]],
+                      'return_time': 0.001}
+    scanManager = ScanManagerBase(setupInfo=setupInfoBasic)
+    scanDesigner = scanManager._scanDesigner
+    with mock.patch.object(scanDesigner, 'make_signal', wraps=scanDesigner.make_signal) as spy:
+        signals, positions, scanInfoDict = scanManager.getScanSignalsDict(scanParameters)
+        cachedSignals, cachedPositions, cachedScanInfoDict = scanManager.getScanSignalsDict(
+            dict(scanParameters)
+        )
+        assert spy.call_count == 1
+        assert cachedSignals['X'] is signals['X']
+        assert (cachedPositions, cachedScanInfoDict) == (positions, scanInfoDict)
+
+        scanManager.getScanSignalsDict(dict(scanParameters, scan_time_edit=[[6]]))
+        assert spy.call_count == 2
+
+
+@pytest.fixture
+def mockedNidaqmx(monkeypatch):
+    """ Replaces nidaqmx tasks and writers with mocks, and returns the list
+    that created tasks are appended to and the mock writer class. """
+    tasks = []
+
+    def createTask(name):
+        task = mock.MagicMock(name=name)
+        tasks.append(task)
+        return task
+
+    writer = mock.MagicMock()
+    monkeypatch.setattr(nidaqmx, 'Task', createTask)
+    monkeypatch.setattr(nidaqManagerModule, 'AnalogSingleChannelWriter', writer)
+    return tasks, writer
+
+
+def makeSignals(length):
+    return {'scanSignalsDict': {'X': np.linspace(0, 1, length),
+                                'Y': np.linspace(1, 0, length)},
+            'TTLCycleSignalsDict': {}}
+
+
+def test_nidaq_tasks_reused(mockedNidaqmx):
+    tasks, writer = mockedNidaqmx
+    nidaqManager = NidaqManager(setupInfoBasic)
+
+    nidaqManager.runScanInitialization(makeSignals(100), {})
+    assert len(tasks) == 1
+    assert writer.return_value.write_many_sample.call_count == 1
+
+    # Unchanged scan: the task is re-armed and its buffer is not written again
+    nidaqManager.runScanInitialization(makeSignals(100), {})
+    assert len(tasks) == 1
+    tasks[0].stop.assert_called_once()
+    tasks[0].close.assert_not_called()
+    assert writer.return_value.write_many_sample.call_count == 1
+
+    # Same length but different signals: the task is reused, the signals rewritten
+    signals = makeSignals(100)
+    signals['scanSignalsDict']['X'] = np.zeros(100)
+    nidaqManager.runScanInitialization(signals, {})
+    assert len(tasks) == 1
+    assert writer.return_value.write_many_sample.call_count == 2
+
+    # Different length: the task is replaced
+    nidaqManager.runScanInitialization(makeSignals(200), {})
+    assert len(tasks) == 2
+    tasks[0].close.assert_called_once()
+    assert writer.return_value.write_many_sample.call_count == 3
+
+    nidaqManager.closeSignalReceived()
+    tasks[1].close.assert_called_once()
+    nidaqManager.runScanInitialization(makeSignals(200), {})
+    assert len(tasks) == 3
+    assert writer.return_value.write_many_sample.call_count == 4
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,60 @@
+import threading
+from types import SimpleNamespace
+
+import Pyro5.api
+import Pyro5.server
+
+from imswitch.imcommon.model import APIExport, generateAPI
+from imswitch.imcontrol.controller.server import ImSwitchServer
+
+
+class _Exported:
+    @APIExport(runOnUIThread=True)
+    def add(self, a, b=0):
+        return a + b
+
+    @APIExport()
+    def getName(self):
+        return 'exported'
+
+
+def test_pyro_returns_results(qtbot):
+    pyroServerInfo = SimpleNamespace(name='ImSwitchServer', host='127.0.0.1', port=0)
+    server = ImSwitchServer(generateAPI([_Exported()]),
+                            SimpleNamespace(pyroServerInfo=pyroServerInfo))
+    server.createAPI()
+
+    daemon = Pyro5.server.Daemon(host='127.0.0.1', port=0)
+    uri = daemon.register(server._pyroAPI, 'ImSwitchServer')
+    threading.Thread(target=daemon.requestLoop, daemon=True).start()
+    try:
+        # Call from another thread, so that the UI thread can run add
+        results = []
+
+        def call():
+            with Pyro5.api.Proxy(uri) as proxy:
+                results.append((proxy.add(1, b=2), proxy.getName()))
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        qtbot.waitUntil(lambda: not thread.is_alive())
+        assert results == [(3, 'exported')]
+    finally:
+        daemon.shutdown()
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
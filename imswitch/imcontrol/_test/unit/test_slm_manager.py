@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.model import SLMManager
+from imswitch.imcontrol.model.managers.SLMManager import Direction, Mask, MaskMode
+
+
+aberrations = {
+    "left": {"tilt": 0.5, "tip": -0.3, "defocus": 1.2, "spherical": 0.4, "verticalComa": 0.1,
+             "horizontalComa": 0.0, "verticalAstigmatism": -0.7, "obliqueAstigmatism": 0.2},
+    "right": {"tilt": 0.0, "tip": 0.0, "defocus": -2.0, "spherical": 0.0, "verticalComa": 0.0,
+              "horizontalComa": 0.9, "verticalAstigmatism": 0.0, "obliqueAstigmatism": 0.0}
+}
+
+
+@pytest.fixture(params=[775, 561], ids=['lut256', 'lut149'])
+def slmInfo(request, tmp_path):
+    return SimpleNamespace(monitorIdx=0, width=80, height=60, wavelength=request.param,
+                           pixelSize=0.0125, angleMount=0.15, correctionPatternsDir=str(tmp_path))
+
+
+def makeReferenceMasks(slmInfo, maskModes):
+    """ Returns the pattern, tilt and aberration masks of the halves of an
+    SLM set up like in test_composition. """
+    masks = []
+    for side, maskMode in zip(["left", "right"], maskModes):
+        pattern, tilt, aber = (Mask(slmInfo.height, slmInfo.width // 2, slmInfo.wavelength)
+                               for _ in range(3))
+        for mask in [pattern, tilt, aber]:
+            mask.setRadius(20)
+            mask.setSigma(10)
+        pattern.mask_type = maskMode
+        tilt.setTiltAngle(0.15, 1 if side == "left" else -1)
+        tilt.setTilt(slmInfo.pixelSize)
+        aber.setAberrationFactors(aberrations[side])
+        aber.setAberrations()
+        masks.append((pattern, tilt, aber))
+    return [masks[0][i].concat(masks[1][i]).image().astype(int) for i in range(3)]
+
+
+def test_composition(slmInfo):
+    slmManager = SLMManager(slmInfo)
+    slmManager.setGeneral({"radius": 20, "sigma": 10, "rotationAngle": 0, "tiltAngle": 0.15})
+    slmManager.setMask(0, MaskMode.Donut)
+    slmManager.setMask(1, MaskMode.Tophat)
+    slmManager.setAberrations(aberrations, None)
+    preview = slmManager.update(maskChange=True, tiltChange=True, aberChange=True)
+
+    pattern, tilt, aber = makeReferenceMasks(slmInfo, [MaskMode.Donut, MaskMode.Tophat])
+    lutSize = Mask(1, 1, slmInfo.wavelength).value_max + 1
+    np.testing.assert_array_equal(preview, (pattern + aber) % lutSize)
+    np.testing.assert_array_equal(slmManager.maskCombined.image(),
+                                  (pattern + tilt + aber) % lutSize)
+    assert slmManager.maskCombined.image().dtype == np.uint8
+
+
+def test_update_regenerates_changed_masks(slmInfo):
+    slmManager = SLMManager(slmInfo)
+    slmManager.setAberrations(aberrations, None)
+    slmManager.update(maskChange=True, tiltChange=True, aberChange=True)
+    combined = slmManager.maskCombined.image()
+
+    with mock.patch.object(Mask, 'updateImage', autospec=True,
+                           side_effect=Mask.updateImage) as updateImage:
+        slmManager.update(maskChange=True, tiltChange=True, aberChange=True)
+        assert updateImage.call_count == 0
+
+        slmManager.setAberrations({"right": dict(aberrations["right"], tip=1.0)}, 1)
+        slmManager.update(maskChange=True, tiltChange=True, aberChange=True)
+        assert updateImage.call_count == 1
+        assert updateImage.call_args[0][0].mask_type == MaskMode.Aber
+
+        # Only the left pattern, tilt and aberration masks depend on its center
+        updateImage.reset_mock()
+        slmManager.moveMask(0, Direction.Up, 2)
+        slmManager.update(maskChange=True, tiltChange=True, aberChange=True)
+        assert updateImage.call_count == 3
+
+        # Changes to layers that are not flagged are deferred
+        updateImage.reset_mock()
+        slmManager.setAberrations(aberrations, None)
+        slmManager.update(maskChange=True)
+        assert updateImage.call_count == 0
+
+    assert slmManager.maskCombined.image() is combined  # The output buffer is reused
+    assert set(slmManager.lastUpdateTimes) == {'pattern', 'tilt', 'aberrations', 'compose',
+                                               'total'}
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
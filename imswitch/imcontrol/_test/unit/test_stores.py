@@ -1,9 +1,15 @@
 from dataclasses import dataclass
 import os
 import pytest
-from imswitch.imcontrol.model.managers.RecordingManager import ZarrStorer, HDF5Storer, TiffStorer
+from imswitch.imcontrol.model.managers.RecordingManager import (
+    ZarrStorer, HDF5Storer, TiffStorer, HDF5StreamWriter, ZarrStreamWriter, TiffStreamWriter,
+    castLossless, computeChunkShape, computePyramidShapes
+)
 from imswitch.imcontrol.model.managers.DetectorsManager import DetectorsManager
+import h5py
+import numcodecs
 import numpy as np
+import tifffile
 import zarr
 
 
@@ -43,4 +49,143 @@ def test_hdf5_storer(tmpdir, fake_manager):
     path = os.path.join(tmpdir, "test")
     storer = HDF5Storer(path, {"test_channel": fake_manager})
     storer.snap({"test_channel": np.zeros((100,100))}, {"test_channel": {"test": 3}})
-    assert os.path.exists(path + "_test_channel.h5"), "path does not exist"
\ No newline at end of file
+    assert os.path.exists(path + "_test_channel.h5"), "path does not exist"
+
+
+def test_compute_chunk_shape():
+    # Small frames are grouped in time, limited by frame rate and frame count
+    assert computeChunkShape((256, 256), 2, 4 * 1024 ** 2) == (32, 256, 256)
+    assert computeChunkShape((256, 256), 2, 4 * 1024 ** 2, frameRate=10) == (10, 256, 256)
+    assert computeChunkShape((256, 256), 2, 4 * 1024 ** 2, maxFrames=5) == (5, 256, 256)
+    # Large frames are tiled
+    assert computeChunkShape((2048, 2048), 2, 4 * 1024 ** 2) == (1, 1024, 2048)
+    assert computeChunkShape((2048, 2048), 2, 1024 ** 2) == (1, 512, 1024)
+
+
+@pytest.mark.parametrize('chunks,compression,shuffle', [
+    ((4, 30, 40), None, False),
+    ((3, 16, 16), 'gzip', True),
+    ((1, 30, 17), 'gzip', False),
+    ((5, 30, 40), 'lzf', True),
+])
+def test_hdf5_stream_writer(tmpdir, chunks, compression, shuffle):
+    """Test that chunk-wise written frames read back identically and that the
+    dataset is trimmed to the number of written frames"""
+    frames = np.random.randint(0, 2 ** 15, size=(23, 30, 40)).astype('i2')
+    with h5py.File(os.path.join(tmpdir, "test.h5"), 'w') as file:
+        dataset = file.create_dataset('data', (chunks[0], 30, 40), maxshape=(None, 30, 40),
+                                      dtype='i2', chunks=chunks, compression=compression,
+                                      shuffle=shuffle)
+        writer = HDF5StreamWriter(dataset)
+        for start, stop in [(0, 2), (2, 11), (11, 12), (12, 23)]:
+            writer.write(frames[start:stop])
+        writer.close()
+
+        assert dataset.shape == frames.shape
+        assert np.array_equal(dataset[:], frames)
+
+
+def test_hdf5_stream_writer_no_frames(tmpdir):
+    with h5py.File(os.path.join(tmpdir, "test.h5"), 'w') as file:
+        dataset = file.create_dataset('data', (8, 30, 40), maxshape=(None, 30, 40),
+                                      dtype='i2', chunks=(4, 30, 40))
+        HDF5StreamWriter(dataset).close()
+        assert dataset.shape[0] == 0
+
+
+def test_compute_pyramid_shapes():
+    assert computePyramidShapes((2048, 1500), 5) == [(2048, 1500), (1024, 750), (512, 375)]
+    assert computePyramidShapes((2048, 2048), 1) == [(2048, 2048), (1024, 1024)]
+    assert computePyramidShapes((300, 300), 3) == [(300, 300)]
+
+
+@pytest.mark.parametrize('compressor', [None, 'zstd'])
+def test_zarr_stream_writer(tmpdir, compressor):
+    """Test that the full resolution and downsampled levels read back
+    correctly and are trimmed to the number of written frames"""
+    frames = np.random.randint(0, 2 ** 15, size=(23, 30, 41)).astype('i2')
+    compressor = numcodecs.Blosc(cname=compressor) if compressor is not None else None
+    root = zarr.group(store=zarr.storage.DirectoryStore(os.path.join(tmpdir, "test.zarr")))
+    levels = [root.create_dataset('0', shape=(4, 30, 41), chunks=(4, 16, 16), dtype='i2',
+                                  compressor=compressor),
+              root.create_dataset('1', shape=(3, 15, 21), chunks=(3, 15, 21), dtype='i2',
+                                  compressor=compressor),
+              root.create_dataset('2', shape=(5, 8, 11), chunks=(5, 8, 11), dtype='i2',
+                                  compressor=compressor)]
+    writer = ZarrStreamWriter(levels)
+    for start, stop in [(0, 2), (2, 11), (11, 12), (12, 23)]:
+        writer.write(frames[start:stop])
+    writer.close()
+
+    assert np.array_equal(levels[0][:], frames)
+    assert np.array_equal(levels[1][:], frames[:, ::2, ::2])
+    assert np.array_equal(levels[2][:], frames[:, ::4, ::4])
+
+
+@pytest.mark.parametrize('metadataFormat', ['ome', 'imagej', None])
+def test_tiff_stream_writer(tmpdir, metadataFormat):
+    """Test that frames are written as one series with metadata describing
+    all frames"""
+    frames = np.random.randint(0, 2 ** 16, size=(23, 30, 40)).astype(np.uint16)
+    path = os.path.join(tmpdir, "test.tiff")
+    writer = TiffStreamWriter(path, metadataFormat=metadataFormat, pixelSizeUm=[1, 0.2, 0.1],
+                              name="test_channel", attrs={"key": "value"})
+    for start, stop in [(0, 2), (2, 11), (11, 23)]:
+        writer.write(frames[start:stop])
+    writer.close()
+
+    assert writer.filePaths == [path]
+    with tifffile.TiffFile(path) as file:
+        assert file.is_bigtiff == (metadataFormat != 'imagej')
+        assert file.is_ome == (metadataFormat == 'ome')
+        assert file.is_imagej == (metadataFormat == 'imagej')
+        assert len(file.series) == 1
+        assert np.array_equal(file.asarray(), frames)
+        if metadataFormat == 'ome':
+            assert 'PhysicalSizeX="0.1"' in file.ome_metadata
+        elif metadataFormat == 'imagej':
+            assert file.imagej_metadata['frames'] == 23
+
+
+def test_tiff_stream_writer_rollover(tmpdir):
+    frames = np.arange(10, dtype=np.uint16).reshape(10, 1, 1) * np.ones((10, 8, 8), np.uint16)
+    path = os.path.join(tmpdir, "test.tiff")
+    writer = TiffStreamWriter(path, rolloverBytes=4 * frames[0].nbytes)
+    writer.write(frames[:3])
+    writer.write(frames[3:])
+    writer.close()
+
+    assert writer.filePaths == [path, os.path.join(tmpdir, "test_0001.tiff"),
+                                os.path.join(tmpdir, "test_0002.tiff")]
+    stored = np.concatenate([tifffile.imread(filePath) for filePath in writer.filePaths])
+    assert np.array_equal(stored, frames)
+
+
+@pytest.mark.parametrize('storerClass,extension', [(HDF5Storer, '_test_channel.h5'),
+                                                   (TiffStorer, '_test_channel.tiff')])
+def test_storers_keep_native_dtype(tmpdir, fake_manager, storerClass, extension):
+    """Test that 16-bit unsigned data above 32767 is stored without conversion"""
+    image = np.full((100, 100), 65000, dtype=np.uint16)
+    path = os.path.join(tmpdir, "test")
+    storerClass(path, {"test_channel": fake_manager}).snap({"test_channel": image},
+                                                          {"test_channel": {}})
+    if storerClass is HDF5Storer:
+        with h5py.File(path + extension) as file:
+            stored = file['data'][:]
+    else:
+        stored = tifffile.imread(path + extension)
+    assert stored.dtype == np.uint16
+    assert np.all(stored == 65000)
+
+
+def test_cast_lossless():
+    frames = np.arange(256, dtype=np.uint16).reshape(1, 16, 16)
+    assert castLossless(frames, np.uint16) is frames
+    assert castLossless(frames, np.uint8).dtype == np.uint8
+    assert castLossless(frames.astype(float), np.uint8).dtype == np.uint8
+    assert castLossless(frames, np.float32).dtype == np.float32
+    with pytest.raises(ValueError):
+        castLossless(frames + 1, np.uint8)
+    with pytest.raises(ValueError):
+        castLossless(frames + 0.5, np.uint16)
+
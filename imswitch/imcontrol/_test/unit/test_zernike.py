@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from imswitch.imcontrol.model.Zernike import ZernikeBasis, getZernikeBasis, nollToNM
+from imswitch.imcontrol.model.managers.SLMManager import Mask
+
+
+def test_noll_indices():
+    assert [nollToNM(j) for j in range(1, 16)] == [
+        (0, 0), (1, 1), (1, -1), (2, 0), (2, -2), (2, 2), (3, -1), (3, 1), (3, -3), (3, 3),
+        (4, 0), (4, 2), (4, -2), (4, 4), (4, -4)
+    ]
+    assert nollToNM(22) == (6, 0)
+    with pytest.raises(ValueError):
+        nollToNM(0)
+
+
+def test_polynomials():
+    basis = ZernikeBasis((201, 201), (100, 100), 100)
+    x, y = np.ogrid[-100:101, -100:101]
+    x, y = x / 100, y / 100
+    rho2 = x ** 2 + y ** 2
+    np.testing.assert_allclose(basis.polynomial(2), 2 * x + 0 * y, atol=1e-12)
+    np.testing.assert_allclose(basis.polynomial(4), np.sqrt(3) * (2 * rho2 - 1), atol=1e-12)
+    np.testing.assert_allclose(basis.polynomial(11), np.sqrt(5) * (6 * rho2 ** 2 - 6 * rho2 + 1),
+                               atol=1e-12)
+    assert basis.numPolynomials == 11
+
+    # Orthonormal over the unit disk
+    disk = basis.rho <= 1
+    polynomials = np.array([basis.polynomial(j)[disk] for j in range(1, 23)])
+    gram = polynomials @ polynomials.T / np.count_nonzero(disk)
+    np.testing.assert_allclose(gram, np.eye(22), atol=0.05)
+
+
+def test_compose():
+    basis = ZernikeBasis((30, 40), (12.5, 20), 15, dtype=np.float32)
+    composed = basis.compose({3: 0.5, 7: -2})
+    assert composed.dtype == np.float32
+    np.testing.assert_allclose(composed, 0.5 * basis.polynomial(3) - 2 * basis.polynomial(7),
+                               rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(basis.compose([0, 0, 0.5, 0, 0, 0, -2]), composed)
+
+    out = np.empty((30, 40), dtype=np.float32)
+    assert basis.compose({}, out=out) is out
+    assert not out.any()
+
+
+def test_basis_cache():
+    basis = getZernikeBasis((30, 40), (np.int64(15), 20), 10)
+    assert getZernikeBasis((30, 40), (15.0, 20.0), 10.0) is basis
+    assert getZernikeBasis((30, 40), (16, 20), 10) is not basis
+    assert getZernikeBasis((30, 40), (15, 20), 10, dtype=np.float32) is not basis
+
+
+def test_mask_aberrations():
+    names = ["tilt", "tip", "defocus", "spherical", "verticalComa", "horizontalComa",
+             "verticalAstigmatism", "obliqueAstigmatism"]
+    factors = {name: 0.1 * i for i, name in enumerate(names)}
+    masks = [Mask(60, 40, 775) for _ in range(2)]
+    for mask in masks:
+        mask.setCenter((30, 20))
+        mask.setRadius(25)
+    masks[0].setAberrationFactors(factors)
+    masks[1].setAberrationFactors({3: 0, 2: 0.1, 4: 0.2, "spherical": 0.3, 7: 0.4, 8: 0.5,
+                                   6: 0.6, 5: 0.7})
+    for mask in masks:
+        mask.setAberrations()
+    assert masks[0].img.dtype == np.uint8
+    np.testing.assert_array_equal(masks[0].img, masks[1].img)
+
+    # Same terms as the masks were generated with before they used the Zernike basis, including
+    # the rho^8 of the spherical aberration
+    x, y = np.ogrid[:60, :40]
+    x, y = (x - 30) / 25, (y - 20) / 25
+    rho2 = x ** 2 + y ** 2
+    theta = np.arctan2(y, x)
+    expected = (factors["tilt"] * 2 * y + factors["tip"] * 2 * x
+                + factors["defocus"] * np.sqrt(3) * (2 * rho2 - 1)
+                + factors["spherical"] * np.sqrt(5) * (6 * rho2 ** 4 - 6 * rho2 + 1)
+                + factors["verticalComa"] * np.sqrt(8) * np.sin(theta) * (3 * rho2 - 2)
+                * np.sqrt(rho2)
+                + factors["horizontalComa"] * np.sqrt(8) * np.cos(theta) * (3 * rho2 - 2)
+                * np.sqrt(rho2)
+                + factors["verticalAstigmatism"] * np.sqrt(6) * np.cos(2 * theta) * rho2
+                + factors["obliqueAstigmatism"] * np.sqrt(6) * np.sin(2 * theta) * rho2)
+    expected = np.round(expected % (2 * np.pi) * masks[0].value_max / (2 * np.pi))
+    np.testing.assert_array_equal(masks[0].img, expected.astype(np.uint8))
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -4,10 +4,9 @@ import h5py
 
 from imswitch.imcommon.controller import MainController, PickDatasetsController
 from imswitch.imcommon.model import (
-    ostools, initLogger, generateAPI, generateShortcuts, SharedAttributes
+    ostools, initLogger, generateAPI, generateShortcuts, SharedAttributes, startupProfile
 )
 from imswitch.imcommon.framework import Thread
-from .server import ImSwitchServer
 from imswitch.imcontrol.model import configfiletools
 from imswitch.imcontrol.view import guitools
 from . import controllers
@@ -31,11 +30,13 @@ class ImConMainController(MainController):
         self.__mainView.sigLoadParamsFromHDF5.connect(self.loadParamsFromHDF5)
         self.__mainView.sigPickSetup.connect(self.pickSetup)
         self.__mainView.sigClosing.connect(self.closeEvent)
+        self.__mainView.sigWidgetFirstShown.connect(self.createDeferredController)
 
         # Init communication channel and master controller
         self.__commChannel = CommunicationChannel(self, self.__setupInfo)
-        self.__masterController = MasterController(self.__setupInfo, self.__commChannel,
-                                                   self._moduleCommChannel)
+        with startupProfile.measure('imcontrol', 'Device managers'):
+            self.__masterController = MasterController(self.__setupInfo, self.__commChannel,
+                                                       self._moduleCommChannel)
 
         # List of Controllers for the GUI Widgets
         self.__factory = ImConWidgetControllerFactory(
@@ -49,13 +50,18 @@ class ImConMainController(MainController):
         )
 
         self.controllers = {}
+        self.__deferredControllers = {}
 
         for widgetKey, widget in self.__mainView.widgets.items():
-            self.controllers[widgetKey] = self.__factory.createController(
-                (getattr(controllers, f'{widgetKey}Controller')
+            controllerClass = (
+                getattr(controllers, f'{widgetKey}Controller')
                 if widgetKey != 'Scan' else
-                getattr(controllers, f'{widgetKey}Controller{self.__setupInfo.scan.scanWidgetType}')), widget
+                getattr(controllers, f'{widgetKey}Controller{self.__setupInfo.scan.scanWidgetType}')
             )
+            if controllerClass.createWhenShown:
+                self.__deferredControllers[widgetKey] = controllerClass
+            else:
+                self._createController(widgetKey, controllerClass)
 
         # Generate API
         self.__api = None
@@ -73,7 +79,9 @@ class ImConMainController(MainController):
         self.__shortcuts = generateShortcuts(shorcutObjs)
         self.__mainView.addShortcuts(self.__shortcuts)
 
+        self._frameStreamServer = None
         if setupInfo.pyroServerInfo.active:
+            from .server import FrameStreamServer, ImSwitchServer  # Imports are slow
             self._serverWorker = ImSwitchServer(self.__api, setupInfo)
             self.__logger.debug(self.__api)
             self._thread = Thread()
@@ -82,10 +90,31 @@ class ImConMainController(MainController):
             self._thread.finished.connect(self._serverWorker.stop)
             self._thread.start()
 
+            if setupInfo.pyroServerInfo.frameStreamPort is not None:
+                self._frameStreamServer = FrameStreamServer(
+                    self.__masterController.detectorsManager.liveFrames,
+                    host=setupInfo.pyroServerInfo.host,
+                    port=setupInfo.pyroServerInfo.frameStreamPort
+                )
+                self._frameStreamServer.start()
+
     @property
     def api(self):
         return self.__api
 
+    def createDeferredController(self, widgetKey):
+        """ Creates the controller of the widget with the given key, if its
+        creation has been deferred until the widget is shown. """
+        controllerClass = self.__deferredControllers.pop(widgetKey, None)
+        if controllerClass is not None:
+            self._createController(widgetKey, controllerClass)
+
+    def _createController(self, widgetKey, controllerClass):
+        with startupProfile.measure('controller', controllerClass.__name__):
+            self.controllers[widgetKey] = self.__factory.createController(
+                controllerClass, self.__mainView.widgets[widgetKey]
+            )
+
     @property
     def shortcuts(self):
         return self.__shortcuts
@@ -148,6 +177,8 @@ class ImConMainController(MainController):
         self.controllers['Scan'].ard.close()
         self.controllers['Scan'].closeScan()
         self.__factory.closeAllCreatedControllers()
+        if self._frameStreamServer is not None:
+            self._frameStreamServer.stop()
         self.__masterController.closeEvent()
 
 
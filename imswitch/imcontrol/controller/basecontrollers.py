@@ -22,6 +22,12 @@ class ImConWidgetController(WidgetController):
     All WidgetControllers should have access to the setup information,
     MasterController, CommunicationChannel and the linked Widget. """
 
+    createWhenShown = False
+    """ Whether the controller is created when its widget is first shown
+    rather than at startup. Only suitable for controllers of tools that
+    neither export API functions nor need to do anything before the user
+    interacts with them. """
+
     def __init__(self, setupInfo, commChannel, master, *args, **kwargs):
         # Protected attributes, which should only be accessed from controller and its subclasses
         self._setupInfo = setupInfo
@@ -6,19 +6,19 @@ from ..basecontrollers import LiveUpdatedController
 class AlignAverageController(LiveUpdatedController):
     """ Linked to AlignAverageWidget."""
 
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.roiAdded = False
-
-        # Connect CommunicationChannel signals
-        self._commChannel.sigUpdateImage.connect(self.update)
+        self._subscription = None
 
         # Connect AlignAverageWidget signals
         self._widget.sigShowROIToggled.connect(self.toggleROI)
 
     def update(self, detectorName, im, init, scale, isCurrentDetector):
         """ Update with new detector frame. """
-        if isCurrentDetector and self.active:
+        if self.active:
             value = np.mean(
                 self.getCroppedImage(im, self._widget.getROIGraphicsItem())
             )
@@ -46,6 +46,13 @@ class AlignAverageController(LiveUpdatedController):
             self._widget.hideROI()
 
         self.active = show
+        if show and self._subscription is None:
+            self._subscription = self._master.detectorsManager.liveFrames.subscribe(
+                self.update, maxRate=_maxUpdateRate
+            )
+        elif not show and self._subscription is not None:
+            self._subscription.unsubscribe()
+            self._subscription = None
 
     def getCroppedImage(self, image, roiItem):
         """ Returns the cropped image within the ROI. """
@@ -53,6 +60,9 @@ class AlignAverageController(LiveUpdatedController):
         return image[x0:x1, y0:y1]
 
 
+_maxUpdateRate = 20  # Hz
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
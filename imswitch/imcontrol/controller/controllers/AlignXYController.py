@@ -6,6 +6,8 @@ from ..basecontrollers import LiveUpdatedController
 class AlignXYController(LiveUpdatedController):
     """ Linked to AlignXYWidget. """
 
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.axis = 0
@@ -4,6 +4,8 @@ from ..basecontrollers import ImConWidgetController
 class AlignmentLineController(ImConWidgetController):
     """ Linked to AlignmentLineWidget."""
 
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lineAdded = False
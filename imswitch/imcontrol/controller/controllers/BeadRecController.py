@@ -7,10 +7,13 @@ from ..basecontrollers import ImConWidgetController
 
 
 class BeadRecController(ImConWidgetController):
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.running = False
         self.roiAdded = False
+        self.stream = None
 
         self.beadWorker = BeadWorker(self)
         self.beadWorker.sigNewChunk.connect(self.update)
@@ -54,12 +57,15 @@ class BeadRecController(ImConWidgetController):
             self.dims = np.array(self._commChannel.getDimsScan()).astype(int)
             self.dims = self.dims[self.dims != 0]
             self.running = True
-            self._master.detectorsManager.execOnAll(lambda c: c.flushBuffers())
+            self.stream = self._master.detectorsManager.execOnCurrent(
+                lambda c: c.openStream('BeadRec')
+            )
             self.thread.start()
         else:
             self.running = False
             self.thread.quit()
             self.thread.wait()
+            self.stream.close()
 
     def update(self):
         self._widget.updateImage(np.resize(self.recIm, self.dims + 1))
@@ -79,9 +85,7 @@ class BeadWorker(Worker):
         i = 0
 
         while self.__controller.running:
-            newImages = self.__controller._master.detectorsManager.execOnCurrent(
-                lambda c: c.getChunk()
-            )
+            newImages = self.__controller.stream.read()
             n = len(newImages)
             if n > 0:
                 roiItem = self.__controller._widget.getROIGraphicsItem()
@@ -117,6 +117,7 @@ class EtSTEDController(ImConWidgetController):
         self.__frame = 0
         self.t_call = 0
         self.__maxAnaImgVal = 0
+        self.__pipelineSubscription = None
 
 
     def initiate(self):
@@ -153,7 +154,7 @@ class EtSTEDController(ImConWidgetController):
             self.loadTransform()
             self.__transformCoeffs = self.__coordTransformHelper.getTransformCoeffs()
             # connect communication channel signals and turn on wf laser
-            self._commChannel.sigUpdateImage.connect(self.runPipeline)
+            self.subscribePipeline()
             if self.scanInitiationMode == ScanInitiationMode.ScanWidget:
                 self._commChannel.sigToggleBlockScanWidget.emit(False)
                 self._commChannel.sigScanEnded.connect(self.scanEnded)
@@ -166,7 +167,7 @@ class EtSTEDController(ImConWidgetController):
             self.__running = True
         else:
             # disconnect communication channel signals and turn off wf laser
-            self._commChannel.sigUpdateImage.disconnect(self.runPipeline)
+            self.unsubscribePipeline()
             if self.scanInitiationMode == ScanInitiationMode.ScanWidget:
                 self._commChannel.sigToggleBlockScanWidget.emit(True)
                 self._commChannel.sigScanEnded.disconnect(self.scanEnded)
@@ -244,7 +245,7 @@ class EtSTEDController(ImConWidgetController):
         """ Continue the fast method, after an event scan has been performed. """
         if self._widget.endlessScanCheck.isChecked() and not self.__running:
             # connect communication channel signals
-            self._commChannel.sigUpdateImage.connect(self.runPipeline)
+            self.subscribePipeline()
             self._master.lasersManager.execOn(self.laserFast, lambda l: l.setEnabled(True))
             
             #self._widget.setEventScatterVisible(True)
@@ -388,6 +389,21 @@ class EtSTEDController(ImConWidgetController):
         self.__frame = 0
         self.__maxAnaImgVal = 0
 
+    def subscribePipeline(self):
+        """ Start running the analysis pipeline on fast method frames. Frames
+        that arrive while the pipeline is busy are dropped in favour of the
+        newest one. """
+        if self.__pipelineSubscription is None:
+            self.__pipelineSubscription = self._master.detectorsManager.liveFrames.subscribe(
+                self.runPipeline, detectorName=self.detectorFast
+            )
+
+    def unsubscribePipeline(self):
+        """ Stop running the analysis pipeline on fast method frames. """
+        if self.__pipelineSubscription is not None:
+            self.__pipelineSubscription.unsubscribe()
+            self.__pipelineSubscription = None
+
     def runPipeline(self, detectorName, img, init, scale, isCurrentDetector):
         """ If detector is detectorFast: run the analyis pipeline, called after every fast method frame. """
         if detectorName == self.detectorFast:
@@ -579,7 +595,7 @@ class EtSTEDController(ImConWidgetController):
     def pauseFastModality(self):
         """ Pause the fast method, when an event has been detected. """
         if self.__running:
-            self._commChannel.sigUpdateImage.disconnect(self.runPipeline)
+            self.unsubscribePipeline()
             self._master.lasersManager.execOn(self.laserFast, lambda l: l.setEnabled(False))
             self.__running = False
 
@@ -1,47 +1,52 @@
 import numpy as np
 
-from imswitch.imcommon.framework import Signal, Thread, Worker, Mutex
-from imswitch.imcontrol.view import guitools
+from imswitch.imcommon.framework import Signal
+from imswitch.imcommon.model import ContrastEstimator
+from imswitch.imcontrol.model.FFTService import FFTService
 from ..basecontrollers import LiveUpdatedController
 
 
 class FFTController(LiveUpdatedController):
     """ Linked to FFTWidget."""
 
-    sigImageReceived = Signal()
+    createWhenShown = True
+
+    sigFftImageComputed = Signal(np.ndarray, object)  # (image, levels)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.updateRate = 10
-        self.it = 0
+        self.maxRate = None
         self.init = False
         self.showPos = False
+        self._lastShape = None
 
-        # Prepare image computation worker
-        self.imageComputationWorker = self.FFTImageComputationWorker()
-        self.imageComputationWorker.sigFftImageComputed.connect(self.displayImage)
-        self.imageComputationThread = Thread()
-        self.imageComputationWorker.moveToThread(self.imageComputationThread)
-        self.sigImageReceived.connect(self.imageComputationWorker.computeFFTImage)
-        self.imageComputationThread.start()
-
-        # Connect CommunicationChannel signals
-        self._commChannel.sigUpdateImage.connect(self.update)
+        # The FFT is computed in the background thread of a live frame
+        # subscription, which only ever hands it the newest frame
+        self._fftService = FFTService()
+        self._contrastEstimator = ContrastEstimator('best')
+        self._subscription = None
+        self.sigFftImageComputed.connect(self.displayImage)
 
         # Connect FFTWidget signals
         self._widget.sigShowToggled.connect(self.setShowFFT)
         self._widget.sigPosToggled.connect(self.setShowPos)
         self._widget.sigPosChanged.connect(self.changePos)
         self._widget.sigUpdateRateChanged.connect(self.changeRate)
+        self._widget.sigDecimationChanged.connect(self.changeDecimation)
+        self._widget.sigNumAverageChanged.connect(self.changeNumAverage)
+        self._widget.sigROIChanged.connect(self.setROI)
         self._widget.sigResized.connect(self.adjustFrame)
 
         self.changeRate(self._widget.getUpdateRate())
+        self.changeDecimation(self._widget.getDecimation())
+        self.changeNumAverage(self._widget.getNumAverage())
+        self.setROI(self._widget.getROI())
         self.setShowFFT(self._widget.getShowFFTChecked())
         self.setShowPos(self._widget.getShowPosChecked())
 
     def __del__(self):
-        self.imageComputationThread.quit()
-        self.imageComputationThread.wait()
+        if self._subscription is not None:
+            self._subscription.unsubscribe()
         if hasattr(super(), '__del__'):
             super().__del__()
 
@@ -49,6 +54,14 @@ class FFTController(LiveUpdatedController):
         """ Show or hide FFT. """
         self.active = enabled
         self.init = False
+        self._fftService.resetAverage()
+        if enabled and self._subscription is None:
+            self._subscription = self._master.detectorsManager.liveFrames.subscribe(
+                self.update, maxRate=self.maxRate, background=True
+            )
+        elif not enabled and self._subscription is not None:
+            self._subscription.unsubscribe()
+            self._subscription = None
 
     def setShowPos(self, enabled):
         """ Show or hide lines. """
@@ -56,27 +69,25 @@ class FFTController(LiveUpdatedController):
         self.changePos(self._widget.getPos())
 
     def update(self, detectorName, im, init, scale, isCurrentDetector):
-        """ Update with new detector frame. """
-        if not isCurrentDetector or not self.active:
-            return
-
-        if self.it == self.updateRate:
-            self.it = 0
-            self.imageComputationWorker.prepareForNewImage(im)
-            self.sigImageReceived.emit()
-        else:
-            self.it += 1
+        """ Compute the FFT of a new detector frame, and display levels for
+        it if it is the first image or its shape changed. Called in a
+        background thread. """
+        fftImage = self._fftService.compute(im)
+        levels = None
+        if not self.init or fftImage.shape != self._lastShape:
+            self.init = True
+            self._lastShape = fftImage.shape
+            levels = self._contrastEstimator.estimate(fftImage, smooth=False)
+        self.sigFftImageComputed.emit(fftImage, levels)
 
-    def displayImage(self, im):
-        """ Displays the image in the view. """
-        prevIm = self._widget.getImage()
-        shapeChanged = prevIm is None or im.shape != prevIm.shape
+    def displayImage(self, im, levels):
+        """ Displays the image in the view, and sets the display levels if
+        any were estimated for it. """
         self._widget.setImage(im)
 
-        if shapeChanged or not self.init:
+        if levels is not None:
             self.adjustFrame()
-            self._widget.setImageDisplayLevels(*guitools.bestLevels(im))
-            self.init = True
+            self._widget.setImageDisplayLevels(*levels)
 
     def adjustFrame(self):
         im = self._widget.getImage()
@@ -85,10 +96,26 @@ class FFTController(LiveUpdatedController):
 
         self._widget.updateImageLimits(im.shape[1], im.shape[0])
 
-    def changeRate(self, updateRate):
-        """ Change update rate. """
-        self.updateRate = updateRate
-        self.it = 0
+    def changeRate(self, maxRate):
+        """ Change the maximum update rate, in Hz. 0 means no limit. """
+        self.maxRate = maxRate if maxRate > 0 else None
+        if self._subscription is not None:
+            self._subscription.setMaxRate(self.maxRate)
+
+    def changeDecimation(self, decimation):
+        """ Change the decimation of frames before the FFT is computed. """
+        self._fftService.setDecimation(decimation)
+
+    def changeNumAverage(self, numAverage):
+        """ Change the number of frames to average the power spectrum over.
+        """
+        self._fftService.setNumAverage(numAverage)
+
+    def setROI(self, roi):
+        """ Restrict the FFT to a region of the frames, given as
+        (y0, x0, y1, x1), or compute it on whole frames if roi is None. """
+        self._fftService.setROI(roi)
+        self._fftService.resetAverage()
 
     def changePos(self, pos):
         """ Change positions of lines.  """
@@ -99,40 +126,12 @@ class FFTController(LiveUpdatedController):
             if im is None:
                 return
 
-            pos = float(1 / pos)
+            pos = float(self._fftService.decimation / pos)
             imgWidth = im.shape[1]
             imgHeight = im.shape[0]
             self._widget.updatePosLines(pos, imgWidth, imgHeight)
             self._widget.setPosLinesVisible(True)
 
-    class FFTImageComputationWorker(Worker):
-        sigFftImageComputed = Signal(np.ndarray)
-
-        def __init__(self):
-            super().__init__()
-            self._numQueuedImages = 0
-            self._numQueuedImagesMutex = Mutex()
-
-        def computeFFTImage(self):
-            """ Compute FFT of an image. """
-            try:
-                if self._numQueuedImages > 1:
-                    return  # Skip this frame in order to catch up
-
-                fftImage = np.fft.fftshift(np.log10(abs(np.fft.fft2(self._image))))
-                self.sigFftImageComputed.emit(fftImage)
-            finally:
-                self._numQueuedImagesMutex.lock()
-                self._numQueuedImages -= 1
-                self._numQueuedImagesMutex.unlock()
-
-        def prepareForNewImage(self, image):
-            """ Must always be called before the worker receives a new image. """
-            self._image = image
-            self._numQueuedImagesMutex.lock()
-            self._numQueuedImages += 1
-            self._numQueuedImagesMutex.unlock()
-
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
@@ -1,12 +1,12 @@
 import time
+from typing import Dict
 
 import numpy as np
 from time import perf_counter
 import scipy.ndimage as ndi
-from skimage.feature import peak_local_max
 
 from imswitch.imcommon.framework import Thread, Timer
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.model import initLogger, APIExport
 from ..basecontrollers import ImConWidgetController
 
 
@@ -59,6 +59,7 @@ class FocusLockController(ImConWidgetController):
         self.currPoint = 0
         self.setPointData = np.zeros(self.buffer)
         self.timeData = np.zeros(self.buffer)
+        self.lastDisplayTime = 0
 
         self._master.detectorsManager[self.camera].startAcquisition()
         self.__processDataThread = ProcessDataThread(self)
@@ -113,6 +114,13 @@ class FocusLockController(ImConWidgetController):
             self.twoFociVar = False
         else:
             self.twoFociVar = True
+        self.__processDataThread.estimator.reset()
+
+    @APIExport()
+    def getFocusSignalTimings(self) -> Dict[str, float]:
+        """ Returns the time taken by each stage of the latest focus signal
+        estimate (decimate, coarse, refine and total), in milliseconds. """
+        return self.__processDataThread.estimator.timings
 
     def update(self):
         # get data
@@ -125,8 +133,11 @@ class FocusLockController(ImConWidgetController):
                 self._master.positionersManager[self.positioner].move(value_move, 0)
         elif self.aboutToLock:
            self.aboutToLockUpdate()
-        # udpate graphics
+        # udpate graphics, at most at the display rate
         self.updateSetPointData()
+        if perf_counter() - self.lastDisplayTime < 1 / _maxDisplayRate:
+            return
+        self.lastDisplayTime = perf_counter()
         self._widget.camImg.setImage(img)
         if self.currPoint < self.buffer:
             self._widget.focusPlotCurve.setData(self.timeData[1:self.currPoint],
@@ -196,6 +207,13 @@ class ProcessDataThread(Thread):
         self._controller = controller
         super().__init__(*args, **kwargs)
 
+        focusLockInfo = self._controller._setupInfo.focusLock
+        self.estimator = FocusSignalEstimator(
+            decimation=focusLockInfo.signalDecimation,
+            refineMethod=focusLockInfo.signalRefineMethod,
+            trackRadius=focusLockInfo.signalTrackRadius
+        )
+
     def grabCameraFrame(self):
         detectorManager = self._controller._master.detectorsManager[self._controller.camera]
         self.latestimg = detectorManager.getLatestFrame()
@@ -205,49 +223,158 @@ class ProcessDataThread(Thread):
         return self.latestimg
 
     def update(self, twoFociVar):
-        # Gaussian filter the image, to remove noise and so on, to get a better center estimate
-        imagearraygf = ndi.filters.gaussian_filter(self.latestimg, 7)
-
-        # Update the focus signal
-        if twoFociVar:
-            allmaxcoords = peak_local_max(imagearraygf, min_distance=60)
-            size = allmaxcoords.shape
-            maxvals = np.zeros(size[0])
-            maxvalpos = np.zeros(2)
-            for n in range(0, size[0]):
-                if imagearraygf[allmaxcoords[n][0], allmaxcoords[n][1]] > maxvals[0]:
-                    if imagearraygf[allmaxcoords[n][0], allmaxcoords[n][1]] > maxvals[1]:
-                        tempval = maxvals[1]
-                        maxvals[0] = tempval
-                        maxvals[1] = imagearraygf[allmaxcoords[n][0], allmaxcoords[n][1]]
-                        tempval = maxvalpos[1]
-                        maxvalpos[0] = tempval
-                        maxvalpos[1] = n
-                    else:
-                        maxvals[0] = imagearraygf[allmaxcoords[n][0], allmaxcoords[n][1]]
-                        maxvalpos[0] = n
-            xcenter = allmaxcoords[maxvalpos[0]][0]
-            ycenter = allmaxcoords[maxvalpos[0]][1]
-            if allmaxcoords[maxvalpos[1]][1] < ycenter:
-                xcenter = allmaxcoords[maxvalpos[1]][0]
-                ycenter = allmaxcoords[maxvalpos[1]][1]
-            centercoords2 = np.array([xcenter, ycenter])
+        return self.estimator.estimate(self.latestimg, twoFoci=twoFociVar)
+
+
+class FocusSignalEstimator:
+    """ Estimates the focus signal, i.e. the position along the second image
+    axis of the focus laser spot, or of the leftmost of the two brightest
+    spots in two-foci mode.
+
+    The spot is first located coarsely on a decimated, smoothed copy of the
+    frame. If it was found in the previous frame, it is searched for within
+    trackRadius pixels of its previous position, falling back to the whole
+    frame if it is no longer there. Its position is then refined to subpixel
+    precision on a full-resolution window around the coarse position, either
+    by the centroid of the window's column profile (refineMethod='centroid')
+    or by a Gaussian fit to the profile's peak (refineMethod='gaussian').
+    Buffers are allocated once per frame shape. """
+
+    def __init__(self, decimation=4, smoothingSigma=7, refineMethod='centroid',
+                 windowSize=50, trackRadius=100, minFociDistance=60):
+        if refineMethod not in ['centroid', 'gaussian']:
+            raise ValueError(f'Invalid refine method "{refineMethod}"')
+
+        self.decimation = max(1, decimation)
+        self.smoothingSigma = smoothingSigma
+        self.refineMethod = refineMethod
+        self.windowSize = windowSize
+        self.trackRadius = trackRadius
+        self.minFociDistance = minFociDistance
+        self.timings = {}
+        """ Time taken by each stage of the latest estimate, in milliseconds.
+        """
+
+        self._frameShape = None
+        self.reset()
+
+    def reset(self):
+        """ Forgets the previous spot position, so that the next estimate
+        searches the whole frame. """
+        self._prevPosition = None
+        self._prevPeakHeight = None
+
+    def estimate(self, frame, twoFoci=False):
+        """ Returns the focus signal of frame, in pixels. """
+        startTime = perf_counter()
+        if frame.shape != self._frameShape:
+            self._allocate(frame.shape)
+            self.reset()
+
+        # Decimate by summing blocks of pixels, one strided view at a time
+        # (much faster than reducing over the block axes), and smooth
+        d = self.decimation
+        height, width = self._decimated.shape
+        blocks = frame[:height * d, :width * d].reshape(height, d, width, d)
+        np.copyto(self._decimated, blocks[:, 0, :, 0])
+        for blockRow in range(d):
+            for blockCol in range(d):
+                if blockRow > 0 or blockCol > 0:
+                    np.add(self._decimated, blocks[:, blockRow, :, blockCol],
+                           out=self._decimated)
+        ndi.gaussian_filter(self._decimated, self.smoothingSigma / d, output=self._smoothed)
+        decimateTime = perf_counter()
+
+        # Find the coarse spot position, near the previous one if possible
+        background = self._smoothed.mean()
+        position = None
+        if self._prevPosition is not None and self.trackRadius > 0:
+            radius = self.trackRadius
+            if twoFoci:
+                radius = min(radius, self.minFociDistance // 2)
+            position = self._findPeak(self._prevPosition, radius // d + 1)
+            if self._smoothed[position] - background < _lostSpotFraction * self._prevPeakHeight:
+                position = None
+        if position is None:
+            position = self._findFociPeak() if twoFoci else self._findPeak()
+        self._prevPosition = position
+        self._prevPeakHeight = self._smoothed[position] - background
+        coarseTime = perf_counter()
+
+        # Refine on a full-resolution window around the coarse position
+        centerRow = position[0] * d + d // 2
+        centerCol = position[1] * d + d // 2
+        rowLow = max(0, centerRow - self.windowSize)
+        rowHigh = min(frame.shape[0], centerRow + self.windowSize)
+        colLow = max(0, centerCol - self.windowSize)
+        colHigh = min(frame.shape[1], centerCol + self.windowSize)
+        profile = self._profile[:colHigh - colLow]
+        np.sum(frame[rowLow:rowHigh, colLow:colHigh], axis=0, dtype=np.float32, out=profile)
+        if self.refineMethod == 'gaussian':
+            signal = colLow + self._gaussianPeak(profile)
         else:
-            centercoords = np.where(imagearraygf == np.array(imagearraygf.max()))
-            centercoords2 = np.array([centercoords[0][0], centercoords[1][0]])
-
-        subsizey = 50
-        subsizex = 50
-        xlow = max(0, (centercoords2[0] - subsizex))
-        xhigh = min(1024, (centercoords2[0] + subsizex))
-        ylow = max(0, (centercoords2[1] - subsizey))
-        yhigh = min(1280, (centercoords2[1] + subsizey))
-
-        imagearraygfsub = imagearraygf[xlow:xhigh, ylow:yhigh]
-        massCenter = np.array(ndi.measurements.center_of_mass(imagearraygfsub))
-        # add the information about where the center of the subarray is
-        massCenterGlobal = massCenter[1] + centercoords2[1]  # - subsizey - self.sensorSize[1] / 2
-        return massCenterGlobal
+            signal = colLow + self._centroid(profile)
+        refineTime = perf_counter()
+
+        self.timings = {
+            'decimate': (decimateTime - startTime) * 1000,
+            'coarse': (coarseTime - decimateTime) * 1000,
+            'refine': (refineTime - coarseTime) * 1000,
+            'total': (refineTime - startTime) * 1000
+        }
+        return signal
+
+    def _allocate(self, frameShape):
+        self._frameShape = frameShape
+        decimatedShape = (max(1, frameShape[0] // self.decimation),
+                          max(1, frameShape[1] // self.decimation))
+        self._decimated = np.empty(decimatedShape, dtype=np.float32)
+        self._smoothed = np.empty(decimatedShape, dtype=np.float32)
+        self._masked = np.empty(decimatedShape, dtype=np.float32)
+        self._profile = np.empty(2 * self.windowSize, dtype=np.float32)
+        self._profileCoords = np.arange(2 * self.windowSize, dtype=np.float32)
+
+    def _findPeak(self, center=None, radius=None):
+        """ Returns the position of the maximum of the smoothed frame, within
+        radius (decimated) pixels of center if given. """
+        if center is None:
+            return np.unravel_index(np.argmax(self._smoothed), self._smoothed.shape)
+
+        rowLow = max(0, center[0] - radius)
+        colLow = max(0, center[1] - radius)
+        region = self._smoothed[rowLow:center[0] + radius + 1, colLow:center[1] + radius + 1]
+        row, col = np.unravel_index(np.argmax(region), region.shape)
+        return rowLow + row, colLow + col
+
+    def _findFociPeak(self):
+        """ Returns the position of the leftmost of the two brightest spots
+        that are at least minFociDistance pixels apart. """
+        first = self._findPeak()
+        radius = self.minFociDistance // self.decimation
+        np.copyto(self._masked, self._smoothed)
+        self._masked[max(0, first[0] - radius):first[0] + radius + 1,
+                     max(0, first[1] - radius):first[1] + radius + 1] = -np.inf
+        second = np.unravel_index(np.argmax(self._masked), self._masked.shape)
+        return second if second[1] < first[1] else first
+
+    def _centroid(self, profile):
+        profile -= profile.min()
+        total = profile.sum()
+        if total <= 0:
+            return (len(profile) - 1) / 2
+        return np.dot(profile, self._profileCoords[:len(profile)]) / total
+
+    def _gaussianPeak(self, profile):
+        peak = int(np.argmax(profile))
+        if peak == 0 or peak == len(profile) - 1:
+            return float(peak)
+
+        profile -= profile.min() - 1
+        logLeft, logPeak, logRight = np.log(profile[peak - 1:peak + 2])
+        curvature = logLeft - 2 * logPeak + logRight
+        if curvature >= 0:
+            return float(peak)
+        return peak + 0.5 * (logLeft - logRight) / curvature
 
 
 class FocusCalibThread(Thread):
@@ -348,6 +475,10 @@ class PI:
         self._ki = value
 
 
+_lostSpotFraction = 0.5
+_maxDisplayRate = 20  # Hz
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
@@ -1,6 +1,6 @@
-from imswitch.imcontrol.view import guitools
+from imswitch.imcommon.framework import Signal
 from ..basecontrollers import LiveUpdatedController
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.model import ContrastEstimator, initLogger
 import numpy as np
 import re
 from imswitch.imcommon.model import APIExport
@@ -8,10 +8,17 @@ from imswitch.imcommon.model import APIExport
 class ImageController(LiveUpdatedController):
     """ Linked to ImageWidget."""
 
+    sigLevelsEstimated = Signal(str, float, float)  # (detectorName, minimum, maximum)
+
+    levelsUpdateRate = 10
+    """ Maximum number of times per second to update the display levels. """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.__logger = initLogger(self, tryInheritParent=True)
+        self._contrastEstimator = ContrastEstimator()
+        self._levelsSubscriptions = []
         if not self._master.detectorsManager.hasDevices():
             return
 
@@ -22,6 +29,18 @@ class ImageController(LiveUpdatedController):
             self._master.detectorsManager.getAllDeviceNames(lambda c: c.forAcquisition)
         )
 
+        # Display levels are estimated from subsampled frames in background
+        # threads, at a limited rate, rather than from every full frame
+        self.sigLevelsEstimated.connect(self._widget.setImageDisplayLevels)
+        for detectorName in self._master.detectorsManager.getAllDeviceNames(
+                lambda c: c.forAcquisition):
+            self._levelsSubscriptions.append(
+                self._master.detectorsManager.liveFrames.subscribe(
+                    self.estimateLevels, detectorName=detectorName,
+                    maxRate=self.levelsUpdateRate, background=True
+                )
+            )
+
         # Connect CommunicationChannel signals
         self._commChannel.sigUpdateImage.connect(self.update)
         self._commChannel.sigAdjustFrame.connect(self.adjustFrame)
@@ -43,8 +62,22 @@ class ImageController(LiveUpdatedController):
             if im is None:
                 im = self._widget.getImage(detectorName)
 
-            # self._widget.setImageDisplayLevels(detectorName, *guitools.bestLevels(im))
-            self._widget.setImageDisplayLevels(detectorName, *guitools.minmaxLevels(im))
+            self._widget.setImageDisplayLevels(
+                detectorName, *self._contrastEstimator.estimate(im, detectorName, smooth=False)
+            )
+
+    def estimateLevels(self, detectorName, im, init, scale, isCurrentDetector):
+        """ Estimate display levels for a new frame, smoothed with those of
+        the previous frames of the same live view. Called in a background
+        thread. """
+        if np.prod(im.shape) <= 1:
+            return
+        if not init:
+            # First frame since live view was started, don't smooth with the
+            # levels of the previous run
+            self._contrastEstimator.reset(detectorName)
+        self.sigLevelsEstimated.emit(detectorName,
+                                     *self._contrastEstimator.estimate(im, detectorName))
 
     def addItemToVb(self, item):
         """ Add item from communication channel to viewbox."""
@@ -59,9 +92,6 @@ class ImageController(LiveUpdatedController):
         """ Update new image in the viewbox. """
         if np.prod(im.shape)>1: # TODO: This seems weird!
 
-            if not init:
-                self.autoLevels([detectorName], im)
-
             self._widget.setImage(detectorName, im, scale)
 
             if not init or self._shouldResetView:
@@ -106,6 +136,10 @@ class ImageController(LiveUpdatedController):
         #self._master._camera._setExposure(exp)
         self._master.detectorsManager[detectorName].setParameter('Set exposure time', exp)
 
+    def closeEvent(self):
+        for subscription in self._levelsSubscriptions:
+            subscription.unsubscribe()
+
     @APIExport(runOnUIThread=True)
     def setExposureTime(self, exptime : float) -> None:
         self.setExposure(exptime)
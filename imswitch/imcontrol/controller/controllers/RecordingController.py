@@ -1,6 +1,6 @@
 import os
 import time
-from typing import Optional, Union, List
+from typing import Dict, Optional, Union, List
 import numpy as np
 
 from imswitch.imcommon.framework import Timer
@@ -453,6 +453,14 @@ class RecordingController(ImConWidgetController):
         """ Sets the folder to save recordings into. """
         self._widget.setRecFolder(folderPath)
 
+    @APIExport()
+    def getRecordingStats(self) -> Dict[str, Dict[str, int]]:
+        """ Returns the frame counters of the current or most recent recording
+        per detector: frames grabbed, written, dropped and overrun in the
+        detector's frame buffer, and the current and highest number of frames
+        waiting to be written along with the buffer capacity. """
+        return self._master.recordingManager.getRecordingStats()
+
 
 _attrCategory = 'Rec'
 _recModeAttr = 'Mode'
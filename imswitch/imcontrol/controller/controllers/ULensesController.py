@@ -6,6 +6,8 @@ from ..basecontrollers import ImConWidgetController
 class ULensesController(ImConWidgetController):
     """ Linked to ULensesWidget. """
 
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
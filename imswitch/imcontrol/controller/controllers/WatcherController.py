@@ -7,6 +7,8 @@ from time import perf_counter
 class WatcherController(ImConWidgetController):
     """ Linked to WatcherWidget. """
 
+    createWhenShown = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.t0 = None
@@ -23,6 +25,7 @@ class WatcherController(ImConWidgetController):
             files = self.watcher.filesInDirectory()
             self.toExecute = files
             self.watcher.sigNewFiles.connect(self.newFiles)
+            self.watcher.sigFilesRemoved.connect(self.filesRemoved)
             self.watcher.start()
             self.runNextFile()
         else:
@@ -35,6 +38,10 @@ class WatcherController(ImConWidgetController):
         self.toExecute.extend(files)
         self.runNextFile()
 
+    def filesRemoved(self, files):
+        self._widget.updateFileList()
+        self.toExecute = [file for file in self.toExecute if file not in files]
+
     def runNextFile(self):
         if len(self.toExecute) and not self.execution:
             self.current = self._widget.path + '/' + self.toExecute.pop()
@@ -1,26 +1,30 @@
-from .AlignAverageController import AlignAverageController
-from .AlignmentLineController import AlignmentLineController
-from .AlignXYController import AlignXYController
-from .AufofocusController import AutofocusController
-from .BeadRecController import BeadRecController
-from .ConsoleController import ConsoleController
-from .EtSTEDController import EtSTEDController
-from .FFTController import FFTController
-from .FocusLockController import FocusLockController
-from .ImageController import ImageController
-from .LaserController import LaserController
-from .MotCorrController import MotCorrController
-from .PositionerController import PositionerController
-from .RecordingController import RecordingController
-from .SLMController import SLMController
-from .ScanControllerBase import ScanControllerBase
-from .ScanControllerMoNaLISA import ScanControllerMoNaLISA
-from .ScanControllerPointScan import ScanControllerPointScan
-from .RotationScanController import RotationScanController
-from .RotatorController import RotatorController
-from .SettingsController import SettingsController
-from .SLMController import SLMController
-from .TilingController import TilingController
-from .ULensesController import ULensesController
-from .ViewController import ViewController
-from .WatcherController import WatcherController
+from imswitch.imcommon.model import pythontools
+
+# Imported when first used, so that only what the setup needs is imported
+pythontools.installLazyImports(__name__, {
+    'AlignAverageController': 'AlignAverageController',
+    'AlignmentLineController': 'AlignmentLineController',
+    'AlignXYController': 'AlignXYController',
+    'AutofocusController': 'AufofocusController',
+    'BeadRecController': 'BeadRecController',
+    'ConsoleController': 'ConsoleController',
+    'EtSTEDController': 'EtSTEDController',
+    'FFTController': 'FFTController',
+    'FocusLockController': 'FocusLockController',
+    'ImageController': 'ImageController',
+    'LaserController': 'LaserController',
+    'MotCorrController': 'MotCorrController',
+    'PositionerController': 'PositionerController',
+    'RecordingController': 'RecordingController',
+    'SLMController': 'SLMController',
+    'ScanControllerBase': 'ScanControllerBase',
+    'ScanControllerMoNaLISA': 'ScanControllerMoNaLISA',
+    'ScanControllerPointScan': 'ScanControllerPointScan',
+    'RotationScanController': 'RotationScanController',
+    'RotatorController': 'RotatorController',
+    'SettingsController': 'SettingsController',
+    'TilingController': 'TilingController',
+    'ULensesController': 'ULensesController',
+    'ViewController': 'ViewController',
+    'WatcherController': 'WatcherController',
+})
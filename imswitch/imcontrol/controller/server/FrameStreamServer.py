@@ -0,0 +1,208 @@
+import json
+import socket
+import threading
+import time
+
+from imswitch.imcommon.model import initLogger
+from .framestream import (
+    FLAG_RING_INFO, FLAG_SHARED_MEMORY, PORT, SharedFrameRing, StreamRequest, encodeFrame,
+    packHeader
+)
+
+
+class FrameStreamServer:
+    """ TCP server that streams live detector frames to remote clients in
+    the binary format described in the framestream module. Every client gets
+    its own subscription to the live frame dispatcher, with its own maximum
+    rate, decimation and region of interest, and frames are sent from the
+    subscription's background thread, so a slow client only makes its own
+    stream skip frames. """
+
+    def __init__(self, liveFrames, host='127.0.0.1', port=PORT, numRingSlots=8):
+        self.__logger = initLogger(self, tryInheritParent=True)
+        self._liveFrames = liveFrames
+        self._host = host
+        self._port = port
+        self._numRingSlots = numRingSlots
+        self._socket = None
+        self._thread = None
+        self._connections = set()
+        self._connectionsLock = threading.Lock()
+
+    @property
+    def address(self):
+        """ The (host, port) that the server listens on. """
+        return self._socket.getsockname() if self._socket is not None else None
+
+    @property
+    def numClients(self):
+        with self._connectionsLock:
+            return len(self._connections)
+
+    def start(self):
+        self._socket = socket.create_server((self._host, self._port))
+        self._thread = threading.Thread(target=self._acceptLoop, daemon=True,
+                                        name='FrameStreamServer')
+        self._thread.start()
+        self.__logger.debug(f'Streaming frames on {self._host}:{self.address[1]}')
+
+    def stop(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        with self._connectionsLock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.close()
+
+    def _acceptLoop(self):
+        while self._socket is not None:
+            try:
+                clientSocket, clientAddress = self._socket.accept()
+            except OSError:
+                break  # Server socket closed
+            threading.Thread(target=self._serve, args=(clientSocket, clientAddress),
+                             daemon=True, name='FrameStreamConnection').start()
+
+    def _serve(self, clientSocket, clientAddress):
+        clientSocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = clientSocket.makefile('rb')
+        try:
+            request = StreamRequest.fromJson(reader.readline().decode('utf-8'))
+        except Exception as e:
+            self._sendLine(clientSocket, {'ok': False, 'error': str(e)})
+            clientSocket.close()
+            return
+
+        connection = _Connection(self, clientSocket, request, self._numRingSlots)
+        with self._connectionsLock:
+            self._connections.add(connection)
+        self.__logger.debug(f'Client {clientAddress} subscribed to frames: {request}')
+        self._sendLine(clientSocket, {'ok': True})
+        connection.subscribe(self._liveFrames)
+
+        # Clients don't send anything after the request; wait for them to disconnect
+        try:
+            while reader.read(1024):
+                pass
+        except OSError:
+            pass
+        reader.close()
+        connection.close()
+        self.__logger.debug(f'Client {clientAddress} disconnected')
+
+    def _removeConnection(self, connection):
+        with self._connectionsLock:
+            self._connections.discard(connection)
+
+    @staticmethod
+    def _sendLine(clientSocket, message):
+        try:
+            clientSocket.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        except OSError:
+            pass
+
+
+class _Connection:
+    """ A client of FrameStreamServer. """
+
+    def __init__(self, server, clientSocket, request, numRingSlots):
+        self._server = server
+        self._socket = clientSocket
+        self._request = request
+        self._numRingSlots = numRingSlots
+        self._subscription = None
+        self._ring = None
+        self._frameIndex = -1
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def subscribe(self, liveFrames):
+        # The subscription's background thread may deliver a frame before
+        # subscribe returns, so hold it off until the subscription is stored
+        with self._lock:
+            self._subscription = liveFrames.subscribe(
+                self._sendFrame, detectorName=self._request.detector,
+                maxRate=self._request.maxRate, decimation=self._request.decimation,
+                roi=self._request.roi, background=True
+            )
+            closed = self._closed
+        if closed:
+            self._subscription.unsubscribe()
+
+    def close(self):
+        with self._lock:  # Wait for any frame being sent
+            if self._closed:
+                return
+            self._closed = True
+            subscription = self._subscription
+            try:
+                # Shut down first, to wake up the thread reading from the socket
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            if self._ring is not None:
+                self._ring.close()
+        if subscription is not None:
+            subscription.unsubscribe()
+        self._server._removeConnection(self)
+
+    def _sendFrame(self, detectorName, image, init, scale, isCurrentDetector):
+        # Called on the subscription's background thread
+        with self._lock:
+            if self._closed:
+                return
+            self._frameIndex = self._subscription.numReceived
+            try:
+                self._sendFrameUnlocked(image)
+            except OSError:
+                self.close()
+
+    def _sendFrameUnlocked(self, image):
+        timestamp = time.time()
+        if self._request.sharedMemory:
+            if self._ring is None or image.nbytes > self._ring.slotBytes:
+                self._replaceRing(image.nbytes)
+            slot = self._ring.write(self._frameIndex, image)
+            payload = slot.to_bytes(4, 'little')
+            flags = FLAG_SHARED_MEMORY
+        else:
+            flags, payload = encodeFrame(image, self._request.compression,
+                                         self._request.compressionLevel)
+
+        self._socket.sendall(packHeader(flags, self._frameIndex, timestamp, len(payload),
+                                        image.dtype, image.shape))
+        self._socket.sendall(payload)
+
+    def _replaceRing(self, frameBytes):
+        """ Creates a ring large enough for frames of frameBytes bytes, and
+        tells the client to read from it from now on. """
+        oldRing = self._ring
+        self._ring = SharedFrameRing(self._numRingSlots, frameBytes)
+        payload = json.dumps(self._ring.info).encode('utf-8')
+        self._socket.sendall(packHeader(FLAG_RING_INFO, self._frameIndex, time.time(),
+                                        len(payload), 'u1', ()))
+        self._socket.sendall(payload)
+        if oldRing is not None:
+            oldRing.close()
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,7 +1,11 @@
+import asyncio
+from concurrent.futures import Future
+from typing import List
+
 import Pyro5
 import Pyro5.server
 from imswitch.imcommon.framework import Worker
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.model import batchAPICalls, initLogger
 from ._serialize import register_serializers
 from fastapi import FastAPI
 import uvicorn
@@ -23,6 +27,7 @@ class ImSwitchServer(Worker):
 
         self._paused = False
         self._canceled = False
+        self._pyroAPI = None
 
     def run(self):
         self.createAPI()
@@ -34,7 +39,7 @@ class ImSwitchServer(Worker):
             register_serializers()
 
             Pyro5.server.serve(
-                {self: self._name},
+                {self._pyroAPI: self._name},
                 use_ns=False,
                 host=self._host,
                 port=self._port,
@@ -56,22 +61,62 @@ class ImSwitchServer(Worker):
             @app.get(str)
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
+                if isinstance(result, Future):  # Function runs on the UI thread
+                    result = await asyncio.wrap_future(result)
+                return result
             return wrapper
 
         def includePyro(func):
             @Pyro5.server.expose
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
+            @wraps(func)
+            def wrapper(_pyroAPI, *args, **kwargs):
+                result = func(*args, **kwargs)
+                if isinstance(result, Future):  # Function runs on the UI thread
+                    result = result.result()
+                return result
             return wrapper
 
+        @app.post("/batch")
+        async def batch(calls: List[dict]):
+            """ Runs several API functions, given as a list of {"function":
+            name, "args": [...], "kwargs": {...}}, with a single hop to the UI
+            thread, and returns a list of {"result": value} or {"error":
+            message} in the same order. """
+            results = []
+            with batchAPICalls():
+                for call in calls:
+                    try:
+                        results.append(api_dict[call['function']](
+                            *call.get('args', []), **call.get('kwargs', {})
+                        ))
+                    except Exception as e:
+                        results.append(e)
+
+            response = []
+            for result in results:
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    if isinstance(result, Future):
+                        result = await asyncio.wrap_future(result)
+                    response.append({'result': result})
+                except Exception as e:
+                    response.append({'error': f'{type(e).__name__}: {e}'})
+            return response
+
+        pyroFunctions = {}
         for f in functions:
             func = api_dict[f]
             if hasattr(func, 'module'):
                 module = func.module
             else:
                 module = func.__module__.split('.')[-1]
-            self.func = includePyro(includeAPI("/"+module+"/"+f, func))
+            includeAPI("/"+module+"/"+f, func)
+            pyroFunctions[f] = includePyro(func)
+
+        # Pyro only exposes methods of the class of the served object
+        self._pyroAPI = type('ImSwitchPyroAPI', (), pyroFunctions)()
 
 
 # Copyright (C) 2020-2022 ImSwitch developers
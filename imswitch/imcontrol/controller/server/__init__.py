@@ -1 +1,2 @@
+from .FrameStreamServer import FrameStreamServer
 from .ImSwitchServer import ImSwitchServer
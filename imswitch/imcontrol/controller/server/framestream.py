@@ -0,0 +1,298 @@
+""" Binary protocol for streaming detector frames to remote clients over TCP.
+
+A client connects and sends one line of JSON with its subscription request:
+
+    {"detector": null, "maxRate": null, "decimation": 1, "roi": null,
+     "compression": null, "compressionLevel": 1, "sharedMemory": false}
+
+where detector is the name of the detector to stream (null for whichever is
+the current one), maxRate the maximum number of frames per second, roi the
+region (y0, x0, y1, x1) of the frames to send, decimation to send every n-th
+row and column of it, compression null or "zlib" (lossless) and
+sharedMemory whether frames should be passed through a shared memory ring
+(only possible if the client runs on the same host). The server answers with
+one line of JSON, {"ok": true} or {"ok": false, "error": "..."}, followed by
+a message per frame. Each message starts with a header (see Header), followed
+by the shape of the frame as ndim little-endian uint32 values and the
+payload.
+
+Frames are taken from the live frame dispatcher of the detectors manager, so
+a client that cannot keep up skips frames rather than building up a backlog;
+the frame index in the header is a per-connection count of the frames the
+server has offered to the client, so that gaps in it show skipped frames.
+"""
+
+import json
+import os
+import socket
+import struct
+import zlib
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+PORT = 54334
+MAGIC = b'ISWF'
+VERSION = 1
+
+FLAG_ZLIB = 0x1
+""" The payload is compressed with zlib. """
+FLAG_SHUFFLED = 0x2
+""" The bytes of the payload are grouped by significance (byte shuffle). """
+FLAG_SHARED_MEMORY = 0x4
+""" The payload is the index of the shared memory ring slot holding the frame. """
+FLAG_RING_INFO = 0x8
+""" The payload is JSON describing a new shared memory ring to read frames from. """
+
+Header = struct.Struct('<4sBBBxQdI8s')
+""" Magic, version, flags, ndim, frame index, timestamp, payload size, dtype. """
+
+_slotHeader = struct.Struct('<q')  # Frame index stored at the start of each ring slot
+
+
+@dataclass
+class FrameHeader:
+    flags: int
+    frameIndex: int
+    timestamp: float
+    payloadSize: int
+    dtype: np.dtype
+    shape: Tuple[int, ...]
+
+
+def packHeader(flags, frameIndex, timestamp, payloadSize, dtype, shape):
+    return Header.pack(MAGIC, VERSION, flags, len(shape), frameIndex, timestamp, payloadSize,
+                       np.dtype(dtype).str.encode('ascii')) + \
+        struct.pack(f'<{len(shape)}I', *shape)
+
+
+def unpackHeader(data, readExactly):
+    """ Unpacks the header at the start of data, reading the shape that
+    follows it with readExactly(numBytes). """
+    magic, version, flags, ndim, frameIndex, timestamp, payloadSize, dtype = \
+        Header.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not an ImSwitch frame stream, or unsupported protocol version')
+    shape = struct.unpack(f'<{ndim}I', readExactly(4 * ndim)) if ndim > 0 else ()
+    return FrameHeader(flags, frameIndex, timestamp, payloadSize,
+                       np.dtype(dtype.rstrip(b'\0').decode('ascii')), tuple(shape))
+
+
+def encodeFrame(frame, compression=None, compressionLevel=1):
+    """ Returns the flags and payload bytes for the given frame. """
+    frame = np.ascontiguousarray(frame)
+    if compression is None:
+        return 0, memoryview(frame).cast('B')
+    if compression != 'zlib':
+        raise ValueError(f'Unsupported compression "{compression}"')
+
+    flags = FLAG_ZLIB
+    data = frame.view(np.uint8).reshape(-1)
+    if frame.dtype.itemsize > 1:
+        # Grouping the bytes by significance makes the data compress much better
+        data = data.reshape(-1, frame.dtype.itemsize).T.copy()
+        flags |= FLAG_SHUFFLED
+    return flags, zlib.compress(data, compressionLevel)
+
+
+def decodeFrame(flags, payload, dtype, shape):
+    """ Returns the frame encoded in payload, as an array of the given dtype
+    and shape. """
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    data = np.frombuffer(payload, dtype=np.uint8)
+    if flags & FLAG_SHUFFLED:
+        data = data.reshape(dtype.itemsize, -1).T.copy()
+    return data.view(dtype).reshape(shape)
+
+
+class SharedFrameRing:
+    """ Ring of slots in a shared memory segment that frames are passed
+    through to clients on the same host. Each slot starts with the index of
+    the frame it holds, which is invalidated while the slot is being written,
+    so that readers can detect frames that were overwritten while they were
+    reading them. """
+
+    def __init__(self, numSlots, slotBytes, name=None):
+        self.numSlots = numSlots
+        self.slotBytes = slotBytes
+        self._owner = name is None
+        self._shm = SharedMemory(name=name, create=self._owner,
+                                 size=numSlots * (_slotHeader.size + slotBytes))
+        if not self._owner and os.name == 'posix':
+            # Attaching registers the segment with the resource tracker, which would
+            # unlink it when this process exits (https://bugs.python.org/issue38119)
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def info(self):
+        return {'name': self.name, 'numSlots': self.numSlots, 'slotBytes': self.slotBytes}
+
+    def write(self, frameIndex, frame):
+        """ Writes frame to the slot of frameIndex and returns the slot. """
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slotBytes:
+            raise ValueError('Frame does not fit in the ring slots')
+        slot = frameIndex % self.numSlots
+        offset = slot * (_slotHeader.size + self.slotBytes)
+        _slotHeader.pack_into(self._shm.buf, offset, -1)
+        dest = np.ndarray(frame.shape, frame.dtype, buffer=self._shm.buf,
+                          offset=offset + _slotHeader.size)
+        dest[...] = frame
+        _slotHeader.pack_into(self._shm.buf, offset, frameIndex)
+        return slot
+
+    def read(self, slot, frameIndex, dtype, shape):
+        """ Returns a copy of the frame with the given index from the given
+        slot, or None if it has been overwritten. """
+        offset = slot * (_slotHeader.size + self.slotBytes)
+        if _slotHeader.unpack_from(self._shm.buf, offset)[0] != frameIndex:
+            return None
+        frame = np.ndarray(shape, dtype, buffer=self._shm.buf,
+                           offset=offset + _slotHeader.size).copy()
+        if _slotHeader.unpack_from(self._shm.buf, offset)[0] != frameIndex:
+            return None
+        return frame
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+@dataclass
+class StreamRequest:
+    detector: Optional[str] = None
+    maxRate: Optional[float] = None
+    decimation: int = 1
+    roi: Optional[Tuple[int, int, int, int]] = None
+    compression: Optional[str] = None
+    compressionLevel: int = 1
+    sharedMemory: bool = False
+
+    def toJson(self):
+        return json.dumps(self.__dict__)
+
+    @classmethod
+    def fromJson(cls, text):
+        request = cls(**json.loads(text))
+        if request.roi is not None:
+            request.roi = tuple(int(v) for v in request.roi)
+        if request.compression not in [None, 'zlib']:
+            raise ValueError(f'Unsupported compression "{request.compression}"')
+        return request
+
+
+class FrameStreamClient:
+    """ Client for the frame stream of an ImSwitch instance. Iterating over
+    the client yields (frameIndex, timestamp, frame) for every received
+    frame; frames passed through shared memory that were overwritten before
+    they could be read are skipped.
+
+    Example::
+
+        with FrameStreamClient('127.0.0.1', maxRate=10, compression='zlib') as client:
+            for frameIndex, timestamp, frame in client:
+                ...
+    """
+
+    def __init__(self, host='127.0.0.1', port=PORT, **request):
+        self.request = StreamRequest(**request)
+        self.numDropped = 0
+        self._ring = None
+        self._socket = socket.create_connection((host, port))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile('rb')
+
+        self._socket.sendall(self.request.toJson().encode('utf-8') + b'\n')
+        response = json.loads(self._reader.readline().decode('utf-8') or '{}')
+        if not response.get('ok'):
+            self.close()
+            raise ConnectionError(f'Frame stream request refused: {response.get("error")}')
+
+    def readFrame(self):
+        """ Waits for the next frame and returns (frameIndex, timestamp,
+        frame), or None if the connection has been closed. """
+        while True:
+            headerBytes = self._reader.read(Header.size)
+            if len(headerBytes) < Header.size:
+                return None
+            header = unpackHeader(headerBytes, self._readExactly)
+            payload = self._readExactly(header.payloadSize)
+
+            if header.flags & FLAG_RING_INFO:
+                if self._ring is not None:
+                    self._ring.close()
+                info = json.loads(payload.decode('utf-8'))
+                self._ring = SharedFrameRing(info['numSlots'], info['slotBytes'],
+                                             name=info['name'])
+                continue
+
+            if header.flags & FLAG_SHARED_MEMORY:
+                frame = self._ring.read(int.from_bytes(payload, 'little'), header.frameIndex,
+                                        header.dtype, header.shape)
+                if frame is None:
+                    self.numDropped += 1
+                    continue
+            else:
+                frame = decodeFrame(header.flags, payload, header.dtype, header.shape)
+            return header.frameIndex, header.timestamp, frame
+
+    def close(self):
+        # The reader holds a reference to the socket, so both must be closed
+        # for the connection to be closed
+        self._reader.close()
+        try:
+            self._socket.close()
+        except OSError:
+            pass
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def __iter__(self):
+        while True:
+            frame = self.readFrame()
+            if frame is None:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _readExactly(self, numBytes):
+        data = self._reader.read(numBytes)
+        if len(data) < numBytes:
+            raise ConnectionError('Frame stream closed')
+        return data
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,173 @@
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+import scipy.fft
+
+
+class FFTService:
+    """ Computes the centred log-magnitude Fourier transform of frames for
+    display, i.e. the equivalent of
+    ``np.fft.fftshift(np.log10(abs(np.fft.fft2(image))))``, in single
+    precision. Since frames are real, only half of the spectrum is computed
+    (with rfft2) and the other half is filled in from its symmetry.
+
+    The input, magnitude and averaging buffers, and the index map that
+    centres and completes the spectrum, are kept for each frame shape and
+    reused for frames of that shape. Each transform still allocates the half
+    spectrum returned by rfft2 and the returned image.
+    The transform can be restricted to a region of interest and/or computed
+    on a decimated frame, and the magnitude can be averaged over the power
+    spectra of the last numAverage frames to reduce noise. All methods may be
+    called from any thread. """
+
+    def __init__(self, decimation: int = 1, roi: Optional[Tuple[int, int, int, int]] = None,
+                 numAverage: int = 1, workers: Optional[int] = -1):
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._workers = workers
+        self.setDecimation(decimation)
+        self.setROI(roi)
+        self.setNumAverage(numAverage)
+
+    @property
+    def decimation(self) -> int:
+        return self._decimation
+
+    @property
+    def roi(self) -> Optional[Tuple[int, int, int, int]]:
+        return self._roi
+
+    @property
+    def numAverage(self) -> int:
+        return self._numAverage
+
+    def setDecimation(self, decimation: int) -> None:
+        """ Sets the transform to be computed on every decimation-th row and
+        column of the frames. """
+        with self._lock:
+            self._decimation = max(1, int(decimation))
+
+    def setROI(self, roi: Optional[Tuple[int, int, int, int]]) -> None:
+        """ Sets the region of the frames to transform, as (y0, x0, y1, x1),
+        or None to transform whole frames. """
+        with self._lock:
+            self._roi = roi
+
+    def setNumAverage(self, numAverage: int) -> None:
+        """ Sets the number of frames to average the power spectrum over. 1
+        disables averaging. Restarts the average. """
+        with self._lock:
+            self._numAverage = max(1, int(numAverage))
+            for plan in self._plans.values():
+                plan.resetAverage(self._numAverage)
+
+    def resetAverage(self) -> None:
+        """ Restarts the average of the power spectrum. """
+        self.setNumAverage(self._numAverage)
+
+    def compute(self, image: np.ndarray) -> np.ndarray:
+        """ Returns the centred log10 magnitude of the Fourier transform of
+        image (or its region of interest and/or decimation), averaged over
+        previous frames if enabled, as a new float32 array. """
+        with self._lock:
+            if self._roi is not None:
+                y0, x0, y1, x1 = self._roi
+                image = image[y0:y1, x0:x1]
+            if self._decimation > 1:
+                image = image[::self._decimation, ::self._decimation]
+
+            plan = self._getPlan(image.shape)
+            np.copyto(plan.input, image, casting='unsafe')
+            spectrum = scipy.fft.rfft2(plan.input, workers=self._workers, overwrite_x=True)
+
+            if self._numAverage > 1:
+                plan.addToAverage(spectrum)
+                plan.getAverageMagnitude(out=plan.magnitude)
+            else:
+                np.abs(spectrum, out=plan.magnitude)
+
+            with np.errstate(divide='ignore'):
+                np.log10(plan.magnitude, out=plan.magnitude)
+
+            return np.take(plan.magnitude, plan.indexMap)
+
+    def _getPlan(self, shape):
+        plan = self._plans.get(shape)
+        if plan is None:
+            if len(self._plans) >= _maxCachedPlans:
+                self._plans.clear()
+            plan = _FFTPlan(shape, self._numAverage)
+            self._plans[shape] = plan
+        return plan
+
+
+class _FFTPlan:
+    """ Buffers and index map for transforming frames of one shape. """
+
+    def __init__(self, shape, numAverage):
+        height, width = shape
+        halfWidth = width // 2 + 1
+        self.input = np.empty(shape, dtype=np.float32)
+        self.magnitude = np.empty((height, halfWidth), dtype=np.float32)
+
+        # Flat indices into the half spectrum of each pixel of the centred
+        # full spectrum; the missing half follows from F[-k] = conj(F[k])
+        rows = (np.arange(height) - height // 2) % height
+        cols = (np.arange(width) - width // 2) % width
+        mirrored = cols >= halfWidth
+        mirroredRows = (-rows) % height
+        mirroredCols = (width - cols) % width
+        self.indexMap = np.where(
+            mirrored[np.newaxis, :],
+            mirroredRows[:, np.newaxis] * halfWidth + mirroredCols[np.newaxis, :],
+            rows[:, np.newaxis] * halfWidth + cols[np.newaxis, :]
+        ).astype(np.intp)
+
+        self.resetAverage(numAverage)
+
+    def resetAverage(self, numAverage):
+        if numAverage > 1:
+            self._powers = np.zeros((numAverage, *self.magnitude.shape), dtype=np.float32)
+            self._powerSum = np.zeros(self.magnitude.shape, dtype=np.float64)
+        else:
+            self._powers = None
+            self._powerSum = None
+        self._numAveraged = 0
+        self._nextSlot = 0
+
+    def addToAverage(self, spectrum):
+        power = self._powers[self._nextSlot]
+        if self._numAveraged >= len(self._powers):
+            self._powerSum -= power
+        else:
+            self._numAveraged += 1
+
+        np.multiply(spectrum.real, spectrum.real, out=power)
+        power += spectrum.imag * spectrum.imag
+        self._powerSum += power
+        self._nextSlot = (self._nextSlot + 1) % len(self._powers)
+
+    def getAverageMagnitude(self, out):
+        np.divide(self._powerSum, max(1, self._numAveraged), out=out, casting='unsafe')
+        np.sqrt(out, out=out)
+
+
+_maxCachedPlans = 4
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
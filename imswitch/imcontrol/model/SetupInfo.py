@@ -45,6 +45,10 @@ class DetectorInfo(DeviceInfo):
     forFocusLock: bool = False
     """ Whether the detector is used for focus lock. """
 
+    frameBufferSizeMB: int = 256
+    """ Size of the ring buffer that holds the most recently captured frames
+    of the detector, in megabytes. """
+
 
 @dataclass(frozen=True)
 class LaserInfo(DeviceInfo):
@@ -162,6 +166,18 @@ class FocusLockInfo:
     piKi: float
     """ Default ki value of feedback loop. """
 
+    signalDecimation: int = 4
+    """ Decimation factor of the camera frame when coarsely locating the focus
+    laser spot. """
+
+    signalRefineMethod: str = 'centroid'
+    """ How the spot position is refined on a full-resolution window around
+    its coarse position; ``centroid`` or ``gaussian``. """
+
+    signalTrackRadius: int = 100
+    """ Radius in pixels around the previous spot position within which the
+    spot is first searched for. 0 to always search the whole frame. """
+
 @dataclass(frozen=True)
 class AutofocusInfo:
     camera: str
@@ -260,12 +276,78 @@ class PulseStreamerInfo:
     """ IP address of Pulse Streamer hardware. """
 
 
+@dataclass(frozen=True)
+class RecordingInfo:
+    bufferSizeMB: int = 512
+    """ Size of the buffer that holds grabbed frames until they have been
+    written to disk during a recording, in megabytes per detector. Frames are
+    dropped if the buffer fills up. """
+
+    numWriterThreads: int = 2
+    """ Number of threads that write buffered frames to disk during a
+    recording. """
+
+    storageDtypes: Dict[str, str] = field(default_factory=dict)
+    """ Data types to store recordings and snaps from specific detectors in,
+    as a map from detector names to NumPy data type names, e.g.
+    ``{"Camera": "uint8"}``. Frames are converted losslessly; saving fails if
+    a value does not fit in the configured data type. Frames from other
+    detectors are stored in the data type that the detector delivers them in.
+    """
+
+    chunkSizeMB: float = 4
+    """ Target size of the chunks that recordings are stored in, in megabytes.
+    """
+
+    hdf5Preallocate: bool = True
+    """ Whether HDF5 recordings are preallocated (or grown in large steps when
+    the number of frames is not known in advance) and written in whole chunks.
+    If false, the dataset is resized for every block of frames received. """
+
+    hdf5Compression: Optional[str] = None
+    """ Compression filter for HDF5 recordings: ``"gzip"``, ``"lzf"`` or
+    ``null`` for no compression. Requires hdf5Preallocate. """
+
+    hdf5CompressionLevel: int = 1
+    """ Compression level (0-9) when hdf5Compression is ``"gzip"``. """
+
+    hdf5Shuffle: bool = False
+    """ Whether to apply the byte shuffle filter to HDF5 recordings, which
+    usually improves compression of camera data. Requires hdf5Preallocate. """
+
+    zarrCompressor: Optional[str] = 'zstd'
+    """ Blosc compressor for Zarr recordings, e.g. ``"zstd"``, ``"lz4"`` or
+    ``"blosclz"``, or ``null`` for no compression. The byte shuffle filter is
+    applied before compressing. """
+
+    zarrCompressionLevel: int = 3
+    """ Compression level (0-9) for Zarr recordings. """
+
+    zarrPyramidLevels: int = 3
+    """ Maximum number of downsampled resolution levels to write alongside
+    Zarr recordings, each half the size of the previous one in x and y. Levels
+    are only added while both sides are at least 256 pixels. """
+
+    tiffMetadata: Optional[str] = 'ome'
+    """ Kind of TIFF file that recordings are saved as: ``"ome"`` for BigTIFF
+    with OME-XML metadata, ``"imagej"`` for an ImageJ hyperstack (limited to
+    4 GB per file) or ``null`` for BigTIFF without metadata. """
+
+    tiffRolloverSizeMB: Optional[float] = None
+    """ Size in megabytes at which TIFF recordings continue in a new, numbered
+    file, or ``null`` to write a single file. ImageJ hyperstacks always roll
+    over before reaching 4 GB. """
+
+
 @dataclass(frozen=True)
 class PyroServerInfo:
     name: Optional[str] = 'ImSwitchServer'
     host: Optional[str] = '127.0.0.1'
     port: Optional[int] = 54333
     active: Optional[bool] = False
+    frameStreamPort: Optional[int] = 54334
+    """ TCP port to stream live frames on while the server is active, or
+    ``null`` to not stream frames. """
 
 
 @dataclass_json(undefined=Undefined.INCLUDE)
@@ -321,6 +403,9 @@ class SetupInfo:
     pulseStreamer: PulseStreamerInfo = field(default_factory=PulseStreamerInfo)
     """ Pulse Streamer settings. """
 
+    recording: RecordingInfo = field(default_factory=RecordingInfo)
+    """ Recording settings. """
+
     pyroServerInfo: PyroServerInfo = field(default_factory=PyroServerInfo)
 
     _catchAll: CatchAll = None
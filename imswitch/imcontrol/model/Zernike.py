@@ -0,0 +1,160 @@
+import functools
+import math
+import threading
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def nollToNM(j: int) -> Tuple[int, int]:
+    """ Returns the radial order n and azimuthal frequency m of the Zernike
+    polynomial with Noll index j (starting at 1). Negative m are sine terms,
+    positive m cosine terms. """
+    if j < 1:
+        raise ValueError(f'Noll indices start at 1, got {j}')
+    n = int((math.sqrt(8 * j - 7) - 1) // 2)
+    while (n + 1) * (n + 2) // 2 < j:  # Guard against rounding in the square root
+        n += 1
+    # Index of j among the polynomials of order n, which come in pairs of increasing |m|
+    k = j - n * (n + 1) // 2 - 1
+    absM = 2 * ((k + (n % 2 == 0)) // 2) + n % 2
+    return n, absM if j % 2 == 0 else -absM
+
+
+def radialCoefficients(n: int, m: int) -> Tuple[int, ...]:
+    """ Returns the coefficients of the radial polynomial R_n^|m|, for the
+    powers n, n - 2, ..., |m| of rho. """
+    m = abs(m)
+    return tuple(
+        (-1) ** k * math.factorial(n - k) //
+        (math.factorial(k) * math.factorial((n + m) // 2 - k) * math.factorial((n - m) // 2 - k))
+        for k in range((n - m) // 2 + 1)
+    )
+
+
+class ZernikeBasis:
+    """ Zernike polynomials in Noll order, normalized to unit RMS over the
+    unit disk, evaluated on a grid of the given shape. The polar coordinates
+    are measured from center (row, column) and normalized by radius, with
+    the angle running from the row axis towards the column axis, like in the
+    SLM masks.
+
+    The polar coordinates are computed once, and each polynomial the first
+    time it is needed; polynomials are kept as the rows of one array, so that
+    a mask can be composed from them as a single weighted sum. Use
+    getZernikeBasis to share bases between masks of the same geometry. """
+
+    def __init__(self, shape: Tuple[int, int], center: Tuple[float, float], radius: float,
+                 dtype=np.float64):
+        self.shape = tuple(shape)
+        self.center = tuple(center)
+        self.radius = radius
+        self.dtype = np.dtype(dtype)
+
+        x, y = np.ogrid[:self.shape[0], :self.shape[1]]
+        x = (x - self.center[0]) / radius
+        y = (y - self.center[1]) / radius
+        self.rho = np.sqrt(x ** 2 + y ** 2)
+        self.theta = np.arctan2(y, x)
+        self.rho.flags.writeable = False
+        self.theta.flags.writeable = False
+
+        self._polynomials = np.empty((0, self.rho.size), dtype=self.dtype)
+        self._lock = threading.Lock()
+
+    @property
+    def numPolynomials(self) -> int:
+        """ The number of polynomials that have been evaluated so far. """
+        return len(self._polynomials)
+
+    def polynomial(self, j: int) -> np.ndarray:
+        """ Returns the (read-only) polynomial with Noll index j. """
+        return self._getPolynomials(j)[j - 1].reshape(self.shape)
+
+    def compose(self, coefficients: Union[Dict[int, float], Sequence[float]],
+                out: np.ndarray = None) -> np.ndarray:
+        """ Returns the sum of the polynomials weighted by coefficients,
+        either a dict from Noll index to weight or a sequence of weights
+        starting at Noll index 1. The sum is written to out if given, which
+        must be a C-contiguous array of the basis' shape and dtype. """
+        if not isinstance(coefficients, dict):
+            coefficients = dict(enumerate(coefficients, start=1))
+        coefficients = {j: c for j, c in coefficients.items() if c != 0}
+
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        if not coefficients:
+            out[...] = 0
+            return out
+
+        weights = np.zeros(max(coefficients), dtype=self.dtype)
+        for j, c in coefficients.items():
+            if j < 1:
+                raise ValueError(f'Noll indices start at 1, got {j}')
+            weights[j - 1] = c
+        np.dot(weights, self._getPolynomials(len(weights))[:len(weights)],
+               out=out.reshape(-1))
+        return out
+
+    def _getPolynomials(self, maxIndex):
+        """ Returns the array of polynomials, evaluating them up to Noll
+        index maxIndex first if needed. """
+        with self._lock:
+            numComputed = len(self._polynomials)
+            if maxIndex <= numComputed:
+                return self._polynomials
+
+            polynomials = np.empty((maxIndex, self.rho.size), dtype=self.dtype)
+            polynomials[:numComputed] = self._polynomials
+            rho2 = self.rho ** 2
+            for j in range(numComputed + 1, maxIndex + 1):
+                polynomials[j - 1] = self._evaluate(j, rho2).reshape(-1)
+            polynomials.flags.writeable = False
+            self._polynomials = polynomials
+            return polynomials
+
+    def _evaluate(self, j, rho2):
+        n, m = nollToNM(j)
+        # Horner's scheme in rho^2, from the highest power down to rho^|m|
+        coefficients = radialCoefficients(n, m)
+        radial = np.full(self.shape, float(coefficients[0]))
+        for coefficient in coefficients[1:]:
+            radial *= rho2
+            radial += coefficient
+        if m != 0:
+            radial *= self.rho ** abs(m)
+            radial *= math.sqrt(2 * (n + 1))
+            radial *= np.cos(m * self.theta) if m > 0 else np.sin(-m * self.theta)
+        else:
+            radial *= math.sqrt(n + 1)
+        return radial
+
+
+def getZernikeBasis(shape: Tuple[int, int], center: Tuple[float, float], radius: float,
+                    dtype=np.float64) -> ZernikeBasis:
+    """ Returns a ZernikeBasis for the given geometry, reusing one of the
+    most recently used bases if it has the same geometry. """
+    return _getZernikeBasis(tuple(int(s) for s in shape), tuple(float(c) for c in center),
+                            float(radius), np.dtype(dtype).str)
+
+
+@functools.lru_cache(maxsize=4)
+def _getZernikeBasis(shape, center, radius, dtype):
+    return ZernikeBasis(shape, center, radius, dtype)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
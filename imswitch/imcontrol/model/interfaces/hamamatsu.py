@@ -822,11 +822,13 @@ class HamamatsuCameraMR(HamamatsuCamera):
     # @return (frames, (frame x size, frame y size))
     #
     def getFrames(self):
+        """ Returns views of the new frames in the camera buffers, which the
+        caller must copy before they are overwritten. """
         frames = []
         for n in self.newFrames():
             im = self.hcam_data[n].getData()
             frames.append(np.reshape(im, (self.frame_y, self.frame_x)))
-        return np.array(frames), (self.frame_y, self.frame_x)
+        return frames, (self.frame_y, self.frame_x)
 
     def getLast(self):
         b_index, f_count = self.getAq_Info()
@@ -17,7 +17,7 @@ class HMockCamData:
     # @param size The size of the data object in bytes.
     #
     def __init__(self, size, max_value):
-        self.np_array = np.random.randint(1, max_value, int(size))
+        self.np_array = np.random.randint(1, max_value, int(size), dtype=np.uint16)
         self.size = size
 
     # __getitem__
@@ -70,7 +70,7 @@ class MockHamamatsu:
         self.number_image_buffers = 0
         self.hcam_data = []
 
-        self.mock_data_max_value = np.random.randint(65536)
+        self.mock_data_max_value = np.random.randint(2, 65536)
         self.mock_acquisiton_running = False
         self.mock_start_time = time.time_ns()
 
@@ -130,7 +130,6 @@ class MockHamamatsu:
         available when it is called.
 
         @return (frames, (frame x size, frame y size))'''
-        frames = []
         frame_x, frame_y = self.frame_x, self.frame_y
 
         cur_frame_number = int(
@@ -139,11 +138,8 @@ class MockHamamatsu:
         num_frames = cur_frame_number - self.last_frame_number
         self.last_frame_number = cur_frame_number
 
-        for i in range(num_frames):
-            # Create storage
-            hc_data = HMockCamData(frame_x * frame_y, self.mock_data_max_value)
-            frames.append(np.reshape(hc_data.getData(), (frame_y, frame_x)))
-
+        frames = np.random.randint(1, self.mock_data_max_value,
+                                   size=(num_frames, frame_y, frame_x), dtype=np.uint16)
         return frames, (frame_x, frame_y)
 
     def getLast(self):
@@ -3,6 +3,7 @@ from time import sleep
 import numpy as np
 
 from imswitch.imcommon.framework import Mutex, Signal, SignalInterface, Thread, Timer, Worker
+from .LiveFrameDispatcher import LiveFrameDispatcher
 from .MultiManager import MultiManager
 
 
@@ -26,6 +27,8 @@ class DetectorsManager(MultiManager, SignalInterface):
         self._activeAcqLVHandles = []
         self._activeAcqsMutex = Mutex()
 
+        self._liveFrames = LiveFrameDispatcher()
+
         self._currentDetectorName = None
         for detectorName, detectorInfo in detectorInfos.items():
             if not self._subManagers[detectorName].forAcquisition:
@@ -63,6 +66,14 @@ class DetectorsManager(MultiManager, SignalInterface):
 
         return self._currentDetectorName
 
+    @property
+    def liveFrames(self):
+        """ The LiveFrameDispatcher that distributes live view frames to
+        subscribers, each with its own maximum rate and view of the frames.
+        Prefer subscribing to it over connecting to sigImageUpdated when
+        processing frames is slow. """
+        return self._liveFrames
+
     def getCurrentDetector(self):
         """ Returns the current detector. """
 
@@ -81,7 +92,7 @@ class DetectorsManager(MultiManager, SignalInterface):
         self.sigDetectorSwitched.emit(detectorName, oldDetectorName)
 
         if self._thread.isRunning():
-            self.execOnCurrent(lambda c: c.updateLatestFrame(True))
+            self._updateLatestFrame(self._currentDetectorName, True)
 
     def execOnCurrent(self, func):
         """ Executes a function on the current detector and returns the result. """
@@ -153,6 +164,18 @@ class DetectorsManager(MultiManager, SignalInterface):
             self.execOnAll(lambda c: c.stopAcquisition(), condition=lambda c: c.forAcquisition)
             self.sigAcquisitionStopped.emit()
 
+    def updateLatestFrames(self, init):
+        """ :meta private: """
+        for detectorName, detector in self._subManagers.items():
+            if detector.forAcquisition:
+                self._updateLatestFrame(detectorName, init)
+
+    def _updateLatestFrame(self, detectorName, init):
+        detector = self._subManagers[detectorName]
+        if detector.updateLatestFrame(init):
+            self._liveFrames.publish(detectorName, detector.image, init, detector.scale,
+                                     detectorName == self._currentDetectorName)
+
     def setUpdatePeriod(self, updatePeriod):
         self._lvWorker.setUpdatePeriod(updatePeriod)
         self._thread.quit()
@@ -168,13 +191,9 @@ class LVWorker(Worker):
         self._vtimer = None
 
     def run(self):
-        self._detectorsManager.execOnAll(lambda c: c.updateLatestFrame(False),
-                                         condition=lambda c: c.forAcquisition)
+        self._detectorsManager.updateLatestFrames(False)
         self._vtimer = Timer()
-        self._vtimer.timeout.connect(
-            lambda: self._detectorsManager.execOnAll(lambda c: c.updateLatestFrame(True),
-                                                     condition=lambda c: c.forAcquisition)
-        )
+        self._vtimer.timeout.connect(lambda: self._detectorsManager.updateLatestFrames(True))
         self._vtimer.start(self._updatePeriod)
 
     def stop(self):
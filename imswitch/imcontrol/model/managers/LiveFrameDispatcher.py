@@ -0,0 +1,248 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from imswitch.imcommon.framework import Signal, SignalInterface, Timer
+from imswitch.imcommon.model import initLogger
+
+
+LiveFrameCallback = Callable[[str, np.ndarray, bool, list, bool], None]
+
+
+class LiveFrameSubscription:
+    """ A subscription to live frames, created by
+    LiveFrameDispatcher.subscribe. The callback is called with the arguments
+    (detectorName, image, init, scale, isCurrentDetector), the same as
+    receivers of the sigUpdateImage signal.
+
+    Frames are coalesced: while the subscriber is busy or held back by its
+    maximum rate, newer frames replace older ones that have not been
+    delivered yet, so it only ever receives the newest frame. """
+
+    def __init__(self, dispatcher, callback: LiveFrameCallback, detectorName: Optional[str],
+                 maxRate: Optional[float], decimation: int,
+                 roi: Optional[Tuple[int, int, int, int]], background: bool):
+        self.__logger = initLogger(self)
+        self._dispatcher = dispatcher
+        self._callback = callback
+        self._detectorName = detectorName
+        self._background = background
+        self.setMaxRate(maxRate)
+        self.setView(decimation, roi)
+
+        self._lock = threading.Lock()
+        self._pending = None
+        self._deliveryScheduled = False
+        self._lastDeliveryTime = -np.inf
+        self._active = True
+        self._numReceived = 0
+        self._numDelivered = 0
+
+        self._wakeUp = threading.Condition(self._lock)
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._deliverLoop, daemon=True,
+                                            name='LiveFrameSubscriber')
+            self._thread.start()
+
+    @property
+    def numReceived(self) -> int:
+        """ Number of frames that have been offered to the subscriber. """
+        return self._numReceived
+
+    @property
+    def numDelivered(self) -> int:
+        """ Number of frames that have been delivered to the subscriber; the
+        others were skipped. """
+        return self._numDelivered
+
+    def setMaxRate(self, maxRate: Optional[float]) -> None:
+        """ Sets the maximum number of frames per second to deliver. None or
+        0 means as fast as frames arrive and the subscriber can keep up. """
+        self._minInterval = 1 / maxRate if maxRate else 0
+
+    def setView(self, decimation: int = 1,
+                roi: Optional[Tuple[int, int, int, int]] = None) -> None:
+        """ Sets which part of the frames to deliver: every decimation-th row
+        and column of the region roi, given as (y0, x0, y1, x1), or of the
+        whole frame if roi is None. The delivered images are views of the
+        frames and should not be modified. """
+        self._decimation = max(1, int(decimation))
+        self._roi = roi
+
+    def unsubscribe(self) -> None:
+        """ Stops the delivery of frames. """
+        with self._lock:
+            self._active = False
+            self._pending = None
+            self._wakeUp.notify()
+        self._dispatcher._removeSubscription(self)
+
+    def _offer(self, detectorName, image, init, scale, isCurrentDetector):
+        """ Called by the dispatcher for every new frame, from the thread that
+        the frame was captured in. Returns whether a delivery on the
+        dispatcher's thread must be scheduled. """
+        if self._detectorName is None and not isCurrentDetector:
+            return False
+        if self._detectorName is not None and detectorName != self._detectorName:
+            return False
+
+        with self._lock:
+            if not self._active:
+                return False
+            self._numReceived += 1
+            if self._pending is not None:
+                init = init and self._pending[2]
+            self._pending = (detectorName, image, init, scale, isCurrentDetector)
+
+            if self._background:
+                self._wakeUp.notify()
+                return False
+            if self._deliveryScheduled:
+                return False
+            self._deliveryScheduled = True
+            return True
+
+    def _takePending(self):
+        """ Returns the pending frame if it may be delivered now. Otherwise,
+        returns None and the number of seconds until it may be. """
+        with self._lock:
+            if self._pending is None:
+                return None, None
+            waitTime = self._lastDeliveryTime + self._minInterval - time.monotonic()
+            if waitTime > 0:
+                return None, waitTime
+            pending = self._pending
+            self._pending = None
+            self._lastDeliveryTime = time.monotonic()
+            return pending, None
+
+    def _deliver(self, frame):
+        detectorName, image, init, scale, isCurrentDetector = frame
+        if self._roi is not None:
+            y0, x0, y1, x1 = self._roi
+            image = image[y0:y1, x0:x1]
+        if self._decimation > 1:
+            image = image[::self._decimation, ::self._decimation]
+
+        try:
+            self._callback(detectorName, image, init, scale, isCurrentDetector)
+        except Exception:
+            self.__logger.exception('Error in live frame subscriber')
+        self._numDelivered += 1
+
+    def _deliverScheduled(self):
+        """ Called on the dispatcher's thread. Returns the number of seconds
+        after which to call again, or None. """
+        frame, waitTime = self._takePending()
+        if frame is not None:
+            self._deliver(frame)
+
+        with self._lock:
+            if waitTime is None:
+                self._deliveryScheduled = False
+                # A frame may have arrived while delivering
+                if self._pending is not None and self._active:
+                    self._deliveryScheduled = True
+                    waitTime = max(0.0, self._lastDeliveryTime + self._minInterval
+                                   - time.monotonic())
+        return waitTime
+
+    def _deliverLoop(self):
+        while True:
+            with self._lock:
+                while self._active and self._pending is None:
+                    self._wakeUp.wait()
+                if not self._active:
+                    return
+
+            frame, waitTime = self._takePending()
+            if frame is not None:
+                self._deliver(frame)
+            elif waitTime is not None:
+                with self._lock:
+                    self._wakeUp.wait(waitTime)
+
+
+class LiveFrameDispatcher(SignalInterface):
+    """ Distributes live view frames to subscribers, each with its own
+    maximum rate and view of the frames (full resolution, decimated or a
+    region of interest). Frames are handed to the dispatcher from the live
+    view thread, and delivered either on the thread that the dispatcher was
+    created in (normally the GUI thread) or on a background thread of the
+    subscription. Subscribers never receive a backlog of stale frames: if
+    they cannot keep up, they get the newest frame once they are ready. """
+
+    _sigDeliver = Signal(object)  # (subscription)
+
+    def __init__(self):
+        super().__init__()
+        self._subscriptions: List[LiveFrameSubscription] = []
+        self._subscriptionsLock = threading.Lock()
+        self._sigDeliver.connect(self._deliver)
+
+    def subscribe(self, callback: LiveFrameCallback, *, detectorName: Optional[str] = None,
+                  maxRate: Optional[float] = None, decimation: int = 1,
+                  roi: Optional[Tuple[int, int, int, int]] = None,
+                  background: bool = False) -> LiveFrameSubscription:
+        """ Subscribes callback to live frames, and returns the subscription.
+
+        Args:
+            callback: Called with (detectorName, image, init, scale,
+              isCurrentDetector) for each delivered frame.
+            detectorName: The detector to deliver frames from, or None to
+              deliver frames from whichever detector is the current one.
+            maxRate: Maximum number of frames per second to deliver, or None
+              for no limit.
+            decimation: Deliver every decimation-th row and column.
+            roi: Region of the frames to deliver, as (y0, x0, y1, x1).
+            background: Whether to call callback on a background thread of
+              the subscription rather than on the dispatcher's thread. Such
+              callbacks must not modify widgets.
+        """
+        subscription = LiveFrameSubscription(self, callback, detectorName, maxRate,
+                                             decimation, roi, background)
+        with self._subscriptionsLock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def publish(self, detectorName: str, image: np.ndarray, init: bool, scale: list,
+                isCurrentDetector: bool) -> None:
+        """ Offers a new frame to all subscribers. May be called from any
+        thread. """
+        with self._subscriptionsLock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            if subscription._offer(detectorName, image, init, scale, isCurrentDetector):
+                self._sigDeliver.emit(subscription)
+
+    def _deliver(self, subscription):
+        waitTime = subscription._deliverScheduled()
+        if waitTime is not None:
+            Timer.singleShot(int(np.ceil(waitTime * 1000)),
+                             lambda: self._deliver(subscription))
+
+    def _removeSubscription(self, subscription):
+        with self._subscriptionsLock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,31 +1,71 @@
 import importlib
 from abc import ABC, abstractmethod
-from imswitch.imcommon.model import initLogger
+from concurrent.futures import ThreadPoolExecutor
 
-from imswitch.imcommon.model import pythontools
+from imswitch.imcommon.framework import SignalInterface
+from imswitch.imcommon.model import pythontools, startupProfile
 
 
 class MultiManager(ABC):
     """ Abstract class for a manager used to control a group of sub-managers.
-    Intended to be extended for each type of manager. """
+    Intended to be extended for each type of manager.
+
+    Sub-managers are independent of each other, so their modules (which may
+    import slow vendor SDKs) are imported in parallel, and those that are
+    not Qt objects (which must be created on the UI thread) are constructed
+    in parallel too, except that sub-managers sharing an RS232 device are
+    constructed one after the other. """
 
     @abstractmethod
     def __init__(self, managedDeviceInfos, subManagersPackage, **lowLevelManagers):
-        #self.__logger = initLogger(self, instanceName='MultiManager')
         self._subManagers = {}
+        if not managedDeviceInfos:
+            return
+
         currentPackage = '.'.join(__name__.split('.')[:-1])
-        if managedDeviceInfos:
-            for managedDeviceName, managedDeviceInfo in managedDeviceInfos.items():
-                # Create sub-manager
-                #self.__logger.debug(f'{currentPackage}.{subManagersPackage}, {managedDeviceInfo.managerName}')
-                #self.__logger.debug(managedDeviceInfo)
-                package = importlib.import_module(
-                    pythontools.joinModulePath(f'{currentPackage}.{subManagersPackage}',
-                                            managedDeviceInfo.managerName)
-                )
-                manager = getattr(package, managedDeviceInfo.managerName)
-                self._subManagers[managedDeviceName] = manager(
-                    managedDeviceInfo, managedDeviceName, **lowLevelManagers)
+
+        def importManager(managerName):
+            modulePath = pythontools.joinModulePath(f'{currentPackage}.{subManagersPackage}',
+                                                    managerName)
+            with startupProfile.measure('import', modulePath):
+                return getattr(importlib.import_module(modulePath), managerName)
+
+        def createManagers(deviceNames):
+            managers = {}
+            for deviceName in deviceNames:
+                deviceInfo = managedDeviceInfos[deviceName]
+                with startupProfile.measure('manager',
+                                            f'{deviceInfo.managerName} "{deviceName}"'):
+                    managers[deviceName] = managerClasses[deviceInfo.managerName](
+                        deviceInfo, deviceName, **lowLevelManagers
+                    )
+            return managers
+
+        managerNames = list(dict.fromkeys(
+            deviceInfo.managerName for deviceInfo in managedDeviceInfos.values()
+        ))
+        with ThreadPoolExecutor(max_workers=min(len(managedDeviceInfos), 8)) as executor:
+            managerClasses = dict(zip(managerNames, executor.map(importManager, managerNames)))
+
+            uiThreadDeviceNames = []
+            deviceNameGroups = {}
+            for deviceName, deviceInfo in managedDeviceInfos.items():
+                if issubclass(managerClasses[deviceInfo.managerName], SignalInterface):
+                    uiThreadDeviceNames.append(deviceName)
+                else:
+                    rs232Device = (deviceInfo.managerProperties or {}).get('rs232device')
+                    groupKey = ('rs232', rs232Device) if rs232Device else deviceName
+                    deviceNameGroups.setdefault(groupKey, []).append(deviceName)
+
+            futures = [executor.submit(createManagers, deviceNames)
+                       for deviceNames in deviceNameGroups.values()]
+            managers = createManagers(uiThreadDeviceNames)
+            for future in futures:
+                managers.update(future.result())
+
+        # Keep the order of the setup
+        self._subManagers = {deviceName: managers[deviceName]
+                             for deviceName in managedDeviceInfos.keys()}
 
     def hasDevices(self):
         """ Returns whether this manager manages any devices. """
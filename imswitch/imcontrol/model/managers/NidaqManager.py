@@ -5,11 +5,13 @@ import warnings
 import nidaqmx
 import nidaqmx._lib
 import nidaqmx.constants
+from nidaqmx.stream_readers import CounterReader
 from nidaqmx.stream_writers import AnalogSingleChannelWriter
 import numpy as np
 
 from imswitch.imcommon.framework import Signal, SignalInterface, Thread
 from imswitch.imcommon.model import initLogger
+from ..signaldesigners import contentHash
 
 
 import datetime, time
@@ -36,7 +38,8 @@ class NidaqManager(SignalInterface):
         self.busy = False
         self.__timerCounterChannel = setupInfo.nidaq.getTimerCounterChannel()
         self.__startTrigger = setupInfo.nidaq.startTrigger
-
+        self.__scanTaskConfigs = {}  # Task name -> configuration the scan task was created with
+        self.__writtenAOSignalsHash = None
 
 
     def __del__(self):
@@ -176,6 +179,14 @@ class NidaqManager(SignalInterface):
         else:
             return self.tasks[taskName].read(samples, timeout)
 
+    def readCounterInputTask(self, taskName, data, timeout=10.0):
+        """ Reads len(data) samples from the counter input task taskName into
+        data, a preallocated uint32 array, and returns it. """
+        CounterReader(self.tasks[taskName].in_stream).read_many_sample_uint32(
+            data, number_of_samples_per_channel=len(data), timeout=timeout
+        )
+        return data
+
     def setDigital(self, target, enable):
         """ Function to set the digital line to a specific target
         to either "high" or "low" voltage """
@@ -249,19 +260,46 @@ class NidaqManager(SignalInterface):
                 finally:
                     self.busy = False
 
+    def __getScanTask(self, name, config, create):
+        """ Returns the scan task with the given name from the previous scan,
+        stopped so that it can be started again, if it was created with the
+        same configuration; otherwise closes it and creates a new one with
+        create(). """
+        task = self.tasks.get(name)
+        if task is not None and self.__scanTaskConfigs.get(name) == config:
+            task.stop()
+            return task
+
+        self.__closeScanTask(name)
+        task = create()
+        self.tasks[name] = task
+        self.__scanTaskConfigs[name] = config
+        return task
+
+    def __closeScanTask(self, name):
+        task = self.tasks.pop(name, None)
+        self.__scanTaskConfigs.pop(name, None)
+        if name == 'ao':
+            self.__writtenAOSignalsHash = None
+        if task is not None:
+            try:
+                task.close()
+            except Exception:
+                self.__logger.warning(f'Failed to close task "{name}": {traceback.format_exc()}')
+
+    def __closeScanTasks(self):
+        for name in list(self.tasks):
+            self.__closeScanTask(name)
+
     def runScanInitialization(self, signalDic, scanInfoDict):
-        
+        """ Prepares the tasks for a scan with the given signals. The tasks of
+        the previous scan are kept and re-armed if their configuration has not
+        changed, and the analog signals are only written again if they have
+        changed, so that repeating a scan is quick. """
         self.__logger.debug('Create nidaq scan...')
-        try:
-            self.aoTask.stop()
-            self.aoTask.close()
-            #del self.tasks
-            self.tasks = {}
-            self.__logger.debug('cleared old scan')
-            
-        except:
-            pass
-
+        # Input tasks are recreated for every scan
+        self.tasks = {name: task for name, task in self.tasks.items()
+                      if name in self.__scanTaskConfigs}
         try:
             # TODO: fill this
             stageDic = signalDic['scanSignalsDict']
@@ -309,16 +347,20 @@ class NidaqManager(SignalInterface):
                     len(AOsignals[0] if len(AOsignals) > 0 else DOsignals[0]) * (1e6/100e3)
                 )
                 #self.__logger.debug(f'Total detection samples in scan: {detSampsInScan}')
-                self.timerTask = self.__createChanCOTask(
-                    'TimerTask', channel=self.__timerCounterChannel, rate=1e6,
-                    sampsInScan=detSampsInScan, starttrig=self.__startTrigger,
-                    reference_trigger='ao/StartTrigger'
+                self.timerTask = self.__getScanTask(
+                    'timer', (self.__timerCounterChannel, detSampsInScan, self.__startTrigger),
+                    lambda: self.__createChanCOTask(
+                        'TimerTask', channel=self.__timerCounterChannel, rate=1e6,
+                        sampsInScan=detSampsInScan, starttrig=self.__startTrigger,
+                        reference_trigger='ao/StartTrigger'
+                    )
                 )
                 self.timerTaskWaiter.connect(self.timerTask)
                 self.timerTaskWaiter.sigWaitDone.connect(
                     lambda: self.taskDone('timer', self.timerTaskWaiter)
                 )
-                self.tasks['timer'] = self.timerTask
+            else:
+                self.__closeScanTask('timer')
             acquisitionTypeFinite = nidaqmx.constants.AcquisitionType.FINITE
             scanclock = r'1MHzTimebase'
             clockDO = scanclock
@@ -330,28 +372,35 @@ class NidaqManager(SignalInterface):
                 scanclock = r'1MHzTimebase'
                 scanSampsInScan = len(AOsignals[0])
                 self.__logger.debug(f'Total scan samples in scan: {scanSampsInScan}')
-                self.aoTask = self.__createChanAOTask('ScanAOTask', AOchannels,
-                                                      acquisitionTypeFinite, scanclock,
-                                                      1000000, min_val=0, max_val=5,
-                                                      sampsInScan=scanSampsInScan,
-                                                      starttrig=True)
-                self.tasks['ao'] = self.aoTask
+                self.aoTask = self.__getScanTask(
+                    'ao', (tuple(AOchannels), scanSampsInScan),
+                    lambda: self.__createChanAOTask('ScanAOTask', AOchannels,
+                                                    acquisitionTypeFinite, scanclock,
+                                                    1000000, min_val=0, max_val=5,
+                                                    sampsInScan=scanSampsInScan,
+                                                    starttrig=True)
+                )
                 #----------------------------------------------------------------------------------
                 #----------------------------------------------------------------------------------
                 # Important to squeeze the array, otherwise we might get an "invalid number of
                 # channels" error
                 #self.aoTask.write(np.array(AOsignals).squeeze(), auto_start=False, timeout=0)
-                
-                self.test_writer = AnalogSingleChannelWriter(self.aoTask.out_stream)
-                self.test_writer.write_many_sample(np.array(AOsignals).squeeze())
+
+                # A re-armed task regenerates the samples already in its buffer
+                AOsignalsHash = contentHash(AOsignals)
+                if AOsignalsHash != self.__writtenAOSignalsHash:
+                    self.__writtenAOSignalsHash = None
+                    self.test_writer = AnalogSingleChannelWriter(self.aoTask.out_stream)
+                    self.test_writer.write_many_sample(np.array(AOsignals).squeeze())
+                    self.__writtenAOSignalsHash = AOsignalsHash
                 # print("Write is successful!")
+            else:
+                self.__closeScanTask('ao')
 
         except:
             self.sigScanBuildFailed.emit()
             self.__logger.error(traceback.format_exc())
-            for task in self.tasks.values():
-                task.close()
-            self.tasks = {}
+            self.__closeScanTasks()
 
 
     def runScan(self, signalDic, scanInfoDict):
@@ -396,9 +445,7 @@ class NidaqManager(SignalInterface):
                     """
             except Exception:
                 self.__logger.error(traceback.format_exc())
-                for task in self.tasks.values():
-                    task.close()
-                self.tasks = {}
+                self.__closeScanTasks()
                 self.busy = False
                 
             else:
@@ -423,11 +470,7 @@ class NidaqManager(SignalInterface):
                 # self.__logger.info('Nidaq scan started!')
                 
     def closeSignalReceived(self):
-        try:
-            self.tasks['ao'].close()
-            del self.tasks['ao']
-        except:
-            pass
+        self.__closeScanTask('ao')
 
 
     def stopTask(self, taskName):
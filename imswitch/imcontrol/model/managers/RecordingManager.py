@@ -1,10 +1,17 @@
 import enum
+import json
 import os
+import queue
+import threading
 import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from typing import Dict, Optional, Type, List
 
 import h5py
+import numcodecs
 import zarr
 import numpy as np
 import tifffile as tiff
@@ -16,7 +23,9 @@ from ome_zarr.format import format_from_version
 import abc
 import logging
 
+from imswitch.imcontrol.model.SetupInfo import RecordingInfo
 from imswitch.imcontrol.model.managers.DetectorsManager import DetectorsManager
+from imswitch.imcontrol.model.managers.RecordingPipeline import RecordingPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -62,7 +71,8 @@ class ZarrStorer(Storer):
             for channel, image in images.items():
                 shape = self.detectorManager[channel].shape
                 root.create_dataset(channel, data=image, shape=tuple(reversed(shape)),
-                                        chunks=(512, 512), dtype='i2') #TODO: why not dynamic chunking?
+                                    chunks=computeImageChunkShape(image, _snapChunkBytes),
+                                    dtype=image.dtype)
 
                 datasets.append({"path": channel, "transformation": None})
             write_multiscales_metadata(root, datasets, format_from_version("0.2"), shape, **attrs)
@@ -76,7 +86,7 @@ class HDF5Storer(Storer):
             with AsTemporayFile(f'{self.filepath}_{channel}.h5') as path:
                 file = h5py.File(path, 'w')
                 shape = self.detectorManager[channel].shape
-                dataset = file.create_dataset('data', tuple(reversed(shape)), dtype='i2')
+                dataset = file.create_dataset('data', tuple(reversed(shape)), dtype=image.dtype)
                 for key, value in attrs[channel].items():
                     try:
                         dataset.attrs[key] = value
@@ -109,6 +119,422 @@ class TiffStorer(Storer):
                 logger.info(f"Saved image to tiff file {path}")
 
 
+class StreamWriter(abc.ABC):
+    """ Base class for writing the frames of one detector as they are being
+    recorded. write is called from a writer thread of the recording pipeline,
+    with a view of the recording buffer that is only valid for the duration of
+    the call. """
+    def __init__(self):
+        self.numFrames = 0
+
+    @abc.abstractmethod
+    def write(self, frames: np.ndarray):
+        """ Writes a (numFrames, height, width) block of frames after the ones
+        that have already been written. """
+        raise NotImplementedError
+
+    def close(self):
+        """ Finalizes the written data. Called once the recording has ended.
+        """
+        pass
+
+
+class _ChunkStager:
+    """ Groups frames into whole chunks along the time axis. Blocks of whole
+    chunks are passed to writeChunks(frames, start) as soon as they are
+    complete, straight from the given frames where possible. The remaining
+    frames are held back in a staging buffer until their chunk is complete or
+    they are taken out with takeStaged. """
+    def __init__(self, depth, frameShape, dtype, writeChunks):
+        self._staged = np.empty((depth, *frameShape), dtype=dtype)
+        self._writeChunks = writeChunks
+        self.numStaged = 0
+        self.numFrames = 0
+
+    def add(self, frames):
+        n = len(frames)
+        depth = len(self._staged)
+        i = 0
+
+        # Top up a partially filled chunk first
+        if self.numStaged > 0:
+            i = min(depth - self.numStaged, n)
+            self._staged[self.numStaged:self.numStaged + i] = frames[:i]
+            self.numStaged += i
+            if self.numStaged == depth:
+                self._writeChunks(self._staged, self.numFrames + i - depth)
+                self.numStaged = 0
+
+        # Write whole chunks straight from the given frames
+        numWhole = (n - i) // depth * depth
+        if numWhole > 0:
+            self._writeChunks(frames[i:i + numWhole], self.numFrames + i)
+            i += numWhole
+
+        # Hold back the rest until its chunk is complete
+        if i < n:
+            self._staged[:n - i] = frames[i:]
+            self.numStaged = n - i
+
+        self.numFrames += n
+
+    def takeStaged(self):
+        """ Returns the index of the first held back frame and a view of the
+        held back frames, and empties the staging buffer. """
+        staged = self._staged[:self.numStaged]
+        self.numStaged = 0
+        return self.numFrames - len(staged), staged
+
+
+class HDF5StreamWriter(StreamWriter):
+    """ A stream writer that writes frames to a chunked HDF5 dataset.
+
+    Unless preallocate is False, the dataset is expected to be created with
+    room for the expected number of frames (or at least one chunk if that is
+    not known). It is grown in geometric steps when more room is needed and
+    trimmed to the number of written frames on close. Whole chunks are written
+    directly to the file, bypassing the HDF5 filter pipeline; shuffling and
+    gzip compression are then done here. Frames that do not fill a whole chunk
+    are held back until the chunk is complete or the writer is closed.
+
+    If preallocate is False, the dataset is resized for every block of frames
+    and written through h5py, as in earlier versions. """
+    def __init__(self, dataset, preallocate=True, growthFactor=2):
+        super().__init__()
+        self.dataset = dataset
+        self.preallocate = preallocate
+        self.growthFactor = growthFactor
+
+        self._stager = None
+        if (preallocate and dataset.chunks is not None
+                and dataset.compression in (None, 'gzip')
+                and not dataset.fletcher32 and dataset.scaleoffset is None):
+            self._stager = _ChunkStager(dataset.chunks[0], dataset.shape[1:], dataset.dtype,
+                                        self._writeChunks)
+        self._encoderPool = None
+
+    def write(self, frames: np.ndarray):
+        frames = castLossless(frames, self.dataset.dtype)
+        n = len(frames)
+        if self._stager is not None:
+            self._stager.add(frames)
+        else:
+            it = self.numFrames
+            if self.preallocate:
+                self._ensureCapacity(it + n)
+            else:
+                self.dataset.resize(n + it, axis=0)
+            self.dataset[it:it + n, :, :] = frames
+        self.numFrames += n
+
+    def close(self):
+        if self._stager is not None:
+            start, staged = self._stager.takeStaged()
+            if len(staged) > 0:
+                self._ensureCapacity(start + len(staged))
+                self.dataset[start:start + len(staged), :, :] = staged
+
+        # Trim preallocated frames, and remove the default frame if no frames have been captured
+        if self.dataset.shape[0] != self.numFrames:
+            self.dataset.resize(self.numFrames, axis=0)
+
+        if self._encoderPool is not None:
+            self._encoderPool.shutdown()
+            self._encoderPool = None
+
+    def _ensureCapacity(self, numFrames):
+        currentSize = self.dataset.shape[0]
+        if numFrames <= currentSize:
+            return
+
+        newSize = max(numFrames, int(currentSize * self.growthFactor))
+        if self.dataset.chunks is not None:
+            depth = self.dataset.chunks[0]
+            newSize = -(-newSize // depth) * depth
+        self.dataset.resize(newSize, axis=0)
+
+    def _writeChunks(self, frames, start):
+        """ Writes frames, whose length must be a multiple of the chunk depth,
+        as whole chunks starting at the chunk-aligned frame index start. """
+        self._ensureCapacity(start + len(frames))
+
+        depth, chunkHeight, chunkWidth = self.dataset.chunks
+        _, height, width = self.dataset.shape
+        offsets = [(t, y, x) for t in range(0, len(frames), depth)
+                   for y in range(0, height, chunkHeight)
+                   for x in range(0, width, chunkWidth)]
+
+        def encode(offset):
+            t, y, x = offset
+            tile = frames[t:t + depth, y:y + chunkHeight, x:x + chunkWidth]
+            if tile.shape[1:] != (chunkHeight, chunkWidth):
+                # Chunks on the edges are stored padded to full size
+                padded = np.zeros(self.dataset.chunks, dtype=self.dataset.dtype)
+                padded[:, :tile.shape[1], :tile.shape[2]] = tile
+                tile = padded
+            else:
+                tile = np.ascontiguousarray(tile, dtype=self.dataset.dtype)
+            return self._encode(tile)
+
+        if self.dataset.compression is not None and len(offsets) > 1:
+            # zlib releases the GIL, so chunks can be compressed in parallel
+            if self._encoderPool is None:
+                self._encoderPool = ThreadPoolExecutor(thread_name_prefix='HDF5Encoder')
+            chunks = self._encoderPool.map(encode, offsets)
+        else:
+            chunks = map(encode, offsets)
+
+        for (t, y, x), chunk in zip(offsets, chunks):
+            self.dataset.id.write_direct_chunk((start + t, y, x), chunk)
+
+    def _encode(self, tile):
+        data = tile
+        if self.dataset.shuffle:
+            data = data.reshape(-1).view(np.uint8).reshape(-1, data.itemsize).T.copy()
+        if self.dataset.compression == 'gzip':
+            data = zlib.compress(data, self.dataset.compression_opts or 4)
+        return data
+
+
+class ZarrStreamWriter(StreamWriter):
+    """ A stream writer that writes frames to the arrays of an OME-Zarr
+    multiscale image in whole chunks. levels[0] receives the frames at full
+    resolution, and each following level the frames of the level before
+    downsampled by 2 in y and x, using nearest-neighbour sampling like the
+    ome_zarr default scaler. The downsampled levels are written by a
+    background thread while the recording is running. All arrays are grown in
+    geometric steps when more room is needed and trimmed to the number of
+    written frames on close. """
+    def __init__(self, levels, growthFactor=2, maxQueuedBlocks=16):
+        super().__init__()
+        self.levels = levels
+        self.growthFactor = growthFactor
+
+        self._stagers = [
+            _ChunkStager(level.chunks[0], level.shape[1:], level.dtype,
+                         lambda frames, start, level=level: self._writeChunks(level, frames, start))
+            for level in levels
+        ]
+        self._pyramidQueue = queue.Queue(maxsize=maxQueuedBlocks)
+        self._pyramidError = None
+        self._pyramidThread = None
+        if len(levels) > 1:
+            self._pyramidThread = threading.Thread(target=self._buildPyramid,
+                                                   name='ZarrPyramidBuilder', daemon=True)
+            self._pyramidThread.start()
+
+    def write(self, frames: np.ndarray):
+        frames = castLossless(frames, self.levels[0].dtype)
+        self._stagers[0].add(frames)
+        if self._pyramidThread is not None:
+            if self._pyramidError is not None:
+                raise self._pyramidError
+            # frames is only valid during this call, so pass on a (smaller) copy
+            self._pyramidQueue.put(np.ascontiguousarray(frames[:, ::2, ::2]))
+        self.numFrames += len(frames)
+
+    def close(self):
+        if self._pyramidThread is not None:
+            self._pyramidQueue.put(None)
+            self._pyramidThread.join()
+
+        for level, stager in zip(self.levels, self._stagers):
+            start, staged = stager.takeStaged()
+            if len(staged) > 0:
+                self._writeChunks(level, staged, start)
+            level.resize(self.numFrames, *level.shape[1:])
+
+        if self._pyramidError is not None:
+            raise self._pyramidError
+
+    def _buildPyramid(self):
+        while True:
+            frames = self._pyramidQueue.get()
+            if frames is None:
+                return
+            if self._pyramidError is not None:
+                continue
+
+            try:
+                for stager in self._stagers[1:]:
+                    stager.add(frames)
+                    frames = frames[:, ::2, ::2]
+            except Exception as e:
+                self._pyramidError = e
+
+    def _writeChunks(self, array, frames, start):
+        end = start + len(frames)
+        if end > array.shape[0]:
+            depth = array.chunks[0]
+            newSize = max(end, int(array.shape[0] * self.growthFactor))
+            array.resize(-(-newSize // depth) * depth, *array.shape[1:])
+        array[start:end] = frames
+
+
+class TiffStreamWriter(StreamWriter):
+    """ A stream writer that writes frames to a tiff file through a file
+    handle that is kept open for the whole recording. Frames are written as
+    one contiguous series of pages, and the metadata is written once the
+    number of frames is known, when the file is closed.
+
+    metadataFormat selects the kind of file written: "ome" for BigTIFF with
+    OME-XML metadata, "imagej" for an ImageJ hyperstack (which is limited to
+    4 GB per file) or None for BigTIFF without metadata. If rolloverBytes is
+    set, the recording continues in a new, numbered file (``name_0001.tiff``
+    and so on) once a file would exceed that size. """
+    def __init__(self, filePath, dtype=None, metadataFormat='ome', rolloverBytes=None,
+                 pixelSizeUm=None, name=None, attrs=None):
+        super().__init__()
+        if metadataFormat not in ('ome', 'imagej', None):
+            raise ValueError(f'Unsupported TIFF metadata format "{metadataFormat}"')
+
+        self.filePath = filePath
+        self.dtype = dtype
+        self.metadataFormat = metadataFormat
+        self.rolloverBytes = rolloverBytes
+        if metadataFormat == 'imagej':
+            self.rolloverBytes = min(rolloverBytes or _imageJMaxFileBytes, _imageJMaxFileBytes)
+        self.pixelSizeUm = pixelSizeUm
+        self.name = name
+        self.attrs = attrs or {}
+        self.filePaths = []
+
+        self._tiffWriter = None
+        self._fileNumFrames = 0
+        self._fileNumBytes = 0
+        self._frameShape = None
+        self._frameDtype = None
+
+    def write(self, frames: np.ndarray):
+        if self.dtype is not None:
+            frames = castLossless(frames, self.dtype)
+
+        for frame in frames:
+            if (self._tiffWriter is not None and self.rolloverBytes is not None
+                    and self._fileNumFrames > 0
+                    and self._fileNumBytes + frame.nbytes > self.rolloverBytes):
+                self._closeFile()
+            if self._tiffWriter is None:
+                self._openFile(frame)
+
+            self._tiffWriter.write(frame, contiguous=True, metadata=None,
+                                   description=_tiffDescriptionPlaceholder,
+                                   resolution=self._getResolution(),
+                                   resolutionunit='CENTIMETER')
+            self._fileNumFrames += 1
+            self._fileNumBytes += frame.nbytes
+            self.numFrames += 1
+
+    def close(self):
+        if self._tiffWriter is not None:
+            self._closeFile()
+
+    def _openFile(self, frame):
+        if len(self.filePaths) < 1:
+            filePath = self.filePath
+        else:
+            root, ext = os.path.splitext(self.filePath)
+            filePath = f'{root}_{len(self.filePaths):04d}{ext}'
+
+        self._tiffWriter = tiff.TiffWriter(filePath, bigtiff=self.metadataFormat != 'imagej')
+        self.filePaths.append(filePath)
+        self._fileNumFrames = 0
+        self._fileNumBytes = 0
+        self._frameShape = frame.shape
+        self._frameDtype = frame.dtype
+
+    def _closeFile(self):
+        try:
+            description = self._getDescription()
+            if description is not None:
+                self._tiffWriter.overwrite_description(description)
+        finally:
+            self._tiffWriter.close()
+            self._tiffWriter = None
+
+    def _getResolution(self):
+        if self.pixelSizeUm is None:
+            return None
+        _, pixelSizeY, pixelSizeX = self.pixelSizeUm
+        return 1e4 / pixelSizeX, 1e4 / pixelSizeY  # Pixels per centimeter
+
+    def _getDescription(self):
+        shape = (self._fileNumFrames, *self._frameShape)
+        info = json.dumps(self.attrs, default=str)
+        if self.metadataFormat == 'ome':
+            metadata = {'axes': 'TYX', 'Description': info}
+            if self.name is not None:
+                metadata['Name'] = self.name
+            if self.pixelSizeUm is not None:
+                metadata['PhysicalSizeY'] = self.pixelSizeUm[1]
+                metadata['PhysicalSizeX'] = self.pixelSizeUm[2]
+            omeXml = tiff.OmeXml()
+            omeXml.addimage(self._frameDtype, shape, (shape[0], 1, 1, *shape[1:], 1),
+                            **metadata)
+            return omeXml.tostring(declaration=True)
+        elif self.metadataFormat == 'imagej':
+            return tiff.imagej_description(shape, axes='TYX', unit='micron', Info=info)
+        return None
+
+
+def castLossless(frames, dtype):
+    """ Returns frames converted to dtype, or frames itself if it already has
+    that data type. Raises a ValueError if the conversion would change any
+    value, e.g. because it does not fit in the new data type. """
+    frames = np.asarray(frames)
+    dtype = np.dtype(dtype)
+    if frames.dtype == dtype:
+        return frames
+
+    converted = frames.astype(dtype)
+    if not np.can_cast(frames.dtype, dtype, 'safe') and not np.array_equal(converted, frames):
+        raise ValueError(f'Cannot losslessly convert frames from {frames.dtype} to {dtype}')
+    return converted
+
+
+def computeChunkShape(frameShape, itemSize, targetChunkBytes, frameRate=None, maxFrames=None):
+    """ Returns a (frames, height, width) chunk shape of roughly
+    targetChunkBytes for frames of shape (height, width). Frames that are
+    smaller than the target are grouped along the time axis, but no more than
+    about one second's worth at the given frame rate (so that chunks are
+    completed and written out quickly) and no more than maxFrames. Frames that
+    are larger than the target are split into tiles instead. """
+    height, width = frameShape
+    frameBytes = height * width * itemSize
+    if frameBytes > targetChunkBytes:
+        while height * width * itemSize > targetChunkBytes and (height > 1 or width > 1):
+            if height >= width:
+                height = (height + 1) // 2
+            else:
+                width = (width + 1) // 2
+        return 1, height, width
+
+    numFrames = max(1, int(targetChunkBytes // frameBytes))
+    if frameRate:
+        numFrames = min(numFrames, max(1, int(frameRate)))
+    if maxFrames:
+        numFrames = min(numFrames, maxFrames)
+    return numFrames, height, width
+
+
+def computeImageChunkShape(image, targetChunkBytes):
+    """ Returns a chunk shape of roughly targetChunkBytes for storing a single
+    image, which is tiled in its last two dimensions. """
+    _, height, width = computeChunkShape(image.shape[-2:], image.itemsize, targetChunkBytes)
+    return (1,) * (image.ndim - 2) + (height, width)
+
+
+def computePyramidShapes(frameShape, maxLevels, minSize=256):
+    """ Returns the (height, width) frame shapes of the full resolution image
+    and up to maxLevels downsampled levels, each with every second row and
+    column of the one before. Levels are only added while both sides of the
+    previous level are at least minSize * 2 pixels. """
+    shapes = [tuple(frameShape)]
+    while len(shapes) <= maxLevels and min(shapes[-1]) >= minSize * 2:
+        shapes.append(tuple(-(-size // 2) for size in shapes[-1]))
+    return shapes
+
+
 class SaveMode(enum.Enum):
     Disk = 1
     RAM = 2
@@ -143,10 +569,12 @@ class RecordingManager(SignalInterface):
         str, object, object, bool
     )  # (name, file, filePath, savedToDisk)
 
-    def __init__(self, detectorsManager, storerMap: Optional[Dict[str, Type[Storer]]] = None):
+    def __init__(self, detectorsManager, storerMap: Optional[Dict[str, Type[Storer]]] = None,
+                 recordingInfo: Optional[RecordingInfo] = None):
         super().__init__()
         self.__logger = initLogger(self)
         self.__storerMap = storerMap or DEFAULT_STORER_MAP
+        self.__recordingInfo = recordingInfo or RecordingInfo()
         self._memRecordings = {}  # { filePath: bytesIO }
         self.__detectorsManager = detectorsManager
         self.__record = False
@@ -169,6 +597,39 @@ class RecordingManager(SignalInterface):
     def detectorsManager(self):
         return self.__detectorsManager
 
+    @property
+    def recordingInfo(self):
+        return self.__recordingInfo
+
+    def getStorageDtype(self, detectorName, image=None):
+        """ Returns the data type to store frames from the specified detector
+        in: the one configured for the detector in the setup, if any, and
+        otherwise the data type of image or, if not given, the detector's
+        native data type. """
+        storageDtype = self.__recordingInfo.storageDtypes.get(detectorName)
+        if storageDtype is not None:
+            return np.dtype(storageDtype)
+        if image is not None:
+            return np.asarray(image).dtype
+        return self.__detectorsManager[detectorName].dtype
+
+    def getRecordingStats(self):
+        """ Returns the frame counters of the current or most recent
+        recording per detector: the number of frames grabbed, written and
+        dropped, the number of frames that were overwritten in the detector's
+        frame buffer before they could be grabbed, and the current and highest
+        number of frames waiting to be written along with the buffer capacity.
+        """
+        pipeline = self.__recordingWorker.pipeline
+        if pipeline is None:
+            return {}
+
+        stats = pipeline.getStats()
+        for detectorName, stream in self.__recordingWorker.streams.items():
+            if detectorName in stats:
+                stats[detectorName]['overrun'] = stream.numOverrun
+        return stats
+
     def startRecording(self, detectorNames, recMode, savename, saveMode, attrs,
                        saveFormat=SaveFormat.HDF5, singleMultiDetectorFile=False, singleLapseFile=False,
                        recFrames=None, recTime=None):
@@ -190,8 +651,18 @@ class RecordingManager(SignalInterface):
         self.__recordingWorker.recTime = recTime
         self.__recordingWorker.singleMultiDetectorFile = singleMultiDetectorFile
         self.__recordingWorker.singleLapseFile = singleLapseFile
-        self.__detectorsManager.execOnAll(lambda c: c.flushBuffers(),
-                                          condition=lambda c: c.forAcquisition)
+        streams = {}
+        try:
+            for detectorName in detectorNames:
+                streams[detectorName] = self.__detectorsManager[detectorName].openStream(
+                    'Recording'
+                )
+        except Exception:
+            for stream in streams.values():
+                stream.close()
+            self.__record = False
+            raise
+        self.__recordingWorker.streams = streams
         self.__thread.start()
 
     def endRecording(self, emitSignal=True, wait=True):
@@ -199,9 +670,6 @@ class RecordingManager(SignalInterface):
         sigRecordingEnded signal will be emitted. Unless wait is False, this
         method will wait until the recording is complete before returning. """
 
-        self.__detectorsManager.execOnAll(lambda c: c.flushBuffers(),
-                                          condition=lambda c: c.forAcquisition)
-
         if self.__record:
             self.__logger.info('Stopping recording')
         self.__record = False
@@ -222,8 +690,10 @@ class RecordingManager(SignalInterface):
 
             # Acquire data
             for detectorName in detectorNames:
-                images[detectorName] = self.__detectorsManager[detectorName].getLatestFrame(is_save=True)
-                image = images[detectorName]
+                image = self.__detectorsManager[detectorName].getLatestFrame(is_save=True)
+                images[detectorName] = castLossless(
+                    image, self.getStorageDtype(detectorName, image)
+                )
 
             if saveFormat:
                 storer = self.__storerMap[saveFormat]
@@ -248,13 +718,14 @@ class RecordingManager(SignalInterface):
         file format and attributes to save to the capture per detector. """
         fileExtension = str(saveFormat.name).lower()
         filePath = self.getSaveFilePath(f'{savename}_{detectorName}.{fileExtension}')
+        image = castLossless(image, self.getStorageDtype(detectorName, image))
 
         # Write file
         if saveFormat == SaveFormat.HDF5:
             file = h5py.File(filePath, 'w')
 
             shape = image.shape
-            dataset = file.create_dataset('data', tuple(reversed(shape)), dtype='i2')
+            dataset = file.create_dataset('data', tuple(reversed(shape)), dtype=image.dtype)
 
             for key, value in attrs[detectorName].items():
                 try:
@@ -277,8 +748,11 @@ class RecordingManager(SignalInterface):
             store = zarr.storage.DirectoryStore(path)
             root = zarr.group(store=store)
             shape = self.__detectorsManager[detectorName].shape
-            d = root.create_dataset(detectorName, data=image, shape=tuple(reversed(shape)), chunks=(512, 512),
-                                    dtype='i2')
+            d = root.create_dataset(detectorName, data=image, shape=tuple(reversed(shape)),
+                                    chunks=computeImageChunkShape(
+                                        image, self.__recordingInfo.chunkSizeMB * 1024 ** 2
+                                    ),
+                                    dtype=image.dtype)
             datasets = {"path": detectorName, "transformation": None}
             write_multiscales_metadata(root, datasets, format_from_version("0.2"), shape, **attrs)
             store.close()
@@ -308,7 +782,8 @@ class RecordingWorker(Worker):
         super().__init__()
         self.__logger = initLogger(self)
         self.__recordingManager = recordingManager
-        self.__logger = initLogger(self)
+        self.pipeline = None
+        self.streams = {}
 
     def run(self):
         acqHandle = self.__recordingManager.detectorsManager.startAcquisition()
@@ -319,73 +794,144 @@ class RecordingWorker(Worker):
             self.__recordingManager.detectorsManager.stopAcquisition(acqHandle)
 
     def _record(self):
-        if self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-            files, fileDests, filePaths = self._getFiles()
+        files, fileDests, filePaths = {}, {}, {}
+        datasets = {}
+        writers = {}
+        pipeline = None
+        try:
+            if self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
+                files, fileDests, filePaths = self._getFiles()
 
-        shapes = {detectorName: self.__recordingManager.detectorsManager[detectorName].shape
-                  for detectorName in self.detectorNames}
+            shapes = {detectorName: self.__recordingManager.detectorsManager[detectorName].shape
+                      for detectorName in self.detectorNames}
 
-        currentFrame = {}
-        datasets = {}
-        filenames = {}
+            recordingInfo = self.__recordingManager.recordingInfo
 
-        for detectorName in self.detectorNames:
-            currentFrame[detectorName] = 0
-
-            datasetName = detectorName
-            if self.recMode == RecMode.ScanLapse and self.singleLapseFile:
-                # Add scan number to dataset name
-                scanNum = 0
-                datasetNameWithScan = f'{datasetName}_scan{scanNum}'
-                while datasetNameWithScan in files[detectorName]:
-                    scanNum += 1
+            for detectorName in self.detectorNames:
+                datasetName = detectorName
+                if self.recMode == RecMode.ScanLapse and self.singleLapseFile:
+                    # Add scan number to dataset name
+                    scanNum = 0
                     datasetNameWithScan = f'{datasetName}_scan{scanNum}'
-                datasetName = datasetNameWithScan
-
-            # Initial number of frames must not be 0; otherwise, too much disk space may get
-            # allocated. We remove this default frame later on if no frames are captured.
-            shape = shapes[detectorName]
-            if len(shape) > 2:
-                shape = shape[-2:]
-
-            if self.saveFormat == SaveFormat.HDF5:
-                # Initial number of frames must not be 0; otherwise, too much disk space may get
-                # allocated. We remove this default frame later on if no frames are captured.
-                datasets[detectorName] = files[detectorName].create_dataset(
-                    datasetName, (1, *reversed(shape)),
-                    maxshape=(None, *reversed(shape)),
-                    dtype='i2'
-                )
-
-                for key, value in self.attrs[detectorName].items():
-                    datasets[detectorName].attrs[key] = value
+                    while datasetNameWithScan in files[detectorName]:
+                        scanNum += 1
+                        datasetNameWithScan = f'{datasetName}_scan{scanNum}'
+                    datasetName = datasetNameWithScan
 
-                datasets[detectorName].attrs['detector_name'] = detectorName
+                shape = shapes[detectorName]
+                if len(shape) > 2:
+                    shape = shape[-2:]
+                dtype = self.__recordingManager.getStorageDtype(detectorName)
 
-                # For ImageJ compatibility
-                datasets[detectorName].attrs['element_size_um'] \
-                    = self.__recordingManager.detectorsManager[detectorName].pixelSizeUm
-                datasets[detectorName].attrs['writing'] = True
-
-            elif self.saveFormat == SaveFormat.TIFF:
-                fileExtension = str(self.saveFormat.name).lower()
-                filenames[detectorName] = self.__recordingManager.getSaveFilePath(
-                    f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-
-            elif self.saveFormat == SaveFormat.ZARR:
-                datasets[detectorName] = files[detectorName].create_dataset(datasetName, shape=(1, *reversed(shape)),
-                                                                            dtype='i2', chunks=(1, 512, 512)
-                                                                            )
-                datasets[detectorName].attrs['detector_name'] = detectorName
-                # For ImageJ compatibility
-                datasets[detectorName].attrs['element_size_um'] \
-                    = self.__recordingManager.detectorsManager[detectorName].pixelSizeUm
-                datasets[detectorName].attrs['writing'] = True
-                info: List[dict] = [{"path": datasetName, "transformation": None}]
-                write_multiscales_metadata(files[detectorName], info, format_from_version("0.2"), shape, **self.attrs[detectorName])
+                if self.saveFormat == SaveFormat.HDF5:
+                    if recordingInfo.hdf5Preallocate:
+                        chunks = computeChunkShape(
+                            tuple(reversed(shape)), dtype.itemsize,
+                            recordingInfo.chunkSizeMB * 1024 ** 2,
+                            frameRate=self.__recordingManager.detectorsManager[detectorName].frameRate,
+                            maxFrames=self._getExpectedNumFrames()
+                        )
+                        initialNumFrames = self._getExpectedNumFrames() or chunks[0]
+                        compression = recordingInfo.hdf5Compression
+                        compressionOpts = (recordingInfo.hdf5CompressionLevel
+                                           if compression == 'gzip' else None)
+                        shuffle = recordingInfo.hdf5Shuffle
+                    else:
+                        chunks, compression, compressionOpts, shuffle = True, None, None, False
+                        # Initial number of frames must not be 0; otherwise, too much disk space may
+                        # get allocated. We remove this default frame later on if no frames are
+                        # captured.
+                        initialNumFrames = 1
+
+                    datasets[detectorName] = files[detectorName].create_dataset(
+                        datasetName, (initialNumFrames, *reversed(shape)),
+                        maxshape=(None, *reversed(shape)),
+                        dtype=dtype, chunks=chunks, compression=compression,
+                        compression_opts=compressionOpts, shuffle=shuffle
+                    )
+
+                    for key, value in self.attrs[detectorName].items():
+                        datasets[detectorName].attrs[key] = value
+
+                    datasets[detectorName].attrs['detector_name'] = detectorName
+
+                    # For ImageJ compatibility
+                    datasets[detectorName].attrs['element_size_um'] \
+                        = self.__recordingManager.detectorsManager[detectorName].pixelSizeUm
+                    datasets[detectorName].attrs['writing'] = True
+
+                    writers[detectorName] = HDF5StreamWriter(
+                        datasets[detectorName], preallocate=recordingInfo.hdf5Preallocate
+                    )
+
+                elif self.saveFormat == SaveFormat.TIFF:
+                    fileExtension = str(self.saveFormat.name).lower()
+                    writers[detectorName] = TiffStreamWriter(
+                        self.__recordingManager.getSaveFilePath(
+                            f'{self.savename}_{detectorName}.{fileExtension}', False, False),
+                        dtype=dtype,
+                        metadataFormat=recordingInfo.tiffMetadata,
+                        rolloverBytes=(recordingInfo.tiffRolloverSizeMB * 1024 ** 2
+                                       if recordingInfo.tiffRolloverSizeMB is not None else None),
+                        pixelSizeUm=self.__recordingManager.detectorsManager[detectorName].pixelSizeUm,
+                        name=detectorName,
+                        attrs=self.attrs[detectorName]
+                    )
 
-        self.__recordingManager.sigRecordingStarted.emit()
-        try:
+                elif self.saveFormat == SaveFormat.ZARR:
+                    detectorManager = self.__recordingManager.detectorsManager[detectorName]
+                    compressor = None
+                    if recordingInfo.zarrCompressor is not None:
+                        compressor = numcodecs.Blosc(cname=recordingInfo.zarrCompressor,
+                                                     clevel=recordingInfo.zarrCompressionLevel,
+                                                     shuffle=numcodecs.Blosc.SHUFFLE)
+
+                    group = files[detectorName].create_group(datasetName)
+                    levels = []
+                    for levelShape in computePyramidShapes(tuple(reversed(shape)),
+                                                           recordingInfo.zarrPyramidLevels):
+                        chunks = computeChunkShape(
+                            levelShape, dtype.itemsize, recordingInfo.chunkSizeMB * 1024 ** 2,
+                            frameRate=detectorManager.frameRate,
+                            maxFrames=self._getExpectedNumFrames()
+                        )
+                        levels.append(group.create_dataset(
+                            str(len(levels)),
+                            shape=(self._getExpectedNumFrames() or chunks[0], *levelShape),
+                            chunks=chunks, dtype=dtype, compressor=compressor
+                        ))
+
+                    datasets[detectorName] = group
+                    group.attrs['detector_name'] = detectorName
+                    # For ImageJ compatibility
+                    group.attrs['element_size_um'] = detectorManager.pixelSizeUm
+                    group.attrs['writing'] = True
+
+                    _, pixelSizeY, pixelSizeX = detectorManager.pixelSizeUm
+                    info: List[dict] = [
+                        {'path': str(level), 'coordinateTransformations': [
+                            {'type': 'scale',
+                             'scale': [1, pixelSizeY * 2 ** level, pixelSizeX * 2 ** level]}
+                        ]}
+                        for level in range(len(levels))
+                    ]
+                    axes = [{'name': 't', 'type': 'time'},
+                            {'name': 'y', 'type': 'space', 'unit': 'micrometer'},
+                            {'name': 'x', 'type': 'space', 'unit': 'micrometer'}]
+                    write_multiscales_metadata(group, info, format_from_version('0.4'), axes,
+                                               name=detectorName, **self.attrs[detectorName])
+
+                    writers[detectorName] = ZarrStreamWriter(levels)
+
+            pipeline = RecordingPipeline(numWriterThreads=recordingInfo.numWriterThreads)
+            for detectorName in self.detectorNames:
+                pipeline.addStream(detectorName,
+                                   self.streams[detectorName].read,
+                                   writers[detectorName],
+                                   bufferBytes=recordingInfo.bufferSizeMB * 1024 ** 2)
+            self.pipeline = pipeline
+
+            self.__recordingManager.sigRecordingStarted.emit()
             if len(self.detectorNames) < 1:
                 raise ValueError('No detectors to record specified')
 
@@ -395,55 +941,16 @@ class RecordingWorker(Worker):
                     raise ValueError('recFrames must be specified in SpecFrames, ScanOnce or'
                                      ' ScanLapse mode')
 
-                while (self.__recordingManager.record and
-                       any([currentFrame[detectorName] < recFrames
-                            for detectorName in self.detectorNames])):
-                    for detectorName in self.detectorNames:
-                        if currentFrame[detectorName] >= recFrames:
-                            continue  # Reached requested number of frames with this detector, skip
-
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-
-                        if n > 0:
-                            it = currentFrame[detectorName]
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-                            elif self.saveFormat == SaveFormat.HDF5:
-                                dataset = datasets[detectorName]
-                                if (it + n) <= recFrames:
-                                    dataset.resize(n + it, axis=0)
-                                    dataset[it:it + n, :, :] = newFrames
-                                    currentFrame[detectorName] += n
-                                else:
-                                    dataset.resize(recFrames, axis=0)
-                                    dataset[it:recFrames, :, :] = newFrames[0:recFrames - it]
-                                    currentFrame[detectorName] = recFrames
-                            elif self.saveFormat == SaveFormat.ZARR:
-                                dataset = datasets[detectorName]
-                                if it == 0:
-                                    dataset[0, :, :] = newFrames[0, :, :]
-                                    if n > 0:
-                                        dataset.append(newFrames[1:n, :, :])
-                                else:
-                                    dataset.append(newFrames)
-                                currentFrame[detectorName] += n
-
-                            # Things get a bit weird if we have multiple detectors when we report
-                            # the current frame number, since the detectors may not be synchronized.
-                            # For now, we will report the lowest number.
-                            self.__recordingManager.sigRecordingFrameNumUpdated.emit(
-                                min(list(currentFrame.values()))
-                            )
-                    time.sleep(0.0001)  # Prevents freezing for some reason
+                self.pipeline.start(frameLimit=recFrames,
+                                    shouldStop=lambda: not self.__recordingManager.record)
+                while self.pipeline.isRunning():
+                    # Things get a bit weird if we have multiple detectors when we report
+                    # the current frame number, since the detectors may not be synchronized.
+                    # For now, we will report the lowest number.
+                    self.__recordingManager.sigRecordingFrameNumUpdated.emit(
+                        min(writer.numFrames for writer in writers.values())
+                    )
+                    time.sleep(_progressInterval)
 
                 self.__recordingManager.sigRecordingFrameNumUpdated.emit(0)
             elif self.recMode == RecMode.SpecTime:
@@ -452,121 +959,95 @@ class RecordingWorker(Worker):
                     raise ValueError('recTime must be specified in SpecTime mode')
 
                 start = time.time()
-                currentRecTime = 0
-                shouldStop = False
-                while True:
-                    for detectorName in self.detectorNames:
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-                        if n > 0:
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-                            elif self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                dataset.resize(n + it, axis=0)
-                                dataset[it:it + n, :, :] = newFrames
-                            currentFrame[detectorName] += n
-                            self.__recordingManager.sigRecordingTimeUpdated.emit(
-                                np.around(currentRecTime, decimals=2)
-                            )
-                            currentRecTime = time.time() - start
-
-                    if shouldStop:
-                        break  # Enter loop one final time, then stop
-
-                    if not self.__recordingManager.record or currentRecTime >= recTime:
-                        shouldStop = True
-
-                    time.sleep(0.0001)  # Prevents freezing for some reason
+                self.pipeline.start(timeLimit=recTime,
+                                    shouldStop=lambda: not self.__recordingManager.record,
+                                    finalGrab=True)
+                while self.pipeline.isRunning():
+                    currentRecTime = time.time() - start
+                    self.__recordingManager.sigRecordingTimeUpdated.emit(
+                        np.around(min(currentRecTime, recTime), decimals=2)
+                    )
+                    time.sleep(_progressInterval)
 
                 self.__recordingManager.sigRecordingTimeUpdated.emit(0)
             elif self.recMode == RecMode.UntilStop:
-                shouldStop = False
-                while True:
-                    for detectorName in self.detectorNames:
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-                        if n > 0:
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-
-                            elif self.saveFormat == SaveFormat.HDF5:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                dataset.resize(n + it, axis=0)
-                                dataset[it:it + n, :, :] = newFrames
-
-                            elif self.saveFormat == SaveFormat.ZARR:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                if it == 0:
-                                    dataset[0, :, :] = newFrames[0, :, :]
-                                    if n > 0:
-                                        dataset.append(newFrames[1:n, :, :])
-                                else:
-                                    dataset.append(newFrames)
-
-                            currentFrame[detectorName] += n
-
-                    if shouldStop:
-                        break
-
-                    if not self.__recordingManager.record:
-                        shouldStop = True  # Enter loop one final time, then stop
-
-                    time.sleep(0.0001)  # Prevents freezing for some reason
+                self.pipeline.start(shouldStop=lambda: not self.__recordingManager.record,
+                                    finalGrab=True)
+                while self.pipeline.isRunning():
+                    time.sleep(_progressInterval)
             else:
                 raise ValueError('Unsupported recording mode specified')
         finally:
-
-            if self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-                for detectorName, file in files.items():
-                    # Remove default frame if no frames have been captured
-                    if currentFrame[detectorName] < 1:
-                        if self.saveFormat == SaveFormat.HDF5:
-                            datasets[detectorName].resize(0, axis=0)
-
-                    # Handle memory recordings
-                    if self.saveMode == SaveMode.RAM or self.saveMode == SaveMode.DiskAndRAM:
-                        filePath = filePaths[detectorName]
-                        name = os.path.basename(filePath)
-                        if self.saveMode == SaveMode.RAM:
-                            file.close()
-                            self.__recordingManager.sigMemoryRecordingAvailable.emit(
-                                name, fileDests[detectorName], filePath, False
-                            )
-                        else:
-                            file.flush()
-                            self.__recordingManager.sigMemoryRecordingAvailable.emit(
-                                name, file, filePath, True
-                            )
+            try:
+                if pipeline is not None:
+                    pipeline.stop()
+                    pipeline.finish()
+            finally:
+                try:
+                    self._closeRecording(files, fileDests, filePaths, datasets, writers,
+                                         finished=pipeline is not None)
+                finally:
+                    emitSignal = True
+                    if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
+                        emitSignal = False
+                    self.__recordingManager.endRecording(emitSignal=emitSignal, wait=False)
+
+    def _closeRecording(self, files, fileDests, filePaths, datasets, writers, finished):
+        """ Closes the streams, writers and files of a recording, logging
+        rather than raising errors so that one failing does not keep the
+        others open. If the recording finished (rather than failing to be set
+        up), the files are marked as written and memory recordings are made
+        available. """
+        for detectorName, stream in self.streams.items():
+            try:
+                stream.close()
+            except Exception:
+                self.__logger.error(f'Failed to close the frame stream of {detectorName}:'
+                                    f' {traceback.format_exc()}')
+        for detectorName, writer in writers.items():
+            try:
+                writer.close()
+            except Exception:
+                self.__logger.error(f'Failed to close the recording writer of {detectorName}:'
+                                    f' {traceback.format_exc()}')
+
+        for detectorName, file in files.items():
+            try:
+                # Handle memory recordings
+                if finished and (self.saveMode == SaveMode.RAM or
+                                 self.saveMode == SaveMode.DiskAndRAM):
+                    filePath = filePaths[detectorName]
+                    name = os.path.basename(filePath)
+                    if self.saveMode == SaveMode.RAM:
+                        self._closeFile(file)
+                        self.__recordingManager.sigMemoryRecordingAvailable.emit(
+                            name, fileDests[detectorName], filePath, False
+                        )
                     else:
+                        file.flush()
+                        self.__recordingManager.sigMemoryRecordingAvailable.emit(
+                            name, file, filePath, True
+                        )
+                else:
+                    if finished and detectorName in datasets:
                         datasets[detectorName].attrs['writing'] = False
-                        if self.saveFormat == SaveFormat.HDF5:
-                            file.close()
-                        else:
-                            self.store.close()
-            emitSignal = True
-            if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
-                emitSignal = False
-            self.__recordingManager.endRecording(emitSignal=emitSignal, wait=False)
+                    self._closeFile(file)
+            except Exception:
+                self.__logger.error(f'Failed to close the recording file of {detectorName}:'
+                                    f' {traceback.format_exc()}')
+
+    def _closeFile(self, file):
+        if self.saveFormat == SaveFormat.HDF5:
+            file.close()
+        else:
+            file.store.close()
+
+    def _getExpectedNumFrames(self):
+        """ Returns the number of frames that will be recorded per detector, or
+        None if it is not known in advance. """
+        if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
+            return self.recFrames
+        return None
 
     def _getFiles(self):
         singleMultiDetectorFile = self.singleMultiDetectorFile
@@ -602,19 +1083,25 @@ class RecordingWorker(Worker):
             if singleMultiDetectorFile and len(files) > 0:
                 files[detectorName] = list(files.values())[0]
             else:
-                if self.saveFormat == SaveFormat.HDF5:
-                    files[detectorName] = h5py.File(fileDests[detectorName],
-                                                    'a' if singleLapseFile else 'w-')
-                elif self.saveFormat == SaveFormat.ZARR:
-                    self.store = zarr.storage.DirectoryStore(fileDests[detectorName])
-                    files[detectorName] = zarr.group(store=self.store, overwrite=True)
+                try:
+                    if self.saveFormat == SaveFormat.HDF5:
+                        files[detectorName] = h5py.File(fileDests[detectorName],
+                                                        'a' if singleLapseFile else 'w-')
+                    elif self.saveFormat == SaveFormat.ZARR:
+                        store = zarr.storage.DirectoryStore(fileDests[detectorName])
+                        files[detectorName] = zarr.group(store=store, overwrite=True)
+                except Exception:
+                    for file in files.values():
+                        self._closeFile(file)
+                    raise
 
         return files, fileDests, filePaths
 
-    def _getNewFrames(self, detectorName):
-        newFrames = self.__recordingManager.detectorsManager[detectorName].getChunk()
-        newFrames = np.array(newFrames)
-        return newFrames
+
+_progressInterval = 0.05  # How often recording progress is reported, in seconds
+_snapChunkBytes = 4 * 1024 ** 2  # Target chunk size for snaps saved as Zarr, in bytes
+_imageJMaxFileBytes = 4 * 1024 ** 3 - 2 ** 24  # Leaves room for the IFDs and metadata
+_tiffDescriptionPlaceholder = ' ' * 4096  # Space reserved for metadata written on close
 
 
 class RecMode(enum.Enum):
@@ -0,0 +1,332 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from imswitch.imcommon.model import initLogger
+
+
+Frames = Union[np.ndarray, Sequence[np.ndarray]]
+
+
+class FrameRing:
+    """ Bounded ring of preallocated frame slots. Frames are copied into the
+    slots by a single producer and handed to one consumer at a time as
+    zero-copy views, which must be released once they have been consumed.
+    Frames that do not fit in the ring are dropped and counted. The slots are
+    allocated when the first frames arrive, since that is when the frame shape
+    and dtype are known. """
+
+    def __init__(self, maxBytes: int, minFrames: int = 2):
+        if maxBytes < 1:
+            raise ValueError('maxBytes must be positive')
+
+        self._maxBytes = maxBytes
+        self._minFrames = max(1, minFrames)
+        self._slots = None
+        self._lock = threading.Lock()
+        self._numPushed = 0
+        self._numReleased = 0
+        self._numDropped = 0
+        self._maxDepth = 0
+
+    @property
+    def capacity(self) -> int:
+        """ Number of frame slots in the ring, or 0 if no frames have been
+        pushed yet. """
+        return len(self._slots) if self._slots is not None else 0
+
+    @property
+    def depth(self) -> int:
+        """ Number of frames that are waiting to be consumed. """
+        with self._lock:
+            return self._numPushed - self._numReleased
+
+    @property
+    def maxDepth(self) -> int:
+        """ Highest number of frames that have been waiting at once. """
+        return self._maxDepth
+
+    @property
+    def numDropped(self) -> int:
+        """ Number of frames that were dropped because the ring was full. """
+        return self._numDropped
+
+    def push(self, frames: Frames) -> int:
+        """ Copies as many of the given frames as there are free slots for
+        into the ring and returns the number of frames accepted. """
+        numFrames = len(frames)
+        if numFrames < 1:
+            return 0
+
+        if self._slots is None:
+            self._allocate(np.asarray(frames[0]))
+
+        with self._lock:
+            numFree = len(self._slots) - (self._numPushed - self._numReleased)
+            start = self._numPushed
+
+        numAccepted = min(numFrames, numFree)
+        self._numDropped += numFrames - numAccepted
+
+        # The slots between start and start + numAccepted are not visible to
+        # the consumer until _numPushed is advanced, so they can be filled
+        # without holding the lock.
+        written = 0
+        while written < numAccepted:
+            slotStart = (start + written) % len(self._slots)
+            numToWrite = min(numAccepted - written, len(self._slots) - slotStart)
+            self._copyInto(self._slots[slotStart:slotStart + numToWrite],
+                           frames[written:written + numToWrite])
+            written += numToWrite
+
+        with self._lock:
+            self._numPushed += numAccepted
+            self._maxDepth = max(self._maxDepth, self._numPushed - self._numReleased)
+
+        return numAccepted
+
+    def peek(self, maxFrames: int) -> Optional[np.ndarray]:
+        """ Returns a view of up to maxFrames of the oldest unconsumed frames,
+        or None if there are none. The view is contiguous, so fewer frames
+        may be returned when the pending frames wrap around the end of the
+        ring. """
+        with self._lock:
+            depth = self._numPushed - self._numReleased
+            if depth < 1:
+                return None
+            start = self._numReleased % len(self._slots)
+
+        numFrames = min(depth, maxFrames, len(self._slots) - start)
+        return self._slots[start:start + numFrames]
+
+    def release(self, numFrames: int) -> None:
+        """ Marks the numFrames oldest frames as consumed, making their slots
+        available to the producer again. """
+        with self._lock:
+            if numFrames > self._numPushed - self._numReleased:
+                raise ValueError('Cannot release more frames than are pending')
+            self._numReleased += numFrames
+
+    def _allocate(self, frame: np.ndarray) -> None:
+        numSlots = max(self._minFrames, self._maxBytes // max(1, frame.nbytes))
+        self._slots = np.empty((numSlots, *frame.shape), dtype=frame.dtype)
+
+    def _copyInto(self, slots: np.ndarray, frames: Frames) -> None:
+        if isinstance(frames, np.ndarray):
+            if frames.shape[1:] != slots.shape[1:]:
+                raise ValueError(f'Frame shape changed from {slots.shape[1:]} to'
+                                 f' {frames.shape[1:]} during recording')
+            np.copyto(slots, frames, casting='unsafe')
+        else:
+            for slot, frame in zip(slots, frames):
+                if np.shape(frame) != slot.shape:
+                    raise ValueError(f'Frame shape changed from {slot.shape} to'
+                                     f' {np.shape(frame)} during recording')
+                np.copyto(slot, frame, casting='unsafe')
+
+
+class _DetectorStream:
+    """ State of one detector within a RecordingPipeline. """
+
+    def __init__(self, name, source, writer, ring):
+        self.name = name
+        self.source = source
+        self.writer = writer
+        self.ring = ring
+        self.numGrabbed = 0
+        self.numWritten = 0
+        self.scheduled = False
+        self.lock = threading.Lock()
+
+
+class RecordingPipeline:
+    """ Producer/consumer recording engine. One grab thread per detector
+    collects frames from its source into a FrameRing, and a pool of writer
+    threads drains the rings into the writers. Frames from a single detector
+    are written in order and by one writer thread at a time, while different
+    detectors are written in parallel. A slow write therefore no longer stalls
+    frame collection; if a ring fills up, frames are dropped and counted
+    instead. """
+
+    def __init__(self, numWriterThreads: int = 2, maxFramesPerWrite: int = 64,
+                 pollInterval: float = 0.001):
+        self.__logger = initLogger(self)
+        self._numWriterThreads = max(1, numWriterThreads)
+        self._maxFramesPerWrite = max(1, maxFramesPerWrite)
+        self._pollInterval = pollInterval
+
+        self._streams: Dict[str, _DetectorStream] = {}
+        self._grabThreads = []
+        self._writerThreads = []
+        self._workQueue = queue.Queue()
+        self._stopEvent = threading.Event()
+        self._errorLock = threading.Lock()
+        self._error = None
+
+    def addStream(self, name: str, source: Callable[[], Frames], writer,
+                  bufferBytes: int) -> None:
+        """ Adds a detector to the pipeline. source is called repeatedly to
+        get the frames captured since it was last called, and writer is the
+        StreamWriter that the frames are passed on to. """
+        if self._grabThreads:
+            raise RuntimeError('Cannot add streams to a pipeline that has been started')
+        self._streams[name] = _DetectorStream(name, source, writer, FrameRing(bufferBytes))
+
+    def start(self, frameLimit: Optional[int] = None, timeLimit: Optional[float] = None,
+              shouldStop: Callable[[], bool] = lambda: False, finalGrab: bool = False) -> None:
+        """ Starts grabbing and writing. Grabbing stops for a detector once
+        frameLimit frames have been grabbed from it, once timeLimit seconds
+        have passed, or once shouldStop returns True. If finalGrab is True,
+        the sources are polled one final time after the time limit or stop
+        request, to collect frames that arrived in the meantime. """
+        deadline = time.monotonic() + timeLimit if timeLimit is not None else None
+
+        for i in range(min(self._numWriterThreads, len(self._streams))):
+            thread = threading.Thread(target=self._writeLoop, name=f'RecordingWriter-{i}',
+                                      daemon=True)
+            self._writerThreads.append(thread)
+            thread.start()
+
+        for stream in self._streams.values():
+            thread = threading.Thread(target=self._grabLoop, name=f'RecordingGrab-{stream.name}',
+                                      args=(stream, frameLimit, deadline, shouldStop, finalGrab),
+                                      daemon=True)
+            self._grabThreads.append(thread)
+            thread.start()
+
+    def stop(self) -> None:
+        """ Requests the grab threads to stop. Frames that have already been
+        grabbed will still be written. """
+        self._stopEvent.set()
+
+    def isRunning(self) -> bool:
+        """ Whether frames are still being grabbed or waiting to be written.
+        """
+        return (any(thread.is_alive() for thread in self._grabThreads) or
+                any(stream.ring.depth > 0 for stream in self._streams.values()))
+
+    def finish(self) -> None:
+        """ Waits for all grabbed frames to be written and shuts down the
+        writer threads. Raises the first error that occurred in a grab or
+        writer thread, if any. """
+        for thread in self._grabThreads:
+            thread.join()
+        while any(stream.ring.depth > 0 for stream in self._streams.values()):
+            time.sleep(self._pollInterval)
+        for _ in self._writerThreads:
+            self._workQueue.put(None)
+        for thread in self._writerThreads:
+            thread.join()
+
+        for name, stats in self.getStats().items():
+            if stats['dropped'] > 0:
+                self.__logger.warning(
+                    f'{name}: dropped {stats["dropped"]} of {stats["grabbed"]} frames; the'
+                    f' recording buffer (max. {stats["maxQueueDepth"]}/{stats["capacity"]}'
+                    f' frames used) could not keep up with the writer'
+                )
+
+        if self._error is not None:
+            raise self._error
+
+    def getStats(self) -> Dict[str, Dict[str, int]]:
+        """ Returns, per detector, the number of frames that have been
+        grabbed, written and dropped, as well as the current and highest
+        number of frames waiting in the buffer and the buffer capacity. """
+        return {
+            name: {
+                'grabbed': stream.numGrabbed,
+                'written': stream.numWritten,
+                'dropped': stream.ring.numDropped,
+                'queueDepth': stream.ring.depth,
+                'maxQueueDepth': stream.ring.maxDepth,
+                'capacity': stream.ring.capacity
+            }
+            for name, stream in self._streams.items()
+        }
+
+    def _grabLoop(self, stream, frameLimit, deadline, shouldStop, finalGrab):
+        try:
+            stopping = False
+            while True:
+                frames = stream.source()
+                numFrames = len(frames)
+                if numFrames > 0:
+                    if frameLimit is not None and stream.numGrabbed + numFrames > frameLimit:
+                        frames = frames[:frameLimit - stream.numGrabbed]
+                        numFrames = len(frames)
+                    stream.ring.push(frames)
+                    stream.numGrabbed += numFrames
+                    self._schedule(stream)
+
+                if stopping or self._error is not None:
+                    break
+                if frameLimit is not None and stream.numGrabbed >= frameLimit:
+                    break
+                if (self._stopEvent.is_set() or shouldStop() or
+                        (deadline is not None and time.monotonic() >= deadline)):
+                    if not finalGrab:
+                        break
+                    stopping = True  # Grab one final time, then stop
+                    continue
+
+                if numFrames < 1:
+                    time.sleep(self._pollInterval)
+        except Exception as e:
+            self._setError(e)
+
+    def _writeLoop(self):
+        while True:
+            stream = self._workQueue.get()
+            if stream is None:
+                return
+
+            frames = stream.ring.peek(self._maxFramesPerWrite)
+            if frames is not None:
+                try:
+                    if self._error is None:
+                        stream.writer.write(frames)
+                        stream.numWritten += len(frames)
+                except Exception as e:
+                    self._setError(e)
+                finally:
+                    stream.ring.release(len(frames))
+
+            with stream.lock:
+                stream.scheduled = stream.ring.depth > 0
+                requeue = stream.scheduled
+            if requeue:
+                self._workQueue.put(stream)
+
+    def _schedule(self, stream):
+        with stream.lock:
+            if stream.scheduled or stream.ring.depth < 1:
+                return
+            stream.scheduled = True
+        self._workQueue.put(stream)
+
+    def _setError(self, error):
+        with self._errorLock:
+            if self._error is None:
+                self._error = error
+        self._stopEvent.set()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,7 +1,9 @@
 import enum
+import functools
 import glob
 import math
 import os
+import time
 
 import numpy as np
 from PIL import Image
@@ -9,9 +11,16 @@ from scipy import signal as sg
 
 from imswitch.imcommon.framework import Signal, SignalInterface
 from imswitch.imcommon.model import initLogger
+from ..Zernike import getZernikeBasis
 
 
 class SLMManager(SignalInterface):
+    """ Composes the mask displayed on the SLM from four layers: the phase
+    patterns, tilts and aberrations of the left and right half of the SLM,
+    and the flatness correction pattern. Each layer is cached, so that only
+    the halves of the layers whose parameters have changed are regenerated
+    on update. """
+
     sigSLMMaskUpdated = Signal(object)  # (maskCombined)
 
     def __init__(self, slmInfo, *args, **kwargs):
@@ -37,8 +46,28 @@ class SLMManager(SignalInterface):
         self.__masksAber = [self.__maskAberLeft, self.__maskAberRight]
         self.__masksTilt = [self.__maskTiltLeft, self.__maskTiltRight]
 
+        self.__patternLayer = _MaskLayer('pattern', self.__masks)
+        self.__tiltLayer = _MaskLayer('tilt', self.__masksTilt)
+        self.__aberLayer = _MaskLayer('aberrations', self.__masksAber)
+        self.__correctionImage = self.__maskCorrection.image().astype(np.uint16)
+        self.__staticSum = np.empty_like(self.__correctionImage)  # All but aberrations, wrapped
+        self.__sumBuffer = np.empty_like(self.__correctionImage)
+        # Wraps sums of two layers around the LUT
+        self.__lutSize = self.__maskLeft.value_max + 1
+        self.__wrapLut = (np.arange(2 * self.__lutSize) % self.__lutSize).astype(np.uint8)
+        self.__previewImage = np.empty(self.__correctionImage.shape, dtype=np.uint8)
+        self.maskCombined = Mask(*self.__correctionImage.shape, self.__wavelength)
+        self.maskCombined.loadArray(np.empty(self.__correctionImage.shape, dtype=np.uint8))
+        self.__lastUpdateTimes = {}
+
         self.update(maskChange=True, tiltChange=True, aberChange=True)
 
+    @property
+    def lastUpdateTimes(self):
+        """ The time in seconds that the last update spent on regenerating
+        each layer and on composing the mask, and in total. """
+        return dict(self.__lastUpdateTimes)
+
     def saveState(self, state_general=None, state_pos=None, state_aber=None):
         if state_general is not None:
             self.state_general = state_general
@@ -149,14 +178,15 @@ class SLMManager(SignalInterface):
         self.__masksAber[1].setAberrationFactors(rAberFactors)
 
     def setAberrations(self, aber_info, mask):
+        # The aberration masks are generated on the next update
         if mask == 0 or mask == None:
             lAberFactors = aber_info["left"]
             self.__masksAber[0].setAberrationFactors(lAberFactors)
-            self.__masksAber[0].setAberrations()
+            self.__masksAber[0].mask_type = MaskMode.Aber
         if mask == 1 or mask == None:
             rAberFactors = aber_info["right"]
             self.__masksAber[1].setAberrationFactors(rAberFactors)
-            self.__masksAber[1].setAberrations()
+            self.__masksAber[1].mask_type = MaskMode.Aber
 
     def setRadius(self, radius):
         for mask, masktilt, maskaber in zip(self.__masks, self.__masksTilt, self.__masksAber):
@@ -178,17 +208,69 @@ class SLMManager(SignalInterface):
             mask.setTiltAngle(tilt_angle, inverts[idx])
 
     def update(self, maskChange=False, tiltChange=False, aberChange=False):
-        if maskChange:
-            self.maskDouble = self.__masks[0].concat(self.__masks[1])
-        if tiltChange:
-            self.maskTilt = self.__masksTilt[0].concat(self.__masksTilt[1])
-        if aberChange:
-            self.maskAber = self.__masksAber[0].concat(self.__masksAber[1])
-        self.maskCombined = self.maskDouble + self.maskAber + self.maskTilt + self.__maskCorrection
-        self.sigSLMMaskUpdated.emit(self.maskCombined)
+        """ Regenerates the halves of the flagged layers whose parameters
+        have changed, composes the layers into maskCombined and emits it.
+        Returns the image of the phase pattern and aberration layers. The
+        images of maskCombined and the returned image are reused, and are
+        overwritten by the next update. """
+        startTime = time.perf_counter()
+        updateTimes = {}
+        staticChanged = False
+        for layer, layerChange in [(self.__patternLayer, maskChange),
+                                   (self.__tiltLayer, tiltChange),
+                                   (self.__aberLayer, aberChange)]:
+            layerStartTime = time.perf_counter()
+            changed = layerChange and layer.update()
+            updateTimes[layer.name] = time.perf_counter() - layerStartTime
+            staticChanged |= changed and layer is not self.__aberLayer
+
+        composeStartTime = time.perf_counter()
+        if staticChanged or not self.__lastUpdateTimes:
+            np.add(self.__patternLayer.image, self.__tiltLayer.image, out=self.__staticSum)
+            self.__staticSum += self.__correctionImage
+            np.remainder(self.__staticSum, self.__lutSize, out=self.__staticSum)
+
+        np.add(self.__staticSum, self.__aberLayer.image, out=self.__sumBuffer)
+        np.take(self.__wrapLut, self.__sumBuffer, out=self.maskCombined.image())
+        np.add(self.__patternLayer.image, self.__aberLayer.image, out=self.__sumBuffer)
+        np.take(self.__wrapLut, self.__sumBuffer, out=self.__previewImage)
+
+        updateTimes['compose'] = time.perf_counter() - composeStartTime
+        updateTimes['total'] = time.perf_counter() - startTime
+        self.__lastUpdateTimes = updateTimes
 
-        returnmask = self.maskDouble + self.maskAber
-        return returnmask.image()
+        self.sigSLMMaskUpdated.emit(self.maskCombined)
+        return self.__previewImage
+
+
+class _MaskLayer:
+    """ A layer of the SLM mask, made of the masks of the left and right
+    half of the SLM. The circular mask images, which hold LUT values, are
+    cached side by side, along with the parameters they were generated from,
+    and are only regenerated when those change. """
+
+    def __init__(self, name, masks):
+        self.name = name
+        self.masks = masks
+        self.image = np.zeros((masks[0].height, sum(mask.width for mask in masks)),
+                              dtype=np.uint16)
+        self._inputs = [None] * len(masks)
+
+    def update(self):
+        """ Regenerates the masks whose parameters have changed, and returns
+        whether there were any. """
+        changed = False
+        x0 = 0
+        for i, mask in enumerate(self.masks):
+            inputs = mask.getInputs()
+            if inputs != self._inputs[i]:
+                mask.updateImage()
+                mask.setCircular()
+                self.image[:, x0:x0 + mask.width] = mask.image()
+                self._inputs[i] = inputs
+                changed = True
+            x0 += mask.width
+        return changed
 
 
 class Mask:
@@ -272,7 +354,8 @@ class Mask:
         """Method converting a phase image (values from 0 to 2Pi) into a uint8
         image"""
         self.img *= self.value_max / (2 * math.pi)
-        self.img = np.round(self.img).astype(np.uint8)
+        np.round(self.img, out=self.img)
+        self.img = self.img.astype(np.uint8)
 
     def load(self, img):
         """Initiates the mask with an existing image."""
@@ -317,30 +400,47 @@ class Mask:
     def setAberrationFactors(self, aber_params_info):
         self.aber_params_info = aber_params_info
 
-    def setAberrations(self):
-        fTilt = self.aber_params_info["tilt"]
-        fTip = self.aber_params_info["tip"]
-        fDefoc = self.aber_params_info["defocus"]
-        fSph = self.aber_params_info["spherical"]
-        fVertComa = self.aber_params_info["verticalComa"]
-        fHozComa = self.aber_params_info["horizontalComa"]
-        fVertAst = self.aber_params_info["verticalAstigmatism"]
-        fOblAst = self.aber_params_info["obliqueAstigmatism"]
-
-        mask = np.fromfunction(lambda i, j: fTilt * 2 * np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2) * np.sin(np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fTip * 2 * np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2) * np.cos(np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fDefoc * np.sqrt(3) * (2 * (((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2) - 1), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fSph * np.sqrt(5) * (6 * (((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2)**4 - 6 * (((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2) + 1), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fVertComa * np.sqrt(8) * np.sin(np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))) * (3 * (np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2))**3 - 2 * np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2)), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fHozComa * np.sqrt(8) * np.cos(np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))) * (3 * (np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2))**3 - 2 * np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2)), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fVertAst * np.sqrt(6) * np.cos(2 * np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))) * ((np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2))**2), (self.height, self.width), dtype="float")
-        mask += np.fromfunction(lambda i, j: fOblAst * np.sqrt(6) * np.sin(2 * np.arctan2(((j - self.centery) / self.radius), ((i - self.centerx) / self.radius))) * ((np.sqrt(((i - self.centerx) / self.radius)**2 + ((j - self.centery) / self.radius)**2))**2), (self.height, self.width), dtype="float")
-
+    def setAberrations(self, dtype=np.float64):
+        """Creates an aberration mask, the sum of the Zernike polynomials
+        weighted by the aberration factors, which are keyed by the names in
+        aberrationNollIndices or directly by Noll index, plus the spherical
+        aberration term. The polynomials are cached for the center, radius and
+        shape of the mask, so only the sum is computed as long as these don't
+        change."""
+        coefficients = {}
+        for name, factor in self.aber_params_info.items():
+            if name == "spherical":
+                continue
+            nollIndex = aberrationNollIndices.get(name, name)
+            coefficients[nollIndex] = coefficients.get(nollIndex, 0) + factor
+
+        basis = getZernikeBasis((self.height, self.width), (self.centerx, self.centery),
+                                self.radius, dtype)
+        mask = basis.compose(coefficients)
+        fSph = self.aber_params_info.get("spherical", 0)
+        if fSph != 0:
+            mask += fSph * _getSphericalAberration(basis)
         mask %= 2 * math.pi
         self.img = mask
         self.pi2uint8()
         self.mask_type = MaskMode.Aber
 
+    def getInputs(self):
+        """Returns the parameters that the image generated by updateImage
+        and setCircular depends on, for the current mask type."""
+        inputs = (self.mask_type, self.height, self.width, self.centerx, self.centery,
+                  self.radius)
+        if self.mask_type == MaskMode.Tophat:
+            inputs += (self.sigma,)
+        elif self.mask_type in [MaskMode.Half, MaskMode.Quad, MaskMode.Hex, MaskMode.Split]:
+            inputs += (self.angle_rotation,)
+        elif self.mask_type == MaskMode.Tilt:
+            inputs += (self.angle_tilt, self.pixelSize)
+        elif self.mask_type == MaskMode.Aber:
+            inputs += (tuple(sorted(self.aber_params_info.items(),
+                                    key=lambda item: repr(item[0]))),)
+        return inputs
+
     def getCenter(self):
         return (self.centerx, self.centery)
 
@@ -509,6 +609,32 @@ class Mask:
             raise TypeError("Cannot add two masks with different shapes")
 
 
+aberrationNollIndices = {
+    "tip": 2,
+    "tilt": 3,
+    "defocus": 4,
+    "obliqueAstigmatism": 5,
+    "verticalAstigmatism": 6,
+    "verticalComa": 7,
+    "horizontalComa": 8
+}
+""" Noll indices of the Zernike polynomials of the named aberrations. The
+"spherical" aberration is not among them, see _getSphericalAberration. """
+
+
+@functools.lru_cache(maxsize=4)
+def _getSphericalAberration(basis):
+    """ Returns the spherical aberration term of the masks, evaluated on the
+    grid of basis. This is sqrt(5) * (6 rho^8 - 6 rho^2 + 1) as in earlier
+    versions, rather than Zernike polynomial 11, which has rho^4 in place of
+    rho^8, so that saved aberration factors keep producing the same masks. """
+    rho2 = basis.rho ** 2
+    polynomial = np.sqrt(5) * (6 * rho2 ** 4 - 6 * rho2 + 1)
+    polynomial = polynomial.astype(basis.dtype, copy=False)
+    polynomial.flags.writeable = False
+    return polynomial
+
+
 class MaskMode(enum.Enum):
     Donut = 1
     Tophat = 2
@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 
 from imswitch.imcommon.model import initLogger
 from ..errors import IncompatibilityError
-from ..signaldesigners import SignalDesignerFactory
+from ..signaldesigners import SignalCache, SignalDesignerFactory, contentHash
 
 
 class ScanManagerFactory:
@@ -31,6 +31,7 @@ class SuperScanManager(ABC):
             self._TTLCycleDesigner = None
 
         self._expectedSyncParameters = []
+        self._signalCache = SignalCache()
    
     def isValidChild(self):  # For future possible implementation
         return True
@@ -63,18 +64,35 @@ class SuperScanManager(ABC):
             raise IncompatibilityError('Incompatible TTL parameters')
 
     def getScanSignalsDict(self, scanParameters):
-        """ Generates scan signals. """
+        """ Generates scan signals, or returns the cached ones if they have
+        been generated from the same parameters before. """
         self._checkScanDefined()
         parameterDict = copy.deepcopy(self._setupInfo.scan.scanDesignerParams)
         parameterDict.update(scanParameters)
-        return self._scanDesigner.make_signal(parameterDict, self._setupInfo)
+        return self._getCachedSignals(
+            lambda: self._scanDesigner.make_signal(parameterDict, self._setupInfo),
+            'scan', type(self._scanDesigner).__name__, parameterDict
+        )
 
     def getTTLCycleSignalsDict(self, TTLParameters, scanInfoDict=None):
-        """ Generates TTL cycle signals. """
+        """ Generates TTL cycle signals, or returns the cached ones if they
+        have been generated from the same parameters before. """
         self._checkScanDefined()
         parameterDict = copy.deepcopy(self._setupInfo.scan.TTLCycleDesignerParams)
         parameterDict.update(TTLParameters)
-        return self._TTLCycleDesigner.make_signal(parameterDict, self._setupInfo, scanInfoDict)
+        return self._getCachedSignals(
+            lambda: self._TTLCycleDesigner.make_signal(parameterDict, self._setupInfo,
+                                                       scanInfoDict),
+            'TTL', type(self._TTLCycleDesigner).__name__, parameterDict, scanInfoDict
+        )
+
+    def _getCachedSignals(self, generate, *keyContent):
+        try:
+            key = contentHash(*keyContent)
+        except TypeError:
+            # Parameters we can't hash; generate the signals without caching
+            return generate()
+        return self._signalCache.get(key, generate)
 
     def _checkScanDefined(self):
         if not self._setupInfo.scan:
@@ -1,3 +1,5 @@
+import time
+
 import numpy as np
 
 from imswitch.imcommon.framework import Signal, Thread, Worker
@@ -45,6 +47,7 @@ class APDManager(DetectorManager):
         self._scanThread = None
         self._frameCount = 0
         self.__newFrameReady = False
+        self.__numLinesAcquired = 0
 
         # Prepare parameters and signal connections
         parameters = {}
@@ -71,9 +74,8 @@ class APDManager(DetectorManager):
             self._scanWorker.moveToThread(self._scanThread)
             self._scanThread.started.connect(self._scanWorker.run)
             self._scanWorker.scanning = True
-            self._scanWorker.d2Step.connect(
-                lambda pixels, pos: self.updateImage(pixels, pos)
-            )
+            self.__numLinesAcquired = 0
+            self._scanWorker.linesAcquired.connect(self.updateImage)
             self._scanWorker.acqDoneSignal.connect(self.stopAcquisitionLocal)
             self._scanWorker.newFrame.connect(lambda: self.sigNewFrame.emit())
 
@@ -121,14 +123,19 @@ class APDManager(DetectorManager):
             px_sizes.pop(axis)
         self.setPixelSize(px_sizes[::-1])
 
-    def updateImage(self, pixels, pos: tuple):
-        pass
-        # pos: tuple with current pos for new pixels to be entered, from high dim to low dim (ending at d2)
-        (*pos_rest, pos_d2) = (0,) + pos
-        img_slice = tuple(pos_rest)+tuple([pos_d2,])
-        self._image[img_slice] = pixels
-        self.__currSlice = pos_rest  # from high dim to low dim (ending at d3)
-        if pos_d2 == 0:
+    def updateImage(self, numLines):
+        """ Called when the first numLines lines of the image have been
+        written by the scan worker. """
+        if numLines <= self.__numLinesAcquired:
+            return
+        # position of the last line written, from high dim to low dim (ending at d2)
+        (*pos_rest, pos_d2) = np.unravel_index(numLines - 1, np.shape(self._image)[:-1])
+        self.__currSlice = [int(pos) for pos in pos_rest]  # from high dim to low dim (ending at d3)
+        linesPerFrame = np.shape(self._image)[-2]
+        framesStarted = -(-numLines // linesPerFrame)
+        framesStartedBefore = -(-self.__numLinesAcquired // linesPerFrame)
+        self.__numLinesAcquired = numLines
+        if framesStarted > framesStartedBefore:
             # adjust viewbox shape to new image shape at the start of a d3 step
             self.updateLatestFrame(True)
             self.__newFrameReady = True
@@ -212,20 +219,33 @@ class APDManager(DetectorManager):
 
 
 class ScanWorker(Worker):
-    d2Step = Signal(np.ndarray, tuple)
-    newLine = Signal(np.ndarray, int, int)
+    """ Reads the counter of the APD during a point scan and writes the
+    photon counts of each pixel into the image of the manager.
+
+    The read schedule of the scan (which detection samples belong to which
+    line, and which are thrown away during flyback, settling and padding) is
+    computed up front as the sample index of the start of every line. Data
+    is then read in batches of whole lines, of about 1/maxUpdateRate seconds
+    each, and the pixels of all lines in a batch are computed at once as
+    differences of the cumulative counts at the pixel boundaries. The number
+    of lines written so far is emitted at most maxUpdateRate times per
+    second. """
+
+    linesAcquired = Signal(int)  # (number of lines of the image written)
     newFrame = Signal()
     acqDoneSignal = Signal()
 
-    def __init__(self, manager, scanInfoDict, signalDict):
+    def __init__(self, manager, scanInfoDict, signalDict, maxUpdateRate=20):
         super().__init__()
         self.__logger = initLogger(self, tryInheritParent=True)
 
         self._samples_read = 0
         self._last_value = 0
+        self._buffer = np.empty(0, dtype=np.uint32)  # reused for reading data
         self._manager = manager
         self._name = self._manager._name
         self._channel = self._manager._channel
+        self._maxUpdateRate = maxUpdateRate
 
         # time step of scanning, in s
         self._scan_dwell_time = scanInfoDict['dwell_time']
@@ -237,13 +257,14 @@ class ScanWorker(Worker):
         # ratio between detection sample rate and scanning sample rate
         self._frac_scan_det_rate = round(self._manager._detection_samplerate * scanInfoDict['scan_time_step'])
 
-        # extract APD signals from signalDict
+        # extract APD signals from signalDict, as the detection samples during which the
+        # detector should be off
+        self._seq_off = None
         if self._manager._ttlmultiplying:
             for target in signalDict['TTLCycleSignalsDict'].keys():
                 if self._name == target:
-                    self._seq_signal = np.repeat(signalDict['TTLCycleSignalsDict'][target].copy(), self._frac_scan_det_rate)
-                    self._seq_signal = self._seq_signal.astype('float')
-                    self._seq_signal[self._seq_signal == 0] = np.nan
+                    self._seq_off = np.repeat(signalDict['TTLCycleSignalsDict'][target] == 0,
+                                              self._frac_scan_det_rate)
                     break
 
         # number of steps on each axis in image
@@ -263,7 +284,7 @@ class ScanWorker(Worker):
         self._throw_startacc = round(scanInfoDict['scan_throw_startacc'] * self._frac_scan_det_rate)  # starting acceleration
         self._throw_finalpos = round(scanInfoDict['scan_throw_finalpos'] * self._frac_scan_det_rate)  # smooth final positioning time
         # scan samples in a d3 step (period)
-        self._samples_d3_step = round(scanInfoDict['scan_samples'][2] * self._frac_scan_det_rate)
+        self._samples_d3_step = round(scanInfoDict['scan_samples'][2] * self._frac_scan_det_rate) if len(scanInfoDict['scan_samples']) > 2 else 0
         # scan samples for zero padding at end of scanning curve dimensions
         self._samples_padlens = [round(scanInfoDict['padlens'][i] * self._frac_scan_det_rate) for i in range(len(scanInfoDict['padlens']))]
 
@@ -273,6 +294,9 @@ class ScanWorker(Worker):
         # samples to throw due to smooth between d>2 step transitioning
         self._throw_init_d2_step = (self._throw_initpos + self._throw_settling + self._throw_startacc + self._phase_delay)
 
+        # det sample index of the start of every line, in the order of the lines in the image
+        self._line_starts, self._samples_end = self.getLineStarts()
+
         self._manager._nidaqManager.startInputTask(self._name, 'ci', self._channel, 'finite',
                                                    self._manager._nidaq_clock_source,
                                                    self._manager._detection_samplerate,
@@ -281,128 +305,122 @@ class ScanWorker(Worker):
         self._manager.initiateImage(self._img_dims)
         self._manager.setPixelSize(scanInfoDict['pixel_sizes'])  # 'pixel_sizes' order: low dim to high dim
 
+    def getLineStarts(self):
+        """ Returns the det sample index of the first sample of every line,
+        in the order of the lines in the image, and the number of samples
+        read by the end of the scan. Follows the scanning curves: initial
+        zero-padding, positioning, settling and acceleration at the start of
+        each d3 step, full d2 periods (line and flyback) for all but the last
+        line of a d3 step, realignment with the length of the d3 steps at
+        their end, and zero-padding at the end of higher dimension steps. """
+        throw = lambda datalen: max(datalen, 0)
+        line_offsets = np.arange(self._img_dims[1]) * self._samples_d2_period
+        samples_d3_step_read = line_offsets[-1] + self._samples_line
+
+        samples_read = throw(self._samples_throw_init)
+        line_starts = []
+        if len(self._img_dims) == 2:
+            samples_read += throw(self._throw_init_d2_step)
+            line_starts.append(samples_read + line_offsets)
+            samples_read += samples_d3_step_read
+        else:
+            # d3 steps in scanning order, positions from high dim to low dim (ending at d3)
+            shape_high = tuple(reversed(self._img_dims[2:]))
+            for step, pos_high in enumerate(np.ndindex(*shape_high)):
+                pos = list(reversed(pos_high))  # positions from d3 to the highest dim
+                samples_read += throw(self._throw_init_d2_step)
+                line_starts.append(samples_read + line_offsets)
+                samples_read += samples_d3_step_read
+                # realign actual N read samples with supposed N read samples, in case of discrepancy
+                throwdatalen_highdsteps = sum([self._samples_padlens[dim] * pos[dim - 2]
+                                               for dim in range(3, len(self._img_dims))])
+                samples_read += throw(self._throw_startzero + self._samples_d3_step * (step + 1) +
+                                      throwdatalen_highdsteps - samples_read)
+                # zero-padding at the end of each finished step in dims > 3
+                for dim in range(3, len(self._img_dims)):
+                    if pos[dim - 3] != self._img_dims[dim - 1] - 1:
+                        break
+                    samples_read += throw(self._samples_padlens[dim])
+
+        samples_read += throw(self._throw_startzero + self._throw_finalpos)
+        return np.concatenate(line_starts), samples_read
+
     def throwdata(self, datalen):
         """ Throw away data with length datalen, save the last value, 
         and add length of data to total samples_read length.
         """
         if datalen > 0:
-            throwdata = self._manager._nidaqManager.readInputTask(self._name, datalen)
-            self.__plot_curves(plot=False, xvals=range(int((self._samples_read)/10), int((self._samples_read+datalen)/10)), signal=self._ploty*np.ones(int((datalen)/10)))
-            self._last_value = throwdata[-1]
-            self._samples_read += datalen
+            self.readdata(datalen)
 
     def readdata(self, datalen):
         """ Read data with length datalen and add length of data to total samples_read length.
+        Returns the data preceded by the last value read before it, in a buffer that is reused
+        for the next read.
         """
-        data = self._manager._nidaqManager.readInputTask(self._name, datalen)
-        self.__plot_curves(plot=False, xvals=range(int((self._samples_read)/10), int((self._samples_read+datalen)/10)), signal=self._ploty*np.ones(int((datalen)/10)))
+        if len(self._buffer) < datalen + 1:
+            self._buffer = np.empty(datalen + 1, dtype=np.uint32)
+        data = self._buffer[:datalen + 1]
+        data[0] = self._last_value
+        self._manager._nidaqManager.readCounterInputTask(self._name, data[1:])
+        self._last_value = data[-1]
         self._samples_read += datalen
         return data
 
-    def samples_to_pixels(self, line_samples):
-        """ Reshape read datastream over the line to a line with pixel counts.
-        Do this by summing elements, with the rate ratio calculated previously.
-        """
-        # If reading with higher sample rate (ex. 1 MHz, 1 us per sample) than scanning, sum N
-        # samples for each pixel, since scanning curve is linear (ex. only allow dwell times as
-        # multiples of 1 us if sampling rate is 1 MHz)
-        line_pixels = np.array(line_samples).reshape(-1, self._frac_det_dwell).sum(axis=1)
-        return line_pixels
-
-    def __plot_curves(self, plot, xvals, signal):
-        """ Plot detection curves, for debugging. """
-        if plot:
-            import matplotlib.pyplot as plt
-            plt.figure(1)
-            plt.plot(xvals, signal)
-            self._ploty += 0.01
-            if self._ploty > 1.1:
-                self._ploty = 1
+    def samples_to_pixels(self, data, data_start, line_starts):
+        """ Compute the pixel counts of the lines starting at the det sample
+        indices line_starts from data, the cumulative counts read from the
+        det sample index data_start onwards, preceded by the last count read
+        before it. Each pixel is the sum of _frac_det_dwell samples, i.e. the
+        difference between the cumulative counts at its boundaries (which
+        also takes care of the counter wrapping around). """
+        # boundaries[i, p]: index in data of the last sample before pixel p of line i
+        num_pixels = self._samples_line // self._frac_det_dwell
+        boundaries = (line_starts[:, np.newaxis] - data_start +
+                      np.arange(num_pixels + 1) * self._frac_det_dwell)
+        pixels = np.diff(data[boundaries], axis=1)
+        if self._seq_off is not None:
+            # mask with TTL sequence from ScanWidget, to say if detector should be on or not
+            seq_start = data_start - self._phase_delay
+            seq_off = np.zeros(len(data), dtype=bool)
+            seq_off_read = self._seq_off[max(seq_start, 0):seq_start + len(data) - 1]
+            seq_off[1 + max(-seq_start, 0):1 + max(-seq_start, 0) + len(seq_off_read)] = seq_off_read
+            num_off = np.diff(np.cumsum(seq_off)[boundaries], axis=1)
+            pixels = np.where(num_off > 0, np.nan, pixels)
+        return pixels
 
     def run(self):
         """ Main run for acquisition.
         """
-        self._ploty = 1
-        # create empty current position counter
-        self._pos = np.zeros(len(self._img_dims), dtype='uint16')
-        # throw away initial recording samples
-        self.throwdata(self._samples_throw_init)
-        if len(self._img_dims) == 2:
-            # begin d3 step: throw data from initial d3 step positioning
-            self.throwdata(self._throw_init_d2_step)
-        # start looping through all dimensions to record data, starting with the outermost dimension
-        self.run_loop_dx(dim=len(self._img_dims))
+        # lines of the image, as rows of the preallocated image of the manager
+        image_lines = self._manager._image.reshape(-1, self._img_dims[0])
+        line_ends = self._line_starts + self._samples_line
+        batch_samples = self._manager._detection_samplerate / self._maxUpdateRate
+        num_lines = len(line_ends)
+        num_lines_read = 0
+        last_update_time = time.perf_counter()
+        while num_lines_read < num_lines:
+            if not self.scanning:
+                self.__logger.debug('Close data reading: not scanning any longer')
+                self.close()
+                return
+            # read a batch of whole lines, including the samples thrown before each of them
+            batch_end = max(np.searchsorted(line_ends, self._samples_read + batch_samples,
+                                            side='right'), num_lines_read + 1)
+            data_start = self._samples_read
+            data = self.readdata(line_ends[batch_end - 1] - data_start)
+            image_lines[num_lines_read:batch_end] = self.samples_to_pixels(
+                data, data_start, self._line_starts[num_lines_read:batch_end]
+            )
+            num_lines_read = batch_end
 
-        # throw acquisition-final positioning datae
-        self.throwdata(self._throw_startzero + self._throw_finalpos)
-        self.acqDoneSignal.emit()
+            if time.perf_counter() - last_update_time >= 1 / self._maxUpdateRate:
+                self.linesAcquired.emit(num_lines_read)
+                last_update_time = time.perf_counter()
+        self.linesAcquired.emit(num_lines_read)
 
-    def run_loop_dx(self, dim):
-        """ Recursive looping through all scanning dimensions, actually read samples at dim = 2,
-        and step through all steps in each dimension.
-        """
-        while self._pos[dim-1] < self._img_dims[dim-1]:
-            if dim > 2:
-                if dim == 3:
-                    # begin d3 step: throw data from initial d3 step positioning
-                    self.throwdata(self._throw_init_d2_step)
-                self.run_loop_dx(dim-1)
-                if dim == 3:
-                    # end d3 step: realign actual N read samples with supposed N read samples, in case of discrepancy
-                    throwdatalen_term1_terms = np.copy(self._pos[2:])
-                    for n in range(len(self._img_dims),3,-1):
-                        for m in range(n-1,2,-1):
-                            throwdatalen_term1_terms[(n-2)-1] *= self._img_dims[m-1]
-                    throwdatalen_term1_terms[0] += 1
-                    throwdatalen_highdsteps = sum([self._samples_padlens[dim]*self._pos[dim] for dim in range(3,len(self._img_dims))])
-                    throwdatalen = self._throw_startzero + self._samples_d3_step * np.sum(throwdatalen_term1_terms) + throwdatalen_highdsteps - self._samples_read
-                    if throwdatalen > 0:
-                        self.throwdata(throwdatalen)
-                if dim > 3:
-                    self.throwdata(self._samples_padlens[dim-1])                  
-            else:
-                self.run_loop_d2()
-            self._pos[dim-1] += 1
-        self._pos[dim-1] = 0
-
-    def run_loop_d2(self):
-        """ Reading data on dim = 2, changing data to pixels, and emitting the d2 step of pixels.
-        """
-        if self.scanning:
-            if self._pos[1] == self._img_dims[1] - 1:
-                # read a line
-                if self._manager._ttlmultiplying:
-                    seq_signal_xstart = self._samples_read-self._phase_delay
-                data = self.readdata(self._samples_line)
-                if self._manager._ttlmultiplying:
-                    seq_signal_xend = self._samples_read-self._phase_delay
-                    ttl_seq = self._seq_signal[seq_signal_xstart:seq_signal_xend]
-            else:
-                # read a whole period, starting with the line and then the data during the flyback
-                if self._manager._ttlmultiplying:
-                    seq_signal_xstart = self._samples_read-self._phase_delay
-                data = self.readdata(self._samples_d2_period)
-                #self.__logger.debug('read period')
-                #self.__logger.debug(self._samples_d2_period)
-                if self._manager._ttlmultiplying:
-                    seq_signal_xend = self._samples_read-self._phase_delay
-                    ttl_seq = self._seq_signal[seq_signal_xstart:seq_signal_xend]
-            # get photon counts from data array (which is cumsummed)
-            data_cnts = np.concatenate(([data[0]-self._last_value], np.diff(data)))
-            self._last_value = data[-1]
-            # only take the first samples that corresponds to the samples during the line
-            line_samples = data_cnts[:self._samples_line]
-            if self._manager._ttlmultiplying:
-                ttl_seq = ttl_seq[:self._samples_line]
-                # mask with TTL sequence from ScanWidget, to say if detector should be on or not
-                line_samples = np.multiply(line_samples, 1*ttl_seq)
-            # resample sample array to pixel counts array
-            pixels = self.samples_to_pixels(line_samples)
-            # signal new line of pixels, and the insertion position in all dimensions
-            self.d2Step.emit(pixels, tuple(np.flip(self._pos[1:])))
-        else:
-            self.__logger.debug('Close data reading: not scanning any longer')
-            self.close()
+        # throw acquisition-final data, from the flyback of the last line onwards
+        self.throwdata(self._samples_end - self._samples_read)
+        self.acqDoneSignal.emit()
 
     def close(self):
         self._manager._nidaqManager.inputTaskDone(self._name)
@@ -1,3 +1,4 @@
+import threading
 import traceback
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -7,6 +8,7 @@ import numpy as np
 
 from imswitch.imcommon.framework import Signal, SignalInterface
 from imswitch.imcommon.model import initLogger
+from .FrameRingBuffer import FrameRingBuffer, FrameStream
 
 
 @dataclass
@@ -102,6 +104,10 @@ class DetectorManager(SignalInterface):
         self.__fullShape = fullShape
         self.__supportedBinnings = supportedBinnings
         self.__image = np.array([])
+        self.__frameBuffer = FrameRingBuffer(detectorInfo.frameBufferSizeMB * 1024 ** 2)
+        self.__streams = []
+        self.__streamsLock = threading.Lock()
+        self.__pollLock = threading.Lock()
 
         self.__forAcquisition = detectorInfo.forAcquisition
         self.__forFocusLock = detectorInfo.forFocusLock
@@ -117,8 +123,10 @@ class DetectorManager(SignalInterface):
             self.__image = self.getLatestFrame()
         except Exception:
             self.__logger.error(traceback.format_exc())
+            return False
         else:
             self.sigImageUpdated.emit(self.__image, init, self.scale)
+            return True
 
     def setParameter(self, name: str, value: Any) -> Dict[str, DetectorParameter]:
         """ Sets a parameter value and returns the updated list of parameters.
@@ -181,6 +189,13 @@ class DetectorManager(SignalInterface):
         """ Latest LiveView image. """
         return self.__image
 
+    @property
+    def frameBuffer(self) -> FrameRingBuffer:
+        """ Ring buffer of the most recently captured frames, for managers that
+        pass their frames through it. Consumers can read frames from it
+        without copying them. """
+        return self.__frameBuffer
+
     @property
     def parameters(self) -> Dict[str, DetectorParameter]:
         """ Dictionary of available parameters. """
@@ -206,6 +221,25 @@ class DetectorManager(SignalInterface):
         """ Whether the detector is used for focus lock. """
         return self.__forFocusLock
 
+    @property
+    def dtype(self) -> np.dtype:
+        """ Data type of the frames captured by the detector. By default, this
+        is the data type of the frame returned by getLatestFrame. Override in
+        managers that know their pixel format in advance. """
+        return np.asarray(self.getLatestFrame()).dtype
+
+    @property
+    def frameRate(self) -> Optional[float]:
+        """ Current frame rate in frames per second, or None if it is not
+        known. By default, this is the value of the first parameter with "fps"
+        units, if there is one with a positive value. Override in managers
+        that know their frame rate otherwise. """
+        for parameter in self.__parameters.values():
+            if (isinstance(parameter, DetectorNumberParameter) and parameter.valueUnits == 'fps'
+                    and isinstance(parameter.value, (int, float)) and parameter.value > 0):
+                return parameter.value
+        return None
+
     @property
     def scale(self) -> List[int]:
         """ The pixel sizes in micrometers, all axes, in the format high dim
@@ -237,13 +271,16 @@ class DetectorManager(SignalInterface):
         """ Returns the frames captured by the detector since getChunk was last
         called, or since the buffers were last flushed (whichever happened
         last). The returned object is a numpy array of shape
-        (numFrames, height, width). """
+        (numFrames, height, width). Consumers of frames should use openStream
+        instead of calling this directly. """
         pass
 
     @abstractmethod
     def flushBuffers(self) -> None:
         """ Flushes the detector buffers so that getChunk starts at the last
-        frame captured at the time that this function was called. """
+        frame captured at the time that this function was called. This
+        affects all consumers of frames, so it is only called by openStream
+        when no other streams are open. """
         pass
 
     @abstractmethod
@@ -256,6 +293,49 @@ class DetectorManager(SignalInterface):
         """ Stops image acquisition. """
         pass
 
+    def openStream(self, name: str) -> FrameStream:
+        """ Opens a stream through which the caller receives every frame
+        captured from now on, independently of other streams. Use this rather
+        than getChunk to read frames; getChunk is destructive, so concurrent
+        callers of it would take frames from each other. The stream should be
+        closed when it is no longer needed. """
+        with self.__streamsLock:
+            if len(self.__streams) < 1:
+                # No one else is reading, so frames captured before now can be discarded
+                with self.__pollLock:
+                    self.flushBuffers()
+            else:
+                self._pollFrames()
+
+            stream = FrameStream(name, self.__frameBuffer, poll=self._pollFrames,
+                                 onClose=self.__closeStream)
+            self.__streams.append(stream)
+        return stream
+
+    def _pollFrames(self) -> None:
+        """ Collects the frames captured since the last poll into the frame
+        buffer, by calling getChunk. """
+        with self.__pollLock:
+            startIndex = self.__frameBuffer.nextIndex
+            frames = self.getChunk()
+            if (self.__frameBuffer.nextIndex == startIndex and frames is not None
+                    and len(frames) > 0):
+                # Managers that do not push their frames themselves
+                self.__frameBuffer.push(frames)
+
+    def __closeStream(self, stream):
+        with self.__streamsLock:
+            self.__streams.remove(stream)
+
+    def _pushFrames(self, frames, timestamps=None) -> np.ndarray:
+        """ Pushes newly captured frames into the frame buffer and returns
+        them as held by the buffer, as an array of shape
+        (numFrames, height, width). frames may be such an array or a sequence
+        of (height, width) arrays. If more frames than fit in the buffer are
+        pushed at once, only the latest ones are returned. """
+        startIndex = self.__frameBuffer.push(frames, timestamps)
+        return self.__frameBuffer.getFrames(startIndex)
+
     def finalize(self) -> None:
         """ Close/cleanup detector. """
         pass
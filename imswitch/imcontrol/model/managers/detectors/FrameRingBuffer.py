@@ -0,0 +1,296 @@
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+
+Frames = Union[np.ndarray, Sequence[np.ndarray]]
+
+
+class FrameBlock(NamedTuple):
+    """ A block of consecutive frames read from a FrameRingBuffer. """
+
+    frames: np.ndarray
+    """ The frames, as an array of shape (numFrames, height, width). """
+
+    startIndex: int
+    """ Index of the first frame in the block. """
+
+    timestamps: np.ndarray
+    """ Time at which each frame was captured (or pushed, if the detector
+    does not report capture times), in seconds since the epoch. """
+
+    @property
+    def stopIndex(self) -> int:
+        """ Index of the frame after the last frame in the block. """
+        return self.startIndex + len(self.frames)
+
+
+class FrameRingBuffer:
+    """ Fixed-capacity ring of preallocated frame slots that a detector
+    manager pushes its captured frames into, and that any number of consumers
+    can read from without copying. Each frame is given the next index of a
+    monotonically increasing frame counter and a timestamp. Only the most
+    recent frames are kept; once the ring is full, the oldest frames are
+    overwritten.
+
+    Views returned by the read methods stay valid until their frames are
+    overwritten, so consumers that hold on to frames for longer than it takes
+    to fill the ring should copy them. The slots are allocated when the first
+    frames arrive, and reallocated if the frame shape or data type changes
+    (e.g. after cropping), which discards the frames held until then. """
+
+    def __init__(self, maxBytes: int, minFrames: int = 2):
+        if maxBytes < 1:
+            raise ValueError('maxBytes must be positive')
+
+        self._maxBytes = maxBytes
+        self._minFrames = max(1, minFrames)
+        self._slots = None
+        self._timestamps = None
+        self._lock = threading.Lock()
+        self._nextIndex = 0
+        self._oldestIndex = 0
+
+    @property
+    def capacity(self) -> int:
+        """ Number of frame slots in the ring, or 0 if no frames have been
+        pushed yet. """
+        return len(self._slots) if self._slots is not None else 0
+
+    @property
+    def nextIndex(self) -> int:
+        """ Index that the next pushed frame will get, i.e. the total number
+        of frames that have been pushed. """
+        return self._nextIndex
+
+    @property
+    def oldestIndex(self) -> int:
+        """ Index of the oldest frame that is still held. Equal to nextIndex
+        if no frames are held. """
+        return self._oldestIndex
+
+    @property
+    def numFrames(self) -> int:
+        """ Number of frames currently held. """
+        with self._lock:
+            return self._nextIndex - self._oldestIndex
+
+    def push(self, frames: Frames, timestamps: Optional[Sequence[float]] = None) -> int:
+        """ Copies frames, an array of shape (numFrames, height, width) or a
+        sequence of (height, width) arrays, into the ring and returns the index
+        given to the first of them. If timestamps are not given, all frames
+        are timestamped with the current time. If more frames than the
+        capacity are pushed at once, only the last ones are kept. """
+        numFrames = len(frames)
+        if numFrames < 1:
+            return self._nextIndex
+
+        if timestamps is None:
+            timestamps = np.full(numFrames, time.time())
+        firstFrame = np.asarray(frames[0])
+        if (self._slots is None or self._slots.shape[1:] != firstFrame.shape or
+                self._slots.dtype != firstFrame.dtype):
+            self._allocate(firstFrame)
+
+        capacity = len(self._slots)
+        numSkipped = max(0, numFrames - capacity)
+        with self._lock:
+            startIndex = self._nextIndex
+            stopIndex = startIndex + numFrames
+            # Frames that are about to be overwritten must no longer be read
+            self._oldestIndex = max(self._oldestIndex, stopIndex - capacity)
+
+        written = numSkipped
+        while written < numFrames:
+            slotStart = (startIndex + written) % capacity
+            numToWrite = min(numFrames - written, capacity - slotStart)
+            self._copyInto(self._slots[slotStart:slotStart + numToWrite],
+                           frames[written:written + numToWrite])
+            self._timestamps[slotStart:slotStart + numToWrite] = \
+                timestamps[written:written + numToWrite]
+            written += numToWrite
+
+        with self._lock:
+            self._nextIndex = stopIndex
+
+        return startIndex
+
+    def read(self, startIndex: int, maxFrames: Optional[int] = None) -> Optional[FrameBlock]:
+        """ Returns a view of up to maxFrames frames starting at startIndex, or
+        at the oldest frame held if that is later, or None if there are no
+        such frames. The view is contiguous, so fewer frames may be returned
+        when they wrap around the end of the ring. """
+        with self._lock:
+            startIndex = max(startIndex, self._oldestIndex)
+            numFrames = self._nextIndex - startIndex
+        if numFrames < 1:
+            return None
+
+        capacity = len(self._slots)
+        slotStart = startIndex % capacity
+        numFrames = min(numFrames, capacity - slotStart)
+        if maxFrames is not None:
+            numFrames = min(numFrames, maxFrames)
+        return FrameBlock(self._slots[slotStart:slotStart + numFrames], startIndex,
+                          self._timestamps[slotStart:slotStart + numFrames])
+
+    def getFrames(self, startIndex: int, stopIndex: Optional[int] = None) -> np.ndarray:
+        """ Returns the frames held from startIndex (or the oldest frame held,
+        if that is later) up to stopIndex (or the latest frame) as one array.
+        This is a view of the ring unless the frames wrap around its end. """
+        blocks = []
+        while stopIndex is None or startIndex < stopIndex:
+            block = self.read(startIndex,
+                              stopIndex - startIndex if stopIndex is not None else None)
+            if block is None:
+                break
+            blocks.append(block.frames)
+            startIndex = block.stopIndex
+
+        if len(blocks) < 1:
+            shape = self._slots.shape[1:] if self._slots is not None else (0, 0)
+            dtype = self._slots.dtype if self._slots is not None else float
+            return np.empty((0, *shape), dtype=dtype)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def getLatest(self) -> Optional[np.ndarray]:
+        """ Returns a view of the latest frame, or None if no frames are held.
+        """
+        with self._lock:
+            if self._nextIndex <= self._oldestIndex:
+                return None
+            return self._slots[(self._nextIndex - 1) % len(self._slots)]
+
+    def clear(self) -> None:
+        """ Discards the frames held. Frame indices keep counting up. """
+        with self._lock:
+            self._oldestIndex = self._nextIndex
+
+    def _allocate(self, frame: np.ndarray) -> None:
+        numSlots = max(self._minFrames, self._maxBytes // max(1, frame.nbytes))
+        with self._lock:
+            self._slots = np.empty((numSlots, *frame.shape), dtype=frame.dtype)
+            self._timestamps = np.zeros(numSlots)
+            self._oldestIndex = self._nextIndex
+
+    def _copyInto(self, slots: np.ndarray, frames: Frames) -> None:
+        if isinstance(frames, np.ndarray):
+            np.copyto(slots, frames)
+        else:
+            for slot, frame in zip(slots, frames):
+                np.copyto(slot, frame)
+
+
+class FrameStream:
+    """ A read cursor on a FrameRingBuffer, through which one consumer
+    receives every frame pushed to the buffer after the stream was opened,
+    independently of other consumers. If the consumer falls so far behind
+    that frames are overwritten before it reads them, they are skipped and
+    counted in numOverrun instead.
+
+    poll is called before every read to let the detector push any newly
+    captured frames, and onClose when the stream is closed. """
+
+    def __init__(self, name: str, frameBuffer: FrameRingBuffer,
+                 poll: Optional[Callable[[], None]] = None,
+                 onClose: Optional[Callable[['FrameStream'], None]] = None):
+        self.name = name
+        self._frameBuffer = frameBuffer
+        self._poll = poll
+        self._onClose = onClose
+        self._position = frameBuffer.nextIndex
+        self._numOverrun = 0
+        self._closed = False
+
+    @property
+    def position(self) -> int:
+        """ Index of the next frame to be read. """
+        return self._position
+
+    @property
+    def numOverrun(self) -> int:
+        """ Number of frames that were overwritten before they were read. """
+        return self._numOverrun
+
+    @property
+    def closed(self) -> bool:
+        """ Whether the stream has been closed. """
+        return self._closed
+
+    def readBlock(self, maxFrames: Optional[int] = None) -> Optional[FrameBlock]:
+        """ Returns a view of up to maxFrames of the unread frames and marks
+        them as read, or returns None if there are no unread frames. The view
+        is contiguous, so fewer frames may be returned when they wrap around
+        the end of the buffer. """
+        if self._closed:
+            raise ValueError(f'Stream "{self.name}" is closed')
+        if self._poll is not None:
+            self._poll()
+
+        block = self._frameBuffer.read(self._position, maxFrames)
+        if block is None:
+            self._skipTo(self._frameBuffer.oldestIndex)
+            return None
+
+        self._skipTo(block.startIndex)
+        self._position = block.stopIndex
+        return block
+
+    def read(self, maxFrames: Optional[int] = None) -> np.ndarray:
+        """ Returns up to maxFrames of the unread frames (all of them by
+        default) as an array of shape (numFrames, height, width), and marks
+        them as read. This is a view of the buffer unless the frames wrap
+        around its end. """
+        if self._closed:
+            raise ValueError(f'Stream "{self.name}" is closed')
+        if self._poll is not None:
+            self._poll()
+
+        stopIndex = self._frameBuffer.nextIndex
+        if maxFrames is not None:
+            stopIndex = min(stopIndex, self._position + maxFrames)
+        startIndex = max(self._position, self._frameBuffer.oldestIndex)
+        frames = self._frameBuffer.getFrames(startIndex, stopIndex)
+
+        # Frames may have been overwritten between the index lookups above
+        self._skipTo(stopIndex - len(frames))
+        self._position = stopIndex
+        return frames
+
+    def skipToLatest(self) -> None:
+        """ Marks all frames captured so far as read, without counting them as
+        overrun. """
+        if self._poll is not None:
+            self._poll()
+        self._position = self._frameBuffer.nextIndex
+
+    def close(self) -> None:
+        """ Closes the stream. """
+        if not self._closed:
+            self._closed = True
+            if self._onClose is not None:
+                self._onClose(self)
+
+    def _skipTo(self, index):
+        if index > self._position:
+            self._numOverrun += index - self._position
+            self._position = index
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -66,7 +66,7 @@ class HamamatsuManager(DetectorManager):
         return self._camera.getLast()
 
     def getChunk(self):
-        return self._camera.getFrames()[0]
+        return self._pushFrames(self._camera.getFrames()[0])
 
     def flushBuffers(self):
         self._camera.updateIndices()
@@ -90,7 +90,7 @@ class TISManager(DetectorManager):
         super().setBinning(binning)
 
     def getChunk(self):
-        return self._camera.grabFrame()[np.newaxis, :, :]
+        return self._pushFrames(self._camera.grabFrame()[np.newaxis, :, :])
 
     def flushBuffers(self):
         pass
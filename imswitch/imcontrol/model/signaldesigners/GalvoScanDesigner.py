@@ -152,20 +152,28 @@ class GalvoScanDesigner(ScanDesigner):
             pos.append(pos_temp)
             n_scan_samples_dx.append(len(pos[0]))
 
-        # d>2 axes signals - all generated as pure step signals
+        # d>2 axes signals - all generated as pure step signals. For each new axis, the signals
+        # of the lower axes are padded with zeros to the same length and repeated for every step
+        # of the new axis; rather than doing that here, only the lengths are kept track of, and
+        # the signals are written into preallocated arrays below
+        signal_lens = [len(pos_i) for pos_i in pos]
+        reps_dx = []  # (period, repetitions) of the lower axes signals, for each d>2 axis
         if axis_count_scan > 2:
             for axis in range(2, axis_count_scan):
-                pos, pad_max = self.__zero_padding(pos, padlen_base=0)
-                pad_maxes.append(pad_max)
-                pos = self.__repeat_dlower(pos, n_steps_dx[axis])
+                period = max(signal_lens)
+                pad_maxes.append(period - signal_lens[0])
+                reps_dx.append((period, n_steps_dx[axis]))
                 smooth = False if 'mock' in self.axis_devs_order[axis].lower() else True
-                pos_temp = self.__generate_step_scan(axis, n_scan_samples_dx[axis], n_steps_dx[axis], self.axis_devs_order[axis], smooth, v_max=self.axis_vel_max[axis], a_max=self.axis_acc_max[axis])
+                pos_temp = self.__generate_step_scan_parts(axis, n_steps_dx[axis], self.axis_devs_order[axis], smooth, v_max=self.axis_vel_max[axis], a_max=self.axis_acc_max[axis])
+                signal_lens = [period * n_steps_dx[axis]] * len(pos)
+                signal_lens.append(len(pos_temp[0]) + n_steps_dx[axis] * n_scan_samples_dx[axis] + len(pos_temp[2]))
                 pos.append(pos_temp)
-                n_scan_samples_dx.append(len(pos[0]))
+                n_scan_samples_dx.append(signal_lens[0])
 
         # pad all signals with zeros, for initial and final settling of galvos and safety start and end
-        axis_signals, pad_max = self.__zero_padding(pos, padlen_base=int(round(self.__paddingtime / self.__timestep)))
-        pad_maxes.append(pad_max)
+        padlen_base = int(round(self.__paddingtime / self.__timestep))
+        axis_signals = self.__build_signals(pos, signal_lens, reps_dx, n_scan_samples_dx, padlen_base)
+        pad_maxes.append(padlen_base + max(signal_lens) - signal_lens[0])
 
         # add all signals to a signal dictionary
         sig_dict = {parameterDict['target_device'][i]: axis_signals[i] for i in range(axis_count_scan)}
@@ -178,7 +186,7 @@ class GalvoScanDesigner(ScanDesigner):
             'img_dims': n_steps_dx,
             'scan_samples': n_scan_samples_dx,
             'pixel_sizes': pixel_sizes,
-            'minmaxes': [[min(axis_signals[i]), max(axis_signals[i])] for i in range(axis_count_scan)],
+            'minmaxes': [[np.min(axis_signals[i]), np.max(axis_signals[i])] for i in range(axis_count_scan)],
             'scan_samples_total': len(axis_signals[0]),
             'scan_throw_startzero': int(round(self.__paddingtime / self.__timestep)),
             'scan_throw_initpos': self._samples_initpos,
@@ -225,6 +233,18 @@ class GalvoScanDesigner(ScanDesigner):
 
     def __generate_step_scan(self, dim, len_axis, n_axis, axis_name, smooth, v_max=0, a_max=0, axis_reps=[0,0]):
         """ Generate a step-function scanning curve, with smooth initial positioning or not. """
+        pos_init, positions, pos_final = self.__generate_step_scan_parts(dim, n_axis, axis_name, smooth, v_max, a_max)
+        if dim==1: # and 'mock' not in axis_name.lower():
+            if 'mock' not in axis_name.lower():
+                axis_reps[0] = axis_reps[0] - len(pos_init)
+            pos_ret = np.repeat(positions, axis_reps)
+        else:
+            pos_ret = np.repeat(positions, len_axis)
+        return np.concatenate((pos_init, pos_ret, pos_final))
+
+    def __generate_step_scan_parts(self, dim, n_axis, axis_name, smooth, v_max=0, a_max=0):
+        """ Generate the smooth initial positioning curve (empty if not smooth), the step
+        positions and the smooth final positioning curve of a step-function scanning curve. """
         l_scan = self.axis_length[dim]
         c_scan = self.axis_centerpos[dim]
         # create linspace for axis positions
@@ -237,21 +257,36 @@ class GalvoScanDesigner(ScanDesigner):
             pos_init = self.__init_positioning(positions[0], v_max, a_max)
             # generate the final smooth positioning curve
             pos_final = self.__final_positioning(positions[-1], v_max, a_max)
-        if dim==1: # and 'mock' not in axis_name.lower():
-            if 'mock' not in axis_name.lower():
-                axis_reps[0] = axis_reps[0] - len(pos_init)
-            pos_ret = np.repeat(positions, axis_reps)
         else:
-            pos_ret = np.repeat(positions, len_axis)
-        if smooth:
-            pos_ret = np.concatenate((pos_init, pos_ret, pos_final))
-        return pos_ret
-
-    def __repeat_dlower(self, pos, n_steps_axis):
-        """ Repeat the current positions, for all dimensions,
-        for the number of steps on the new axis. """
-        pos_ret = [np.tile(pos_dim, n_steps_axis) for pos_dim in pos]
-        return pos_ret
+            pos_init = pos_final = np.zeros(0)
+        return pos_init, positions, pos_final
+
+    def __build_signals(self, pos, signal_lens, reps_dx, n_scan_samples_dx, padlen_base):
+        """ Write the full scanning curves of all axes into preallocated arrays, padded with
+        padlen_base zeros at the start and end, and with zeros at the end to the length of the
+        longest curve. pos holds the d1 and d2 curves, which are repeated for every step of the
+        d>2 axes as given by reps_dx, followed by the (initial positioning, positions, final
+        positioning) parts of the d>2 step curves, which are repeated for the higher axes. """
+        signals = []
+        for axis, pos_axis in enumerate(pos):
+            signal = np.zeros(padlen_base + max(signal_lens) + padlen_base)
+            curve = signal[padlen_base:]
+            if axis < 2:
+                curve[:len(pos_axis)] = pos_axis
+            else:
+                pos_init, positions, pos_final = pos_axis
+                steps_start = len(pos_init)
+                steps_end = steps_start + len(positions) * n_scan_samples_dx[axis]
+                curve[:steps_start] = pos_init
+                curve[steps_start:steps_end].reshape(len(positions), -1)[:] = \
+                    positions[:, np.newaxis]
+                curve[steps_end:steps_end + len(pos_final)] = pos_final
+            # repeat for every step of the higher axes, padded with zeros to the same length
+            for period, reps in reps_dx[max(0, axis - 1):]:
+                block = curve[:period * reps].reshape(reps, period)
+                block[1:] = block[0]
+            signals.append(signal)
+        return signals
 
     def __get_axis_reps(self, pos, samples_period, n_d2):
         """ Get reps for each step on d2 axis, by looking at the maximum and
@@ -521,31 +556,6 @@ class GalvoScanDesigner(ScanDesigner):
         self._samples_finalpos = len(pos_post2)
         return pos_ret
 
-    def __zero_padding(self, pos, padlen_base):
-        """ Pad zeros to the beginning and end of all scanning curves. """
-        pos_ret = []  # return array of padded axis signals
-        n_axes = len(pos)  # number of axes
-        padlens = [np.array([padlen_base, padlen_base]) for i in range(n_axes)]  # basic padding length added to arrays for all axes
-        # calculate padding lengths for all axes
-        # get longest axis index
-        pos_lens = [len(pos_i) for pos_i in pos]
-        pos_max_len = np.argmax(pos_lens)
-        # get difference in length between longest and all other axes
-        pos_len_diffs = [pos_lens[pos_max_len] - pos_len for pos_len in pos_lens]
-        # add length differences to padlens for each axis, if differences sum != 0
-        if np.sum(pos_len_diffs) != 0:
-            padlens = [padlen_i + np.array([0, pos_len_diffs[i]]) for i, padlen_i in enumerate(padlens)]
-        # pad arrays
-        for axis, pos_axis in enumerate(pos):
-            pos_temp = np.pad(pos_axis, padlens[axis], 'constant', constant_values=0)
-            pos_ret.append(pos_temp)
-        ## get maximum pad length
-        #pad_max = 0
-        #for padlen in padlens:
-        #    if padlen[1] > pad_max:
-        #        pad_max = padlen[1]
-        return pos_ret, padlens[0][1]
-
     def __plot_curves(self, plot, signals):
         """ Plot all scan curves, for debugging. """
         if plot:
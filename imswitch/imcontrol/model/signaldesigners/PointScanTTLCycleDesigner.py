@@ -54,6 +54,21 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
             zeropad_start = scanInfoDict['scan_throw_startzero']
             zeropad_startacc = scanInfoDict['scan_throw_startacc']
             self.zeropad_extrapad = scanInfoDict['padlens']
+            zeropad_step = zeropad_startacc + zeropad_settling + zeropad_initpos
+            # Every signal is a frame (d3 step) of d2 steps, each followed by flyback zeros
+            # except the last, or a sequence of such frames for higher sequence axes, that is
+            # repeated for all remaining scan axes. It is written into a single preallocated
+            # array per signal, by writing one frame and copying it where it is repeated.
+            frame_len = n_scan_samples_dx[2]
+            d2_step_len = n_scan_samples_dx[1] + onepad_extraon
+
+            def fill_frame(out, d2_values, d2_len=d2_step_len, clock_len=0):
+                """ Fill out with a frame of d2 steps of d2_len samples, with the values
+                d2_values, broadcastable to (d2 steps, d2_len), and with clock_len ON samples
+                at its start. """
+                self.__fit(out, zeropad_step + (n_steps_dx[1] - 1) * (d2_len + zeropad_d2flyback) + d2_len,
+                           lambda frame: self.__fill_frame(frame, d2_values, d2_len, n_steps_dx[1], zeropad_d2flyback, zeropad_step, clock_len))
+
             # Tile and pad TTL signals according to d=1 axis scan parameters
             for i, target in enumerate(targets):
                 # get sequence
@@ -69,23 +84,8 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
                 seq = self.__decode_sequence(seq_txt)
                 if seq_axis == 'None':
                     # no ttl sequences along axes
-                    # repeat start of sequence to d1 axis length
-                    signal_d2_step = np.ones(n_scan_samples_dx[1] + onepad_extraon, dtype='bool') if seq[0] else np.zeros(n_scan_samples_dx[1] + onepad_extraon, dtype='bool')
-                    signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
-                    # all d2 steps except last
-                    signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-                    # add last d2 step (without flyback)
-                    signal_d2 = np.append(signal_d2, signal_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-                    # adjust to frame len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-                    if zeropad_toframelen > 0:
-                        signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d2 = signal_d2[-zeropad_toframelen:]  # TODO: looks strange? not right length? never enters here probably
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
+                    # repeat start of sequence to d1 axis length, for all d2 steps
+                    signal = self.__build_signal(lambda out: fill_frame(out, bool(seq[0])), frame_len, n_steps_dx, 2, axis_count, zeropad_start, samples_total)
                 elif seq_axis == 0:
                     # ttl sequence along first (pixel) axis
                     # repeat sequence to d1 axis length
@@ -96,181 +96,103 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
                         signal_d2_step = signal_d2_step[::int(n_steps_dx[0]/n_scan_samples_dx[1])].astype(bool)
                     append_start = np.ones(onepad_extraon, dtype='bool') if signal_d2_step[0] == 1 else np.zeros(onepad_extraon, dtype='bool')
                     signal_d2_step = np.append(append_start, signal_d2_step)
-                    signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
-                    # all d2 steps except last
-                    signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-                    # add last d2 step (without flyback)
-                    signal_d2 = np.append(signal_d2, signal_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-                    # adjust to d3 step len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-                    if zeropad_toframelen > 0:
-                        signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d2 = signal_d2[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
+                    # use it for all d2 steps
+                    signal = self.__build_signal(lambda out: fill_frame(out, signal_d2_step, len(signal_d2_step)), frame_len, n_steps_dx, 2, axis_count, zeropad_start, samples_total)
                 elif seq_axis == 1:
                     # ttl sequence along second (line) axis
-                    # repeat sequence to d2 axis length
-                    seq = np.resize(seq, n_steps_dx[1])
-                    # create ON and OFF d2 periods and steps to use when building d2 sequence
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # build frame from seq
-                    signal_d3 = np.array([])
-                    for step in seq[:-1]:
-                        signal_d3 = np.append(signal_d3, on_d2_period) if step else np.append(signal_d3, off_d2_period)
-                    # add last d2 step (without flyback)
-                    signal_d3 = np.append(signal_d3, on_d2_step) if seq[-1] else np.append(signal_d3, off_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d3 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d3)
-                    # adjust to d3 step len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d3)
-                    if zeropad_toframelen > 0:
-                        signal_d3 = np.append(signal_d3, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d3 = signal_d3[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d3, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
+                    # repeat sequence to d2 axis length, ON or OFF for each d2 step
+                    seq = np.resize(seq, n_steps_dx[1]).astype(bool)
+                    signal = self.__build_signal(lambda out: fill_frame(out, seq[:, np.newaxis]), frame_len, n_steps_dx, 2, axis_count, zeropad_start, samples_total)
                 elif seq_axis == 2:
                     # ttl sequence along third (frame) axis
-                    # repeat sequence to d3 axis length
-                    seq = np.resize(seq, n_steps_dx[2])
-                    # create ON and OFF d2 periods and steps
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # create ON and OFF d3 steps, to use when building d3 sequence
-                    on_d3_step = self.__create_d3_step(d2_period=on_d2_period, d2_step=on_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    off_d3_step = self.__create_d3_step(d2_period=off_d2_period, d2_step=off_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    # build d4 step from seq
-                    signal_d4 = np.array([])
-                    for step in seq:
-                        signal_d4 = np.append(signal_d4, on_d3_step) if step else np.append(signal_d4, off_d3_step)
-                    # adjust to d4 step len 
-                    zeropad_toframelen = n_scan_samples_dx[3] - len(signal_d4)
-                    if zeropad_toframelen > 0:
-                        signal_d4 = np.append(signal_d4, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d4 = signal_d4[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d4, n_steps_dx=n_steps_dx, axis_start=3, axis_end=axis_count)
+                    # repeat sequence to d3 axis length, ON or OFF for each d3 step
+                    seq = np.resize(seq, n_steps_dx[2]).astype(bool)
+
+                    def fill_d4_step(out):
+                        frames = out.reshape(n_steps_dx[2], frame_len)
+                        if seq.any():
+                            on_frame = frames[np.argmax(seq)]
+                            fill_frame(on_frame, True)
+                            frames[seq] = on_frame
+
+                    signal = self.__build_signal(lambda out: self.__fit(out, n_steps_dx[2] * frame_len, fill_d4_step), n_scan_samples_dx[3], n_steps_dx, 3, axis_count, zeropad_start, samples_total)
                 elif seq_axis == 3:
                     # ttl sequence along fourth (timelapse) axis
-                    # repeat sequence to d4 axis length
-                    seq = np.resize(seq, n_steps_dx[3])
-                    # create ON and OFF d2 periods and steps
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # create ON and OFF d3 steps
-                    on_d3_step = self.__create_d3_step(d2_period=on_d2_period, d2_step=on_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    off_d3_step = self.__create_d3_step(d2_period=off_d2_period, d2_step=off_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    # create ON and OFF d4 steps, to use when building d4 sequence
-                    on_d4_step = self.__create_d4_step(d3_step=on_d3_step, n_steps_d3=n_steps_dx[2])
-                    off_d4_step = self.__create_d4_step(d3_step=off_d3_step, n_steps_d3=n_steps_dx[2])
-                    # build d5 step from seq
-                    signal_d5 = np.array([])
-                    for step in seq:
-                        signal_d5 = np.append(signal_d5, on_d4_step) if step else np.append(signal_d5, off_d4_step)
-                    # adjust to d5 step len 
-                    zeropad_toframelen = n_scan_samples_dx[4] - len(signal_d5)
-                    if zeropad_toframelen > 0:
-                        signal_d5 = np.append(signal_d5, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d5 = signal_d5[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d5, n_steps_dx=n_steps_dx, axis_start=4, axis_end=axis_count)
-                
-                # pad start zeros
-                signal = np.append(np.zeros(zeropad_start, dtype='bool'), signal)
-                # pad scanner phase delay to beginning to sync actual position with TTL
-                #signal = np.append(np.zeros(zeropad_phasedelay, dtype='bool'), signal)
+                    # repeat sequence to d4 axis length, ON or OFF for each d4 step
+                    seq = np.resize(seq, n_steps_dx[3]).astype(bool)
+
+                    def fill_d5_step(out):
+                        d4_steps = out.reshape(n_steps_dx[3], n_steps_dx[2], frame_len)
+                        if seq.any():
+                            on_d4_step = d4_steps[np.argmax(seq)]
+                            fill_frame(on_d4_step[0], True)
+                            on_d4_step[1:] = on_d4_step[0]
+                            d4_steps[seq] = on_d4_step
 
-                # adjust to same length as analog scanning
-                zeropad_end = samples_total - len(signal)
-                if zeropad_end > 0:
-                    signal = np.append(signal, np.zeros(zeropad_end, dtype='bool'))
-                elif zeropad_end < 0:
-                    signal = signal[:zeropad_end]  # TODO: looks strange? not right length? never enters here probably
+                    signal = self.__build_signal(lambda out: self.__fit(out, n_steps_dx[3] * n_steps_dx[2] * frame_len, fill_d5_step), n_scan_samples_dx[4], n_steps_dx, 4, axis_count, zeropad_start, samples_total)
 
-                signal_dict[target] = signal.astype(bool)
+                signal_dict[target] = signal
 
             # Generate frame and line clocks
-            # line clock
-            line_clock = self.__generate_frame_line_clock(n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=False, line=True)
-            signal_dict['line_clock'] = line_clock.astype(bool)
-            # frame clock
-            frame_clock = self.__generate_frame_line_clock(n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=True, line=False)
-            signal_dict['frame_clock'] = frame_clock.astype(bool)
+            # line clock, a pulse at the start of every d2 step
+            line_clock_step = np.zeros(d2_step_len, dtype='bool')
+            line_clock_step[:clock_len] = 1
+            signal_dict['line_clock'] = self.__build_signal(lambda out: fill_frame(out, line_clock_step), frame_len, n_steps_dx, 2, axis_count, zeropad_start, samples_total)
+            # frame clock, a pulse at the start of every frame
+            signal_dict['frame_clock'] = self.__build_signal(lambda out: fill_frame(out, False, clock_len=clock_len), frame_len, n_steps_dx, 2, axis_count, zeropad_start, samples_total)
 
             self.__plot_curves(plot=False, signals=signal_dict, targets=targets+['frame_clock','line_clock'])  # for debugging
 
             # return signal_dict, which contains bool arrays for each target
             return signal_dict
 
-    def __generate_frame_line_clock(self, n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=True, line=False, clock_len=10):
-        """ Generate frame and line clock signals, to be returned in signal_dict and used if user wants frame/line clock at a digital output. """
-        # zeros to d1 axis length
-        signal_d2_step = np.zeros(n_scan_samples_dx[1] + onepad_extraon, dtype='bool')
-        if line:
-            # replace first part with a line clock pulse
-            signal_d2_step[:clock_len] = 1
-        signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
-        # all d2 steps except last
-        signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-        # add last d2 step (without flyback)
-        signal_d2 = np.append(signal_d2, signal_d2_step)
-        if frame:
-            # replace first part with a frame clock pulse
-            signal_d2[:clock_len] = 1
-        # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-        signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-        # adjust to frame len 
-        zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-        if zeropad_toframelen > 0:
-            signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-        elif zeropad_toframelen < 0:
-            signal_d2 = signal_d2[-zeropad_toframelen:]  # TODO: looks strange? not right length? never enters here probably
+    def __build_signal(self, fill, base_len, n_steps_dx, axis_start, axis_end, zeropad_start, samples_total):
+        """ Build a full TTL signal in one preallocated array: zeropad_start zeros, followed
+        by a signal of base_len samples, written by fill(out), that is padded and repeated
+        for the axes from axis_start to axis_end, adjusted to the length of the analog
+        scanning signals. """
+        repeated_len = base_len
+        for axis in range(axis_start, axis_end):
+            repeated_len = (repeated_len + self.zeropad_extrapad[axis]) * n_steps_dx[axis]
+        signal = np.zeros(max(samples_total, zeropad_start + repeated_len), dtype='bool')
+        repeated = signal[zeropad_start:zeropad_start + repeated_len]
+        fill(repeated[:base_len])
         # repeat signal for all additional scan axes, if applicable
-        signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
-        # pad start zeros
-        signal = np.append(np.zeros(zeropad_start, dtype='bool'), signal)
+        length = base_len
+        for axis in range(axis_start, axis_end):
+            period = length + self.zeropad_extrapad[axis]
+            block = repeated[:period * n_steps_dx[axis]].reshape(n_steps_dx[axis], period)
+            block[1:] = block[0]
+            length = period * n_steps_dx[axis]
         # adjust to same length as analog scanning
-        zeropad_end = samples_total - len(signal)
-        if zeropad_end > 0:
-            signal = np.append(signal, np.zeros(zeropad_end, dtype='bool'))
-        elif zeropad_end < 0:
-            signal = signal[:zeropad_end]  # TODO: looks strange? not right length? never enters here probably
+        if len(signal) > samples_total:
+            signal = signal[:samples_total].copy()
         return signal
 
-    def __create_d2_period(self, state, n_samples_d1, samples_extra, samples_flyback):
-        """ Create a full d2 step period of boolean state (on or off during d2 step, without flyback). """
-        d2_step = np.ones(n_samples_d1 + samples_extra, dtype='bool') if state else np.zeros(n_samples_d1 + samples_extra, dtype='bool')
-        return np.append(d2_step, np.zeros(samples_flyback, dtype='bool')), d2_step
-    
-    def __create_d3_step(self, d2_period, d2_step, n_steps_d2, n_samples_d3, samples_zeropad_step):
-        """ Create a full d3 step signal. """
-        d3_step = np.tile(d2_period, n_steps_d2 - 1)
-        d3_step = np.append(d3_step, d2_step)
-        d3_step = np.append(np.zeros(samples_zeropad_step, dtype='bool'), d3_step)
-        zeropad_toframelen = n_samples_d3 - len(d3_step)
-        if zeropad_toframelen > 0:
-            d3_step = np.append(d3_step, np.zeros(zeropad_toframelen, dtype='bool'))
-        elif zeropad_toframelen < 0:
-            d3_step = d3_step[-zeropad_toframelen:]
-        return d3_step
-
-    def __create_d4_step(self, d3_step, n_steps_d3):
-        """ Create a full d4 step signal. """
-        return np.tile(d3_step, n_steps_d3)
+    @staticmethod
+    def __fit(out, length, fill):
+        """ Write a signal of the given length with fill(buffer) into out, with zeros after
+        it if it is shorter than out, and cut at the start if it is longer. """
+        if length <= len(out):
+            fill(out[:length])
+        else:
+            buffer = np.zeros(length, dtype='bool')
+            fill(buffer)
+            out[:] = buffer[length - len(out):]
 
-    def __repeat_remaining_axes(self, signal, n_steps_dx, axis_start, axis_end):
-        """ Repeat a created signal for the remaining axes, from axis_start to axis_end. """
-        for axis in range(axis_start, axis_end):
-            signal = np.append(signal, np.zeros(self.zeropad_extrapad[axis]))
-            signal = np.tile(signal, n_steps_dx[axis])
-        return signal
+    @staticmethod
+    def __fill_frame(out, d2_values, d2_len, n_d2, samples_flyback, samples_zeropad_step, clock_len):
+        """ Fill out, all zeros, with a frame (d3 step): samples_zeropad_step zeros, followed
+        by n_d2 d2 steps of d2_len samples with the values d2_values, broadcastable to (n_d2,
+        d2_len), each but the last followed by samples_flyback zeros. The first clock_len
+        samples of the d2 steps are turned ON. """
+        d2_values = np.broadcast_to(d2_values, (n_d2, d2_len))
+        period = d2_len + samples_flyback
+        last_start = samples_zeropad_step + (n_d2 - 1) * period
+        d2_periods = out[samples_zeropad_step:last_start].reshape(n_d2 - 1, period)
+        d2_periods[:, :d2_len] = d2_values[:-1]
+        out[last_start:last_start + d2_len] = d2_values[-1]
+        out[samples_zeropad_step:samples_zeropad_step + min(clock_len, len(out) - samples_zeropad_step)] = 1
 
     def __make_signal_stationary(self, parameterDict, sample_rate):
         """ Make a signal for displaying in the signal graph, without scan parameters. """
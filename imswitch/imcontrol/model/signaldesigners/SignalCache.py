@@ -0,0 +1,126 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SignalCache:
+    """ Least recently used cache of generated signals, keyed by a hash of the
+    content of the parameters they were generated from (see contentHash).
+    Arrays in cached results are made read-only and shared by everyone that
+    gets them, while the dicts, lists and tuples holding them are copied for
+    every caller, so that callers may modify those freely. """
+
+    def __init__(self, maxEntries=8):
+        self.maxEntries = maxEntries
+        self.numHits = 0
+        self.numMisses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, generate):
+        """ Returns the cached result for key, or, if there is none, calls
+        generate() to produce it and caches that. None results are not
+        cached. """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.numHits += 1
+                return _copyContainers(self._entries[key])
+            self.numMisses += 1
+
+        result = generate()
+        if result is None or self.maxEntries < 1:
+            return result
+
+        result = _freeze(result)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxEntries:
+                self._entries.popitem(last=False)
+        return _copyContainers(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def contentHash(*objects):
+    """ Returns a hash of the content of the given objects, which may be
+    (nested) dicts, lists and tuples of numbers, strings, None and numpy
+    arrays. Equal content gives equal hashes, regardless of object identity
+    and dict ordering. Raises TypeError for other types. """
+    hasher = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        _updateHash(hasher, obj)
+    return hasher.hexdigest()
+
+
+def _updateHash(hasher, obj):
+    if isinstance(obj, dict):
+        hasher.update(f'dict{len(obj)}'.encode())
+        for key in sorted(obj, key=repr):
+            _updateHash(hasher, key)
+            _updateHash(hasher, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(f'{type(obj).__name__}{len(obj)}'.encode())
+        for item in obj:
+            _updateHash(hasher, item)
+    elif isinstance(obj, (np.ndarray, np.generic)):
+        array = np.ascontiguousarray(obj)
+        if array.dtype.hasobject:
+            raise TypeError('Cannot hash arrays of objects')
+        hasher.update(f'array{array.dtype.str}{array.shape}'.encode())
+        hasher.update(memoryview(array).cast('B'))
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        hasher.update(f'{type(obj).__name__}:{obj!r};'.encode())
+    else:
+        raise TypeError(f'Cannot hash objects of type {type(obj).__name__}')
+
+
+def _freeze(obj):
+    """ Makes all arrays in obj read-only. """
+    if isinstance(obj, dict):
+        for value in obj.values():
+            _freeze(value)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _freeze(item)
+    elif isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    return obj
+
+
+def _copyContainers(obj):
+    """ Returns a copy of obj in which the dicts, lists and tuples are copied,
+    but not the arrays and other objects in them. """
+    if isinstance(obj, dict):
+        return {key: _copyContainers(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [_copyContainers(item) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple(_copyContainers(item) for item in obj)
+    return obj
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
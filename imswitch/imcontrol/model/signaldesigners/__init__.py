@@ -1 +1,2 @@
+from .SignalCache import SignalCache, contentHash
 from .basesignaldesigners import SignalDesignerFactory
@@ -13,6 +13,7 @@ class ImConMainView(QtWidgets.QMainWindow):
     sigLoadParamsFromHDF5 = QtCore.Signal()
     sigPickSetup = QtCore.Signal()
     sigClosing = QtCore.Signal()
+    sigWidgetFirstShown = QtCore.Signal(str)  # (widgetKey)
 
     def __init__(self, options, viewSetupInfo, *args, **kwargs):
         self.__logger = initLogger(self)
@@ -94,6 +95,7 @@ class ImConMainView(QtWidgets.QMainWindow):
         if 'Image' in enabledDockKeys:
             self.docks['Image'] = Dock('Image Display', size=(1, 1))
             self.widgets['Image'] = self.factory.createWidget(widgets.ImageWidget)
+            self._notifyFirstShow('Image')
             self.docks['Image'].addWidget(self.widgets['Image'])
             self.factory.setArgument('napariViewer', self.widgets['Image'].napariViewer)
 
@@ -156,6 +158,7 @@ class ImConMainView(QtWidgets.QMainWindow):
                 if widgetKey != 'Scan' else
                 getattr(widgets, f'{widgetKey}Widget{self.viewSetupInfo.scan.scanWidgetType}')
             )
+            self._notifyFirstShow(widgetKey)
             self.docks[widgetKey] = Dock(dockInfo.name, size=(1, 1))
             self.docks[widgetKey].addWidget(self.widgets[widgetKey])
             if prevDock is None:
@@ -170,6 +173,28 @@ class ImConMainView(QtWidgets.QMainWindow):
 
         return docks
 
+    def _notifyFirstShow(self, widgetKey):
+        """ Emits sigWidgetFirstShown when the widget is shown for the first
+        time, e.g. when the window is shown or the tab of its dock is first
+        selected. """
+        widget = self.widgets[widgetKey]
+        showFilter = _ShowEventFilter(widget)
+        showFilter.sigShown.connect(lambda: self.sigWidgetFirstShown.emit(widgetKey))
+        widget.installEventFilter(showFilter)
+
+
+class _ShowEventFilter(QtCore.QObject):
+    """ Emits sigShown the first time the watched object is shown, and
+    removes itself. """
+
+    sigShown = QtCore.Signal()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QtCore.QEvent.Show:
+            watched.removeEventFilter(self)
+            self.sigShown.emit()
+        return False
+
 
 @dataclass
 class _DockInfo:
@@ -13,6 +13,9 @@ class FFTWidget(Widget):
     sigPosToggled = QtCore.Signal(bool)  # (enabled)
     sigPosChanged = QtCore.Signal(float)  # (pos)
     sigUpdateRateChanged = QtCore.Signal(float)  # (rate)
+    sigDecimationChanged = QtCore.Signal(int)  # (decimation)
+    sigNumAverageChanged = QtCore.Signal(int)  # (numAverage)
+    sigROIChanged = QtCore.Signal(object)  # (roi)
     sigResized = QtCore.Signal()
 
     def __init__(self, *args, **kwargs):
@@ -25,7 +28,15 @@ class FFTWidget(Widget):
         self.posCheck.setCheckable(True)
         self.linePos = QtWidgets.QLineEdit('4')
         self.lineRate = QtWidgets.QLineEdit('0')
-        self.labelRate = QtWidgets.QLabel('Update rate')
+        self.labelRate = QtWidgets.QLabel('Max rate (Hz)')
+        self.lineDecimation = QtWidgets.QLineEdit('1')
+        self.labelDecimation = QtWidgets.QLabel('Decimation')
+        self.lineAverage = QtWidgets.QLineEdit('1')
+        self.labelAverage = QtWidgets.QLabel('Average frames')
+        self.lineROI = QtWidgets.QLineEdit('')
+        self.lineROI.setPlaceholderText('Whole frame')
+        self.lineROI.setToolTip('Region of the frames to transform, as y0, x0, y1, x1')
+        self.labelROI = QtWidgets.QLabel('ROI (y0, x0, y1, x1)')
 
         # Vertical and horizontal lines
         self.vline = pg.InfiniteLine()
@@ -67,6 +78,12 @@ class FFTWidget(Widget):
         grid.addWidget(self.linePos, 2, 1, 1, 1)
         grid.addWidget(self.labelRate, 2, 2, 1, 1)
         grid.addWidget(self.lineRate, 2, 3, 1, 1)
+        grid.addWidget(self.labelDecimation, 3, 0, 1, 1)
+        grid.addWidget(self.lineDecimation, 3, 1, 1, 1)
+        grid.addWidget(self.labelAverage, 3, 2, 1, 1)
+        grid.addWidget(self.lineAverage, 3, 3, 1, 1)
+        grid.addWidget(self.labelROI, 4, 0, 1, 1)
+        grid.addWidget(self.lineROI, 4, 1, 1, 3)
         # grid.setRowMinimumHeight(0, 300)
 
         # Connect signals
@@ -78,6 +95,15 @@ class FFTWidget(Widget):
         self.lineRate.textChanged.connect(
             lambda: self.sigUpdateRateChanged.emit(self.getUpdateRate())
         )
+        self.lineDecimation.textChanged.connect(
+            lambda: self.sigDecimationChanged.emit(self.getDecimation())
+        )
+        self.lineAverage.textChanged.connect(
+            lambda: self.sigNumAverageChanged.emit(self.getNumAverage())
+        )
+        self.lineROI.editingFinished.connect(
+            lambda: self.sigROIChanged.emit(self.getROI())
+        )
         self.vb.sigResized.connect(self.sigResized)
 
     def getShowFFTChecked(self):
@@ -92,6 +118,21 @@ class FFTWidget(Widget):
     def getUpdateRate(self):
         return float(self.lineRate.text())
 
+    def getDecimation(self):
+        return int(self.lineDecimation.text())
+
+    def getNumAverage(self):
+        return int(self.lineAverage.text())
+
+    def getROI(self):
+        """ Returns the region of interest as (y0, x0, y1, x1), or None if
+        the ROI field doesn't hold four integers. """
+        try:
+            roi = tuple(int(value) for value in self.lineROI.text().split(','))
+        except ValueError:
+            return None
+        return roi if len(roi) == 4 else None
+
     def getImage(self):
         return self.img.image
 
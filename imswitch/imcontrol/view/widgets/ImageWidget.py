@@ -2,11 +2,17 @@ import numpy as np
 from qtpy import QtWidgets
 
 from imswitch.imcommon.model import shortcut
-from imswitch.imcommon.view.guitools import naparitools
+from imswitch.imcommon.view.guitools import decimationPyramid, naparitools
 
 
 class ImageWidget(QtWidgets.QWidget):
-    """ Widget containing viewbox that displays the new detector frames. """
+    """ Widget containing viewbox that displays the new detector frames.
+
+    Live frames are displayed as multiscale layers of the frame and
+    decimated views of it, so that napari only copies and uploads the part
+    of the frame that is visible, at no more than the on-screen resolution:
+    a decimated level when zoomed out and the visible region at native
+    resolution when zoomed in. """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -37,18 +43,35 @@ class ImageWidget(QtWidgets.QWidget):
             if name not in names:
                 self.napariViewer.layers.remove(img, force=True)
 
-        def addImage(name, colormap=None):
-            self.imgLayers[name] = self.napariViewer.add_image(
-                np.zeros((1, 1)), rgb=False, name=f'Live: {name}', blending='additive',
-                colormap=colormap, protected=True
-            )
-
         for name in names:
             if name not in self.napariViewer.layers:
                 try:
-                    addImage(name, name.lower())
+                    self._addLiveViewLayer(name, name.lower())
                 except KeyError:
-                    addImage(name, 'grayclip')
+                    self._addLiveViewLayer(name, 'grayclip')
+
+    def _addLiveViewLayer(self, name, colormap=None, ndim=2):
+        self.imgLayers[name] = self.napariViewer.add_image(
+            [np.zeros((1,) * ndim)], multiscale=True, rgb=False, name=f'Live: {name}',
+            blending='additive', colormap=colormap, protected=True
+        )
+        return self.imgLayers[name]
+
+    def _replaceLiveViewLayer(self, name, ndim):
+        """ Replaces the live view layer of name with one for frames with
+        ndim dimensions, since napari can't change the number of dimensions
+        of a multiscale layer. """
+        oldLayer = self.imgLayers[name]
+        index = self.napariViewer.layers.index(oldLayer)
+        oldLayer.protected = False
+        self.napariViewer.layers.remove(oldLayer)
+
+        layer = self._addLiveViewLayer(name, oldLayer.colormap, ndim)
+        self.napariViewer.layers.move(self.napariViewer.layers.index(layer), index)
+        layer.contrast_limits = oldLayer.contrast_limits
+        layer.opacity = oldLayer.opacity
+        layer.visible = oldLayer.visible
+        return layer
 
     def addStaticLayer(self, name, im):
         self.napariViewer.add_image(im, rgb=False, name=name, blending='additive')
@@ -57,11 +80,14 @@ class ImageWidget(QtWidgets.QWidget):
         return self.napariViewer.active_layer.name
 
     def getImage(self, name):
-        return self.imgLayers[name].data
-
-    def setImage(self, name, im, scale):
-        self.imgLayers[name].data = im
-        self.imgLayers[name].scale = tuple(scale)
+        return self.imgLayers[name].data[0]
+
+    def setImage(self, name, im, scale=(1, 1)):
+        layer = self.imgLayers[name]
+        if np.ndim(im) != layer.ndim:
+            layer = self._replaceLiveViewLayer(name, np.ndim(im))
+        layer.data = decimationPyramid(im)
+        layer.scale = tuple(scale)
 
     def clearImage(self, name):
         self.setImage(name, np.zeros((1, 1)))
@@ -1,27 +1,31 @@
-from .AlignAverageWidget import AlignAverageWidget
-from .AlignmentLineWidget import AlignmentLineWidget
-from .AlignXYWidget import AlignXYWidget
-from .AutofocusWidget import AutofocusWidget
+from imswitch.imcommon.model import pythontools
 from .basewidgets import WidgetFactory
-from .BeadRecWidget import BeadRecWidget
-from .ConsoleWidget import ConsoleWidget
-from .EtSTEDWidget import EtSTEDWidget
-from .FFTWidget import FFTWidget
-from .FocusLockWidget import FocusLockWidget
-from .ImageWidget import ImageWidget
-from .LaserWidget import LaserWidget
-from .MotCorrWidget import MotCorrWidget
-from .PositionerWidget import PositionerWidget
-from .RecordingWidget import RecordingWidget
-from .SLMWidget import SLMWidget
-from .ScanWidgetBase import ScanWidgetBase
-from .ScanWidgetMoNaLISA import ScanWidgetMoNaLISA
-from .ScanWidgetPointScan import ScanWidgetPointScan
-from .RotationScanWidget import RotationScanWidget
-from .RotatorWidget import RotatorWidget
-from .SettingsWidget import SettingsWidget
-from .SLMWidget import SLMWidget
-from .TilingWidget import TilingWidget
-from .ULensesWidget import ULensesWidget
-from .ViewWidget import ViewWidget
-from .WatcherWidget import WatcherWidget
+
+# Imported when first used, so that only what the setup needs is imported
+pythontools.installLazyImports(__name__, {
+    'AlignAverageWidget': 'AlignAverageWidget',
+    'AlignmentLineWidget': 'AlignmentLineWidget',
+    'AlignXYWidget': 'AlignXYWidget',
+    'AutofocusWidget': 'AutofocusWidget',
+    'BeadRecWidget': 'BeadRecWidget',
+    'ConsoleWidget': 'ConsoleWidget',
+    'EtSTEDWidget': 'EtSTEDWidget',
+    'FFTWidget': 'FFTWidget',
+    'FocusLockWidget': 'FocusLockWidget',
+    'ImageWidget': 'ImageWidget',
+    'LaserWidget': 'LaserWidget',
+    'MotCorrWidget': 'MotCorrWidget',
+    'PositionerWidget': 'PositionerWidget',
+    'RecordingWidget': 'RecordingWidget',
+    'SLMWidget': 'SLMWidget',
+    'ScanWidgetBase': 'ScanWidgetBase',
+    'ScanWidgetMoNaLISA': 'ScanWidgetMoNaLISA',
+    'ScanWidgetPointScan': 'ScanWidgetPointScan',
+    'RotationScanWidget': 'RotationScanWidget',
+    'RotatorWidget': 'RotatorWidget',
+    'SettingsWidget': 'SettingsWidget',
+    'TilingWidget': 'TilingWidget',
+    'ULensesWidget': 'ULensesWidget',
+    'ViewWidget': 'ViewWidget',
+    'WatcherWidget': 'WatcherWidget',
+})
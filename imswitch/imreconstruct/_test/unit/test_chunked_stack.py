@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from imswitch.imreconstruct.model import ChunkedStack, SignalExtractor
+
+
+class CountingSource:
+    """ Array-like source that records the frame ranges read from it. """
+
+    def __init__(self, data, chunks=None):
+        self._data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.chunks = chunks
+        self.reads = []
+
+    def __getitem__(self, key):
+        self.reads.append((key.start, key.stop))
+        return self._data[key]
+
+
+@pytest.fixture
+def data():
+    return np.random.default_rng(0).integers(0, 1000, size=(23, 6, 7), dtype=np.uint16)
+
+
+def test_indexing_matches_source(data):
+    stack = ChunkedStack(data, framesPerChunk=4)
+    assert stack.shape == data.shape
+    assert len(stack) == len(data)
+    assert np.array_equal(stack[5], data[5])
+    assert np.array_equal(stack[-1], data[-1])
+    assert np.array_equal(stack[3:14], data[3:14])
+    assert np.array_equal(stack[2:20:3, 1:4], data[2:20:3, 1:4])
+    assert np.array_equal(stack[15:2:-2], data[15:2:-2])
+    assert np.array_equal(stack[[1, 9, 22]], data[[1, 9, 22]])
+    assert np.array_equal(np.asarray(stack), data)
+    with pytest.raises(IndexError):
+        stack[23]
+
+
+def test_reads_only_needed_chunks(data):
+    source = CountingSource(data, chunks=(5, 6, 7))
+    stack = ChunkedStack(source, maxChunkBytes=1)
+    assert stack.framesPerChunk == 5
+
+    stack[7:12]
+    assert source.reads == [(5, 10), (10, 15)]
+    stack[8]
+    assert source.reads == [(5, 10), (10, 15)]
+
+
+def test_cache_evicts_least_recently_used(data):
+    source = CountingSource(data)
+    chunkBytes = 4 * data[0].nbytes
+    stack = ChunkedStack(source, framesPerChunk=4, maxCacheBytes=2 * chunkBytes)
+
+    stack[0]
+    stack[4]
+    stack[0]
+    stack[8]  # Evicts frames 4-7
+    source.reads.clear()
+    stack[0]
+    stack[8]
+    assert source.reads == []
+    stack[4]
+    assert source.reads == [(4, 8)]
+
+
+def test_streaming_statistics(data):
+    stack = ChunkedStack(data, framesPerChunk=3)
+    assert stack.mean().dtype == np.float32
+    assert np.allclose(stack.mean(), np.mean(data, 0))
+    assert np.allclose(stack.mean(4, 17), np.mean(data[4:17], 0))
+    assert np.allclose(stack.frameSums(), np.sum(data, axis=(1, 2)))
+
+
+def test_frame_scales(data):
+    scales = np.linspace(1, 2, len(data))
+    scaled = ChunkedStack(data, framesPerChunk=4).withFrameScales(scales)
+    assert scaled.dtype == data.dtype
+    assert np.array_equal(scaled[6:9],
+                          (data[6:9] * scales[6:9, np.newaxis, np.newaxis]).astype(data.dtype))
+
+
+def test_signal_extraction_from_stack(data):
+    pattern = (1.5, 1.5, 3.0, 3.0)
+    extractor = SignalExtractor(maxBatchBytes=3 * data[0].nbytes, numThreads=2)
+    expected = extractor.extractSignal(data, [1.0, 1e4], pattern, 'numpy')
+    coeffs = extractor.extractSignal(ChunkedStack(data, framesPerChunk=4), [1.0, 1e4],
+                                     pattern, 'numpy')
+    assert np.array_equal(coeffs, expected)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,112 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from imswitch.imreconstruct.model import ReconObj
+
+
+texts = dict(r_l_text='Right/Left', u_d_text='Up/Down', b_f_text='Back/Forth',
+             timepoints_text='Timepoints', p_text='pos', n_text='neg')
+
+
+def referenceCoeffsToImage(coeffs, scanParDict):
+    """ The frame-by-frame placement of coefficients that the vectorized
+    ReconObj.coeffsToImage must reproduce exactly. """
+    frames = np.shape(coeffs)[0]
+    dims = scanParDict['dimensions']
+    steps = [int(step) for step in scanParDict['steps']]
+    dim0Side, dim1Side, dim2Side, dim3Side = steps
+    timepoints = steps[dims.index(texts['timepoints_text'])]
+    slices = steps[dims.index(texts['b_f_text'])]
+    sqRows = steps[dims.index(texts['u_d_text'])]
+    sqCols = steps[dims.index(texts['r_l_text'])]
+
+    im = np.zeros([timepoints, slices, sqRows * np.shape(coeffs)[1],
+                   sqCols * np.shape(coeffs)[2]], dtype=np.float32)
+    for i in range(frames):
+        t = int(np.floor(i / (frames / dim3Side)))
+        slow = int(np.mod(i, frames / timepoints) / (dim0Side * dim1Side))
+        mid = int(np.mod(i, dim0Side * dim1Side) / dim0Side)
+        fast = np.mod(i, dim0Side)
+        if not scanParDict['unidirectional']:
+            oddMidStep = np.mod(mid, 2)
+            fast = (1 - oddMidStep) * fast + oddMidStep * (dim1Side - 1 - fast)
+        neg = [int(direction == 'neg') for direction in scanParDict['directions']]
+        fast = (1 - neg[0]) * fast + neg[0] * (dim0Side - 1 - fast)
+        mid = (1 - neg[1]) * mid + neg[1] * (dim1Side - 1 - mid)
+        slow = (1 - neg[2]) * slow + neg[2] * (dim2Side - 1 - slow)
+
+        values = {dims[0]: (fast, dim0Side), dims[1]: (mid, dim1Side), dims[2]: (slow, dim2Side)}
+        r, pr = values[texts['u_d_text']]
+        c, pc = values[texts['r_l_text']]
+        s = values[texts['b_f_text']][0]
+        im[t, s, r::pr, c::pc] = coeffs[i]
+    return im
+
+
+def makeScanParDict(dimensions, directions, unidirectional, sides):
+    steps = [str(sides[dimension]) for dimension in dimensions] + ['2']
+    return {
+        'dimensions': [*dimensions, texts['timepoints_text']],
+        'directions': directions,
+        'steps': steps,
+        'step_sizes': ['35', '35', '35', '1'],
+        'unidirectional': unidirectional
+    }
+
+
+@pytest.mark.parametrize('dimensions', list(itertools.permutations(
+    [texts['r_l_text'], texts['u_d_text'], texts['b_f_text']]
+)))
+@pytest.mark.parametrize('directions', [['pos', 'pos', 'pos'], ['neg', 'pos', 'neg']])
+@pytest.mark.parametrize('unidirectional', [True, False])
+def test_coeffs_to_image_matches_reference(dimensions, directions, unidirectional):
+    sides = {texts['r_l_text']: 3, texts['u_d_text']: 3, texts['b_f_text']: 3}
+    scanParDict = makeScanParDict(dimensions, directions, unidirectional, sides)
+    numFrames = 3 * 3 * 3 * 2
+    rng = np.random.default_rng(0)
+    coeffs = rng.random((2, 3, numFrames, 5, 6)).astype(np.float32)
+
+    reconObj = ReconObj('test', scanParDict, **texts)
+    for timepoint in coeffs:
+        reconObj.addCoeffsTP(timepoint)
+    reconObj.updateImages()
+
+    reconstructed = reconObj.getReconstruction()
+    expected = np.array([[referenceCoeffsToImage(basis, scanParDict) for basis in timepoint]
+                         for timepoint in coeffs])
+    assert np.array_equal(reconstructed, expected)
+
+
+def test_add_coeffs_grows_buffer():
+    reconObj = ReconObj('test', makeScanParDict(
+        [texts['r_l_text'], texts['u_d_text'], texts['b_f_text']], ['pos'] * 3, True,
+        {texts['r_l_text']: 2, texts['u_d_text']: 2, texts['b_f_text']: 1}
+    ), **texts)
+    assert reconObj.getCoeffs() is None
+
+    timepoints = [np.full((2, 8, 3, 3), i, dtype=np.float32) for i in range(5)]
+    for timepoint in timepoints:
+        reconObj.addCoeffsTP(timepoint)
+    assert np.array_equal(reconObj.getCoeffs(), np.array(timepoints))
+
+    with pytest.raises(ValueError):
+        reconObj.addCoeffsTP(np.zeros((2, 8, 3, 4)))
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,94 @@
+import h5py
+import numpy as np
+import pytest
+
+from imswitch.imreconstruct.model import (
+    ChunkedStack, ReconObj, ReconstructionSettings, SignalExtractor
+)
+from imswitch.imreconstruct.model.ReconstructionQueue import bleachingCorrection, reconstructFile
+
+
+dimensionTexts = ('Right/Left', 'Up/Down', 'Back/Forth', 'Timepoints', 'pos', 'neg')
+
+settings = ReconstructionSettings(
+    sigmas=(1.0, 1e4),
+    pattern=(1.5, 1.5, 3.0, 3.0),
+    device='numpy',
+    scanParDict={
+        'dimensions': list(dimensionTexts[:4]),
+        'directions': ['pos', 'pos', 'pos'],
+        'steps': ['2', '2', '1', '1'],
+        'step_sizes': ['35', '35', '35', '1'],
+        'unidirectional': True
+    },
+    bleachCorrection=False,
+    dimensionTexts=dimensionTexts
+)
+
+
+def writeRecording(path, datasets, writing=False):
+    with h5py.File(path, 'w') as file:
+        file.attrs['writing'] = writing
+        for name, data in datasets.items():
+            file.create_dataset(name, data=data)
+
+
+def test_reconstruct_file(tmp_path):
+    rng = np.random.default_rng(0)
+    datasets = {name: rng.poisson(100, size=(4, 12, 12)).astype(np.uint16)
+                for name in ['a', 'b']}
+    dataPath = str(tmp_path / 'recording.hdf5')
+    recPath = str(tmp_path / 'rec_recording.hdf5')
+    writeRecording(dataPath, datasets)
+
+    timings = reconstructFile(dataPath, recPath, settings, numThreads=1)
+    assert set(timings) == {'load', 'extract', 'assemble', 'save', 'total'}
+
+    reconObj = ReconObj('recording', settings.scanParDict, *dimensionTexts)
+    for data in datasets.values():
+        reconObj.addCoeffsTP(SignalExtractor().extractSignal(
+            data, np.array(settings.sigmas), settings.pattern, 'numpy'
+        ))
+    reconObj.updateImages()
+    expected = np.squeeze(reconObj.getReconstruction()[:, 0].swapaxes(-1, -2))
+
+    with h5py.File(recPath, 'r') as file:
+        assert np.allclose(file['data'][0], expected)
+        assert not file['data'].attrs['writing']
+    assert (tmp_path / 'rec_recording.tiff').exists()
+
+
+def test_reconstruct_file_being_written(tmp_path):
+    dataPath = str(tmp_path / 'recording.hdf5')
+    writeRecording(dataPath, {'a': np.zeros((4, 12, 12), dtype=np.uint16)}, writing=True)
+    with pytest.raises(OSError):
+        reconstructFile(dataPath, str(tmp_path / 'rec_recording.hdf5'), settings)
+    assert not (tmp_path / 'rec_recording.hdf5').exists()
+
+
+def test_bleaching_correction():
+    data = np.random.default_rng(0).integers(1, 1000, size=(6, 5, 5), dtype=np.uint16)
+    energy = np.sum(data, axis=(1, 2))
+    expected = data.copy()
+    for i in range(len(data)):
+        expected[i] = data[i] * (energy[0] / energy[i]) ** 4
+
+    corrected = bleachingCorrection(ChunkedStack(data, framesPerChunk=4))
+    assert np.array_equal(corrected[:], expected)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from imswitch.imreconstruct.model import SignalExtractor
+from imswitch.imreconstruct.model.SignalExtractor import calcCoeffGridSize
+
+
+def referenceExtraction(data, sigmas, pattern):
+    """ Straightforward per-frame, per-grid-point least squares fit of the
+    Gaussian bases, to check the vectorized fit against. """
+    rowOffset, colOffset, rowPeriod, colPeriod = pattern
+    numFrames, imRows, imCols = data.shape
+    gridRows, gridCols = calcCoeffGridSize(imRows, imCols, pattern)
+    coeffs = np.zeros((len(sigmas), numFrames, gridRows, gridCols))
+    fitted = [i for i, sigma in enumerate(sigmas) if sigma > 0]
+    for gridRow in range(gridRows):
+        for gridCol in range(gridCols):
+            centerRow = rowOffset + gridRow * rowPeriod
+            centerCol = colOffset + gridCol * colPeriod
+            halfRows = max(1, int(rowPeriod // 2))
+            halfCols = max(1, int(colPeriod // 2))
+            rows = np.arange(round(centerRow) - halfRows, round(centerRow) + halfRows + 1)
+            cols = np.arange(round(centerCol) - halfCols, round(centerCol) + halfCols + 1)
+            rows = rows[(rows >= 0) & (rows < imRows)]
+            cols = cols[(cols >= 0) & (cols < imCols)]
+            r, c = np.meshgrid(rows, cols, indexing='ij')
+            bases = np.stack([
+                np.exp(-((r - centerRow) ** 2 + (c - centerCol) ** 2) / (2 * sigmas[i] ** 2))
+                .ravel()
+                for i in fitted
+            ], axis=1)
+            for frame in range(numFrames):
+                values = data[frame][r, c].ravel().astype(np.float64)
+                solution = np.linalg.lstsq(bases, values, rcond=None)[0]
+                coeffs[fitted, frame, gridRow, gridCol] = solution
+    return coeffs
+
+
+@pytest.mark.parametrize('imShape, pattern, gridSize', [
+    # Grid sizes as calc_coeff_grid_size of the reconstruction library gives them,
+    # int((imSize - 1) / period + 0.5 - offset / period) + 1 for each axis
+    ((48, 53), (3.3, 9.89, 11.05, 10.4), (5, 5)),
+    ((100, 120), (9.89, 10.4, 11.05, 11.05), (9, 11)),
+    ((60, 60), (5.0, 5.0, 10.0, 10.0), (6, 6)),
+    ((10, 10), (0, 0, 20, 20), (1, 1)),
+    ((10, 10), (15, 0, 20, 20), (1, 1)),
+])
+def test_calc_coeff_grid_size(imShape, pattern, gridSize):
+    assert calcCoeffGridSize(*imShape, pattern) == gridSize
+    data = np.zeros((1, *imShape), dtype=np.uint16)
+    coeffs = SignalExtractor().extractSignal(data, [1.2, 4.0], pattern, 'numpy')
+    assert coeffs.shape == (2, 1, *gridSize)
+
+
+@pytest.mark.parametrize('sigmas', [[1.2, 9999 / 2.355 / 65], [1.2, 4.0], [1.2, 0]])
+@pytest.mark.parametrize('maxBatchBytes', [2 ** 30, 2 ** 16])
+def test_numpy_extraction_matches_least_squares(sigmas, maxBatchBytes):
+    rng = np.random.default_rng(0)
+    data = rng.poisson(50, size=(5, 48, 53)).astype(np.uint16)
+    pattern = (3.3, 9.89, 11.05, 10.4)
+
+    extractor = SignalExtractor(maxBatchBytes=maxBatchBytes, numThreads=2)
+    coeffs = extractor.extractSignal(data, sigmas, pattern, 'numpy')
+    assert coeffs.dtype == np.float32
+    assert coeffs.shape == (2, 5, *calcCoeffGridSize(48, 53, pattern))
+    assert np.allclose(coeffs, referenceExtraction(data, sigmas, pattern),
+                       rtol=1e-3, atol=1e-2)
+
+
+@pytest.mark.skipif(not SignalExtractor().libraryLoaded,
+                    reason='Reconstruction library is not available')
+@pytest.mark.parametrize('sigmas', [[1.2, 9999 / 2.355 / 65], [1.2, 4.0], [1.2, 0]])
+def test_numpy_extraction_matches_library(sigmas):
+    rng = np.random.default_rng(0)
+    data = rng.poisson(50, size=(5, 48, 53)).astype(np.uint16)
+    pattern = (3.3, 9.89, 11.05, 10.4)
+
+    extractor = SignalExtractor()
+    libraryCoeffs = extractor.extractSignal(data, sigmas, pattern, 'cpu')
+    numpyCoeffs = extractor.extractSignal(data, sigmas, pattern, 'numpy')
+    assert numpyCoeffs.shape == libraryCoeffs.shape
+    assert np.allclose(numpyCoeffs, libraryCoeffs, rtol=1e-3, atol=1e-2)
+
+
+def test_numpy_extraction_recovers_signal():
+    rows, cols = np.indices((60, 60))
+    pattern = (5.0, 5.0, 10.0, 10.0)
+    signal = np.arange(36, dtype=np.float32).reshape(6, 6) * 10
+    data = np.full((1, 60, 60), 20.0)
+    for gridRow in range(6):
+        for gridCol in range(6):
+            data[0] += signal[gridRow, gridCol] * np.exp(
+                -((rows - 5 - 10 * gridRow) ** 2 + (cols - 5 - 10 * gridCol) ** 2) / (2 * 1.0 ** 2)
+            )
+
+    coeffs = SignalExtractor().extractSignal(data, [1.0, 1e4], pattern, 'numpy')
+    assert np.allclose(coeffs[0, 0], signal, atol=1e-2)
+    assert np.allclose(coeffs[1, 0], 20, atol=1e-2)
+
+
+def test_library_devices_unavailable():
+    extractor = SignalExtractor()
+    if extractor.libraryLoaded:
+        pytest.skip('Reconstruction library is available')
+    with pytest.raises(RuntimeError):
+        extractor.extractSignal(np.zeros((1, 20, 20)), [1.0], (0, 0, 5, 5), 'cpu')
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
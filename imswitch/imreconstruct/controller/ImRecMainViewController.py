@@ -6,7 +6,10 @@ import tifffile as tiff
 
 import imswitch.imreconstruct.view.guitools as guitools
 from imswitch.imcommon.controller import PickDatasetsController
-from imswitch.imreconstruct.model import DataObj, ReconObj, PatternFinder, SignalExtractor
+from imswitch.imreconstruct.model import (
+    DataObj, ReconObj, PatternFinder, ReconstructionSettings, SignalExtractor
+)
+from imswitch.imreconstruct.model.ReconstructionQueue import bleachingCorrection
 from .DataFrameController import DataFrameController
 from .MultiDataFrameController import MultiDataFrameController
 from .WatcherFrameController import WatcherFrameController
@@ -38,6 +41,7 @@ class ImRecMainViewController(ImRecWidgetController):
         self.pickDatasetsController = self._factory.createController(
             PickDatasetsController, self._widget.pickDatasetsDialog
         )
+        self.watcherFrameController.setSettingsSource(self.getReconstructionSettings)
 
         self._signalExtractor = SignalExtractor()
         self._patternFinder = PatternFinder()
@@ -235,7 +239,9 @@ class ImRecMainViewController(ImRecWidgetController):
 
         self.updateScanParams()
 
-    def extractData(self, data):
+    def getReconstructionSettings(self):
+        """ Returns the current reconstruction settings, for reconstructing
+        data outside of the GUI thread. """
         fwhmNm = self._widget.getFwhmNm()
         bgModelling = self._widget.getBgModelling()
         if bgModelling == 'Constant':
@@ -253,13 +259,25 @@ class ImRecMainViewController(ImRecWidgetController):
         sigmas = np.divide(fwhmNm, 2.355 * self._widget.getPixelSizeNm())
 
         device = self._widget.getComputeDevice()
-        pattern = self._pattern
-        if device == 'CPU' or device == 'GPU':
-            coeffs = self._signalExtractor.extractSignal(data, sigmas, pattern, device.lower())
-        else:
-            raise ValueError(f'Invalid device "{device}" specified; must be either "CPU" or "GPU"')
+        if device not in ['CPU', 'GPU', 'NumPy']:
+            raise ValueError(f'Invalid device "{device}" specified; must be either "CPU", "GPU"'
+                             f' or "NumPy"')
+
+        return ReconstructionSettings(
+            sigmas=tuple(sigmas),
+            pattern=tuple(self._pattern),
+            device=device.lower(),
+            scanParDict=copy.deepcopy(self._scanParDict),
+            bleachCorrection=self._widget.bleachBool.value(),
+            dimensionTexts=(self._widget.r_l_text, self._widget.u_d_text,
+                            self._widget.b_f_text, self._widget.timepoints_text,
+                            self._widget.p_text, self._widget.n_text)
+        )
 
-        return coeffs
+    def extractData(self, data):
+        settings = self.getReconstructionSettings()
+        return self._signalExtractor.extractSignal(data, np.array(settings.sigmas),
+                                                   settings.pattern, settings.device)
 
     def reconstructCurrent(self):
         if self._currentDataObj is None:
@@ -311,12 +329,7 @@ class ImRecMainViewController(ImRecWidgetController):
             self._commChannel.sigExecutionFinished.emit(self.reconstructionController.getImage())
 
     def bleachingCorrection(self, data):
-        correctedData = data.copy()
-        energy = np.sum(data, axis=(1, 2))
-        for i in range(data.shape[0]):
-            c = (energy[0] / energy[i]) ** 4
-            correctedData[i, :, :] = data[i, :, :] * c
-        return correctedData
+        return bleachingCorrection(data)
 
     def saveCurrent(self, dataType):
         """ Saves the reconstructed image or coefficeints from the current
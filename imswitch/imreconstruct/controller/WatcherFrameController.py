@@ -1,15 +1,9 @@
-from imswitch.imcommon.view.guitools.FileWatcher import FileWatcher
-from imswitch.imreconstruct.model import DataObj
 import os
-from .basecontrollers import ImRecWidgetController
+
 from imswitch.imcommon.model.logging import initLogger
-import zarr
-import numpy as np
-from ome_zarr.io import parse_url
-from ome_zarr.writer import write_image
-from time import perf_counter
-import tifffile as tiff
-import h5py
+from imswitch.imcommon.view.guitools.FileWatcher import FileWatcher
+from imswitch.imreconstruct.model import ReconstructionQueue
+from .basecontrollers import ImRecWidgetController
 
 
 class WatcherFrameController(ImRecWidgetController):
@@ -17,22 +11,31 @@ class WatcherFrameController(ImRecWidgetController):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.attrs = None
-        self.recPath = None
         self._widget.sigWatchChanged.connect(self.toggleWatch)
         self._widget.sigChangeFolder.connect(lambda: self._widget.updateFileList(self._commChannel.extension.value()))
-        self._commChannel.sigExecutionFinished.connect(self.executionFinished)
         self._commChannel.extension.sigValueChanged.connect(self.extensionChanged)
-        self.execution = False
-        self.toExecute = []
-        self.current = None
-        self.t0 = None
+        self.watcher = None
         self.extension = None
+        self._getSettings = None
         self.__logger = initLogger(self, tryInheritParent=False)
 
+        self._queue = ReconstructionQueue()
+        self._queue.sigJobFinished.connect(self.jobFinished)
+        self._queue.sigJobFailed.connect(self.jobFailed)
+        self._queue.sigBacklogChanged.connect(self._widget.setBacklog)
+
+    @property
+    def backlog(self):
+        """ The number of files waiting for or undergoing reconstruction. """
+        return self._queue.backlog
+
+    def setSettingsSource(self, getSettings):
+        """ Sets the function that returns the ReconstructionSettings to
+        reconstruct new files with. """
+        self._getSettings = getSettings
+
     def toggleWatch(self, checked):
         if checked:
-            self.execution = False
             self.extension = self._commChannel.extension.value()
             rec_dir = self._widget.path + '/rec'
             if not os.path.isdir(rec_dir):
@@ -40,15 +43,15 @@ class WatcherFrameController(ImRecWidgetController):
             self.watcher = FileWatcher(self._widget.path, self.extension, 1)
             self._widget.updateFileList(self.extension)
             files = self.watcher.filesInDirectory()
-            self.toExecute = files
             self.watcher.sigNewFiles.connect(self.newFiles)
+            self.watcher.sigFilesRemoved.connect(self.filesRemoved)
             self.watcher.start()
-            self.runNextFile()
+            self.queueFiles(files)
         else:
-            self.execution = False
-            self.watcher.stop()
-            self.watcher.quit()
-            self.toExecute = []
+            self._queue.clear()
+            if self.watcher is not None:
+                self.watcher.stop()
+                self.watcher.quit()
 
     def extensionChanged(self):
         self._widget.updateFileList(self._commChannel.extension.value())
@@ -56,61 +59,38 @@ class WatcherFrameController(ImRecWidgetController):
 
     def newFiles(self, files):
         self._widget.updateFileList(self.extension)
-        self.toExecute.extend(files)
-        try:
-            self.runNextFile()
-        except OSError:
-            self.__logger.error("Writing in progress.")
-            self.watcher.removeFromList(files)
-
-    def runNextFile(self):
-        if len(self.toExecute) and not self.execution:
-            newFile = self.toExecute.pop()
-            self.current = self._widget.path + '/' + newFile
-            self.recPath = self._widget.path + '/' + 'rec' + '/' + 'rec_' + newFile
-            datasets = DataObj.getDatasetNames(self.current)
-            dataObjs = []
-            for d in datasets:
-                file, _ = DataObj._open(self.current, d)
-                dataObj = DataObj(os.path.basename(self.current), d, path=self.current, file=file)
-                dataObj.checkLock()
-                dataObjs.append(dataObj)
-                self.attrs = dataObj.attrs
-            self.execution = True
-            self.t0 = perf_counter()
-            self._commChannel.sigReconstruct.emit(dataObjs, True)
-
-    def executionFinished(self, image):
-        if self.execution:
-            self.execution = False
-            self.saveImage(image)
-            diff = perf_counter() - self.t0
-            self.watcher.addToLog(self.current, [str(self.t0), str(diff)])
-            self._widget.updateFileList(self.extension)
-            self.runNextFile()
-
-    def saveImage(self, image):
-        image = np.squeeze(image[:, 0, :, :, :, :])
-        image = np.reshape(image, (1, *image.shape))
-        extension = self._commChannel.extension.value()
-        if not os.path.exists(self.recPath):
-            if extension == 'zarr':
-                store = parse_url(self.recPath + '.tmp', mode="w").store
-                root = zarr.group(store=store)
-                root.attrs["ImSwitchData"] = self.attrs["ImSwitchData"]
-                write_image(image=image, group=root, axes="zyx")
-                store.close()
-                os.rename(self.recPath + '.tmp', self.recPath)
-                tiff.imwrite(self.recPath.split('.')[0] + ".tiff", image)
-            if extension == 'hdf5':
-                h = h5py.File(self.recPath + '.tmp', 'w')
-                dset = h.create_dataset('data', data=image)
-                self.__logger.debug(type(self.attrs))
-                for k in self.attrs.keys():
-                    dset.attrs[k] = self.attrs[k]
-                h.close()
-                os.rename(self.recPath + '.tmp', self.recPath)
-                tiff.imwrite(self.recPath.split('.')[0] + ".tiff", image)
+        self.queueFiles(files)
+
+    def filesRemoved(self, files):
+        self._widget.updateFileList(self.extension)
+        for removedFile in files:
+            self._queue.remove(self._widget.path + '/' + removedFile)
+
+    def queueFiles(self, files):
+        settings = self._getSettings()
+        for newFile in files:
+            dataPath = self._widget.path + '/' + newFile
+            recPath = self._widget.path + '/' + 'rec' + '/' + 'rec_' + newFile
+            self._queue.put(dataPath, recPath, settings)
+
+    def jobFinished(self, dataPath, timings):
+        self.__logger.debug(f'Reconstructed "{dataPath}" in {timings["total"]:.2f} s')
+        if self.watcher is not None:
+            self.watcher.addToLog(dataPath, {**{name: str(t) for name, t in timings.items()},
+                                             'backlog': str(self._queue.backlog)})
+        self._widget.updateFileList(self.extension)
+
+    def jobFailed(self, dataPath, exception):
+        if isinstance(exception, OSError) and self.watcher is not None:
+            # Writing in progress; forget the file so that it is picked up again later
+            self.__logger.error(f'Writing in progress: "{dataPath}"')
+            self.watcher.removeFromList([os.path.basename(dataPath)])
+
+    def closeEvent(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher.quit()
+        self._queue.shutdown()
 
 
 # Copyright (C) 2020-2021 ImSwitch developers
@@ -0,0 +1,242 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ChunkedStack:
+    """ Read-only, lazily loaded view of a stack of frames stored in an
+    HDF5 dataset, a Zarr array or a TIFF file. Frames are read from the
+    source one chunk of frames at a time, and the most recently used chunks
+    are kept in an LRU cache bounded by maxCacheBytes. Indexing the stack
+    returns NumPy arrays and only reads the chunks that contain the
+    requested frames.
+
+    Optionally, every frame can be multiplied by a per-frame scale factor
+    when it is read (see withFrameScales), with the result cast back to the
+    data type of the source. """
+
+    def __init__(self, source, *, framesPerChunk=None, maxChunkBytes=16 * 1024 ** 2,
+                 maxCacheBytes=256 * 1024 ** 2, frameScales=None):
+        if len(source.shape) < 1:
+            raise ValueError('Source must have at least one dimension')
+
+        self._source = source
+        self._shape = tuple(int(s) for s in source.shape)
+        self._dtype = np.dtype(source.dtype)
+        self._frameScales = (np.asarray(frameScales, dtype=np.float64)
+                             if frameScales is not None else None)
+        if self._frameScales is not None and self._frameScales.shape != self._shape[:1]:
+            raise ValueError(f'Expected {self._shape[0]} frame scales,'
+                             f' got {len(self._frameScales)}')
+
+        if framesPerChunk is None:
+            framesPerChunk = _defaultFramesPerChunk(source, self.frameBytes, maxChunkBytes)
+        self.framesPerChunk = max(1, int(framesPerChunk))
+        self.maxCacheBytes = maxCacheBytes
+
+        self._cache = OrderedDict()
+        self._cacheBytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def ndim(self):
+        return len(self._shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self._shape))
+
+    @property
+    def frameBytes(self):
+        """ The number of bytes of a single frame. """
+        return int(np.prod(self._shape[1:])) * self._dtype.itemsize
+
+    @property
+    def numChunks(self):
+        return -(-self._shape[0] // self.framesPerChunk)
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        frameKey, otherKeys = (key[0] if len(key) > 0 else slice(None)), key[1:]
+
+        if isinstance(frameKey, (int, np.integer)):
+            frame = int(frameKey)
+            if frame < 0:
+                frame += self._shape[0]
+            if not 0 <= frame < self._shape[0]:
+                raise IndexError(f'Frame index {frameKey} out of range for stack with'
+                                 f' {self._shape[0]} frames')
+            chunkStart, chunk = self._getChunk(frame // self.framesPerChunk)
+            return chunk[(frame - chunkStart,) + otherKeys]
+
+        if isinstance(frameKey, slice):
+            start, stop, step = frameKey.indices(self._shape[0])
+            if step < 0:
+                start, stop = stop + 1, start + 1
+            frames = self.read(start, stop)
+            if step != 1:
+                frames = frames[::step] if step > 0 else frames[::-1][::-step]
+            return frames[(slice(None),) + otherKeys]
+
+        # Array of frame indices or boolean mask; read the frames one by one
+        frameIndices = np.arange(self._shape[0])[frameKey]
+        frames = np.empty(frameIndices.shape + self._shape[1:], dtype=self._dtype)
+        for i, frame in np.ndenumerate(frameIndices):
+            frames[i] = self[int(frame)]
+        return frames[(Ellipsis,) + otherKeys] if otherKeys else frames
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.read()
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __iter__(self):
+        for _, chunk in self.iterChunks():
+            yield from chunk
+
+    def read(self, start=0, stop=None):
+        """ Reads frames start to stop (exclusive) into a new array. """
+        stop = self._shape[0] if stop is None else min(stop, self._shape[0])
+        start = max(0, start)
+        out = np.empty((max(0, stop - start),) + self._shape[1:], dtype=self._dtype)
+        for chunkStart, chunk in self.iterChunks(start, stop):
+            out[chunkStart - start:chunkStart - start + len(chunk)] = chunk
+        return out
+
+    def iterChunks(self, start=0, stop=None):
+        """ Yields (first frame index, frames) pairs that together cover
+        frames start to stop (exclusive), one chunk at a time. The yielded
+        arrays may be views of cached chunks and must not be modified. """
+        stop = self._shape[0] if stop is None else min(stop, self._shape[0])
+        start = max(0, start)
+        if start >= stop:
+            return
+
+        for chunkIndex in range(start // self.framesPerChunk,
+                                (stop - 1) // self.framesPerChunk + 1):
+            chunkStart, chunk = self._getChunk(chunkIndex)
+            first = max(start, chunkStart)
+            last = min(stop, chunkStart + len(chunk))
+            yield first, chunk[first - chunkStart:last - chunkStart]
+
+    def mean(self, start=0, stop=None):
+        """ Returns the mean frame of frames start to stop (exclusive), as
+        float32, accumulated one chunk at a time. """
+        stop = self._shape[0] if stop is None else min(stop, self._shape[0])
+        total = np.zeros(self._shape[1:], dtype=np.float64)
+        for _, chunk in self.iterChunks(start, stop):
+            total += np.sum(chunk, axis=0, dtype=np.float64)
+        return (total / max(1, stop - max(0, start))).astype(np.float32)
+
+    def frameSums(self):
+        """ Returns the sum of the pixel values of every frame, accumulated
+        one chunk at a time. """
+        sums = np.empty(self._shape[0], dtype=np.float64)
+        for chunkStart, chunk in self.iterChunks():
+            sums[chunkStart:chunkStart + len(chunk)] = np.sum(
+                chunk.reshape(len(chunk), -1), axis=1, dtype=np.float64
+            )
+        return sums
+
+    def withFrameScales(self, frameScales):
+        """ Returns a new stack over the same source, in which every frame is
+        multiplied by its factor in frameScales when read. """
+        return ChunkedStack(self._source, framesPerChunk=self.framesPerChunk,
+                            maxCacheBytes=self.maxCacheBytes, frameScales=frameScales)
+
+    def clearCache(self):
+        with self._lock:
+            self._cache.clear()
+            self._cacheBytes = 0
+
+    def _getChunk(self, chunkIndex):
+        chunkStart = chunkIndex * self.framesPerChunk
+        with self._lock:
+            chunk = self._cache.get(chunkIndex)
+            if chunk is not None:
+                self._cache.move_to_end(chunkIndex)
+                return chunkStart, chunk
+
+            chunkStop = min(self._shape[0], chunkStart + self.framesPerChunk)
+            chunk = np.asarray(self._source[chunkStart:chunkStop])
+            if self._frameScales is not None:
+                scales = self._frameScales[chunkStart:chunkStop]
+                chunk = (chunk * scales.reshape((-1,) + (1,) * (chunk.ndim - 1))).astype(
+                    self._dtype
+                )
+            chunk.flags.writeable = False
+
+            self._cache[chunkIndex] = chunk
+            self._cacheBytes += chunk.nbytes
+            while self._cacheBytes > self.maxCacheBytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cacheBytes -= evicted.nbytes
+            return chunkStart, chunk
+
+
+class TiffFrameSource:
+    """ Array-like source of the frames of a TIFF file, for use with
+    ChunkedStack, that decodes only the pages of the requested frames. """
+
+    def __init__(self, file):
+        self._file = file
+        series = file.series[0]
+        self.shape = tuple(series.shape)
+        self.dtype = series.dtype
+        if len(self.shape) == 2:
+            self.shape = (1,) + self.shape
+        self._pagePerFrame = len(series.pages) == self.shape[0]
+
+    def __getitem__(self, key):
+        start, stop, _ = key.indices(self.shape[0])
+        if stop <= start:
+            return np.empty((0,) + self.shape[1:], dtype=self.dtype)
+        if not self._pagePerFrame:
+            return self._file.series[0].asarray().reshape(self.shape)[start:stop]
+        return self._file.asarray(key=range(start, stop), series=0).reshape(
+            (stop - start,) + self.shape[1:]
+        )
+
+
+def _defaultFramesPerChunk(source, frameBytes, maxChunkBytes):
+    """ Returns the number of frames per chunk to read: the number of frames
+    per chunk of the source if it is chunked (up to maxChunkBytes), and
+    otherwise as many frames as fit within maxChunkBytes. """
+    maxFrames = max(1, maxChunkBytes // max(1, frameBytes))
+    sourceChunks = getattr(source, 'chunks', None)
+    if sourceChunks:
+        sourceFrames = int(sourceChunks[0])
+        if sourceFrames >= maxFrames:
+            return sourceFrames
+        # Read a whole number of source chunks at a time
+        return sourceFrames * max(1, maxFrames // sourceFrames)
+    return maxFrames
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
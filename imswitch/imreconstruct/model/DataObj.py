@@ -1,11 +1,11 @@
 import os
 
 import h5py
-import numpy as np
 import tifffile as tiff
 import zarr
 
 from imswitch.imcommon.model import initLogger
+from .ChunkedStack import ChunkedStack, TiffFrameSource
 
 
 class DataObj:
@@ -24,15 +24,17 @@ class DataObj:
 
     @property
     def data(self):
+        """ The frames of the dataset, as a ChunkedStack that reads them from
+        the file on demand, a chunk of frames at a time. """
         if self._data is not None:
             return self._data
 
         if isinstance(self._file, h5py.File):
-            self._data = np.array(self._file.get(self._datasetName)[:])
+            self._data = ChunkedStack(self._file[self._datasetName])
         elif isinstance(self._file, tiff.TiffFile):
-            self._data = self._file.asarray()
+            self._data = ChunkedStack(TiffFrameSource(self._file))
         elif isinstance(self._file, zarr.hierarchy.Group):
-            self._data = np.array(self._file[self._datasetName])
+            self._data = ChunkedStack(DataObj._getZarrArray(self._file[self._datasetName]))
         return self._data
 
     @property
@@ -60,7 +62,7 @@ class DataObj:
 
     @property
     def numFrames(self):
-        return np.shape(self.data)[0] if self.data is not None else None
+        return self.data.shape[0] if self.data is not None else None
 
     def checkAndLoadData(self):
         if not self.dataLoaded:
@@ -88,7 +90,7 @@ class DataObj:
 
     def getMeanData(self):
         if self._meanData is None:
-            self._meanData = np.array(np.mean(self.data, 0), dtype=np.float32)
+            self._meanData = self.data.mean()
 
         return self._meanData
 
@@ -136,6 +138,14 @@ class DataObj:
         else:
             raise ValueError(f'Unsupported file extension "{ext}"')
 
+    @staticmethod
+    def _getZarrArray(node):
+        """ Returns the full resolution array if node is an OME-Zarr
+        multiscale image group, and node itself otherwise. """
+        if isinstance(node, zarr.hierarchy.Group) and 'multiscales' in node.attrs:
+            return node[node.attrs['multiscales'][0]['datasets'][0]['path']]
+        return node
+
     def describesSameAs(self, other):  # Don't use __eq__, that makes the class unhashable
         try:
             sameFile = self._file == other._file or self._file.filename == other._file.filename
@@ -17,7 +17,9 @@ class ReconObj:
         self.n_tetx = n_text
 
         self.name = name
-        self.coeffs = None
+        self._coeffsBuffer = None
+        self._numCoeffsTP = 0
+        self._indexMapCache = {}
         self.reconstructed = None
         self.scanParDict = scanParDict.copy()
 
@@ -38,18 +40,33 @@ class ReconObj:
     def getScanParams(self):
         return self.scanParDict
 
+    @property
+    def coeffs(self):
+        """ The coefficients of all timepoints added so far, as an array of
+        shape (timepoints, bases, frames, rows, cols), or None. """
+        if self._coeffsBuffer is None:
+            return None
+        return self._coeffsBuffer[:self._numCoeffsTP]
+
     def addCoeffsTP(self, inCoeffs):
         """ Adds a set of coefficients to the existing set of coefficients. """
-        if self.coeffs is None:
-            # self.__logger.debug(f'In if, shape is: {np.shape(inCoeffs)}')
-            # self.__logger.debug(f'Coeffs are: {inCoeffs}')
-            self.coeffs = np.array([inCoeffs])
+        inCoeffs = np.asarray(inCoeffs)
+        if self._coeffsBuffer is None:
+            self._coeffsBuffer = np.empty((1, *inCoeffs.shape), dtype=inCoeffs.dtype)
         else:
-            # self.__logger.debug(f'In else, shape self.data is: {np.shape(inCoeffs)}')
-            # self.__logger.debug(f'In else, shape inCoeffs is: {np.shape(inCoeffs)}')
+            if inCoeffs.shape != self._coeffsBuffer.shape[1:]:
+                raise ValueError(f'Coefficients of shape {inCoeffs.shape} do not match the'
+                                 f' previous ones of shape {self._coeffsBuffer.shape[1:]}')
             self.__logger.debug(f'Max in coeffs: {inCoeffs.max()}')
-            inCoeffs = np.expand_dims(inCoeffs, 0)
-            self.coeffs = np.vstack((self.coeffs, inCoeffs))
+            if self._numCoeffsTP >= len(self._coeffsBuffer):
+                # Grow geometrically so that adding timepoints takes linear time
+                newBuffer = np.empty((2 * len(self._coeffsBuffer), *inCoeffs.shape),
+                                     dtype=np.result_type(self._coeffsBuffer, inCoeffs))
+                newBuffer[:self._numCoeffsTP] = self._coeffsBuffer[:self._numCoeffsTP]
+                self._coeffsBuffer = newBuffer
+
+        self._coeffsBuffer[self._numCoeffsTP] = inCoeffs
+        self._numCoeffsTP += 1
 
     def updateScanParams(self, scanParDict):
         self.scanParDict = scanParDict
@@ -59,30 +76,49 @@ class ReconObj:
         reconstructed and reassigned images of ALL the bases given to the
         reconstructor"""
         if self.coeffs is not None:
-            datasets = np.shape(self.coeffs)[0]
-            bases = np.shape(self.coeffs)[1]
-            self.reconstructed = np.array([
-                [self.coeffsToImage(self.coeffs[ds][b], self.scanParDict) for b in range(0, bases)]
-                for ds in range(0, datasets)
-            ])
+            self.reconstructed = self.coeffsToImage(self.coeffs, self.scanParDict)
             self.__logger.debug(f'Shape of reconstructed: {np.shape(self.reconstructed)}')
         else:
             self.__logger.error('Cannot update images without coefficients')
 
-    def addGridOfCoeffs(self, im, coeffs, t, s, r0, c0, pr, pc):
-        # self.__logger.debug(f'Timepoint: {t}')
-        # self.__logger.debug(f'shape if im: {im.shape}')
-        # self.__logger.debug(f'shape if coeffts[i]: {coeffs.shape}')
-        # self.__logger.debug(f'r0: {r0}')
-        # self.__logger.debug(f'c0: {c0}')
-        # self.__logger.debug(f'pr: {pr}')
-        # self.__logger.debug(f'pc: {pc}')
-        im[t, s, r0::pr, c0::pc] = coeffs
-
     def coeffsToImage(self, coeffs, scanParDict):
-        """Takes the 4d matrix of coefficients from the signal extraction and
-        reshapes into images according to given parameters"""
-        frames = np.shape(coeffs)[0]
+        """Takes the matrix of coefficients from the signal extraction, of
+        shape (..., frames, rows, cols), and reshapes it into images of shape
+        (..., timepoints, slices, rows, cols) according to given parameters.
+        All frames (and leading dimensions, e.g. datasets and bases) are
+        placed into the images in a single operation."""
+        frames, gridRows, gridCols = np.shape(coeffs)[-3:]
+        indexMap = self.getIndexMap(frames, scanParDict)
+        t, s, r, c, pr, pc, timepoints, slices, sqRows, sqCols = indexMap
+
+        im = np.zeros(
+            [*np.shape(coeffs)[:-3], timepoints, slices, sqRows * gridRows, sqCols * gridCols],
+            dtype=np.float32
+        )
+        if pr == sqRows and pc == sqCols:
+            # Each frame's grid fills every pr-th row and pc-th column, so
+            # view the images as (..., timepoints, slices, row within step,
+            # column within step, grid row, grid column) and place whole grids
+            gridView = im.reshape(*im.shape[:-2], gridRows, pr, gridCols, pc)
+            gridView = np.moveaxis(gridView, (-3, -1), (-4, -3))
+            gridView[..., t, s, r, c, :, :] = coeffs
+        else:
+            rows = r[:, np.newaxis, np.newaxis] + pr * np.arange(gridRows)[:, np.newaxis]
+            cols = c[:, np.newaxis, np.newaxis] + pc * np.arange(gridCols)
+            im[..., t[:, np.newaxis, np.newaxis], s[:, np.newaxis, np.newaxis], rows, cols] = \
+                coeffs
+        return im
+
+    def getIndexMap(self, frames, scanParDict):
+        """ Returns, for each frame, the timepoint, slice, row and column
+        that its grid of coefficients starts at in the reconstructed images,
+        the row and column periods of the grids and the number of timepoints,
+        slices, rows and columns of scan steps. The map is computed once for
+        each number of frames and set of scan parameters. """
+        key = (frames, repr(sorted(scanParDict.items())))
+        if key in self._indexMapCache:
+            return self._indexMapCache[key]
+
         dim0Side = int(scanParDict['steps'][0])
         dim1Side = int(scanParDict['steps'][1])
         dim2Side = int(scanParDict['steps'][2])
@@ -98,75 +134,51 @@ class ReconObj:
         sqRows = int(scanParDict['steps'][scanParDict['dimensions'].index(self.u_d_text)])
         sqCols = int(scanParDict['steps'][scanParDict['dimensions'].index(self.r_l_text)])
 
-        im = np.zeros(
-            [timepoints, slices, sqRows * np.shape(coeffs)[1], sqCols * np.shape(coeffs)[2]],
-            dtype=np.float32
-        )
-        for i in np.arange(np.shape(coeffs)[0]):
-
-            t = int(np.floor(i / (frames / dim3Side)))
-
-            slow = int(np.mod(i, frames / timepoints) / (dim0Side * dim1Side))
-            mid = int(np.mod(i, dim0Side * dim1Side) / dim0Side)
-            fast = np.mod(i, dim0Side)
-
-            if not scanParDict['unidirectional']:
-                oddMidStep = np.mod(mid, 2)
-                fast = (1 - oddMidStep) * fast + oddMidStep * (dim1Side - 1 - fast)
-
-            neg = (int(scanParDict['directions'][0] == 'neg'),
-                   int(scanParDict['directions'][1] == 'neg'),
-                   int(scanParDict['directions'][2] == 'neg'))
-
-            """Adjust for positive or negative direction"""
-            fast = (1 - neg[0]) * fast + neg[0] * (dim0Side - 1 - fast)
-            mid = (1 - neg[1]) * mid + neg[1] * (dim1Side - 1 - mid)
-            slow = (1 - neg[2]) * slow + neg[2] * (dim2Side - 1 - slow)
-
-            """Place dimensions in correct row/col/slice"""
-            if scanParDict['dimensions'][0] == self.r_l_text:
-                if scanParDict['dimensions'][1] == self.u_d_text:
-                    c = fast
-                    pc = dim0Side
-                    r = mid
-                    pr = dim1Side
-                    s = slow
-                else:
-                    c = fast
-                    pc = dim0Side
-                    r = slow
-                    pr = dim2Side
-                    s = mid
-            elif scanParDict['dimensions'][0] == self.u_d_text:
-                if scanParDict['dimensions'][1] == self.r_l_text:
-                    c = mid
-                    pc = dim1Side
-                    r = fast
-                    pr = dim0Side
-                    s = slow
-                else:
-                    c = slow
-                    pc = dim2Side
-                    r = fast
-                    pr = dim0Side
-                    s = mid
+        i = np.arange(frames)
+        t = np.floor(i / (frames / dim3Side)).astype(int)
+
+        slow = (np.mod(i, frames / timepoints) / (dim0Side * dim1Side)).astype(int)
+        mid = (np.mod(i, dim0Side * dim1Side) / dim0Side).astype(int)
+        fast = np.mod(i, dim0Side)
+
+        if not scanParDict['unidirectional']:
+            oddMidStep = np.mod(mid, 2)
+            fast = (1 - oddMidStep) * fast + oddMidStep * (dim1Side - 1 - fast)
+
+        neg = (int(scanParDict['directions'][0] == 'neg'),
+               int(scanParDict['directions'][1] == 'neg'),
+               int(scanParDict['directions'][2] == 'neg'))
+
+        """Adjust for positive or negative direction"""
+        fast = (1 - neg[0]) * fast + neg[0] * (dim0Side - 1 - fast)
+        mid = (1 - neg[1]) * mid + neg[1] * (dim1Side - 1 - mid)
+        slow = (1 - neg[2]) * slow + neg[2] * (dim2Side - 1 - slow)
+
+        """Place dimensions in correct row/col/slice"""
+        if scanParDict['dimensions'][0] == self.r_l_text:
+            if scanParDict['dimensions'][1] == self.u_d_text:
+                c, pc, r, pr, s = fast, dim0Side, mid, dim1Side, slow
             else:
-                if scanParDict['dimensions'][1] == self.r_l_text:
-                    c = mid
-                    pc = dim1Side
-                    r = slow
-                    pr = dim2Side
-                    s = fast
-                else:
-                    c = slow
-                    pc = dim2Side
-                    r = mid
-                    pr = dim1Side
-                    s = fast
-
-            self.addGridOfCoeffs(im, coeffs[i], t, s, r, c, pr, pc)
+                c, pc, r, pr, s = fast, dim0Side, slow, dim2Side, mid
+        elif scanParDict['dimensions'][0] == self.u_d_text:
+            if scanParDict['dimensions'][1] == self.r_l_text:
+                c, pc, r, pr, s = mid, dim1Side, fast, dim0Side, slow
+            else:
+                c, pc, r, pr, s = slow, dim2Side, fast, dim0Side, mid
+        else:
+            if scanParDict['dimensions'][1] == self.r_l_text:
+                c, pc, r, pr, s = mid, dim1Side, slow, dim2Side, fast
+            else:
+                c, pc, r, pr, s = slow, dim2Side, mid, dim1Side, fast
 
-        return im
+        indexMap = t, s, r, c, pr, pc, timepoints, slices, sqRows, sqCols
+        if len(self._indexMapCache) >= _maxCachedIndexMaps:
+            self._indexMapCache.clear()
+        self._indexMapCache[key] = indexMap
+        return indexMap
+
+
+_maxCachedIndexMaps = 8
 
 
 # Copyright (C) 2020-2021 ImSwitch developers
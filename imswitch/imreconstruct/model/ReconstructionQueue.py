@@ -0,0 +1,257 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Tuple
+
+import h5py
+import numpy as np
+import tifffile as tiff
+import zarr
+from ome_zarr.io import parse_url
+from ome_zarr.writer import write_image
+
+from imswitch.imcommon.framework import Signal, SignalInterface
+from imswitch.imcommon.model import initLogger
+from .DataObj import DataObj
+from .ReconObj import ReconObj
+from .SignalExtractor import SignalExtractor
+
+
+@dataclass(frozen=True)
+class ReconstructionSettings:
+    """ Everything needed to reconstruct a file without access to the GUI. """
+
+    sigmas: Tuple[float, ...]
+    pattern: Tuple[float, ...]
+    device: str
+    scanParDict: dict
+    bleachCorrection: bool
+    dimensionTexts: Tuple[str, ...]
+    """ The r_l, u_d, b_f, timepoints, p and n texts passed to ReconObj. """
+
+
+class ReconstructionQueue(SignalInterface):
+    """ Queue of files to reconstruct and save, of which up to maxWorkers are
+    processed concurrently in separate processes. Every job loads all
+    datasets of its file, extracts their signal, assembles them into one
+    consolidated reconstruction and saves it next to a TIFF copy, so the
+    stages of different files overlap each other. """
+
+    sigJobStarted = Signal(str)  # (dataPath)
+    sigJobFinished = Signal(str, object)  # (dataPath, timings)
+    sigJobFailed = Signal(str, object)  # (dataPath, exception)
+    sigBacklogChanged = Signal(int)  # (backlog)
+
+    def __init__(self, maxWorkers=None):
+        super().__init__()
+        self.__logger = initLogger(self)
+
+        self.maxWorkers = maxWorkers or max(1, min(4, (os.cpu_count() or 1) // 2))
+        self._executor = None
+        self._pending = deque()
+        self._running = {}
+        self._lock = threading.Lock()
+
+    @property
+    def backlog(self):
+        """ The number of files that have been queued but not finished. """
+        with self._lock:
+            return len(self._pending) + len(self._running)
+
+    @property
+    def numRunning(self):
+        with self._lock:
+            return len(self._running)
+
+    def isQueued(self, dataPath):
+        with self._lock:
+            return dataPath in self._running or any(job[0] == dataPath for job in self._pending)
+
+    def put(self, dataPath, recPath, settings):
+        """ Queues the file at dataPath to be reconstructed with the given
+        settings and saved to recPath. Files that are already queued are
+        ignored. """
+        if self.isQueued(dataPath):
+            return
+
+        with self._lock:
+            self._pending.append((dataPath, recPath, settings, perf_counter()))
+        self._dispatch()
+
+    def remove(self, dataPath):
+        """ Removes the file at dataPath from the queue, unless it has
+        already started processing. """
+        with self._lock:
+            self._pending = deque(job for job in self._pending if job[0] != dataPath)
+        self.sigBacklogChanged.emit(self.backlog)
+
+    def clear(self):
+        """ Removes all files that have not started processing yet. """
+        with self._lock:
+            self._pending.clear()
+        self.sigBacklogChanged.emit(self.backlog)
+
+    def shutdown(self, wait=False):
+        """ Clears the queue and shuts down the worker processes once the
+        running jobs have finished. """
+        self.clear()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.maxWorkers,
+                    # Don't fork the GUI process and its threads
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+
+            numThreads = max(1, (os.cpu_count() or 1) // self.maxWorkers)
+            while self._pending and len(self._running) < self.maxWorkers:
+                dataPath, recPath, settings, queuedTime = self._pending.popleft()
+                future = self._executor.submit(reconstructFile, dataPath, recPath, settings,
+                                               numThreads)
+                self._running[dataPath] = queuedTime
+                started.append((dataPath, future))
+
+        for dataPath, future in started:
+            self.sigJobStarted.emit(dataPath)
+            future.add_done_callback(
+                lambda f, dataPath=dataPath: self._jobDone(dataPath, f)
+            )
+        self.sigBacklogChanged.emit(self.backlog)
+
+    def _jobDone(self, dataPath, future):
+        with self._lock:
+            queuedTime = self._running.pop(dataPath, None)
+
+        try:
+            timings = future.result()
+        except Exception as e:
+            self.__logger.error(f'Failed to reconstruct "{dataPath}": {e}')
+            self.sigJobFailed.emit(dataPath, e)
+        else:
+            if queuedTime is not None:
+                timings['queued'] = perf_counter() - queuedTime - timings['total']
+            self.sigJobFinished.emit(dataPath, timings)
+
+        if self._executor is not None:
+            self._dispatch()
+        else:
+            self.sigBacklogChanged.emit(self.backlog)
+
+
+def reconstructFile(dataPath, recPath, settings, numThreads=None):
+    """ Reconstructs all datasets of the file at dataPath into one
+    consolidated reconstruction, which is saved to recPath. Returns the
+    time spent in each stage, in seconds. """
+
+    timings = {}
+    t0 = stageStart = perf_counter()
+
+    def endStage(name):
+        nonlocal stageStart
+        now = perf_counter()
+        timings[name] = timings.get(name, 0) + now - stageStart
+        stageStart = now
+
+    dataObjs = []
+    attrs = None
+    try:
+        for datasetName in DataObj.getDatasetNames(dataPath):
+            file, _ = DataObj._open(dataPath, datasetName)
+            dataObj = DataObj(os.path.basename(dataPath), datasetName, path=dataPath, file=file)
+            dataObjs.append(dataObj)
+            dataObj.checkLock()
+            attrs = dataObj.attrs
+        endStage('load')
+
+        signalExtractor = SignalExtractor(numThreads=numThreads)
+        reconObj = ReconObj(os.path.basename(dataPath), settings.scanParDict,
+                            *settings.dimensionTexts)
+        for dataObj in dataObjs:
+            if np.prod(np.array(settings.scanParDict['steps'], dtype=int)) < dataObj.numFrames:
+                raise ValueError(f'Too many frames in dataset "{dataObj.datasetName}"')
+
+            data = dataObj.data
+            if settings.bleachCorrection:
+                data = bleachingCorrection(data)
+            reconObj.addCoeffsTP(signalExtractor.extractSignal(
+                data, np.array(settings.sigmas), settings.pattern, settings.device
+            ))
+            endStage('extract')
+    finally:
+        for dataObj in dataObjs:
+            dataObj.checkAndUnloadData()
+
+    reconObj.updateImages()
+    # Same layout as the standard view of the reconstruction widget
+    image = reconObj.getReconstruction().transpose(0, 1, 2, 3, 5, 4)
+    endStage('assemble')
+
+    saveReconstruction(image, recPath, attrs)
+    endStage('save')
+
+    timings['total'] = perf_counter() - t0
+    return timings
+
+
+def saveReconstruction(image, recPath, attrs):
+    """ Saves the first base of a reconstructed image of shape (datasets,
+    bases, timepoints, slices, rows, cols) to recPath, in the format given by
+    its extension, and a copy of it as TIFF. Files that already exist are
+    not overwritten. """
+    if os.path.exists(recPath):
+        return
+
+    image = np.squeeze(image[:, 0, :, :, :, :])
+    image = np.reshape(image, (1, *image.shape))
+    extension = os.path.splitext(recPath)[1]
+    if extension == '.zarr':
+        store = parse_url(recPath + '.tmp', mode="w").store
+        root = zarr.group(store=store)
+        root.attrs["ImSwitchData"] = attrs["ImSwitchData"]
+        write_image(image=image, group=root, axes="zyx")
+        store.close()
+    elif extension in ['.hdf5', '.hdf']:
+        with h5py.File(recPath + '.tmp', 'w') as h:
+            dset = h.create_dataset('data', data=image)
+            for k in attrs.keys():
+                dset.attrs[k] = attrs[k]
+    else:
+        raise ValueError(f'Unsupported file extension "{extension}"')
+
+    os.rename(recPath + '.tmp', recPath)
+    tiff.imwrite(recPath.split('.')[0] + ".tiff", image)
+
+
+def bleachingCorrection(data):
+    """ Returns a view of the ChunkedStack data in which each frame is scaled
+    to compensate for bleaching; frames are corrected as they are read. """
+    energy = data.frameSums()
+    return data.withFrameScales((energy[0] / energy) ** 4)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
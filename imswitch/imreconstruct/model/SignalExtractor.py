@@ -1,6 +1,7 @@
 import ctypes
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
@@ -11,31 +12,36 @@ class SignalExtractor:
     """ This class takes the raw data together with pre-set
     parameters and recontructs and stores the final images (for the different
     bases).
+
+    The signal can be extracted either by the compiled reconstruction library
+    (devices "cpu" and "gpu"), which is only available on Windows, or by a
+    NumPy implementation (device "numpy") that runs on any operating system.
     """
 
-    def __init__(self):
+    def __init__(self, maxBatchBytes=64 * 1024 ** 2, numThreads=None):
         self.__logger = initLogger(self)
+        self.maxBatchBytes = maxBatchBytes
+        self.numThreads = numThreads or os.cpu_count() or 1
+        self._projectionCache = {}
 
-        if os.name != 'nt':
-            ctypes.cdll.LoadLibrary('/usr/local/cuda-12.1/targets/x86_64-linux/lib/libcudart.so')
-            self.ReconstructionDLL = ctypes.cdll.LoadLibrary('~/Downloads/ImSwitch_win/imswitch/_data/libs/GPU_acc_recon.dll')
-            raise Warning("You have to include the cuda libraries to the program - Hossein")
-            #raise RuntimeError('This module does unfortunately currently not support non-Windows'
-            #                   ' operating systems.')
-
-        # TODO: Support non-Windows OS
-        # This is needed by the DLL containing CUDA code.
-        # ctypes.cdll.LoadLibrary(os.environ['CUDA_PATH_V9_0'] + '\\bin\\cudart64_90.dll')
-        """
-        ctypes.cdll.LoadLibrary(
-            os.path.join(dirtools.DataFileDirs.Libs, 'cudart64_90.dll')
-        )
-        self.ReconstructionDLL = ctypes.cdll.LoadLibrary(
-            os.path.join(dirtools.DataFileDirs.Libs, 'GPU_acc_recon.dll')
-        )
-        """ 
-        
-        
+        self.ReconstructionDLL = None
+        if os.name == 'nt':
+            try:
+                # This is needed by the DLL containing CUDA code.
+                ctypes.cdll.LoadLibrary(
+                    os.path.join(dirtools.DataFileDirs.Libs, 'cudart64_90.dll')
+                )
+                self.ReconstructionDLL = ctypes.cdll.LoadLibrary(
+                    os.path.join(dirtools.DataFileDirs.Libs, 'GPU_acc_recon.dll')
+                )
+            except OSError:
+                self.__logger.warning('Failed to load the reconstruction library, only NumPy'
+                                      ' signal extraction will be available')
+
+    @property
+    def libraryLoaded(self):
+        """ Whether the compiled reconstruction library is available. """
+        return self.ReconstructionDLL is not None
 
     def make3dPtrArray(self, inData):
         assert len(np.shape(inData)) == 3, \
@@ -78,6 +84,16 @@ class SignalExtractor:
         Output is a 4D matrix where first dimension is base and last three
         are frame and pixel coordinates."""
 
+        if dev == 'numpy':
+            return self.extractSignalNumpy(data, sigmas, pattern)
+        elif dev not in ['cpu', 'gpu']:
+            raise ValueError(f'Device must be either "cpu", "gpu" or "numpy"; {dev} given')
+        elif not self.libraryLoaded:
+            raise RuntimeError(f'Signal extraction on device "{dev}" requires the compiled'
+                               f' reconstruction library, which is only available on Windows;'
+                               f' use device "numpy" instead')
+
+        data = np.ascontiguousarray(data)
         self.__logger.debug(f'Max in data: {data.max()}')
         dataPtrArray = self.make3dPtrArray(data)
         p = ctypes.c_float * 4
@@ -107,10 +123,8 @@ class SignalExtractor:
 
         if dev == 'cpu':
             extractionFunction = self.ReconstructionDLL.extract_signal_CPU
-        elif dev == 'gpu':
-            extractionFunction = self.ReconstructionDLL.extract_signal_GPU
         else:
-            raise ValueError(f'Device must be either "cpu" or "gpu"; {dev} given')
+            extractionFunction = self.ReconstructionDLL.extract_signal_GPU
 
         extractionFunction(cImRows, cImCols,
                            cImSlices, ctypes.byref(cPattern),
@@ -121,6 +135,114 @@ class SignalExtractor:
         self.__logger.debug(f'Signal extraction performed in {elapsed} seconds')
         return resCoeffs
 
+    def extractSignalNumpy(self, data, sigmas, pattern):
+        """ Extracts the signal of the data like extractSignal, with NumPy.
+
+        For every point of the pattern grid, the pixels within half a period
+        of it are fitted, by least squares, to a sum of Gaussian bases
+        centred on the point, one for each of the given sigmas (in pixels).
+        The coefficients of the fit are the extracted signal. Bases with a
+        sigma of zero (no background) are left out of the fit and their
+        coefficients are zero, and a very large sigma models a constant
+        background. The pseudo-inverses of the bases are computed once per
+        image shape, pattern and sigmas, and then applied to batches of
+        frames at a time in a thread pool. """
+
+        t = time.time()
+        numFrames, imRows, imCols = data.shape
+        sigmas = np.atleast_1d(np.asarray(sigmas, dtype=np.float64))
+        gridRows, gridCols = calcCoeffGridSize(imRows, imCols, pattern)
+        resCoeffs = np.zeros((len(sigmas), numFrames, gridRows, gridCols), dtype=np.float32)
+        if gridRows < 1 or gridCols < 1 or numFrames < 1:
+            return resCoeffs
+
+        rowIndices, colIndices, projection, fittedBases = self._getProjection(
+            (imRows, imCols), sigmas, pattern
+        )
+        numTiles, _, numTilePixels = projection.shape
+        framesPerBatch = max(1, self.maxBatchBytes // (numTiles * numTilePixels * 4))
+
+        def extractBatch(start):
+            stop = min(numFrames, start + framesPerBatch)
+            # Gather the pixels of every tile into an array of shape
+            # (tiles, tile pixels, frames), and project onto the bases
+            frames = np.moveaxis(np.asarray(data[start:stop], dtype=np.float32), 0, -1)
+            tiles = frames[rowIndices[:, np.newaxis, :, np.newaxis],
+                           colIndices[np.newaxis, :, np.newaxis, :]]
+            tiles = tiles.reshape(numTiles, numTilePixels, stop - start)
+            coeffs = np.matmul(projection, tiles)  # (tiles, fitted bases, frames)
+            resCoeffs[fittedBases, start:stop] = (
+                coeffs.transpose(1, 2, 0).reshape(len(fittedBases), stop - start,
+                                                  gridRows, gridCols)
+            )
+
+        batchStarts = range(0, numFrames, framesPerBatch)
+        if self.numThreads > 1 and len(batchStarts) > 1:
+            with ThreadPoolExecutor(max_workers=self.numThreads) as executor:
+                list(executor.map(extractBatch, batchStarts))
+        else:
+            for start in batchStarts:
+                extractBatch(start)
+
+        elapsed = time.time() - t
+        self.__logger.debug(f'Signal extraction performed in {elapsed} seconds')
+        return resCoeffs
+
+    def _getProjection(self, imShape, sigmas, pattern):
+        """ Returns the row and column indices of the pixels of the tile
+        around each grid point, the pseudo-inverses of the bases of each tile
+        and the indices of the fitted bases. """
+        key = (imShape, tuple(sigmas), tuple(float(p) for p in pattern))
+        if key in self._projectionCache:
+            return self._projectionCache[key]
+
+        rowOffset, colOffset, rowPeriod, colPeriod = pattern
+        gridRows, gridCols = calcCoeffGridSize(*imShape, pattern)
+        fittedBases = np.flatnonzero(sigmas > 0)
+        fittedSigmas = sigmas[fittedBases]
+
+        def tileAxis(offset, period, gridSize, imSize):
+            centers = offset + np.arange(gridSize) * period
+            halfSize = max(1, int(period // 2))
+            indices = (np.rint(centers).astype(int)[:, np.newaxis] +
+                       np.arange(-halfSize, halfSize + 1))
+            valid = (indices >= 0) & (indices < imSize)
+            # Separable Gaussian factor of each basis, shape (grid, pixels, bases)
+            distances = indices - centers[:, np.newaxis]
+            factors = np.exp(-distances[..., np.newaxis] ** 2 / (2 * fittedSigmas ** 2))
+            factors *= valid[..., np.newaxis]
+            return np.clip(indices, 0, imSize - 1), factors
+
+        rowIndices, rowFactors = tileAxis(rowOffset, rowPeriod, gridRows, imShape[0])
+        colIndices, colFactors = tileAxis(colOffset, colPeriod, gridCols, imShape[1])
+
+        # Bases of each tile, shape (tiles, tile pixels, bases); pixels outside
+        # the image are zero in all bases and thus ignored by the fit
+        bases = (rowFactors[:, np.newaxis, :, np.newaxis, :] *
+                 colFactors[np.newaxis, :, np.newaxis, :, :])
+        bases = bases.reshape(gridRows * gridCols, -1, len(fittedBases))
+        projection = np.linalg.pinv(bases).astype(np.float32)
+
+        if len(self._projectionCache) >= _maxCachedProjections:
+            self._projectionCache.clear()
+        self._projectionCache[key] = rowIndices, colIndices, projection, fittedBases
+        return self._projectionCache[key]
+
+
+def calcCoeffGridSize(imRows, imCols, pattern):
+    """ Returns the number of rows and columns of the grid of pattern points
+    for an image of the given size, like calc_coeff_grid_size of the
+    reconstruction library (which rounds, so the last point may lie up to
+    half a period outside the image). pattern is given as (row offset,
+    column offset, row period, column period). """
+    rowOffset, colOffset, rowPeriod, colPeriod = (np.float32(p) for p in pattern)
+    gridRows = int((imRows - 1) / rowPeriod + np.float32(0.5) - rowOffset / rowPeriod) + 1
+    gridCols = int((imCols - 1) / colPeriod + np.float32(0.5) - colOffset / colPeriod) + 1
+    return max(0, gridRows), max(0, gridCols)
+
+
+_maxCachedProjections = 4
+
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
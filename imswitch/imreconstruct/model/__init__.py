@@ -1,4 +1,6 @@
+from .ChunkedStack import ChunkedStack
 from .DataObj import DataObj
 from .PatternFinder import PatternFinder
 from .ReconObj import ReconObj
+from .ReconstructionQueue import ReconstructionQueue, ReconstructionSettings
 from .SignalExtractor import SignalExtractor
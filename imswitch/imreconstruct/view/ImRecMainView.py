@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 import pyqtgraph as pg
 from pyqtgraph.dockarea import Dock, DockArea
@@ -237,7 +239,8 @@ class ReconParTree(ParameterTree):
         # Parameter tree for the reconstruction
         params = [
             {'name': 'Pixel size', 'type': 'float', 'value': 65, 'suffix': 'nm'},
-            {'name': 'CPU/GPU', 'type': 'list', 'values': ['GPU', 'CPU']},
+            {'name': 'CPU/GPU', 'type': 'list', 'values': ['GPU', 'CPU', 'NumPy'],
+             'value': 'GPU' if os.name == 'nt' else 'NumPy'},
             {'name': 'Pattern', 'type': 'group', 'children': [
                 {'name': 'Row-offset', 'type': 'float', 'value': 9.89, 'limits': (0, 9999)},
                 {'name': 'Col-offset', 'type': 'float', 'value': 10.4, 'limits': (0, 9999)},
@@ -18,6 +18,8 @@ class WatcherFrame(QtWidgets.QFrame):
 
         self.browseFolderButton = guitools.BetterPushButton('Browse')
         self.watchCheck = QtWidgets.QCheckBox('Watch and run')
+        self.backlogLabel = QtWidgets.QLabel()
+        self.setBacklog(0)
 
         self.listWidget = QtWidgets.QListWidget()
         #self.updateFileList()
@@ -29,6 +31,7 @@ class WatcherFrame(QtWidgets.QFrame):
         layout.addWidget(self.browseFolderButton, 0, 0)
         layout.addWidget(self.listWidget, 1, 0, 1, 2)
         layout.addWidget(self.watchCheck, 2, 0)
+        layout.addWidget(self.backlogLabel, 2, 1)
 
         self.watchCheck.toggled.connect(self.sigWatchChanged)
         self.browseFolderButton.clicked.connect(self.browse)
@@ -43,6 +46,9 @@ class WatcherFrame(QtWidgets.QFrame):
         self.listWidget.clear()
         self.listWidget.addItems(res)
 
+    def setBacklog(self, backlog):
+        self.backlogLabel.setText(f'Backlog: {backlog}')
+
     def browse(self):
         path = guitools.askForFolderPath(self, defaultFolder=self.path)
         if path:
@@ -2,10 +2,10 @@ import importlib.util
 import logging
 import os
 import time
-from typing import Any, Callable
+from typing import Any, Callable, ContextManager
 
 from imswitch.imcommon.framework import Signal, FrameworkUtils
-from imswitch.imcommon.model import APIExport, generateAPI, initLogger
+from imswitch.imcommon.model import APIExport, batchAPICalls, generateAPI, initLogger
 
 
 class _Actions:
@@ -50,6 +50,19 @@ class _Actions:
         messages to the console. """
         return self._scriptLogger
 
+    @APIExport()
+    def batchAPICalls(self) -> ContextManager[None]:
+        """ Returns a context manager in which calls to API functions that
+        run on the UI thread are collected and executed together once the
+        block is exited, e.g.:
+
+            with batchAPICalls():
+                api.imcontrol.setLaserActive('488 Laser', True)
+                image = api.imcontrol.snapImage(True)
+            print(image.result().shape)
+        """
+        return batchAPICalls()
+
     @APIExport()
     def getWaitForSignal(self, signal: Signal,
                          pollIntervalSeconds: float = 1.0) -> Callable[[], None]:
@@ -0,0 +1,74 @@
+""" Compares the time taken to compute the live view FFT of a frame with the
+double-precision full-spectrum transform of earlier versions against
+FFTService, which reuses buffers and computes a single-precision real-input
+transform, optionally on a decimated frame or averaged over frames.
+
+Usage: python tools/benchmarks/fft_live.py [--size PX] [--repeats N]
+       [--workers N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from imswitch.imcontrol.model.FFTService import FFTService
+
+
+def previousFFT(image):
+    return np.fft.fftshift(np.log10(abs(np.fft.fft2(image))))
+
+
+def timeIt(func, frames, repeats):
+    func(frames[0])  # Warm up plans and buffers
+    start = time.perf_counter()
+    for i in range(repeats):
+        func(frames[i % len(frames)])
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=2048)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=-1,
+                        help='threads used by the transform, -1 for all cores')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = rng.poisson(100, size=(4, args.size, args.size)).astype(np.uint16)
+
+    print(f'{args.size}x{args.size} px uint16 frames, {args.repeats} repeats')
+    cases = [
+        ('numpy fft2, float64 (previous)', previousFFT),
+        ('FFTService', FFTService(workers=args.workers).compute),
+        ('FFTService, decimation 2',
+         FFTService(decimation=2, workers=args.workers).compute),
+        ('FFTService, average of 10',
+         FFTService(numAverage=10, workers=args.workers).compute),
+    ]
+    for name, func in cases:
+        elapsed = timeIt(func, frames, args.repeats)
+        print(f'  {name:<32} {elapsed * 1000:8.1f} ms/frame   {1 / elapsed:6.1f} frames/s')
+
+
+if __name__ == '__main__':
+    main()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
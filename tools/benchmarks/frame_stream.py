@@ -0,0 +1,128 @@
+""" Measures the throughput and latency of the binary frame stream of
+ImSwitch, either of a running instance or, with --local, of an in-process
+server that publishes synthetic frames at the given rate. Latency is the
+time from a frame being sent by the server until it has been decoded by the
+client; skipped frames are those the server did not send because the client
+could not keep up.
+
+Usage: python tools/benchmarks/frame_stream.py [--host HOST] [--port PORT]
+       [--frames N] [--compression zlib] [--shared-memory] [--decimation N]
+       [--local [--size PX] [--rate FPS]]
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from imswitch.imcontrol.controller.server.framestream import PORT, FrameStreamClient
+
+
+def startLocalServer(size, rate):
+    """ Starts a frame stream server on a free port, fed with frames of
+    size x size px published at the given rate, and returns it with a
+    function that stops it. """
+    from imswitch.imcontrol.controller.server.FrameStreamServer import FrameStreamServer
+    from imswitch.imcontrol.model.managers.LiveFrameDispatcher import LiveFrameDispatcher
+
+    dispatcher = LiveFrameDispatcher()
+    server = FrameStreamServer(dispatcher, port=0)
+    server.start()
+
+    rng = np.random.default_rng(0)
+    frames = rng.poisson(100, size=(8, size, size)).astype(np.uint16)
+    stopped = threading.Event()
+
+    def publishFrames():
+        index = 0
+        while not stopped.wait(1 / rate):
+            dispatcher.publish('CAM', frames[index % len(frames)], False, [1, 1], True)
+            index += 1
+
+    threading.Thread(target=publishFrames, daemon=True).start()
+
+    def stop():
+        stopped.set()
+        server.stop()
+
+    return server, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--compression', choices=['zlib'], default=None)
+    parser.add_argument('--shared-memory', action='store_true',
+                        help='pass frames through shared memory (same host only)')
+    parser.add_argument('--decimation', type=int, default=1)
+    parser.add_argument('--max-rate', type=float, default=None)
+    parser.add_argument('--local', action='store_true',
+                        help='stream synthetic frames from an in-process server')
+    parser.add_argument('--size', type=int, default=2048, help='frame size with --local')
+    parser.add_argument('--rate', type=float, default=50, help='frame rate with --local')
+    args = parser.parse_args()
+
+    stop = None
+    host, port = args.host, args.port
+    if args.local:
+        server, stop = startLocalServer(args.size, args.rate)
+        host, port = server.address
+
+    latencies = []
+    numBytes = 0
+    numSkipped = 0
+    try:
+        with FrameStreamClient(host, port, maxRate=args.max_rate, decimation=args.decimation,
+                               compression=args.compression,
+                               sharedMemory=args.shared_memory) as client:
+            frameIndex, _, frame = client.readFrame()  # Don't count connection setup
+            startTime = time.perf_counter()
+            for _ in range(args.frames):
+                previousIndex = frameIndex
+                received = client.readFrame()
+                if received is None:
+                    break
+                frameIndex, timestamp, frame = received
+                latencies.append(time.time() - timestamp)
+                numBytes += frame.nbytes
+                numSkipped += frameIndex - previousIndex - 1
+            elapsed = time.perf_counter() - startTime
+            numDropped = client.numDropped
+    finally:
+        if stop is not None:
+            stop()
+
+    latencies = np.array(latencies) * 1000
+    mode = ('shared memory' if args.shared_memory else args.compression or 'raw')
+    print(f'{frame.shape[1]}x{frame.shape[0]} px {frame.dtype} frames, {mode},'
+          f' {len(latencies)} frames in {elapsed:.2f} s')
+    print(f'  {len(latencies) / elapsed:8.1f} frames/s   {numBytes / elapsed / 1e6:8.1f} MB/s')
+    print(f'  latency {np.mean(latencies):6.2f} ms mean, {np.median(latencies):6.2f} ms median,'
+          f' {np.percentile(latencies, 99):6.2f} ms 99th percentile')
+    print(f'  {numSkipped} frames skipped by the server,'
+          f' {numDropped} overwritten in shared memory')
+
+
+if __name__ == '__main__':
+    main()
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
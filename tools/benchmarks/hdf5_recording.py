@@ -0,0 +1,102 @@
+""" Compares the sustained write throughput of HDF5 recordings with
+preallocated, chunk-aligned datasets against resizing the dataset for every
+block of frames (the behaviour of earlier versions).
+
+Usage: python tools/benchmarks/hdf5_recording.py [--frames N] [--size PX]
+       [--block N] [--fps FPS] [--compression gzip] [--shuffle] [--dir DIR]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from imswitch.imcontrol.model.managers.RecordingManager import (
+    HDF5StreamWriter, computeChunkShape
+)
+
+
+def run(path, frames, numFrames, blockSize, preallocate, fps, compression, shuffle,
+        expectedNumFrames):
+    frameShape = frames.shape[1:]
+    if preallocate:
+        chunks = computeChunkShape(frameShape, 2, 4 * 1024 ** 2, frameRate=fps,
+                                   maxFrames=expectedNumFrames)
+        initialNumFrames = expectedNumFrames or chunks[0]
+        kwargs = dict(chunks=chunks, compression=compression, shuffle=shuffle)
+    else:
+        initialNumFrames = 1
+        kwargs = {}
+
+    start = time.perf_counter()
+    with h5py.File(path, 'w') as file:
+        dataset = file.create_dataset('data', (initialNumFrames, *frameShape),
+                                      maxshape=(None, *frameShape), dtype='i2', **kwargs)
+        writer = HDF5StreamWriter(dataset, preallocate=preallocate)
+        written = 0
+        while written < numFrames:
+            n = min(blockSize, numFrames - written)
+            offset = written % (len(frames) - blockSize)
+            writer.write(frames[offset:offset + n])
+            written += n
+        writer.close()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    os.remove(path)
+    return numFrames * frames[0].nbytes / elapsed / 1024 ** 2, size / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--block', type=int, default=3, help='frames per write call')
+    parser.add_argument('--fps', type=float, default=100)
+    parser.add_argument('--compression', default=None)
+    parser.add_argument('--shuffle', action='store_true')
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = (rng.poisson(100, size=(64 + args.block, args.size, args.size))
+              .astype('i2'))
+    directory = args.dir or tempfile.mkdtemp()
+    path = os.path.join(directory, 'benchmark.hdf5')
+
+    print(f'{args.frames} frames of {args.size}x{args.size} px, {args.block} frames per write,'
+          f' compression={args.compression}, shuffle={args.shuffle}')
+    cases = [
+        ('resize per block (previous)', False, None, None, False, None),
+        ('chunked, known frame count', True, args.fps, args.compression, args.shuffle,
+         args.frames),
+        ('chunked, geometric growth', True, args.fps, args.compression, args.shuffle, None),
+    ]
+    for name, preallocate, fps, compression, shuffle, expected in cases:
+        throughput, size = run(path, frames, args.frames, args.block, preallocate, fps,
+                               compression, shuffle, expected)
+        print(f'  {name:<30} {throughput:8.1f} MB/s   file size {size:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
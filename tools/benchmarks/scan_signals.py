@@ -0,0 +1,85 @@
+""" Measures how long the galvo scan and point scan TTL cycle designers take
+to generate the signals of point scans of different sizes, with the
+positioners and sample rate of the example STED setup.
+
+Usage: python tools/benchmarks/scan_signals.py [--scans XxYxZ [XxYxZ ...]]
+       [--dwell-time US] [--repeats N]
+"""
+
+import argparse
+import os
+import time
+
+from imswitch.imcommon.model.dirtools import DataFileDirs
+from imswitch.imcontrol.model import SetupInfo
+from imswitch.imcontrol.model.signaldesigners import SignalDesignerFactory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', nargs='+', default=['128x128x10', '512x512x50'])
+    parser.add_argument('--dwell-time', type=float, default=10, help='pixel dwell time in µs')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    setupPath = os.path.join(DataFileDirs.UserDefaults, 'imcontrol_setups', 'example_sted.json')
+    with open(setupPath) as file:
+        setupInfo = SetupInfo.from_json(file.read(), infer_missing=True)
+
+    scanDesigner = SignalDesignerFactory('GalvoScanDesigner')
+    TTLCycleDesigner = SignalDesignerFactory('PointScanTTLCycleDesigner')
+
+    for scan in args.scans:
+        numSteps = [int(n) for n in scan.split('x')]
+        stepSizes = [0.05, 0.05, 0.1]
+        scanParameters = {
+            'target_device': ['ND-GalvoX', 'ND-GalvoY', 'ND-PiezoZ'],
+            'axis_length': [n * stepSize for n, stepSize in zip(numSteps, stepSizes)],
+            'axis_step_size': stepSizes,
+            'axis_centerpos': [0, 0, 5],
+            'axis_startpos': [[0], [0], [0]],
+            'sequence_time': args.dwell_time * 1e-6,
+            'phase_delay': 0
+        }
+        TTLParameters = {
+            'target_device': ['775', '640', 'Exc'],
+            'TTL_sequence': ['h1', 'h1,l1', 'l1,h2'],
+            'TTL_sequence_axis': ['None', 'ND-GalvoY', 'ND-PiezoZ'],
+            'sequence_time': args.dwell_time * 1e-6
+        }
+
+        scanTimes, TTLTimes = [], []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            _, _, scanInfoDict = scanDesigner.make_signal(scanParameters, setupInfo)
+            scanTimes.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            TTLCycleDesigner.make_signal(TTLParameters, setupInfo, scanInfoDict)
+            TTLTimes.append(time.perf_counter() - start)
+
+        print(f'{scan:>12} scan, {scanInfoDict["scan_samples_total"]:9d} samples:'
+              f' scan signals {min(scanTimes):6.2f} s,'
+              f' TTL signals {min(TTLTimes):6.2f} s')
+
+
+if __name__ == '__main__':
+    main()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
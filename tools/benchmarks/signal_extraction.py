@@ -0,0 +1,63 @@
+""" Measures the throughput of the NumPy signal extraction of imreconstruct
+for stacks of different numbers of frames, with the default pattern and
+reconstruction options of the reconstruction widget.
+
+Usage: python tools/benchmarks/signal_extraction.py [--size PX]
+       [--frames N [N ...]] [--threads N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from imswitch.imreconstruct.model import SignalExtractor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--frames', type=int, nargs='+', default=[10, 100, 400])
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    pixelSizeNm = 65
+    sigmas = np.divide([220, 9999], 2.355 * pixelSizeNm)  # PSF and constant background
+    pattern = (9.89, 10.4, 11.05, 11.05)
+    rng = np.random.default_rng(0)
+
+    extractor = SignalExtractor(numThreads=args.threads)
+    start = time.perf_counter()
+    extractor.extractSignal(np.zeros((1, args.size, args.size), dtype=np.uint16),
+                            sigmas, pattern, 'numpy')
+    print(f'{args.size}x{args.size} px frames, {extractor.numThreads} threads; bases computed'
+          f' in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    for numFrames in args.frames:
+        data = rng.poisson(100, size=(numFrames, args.size, args.size)).astype(np.uint16)
+        start = time.perf_counter()
+        extractor.extractSignal(data, sigmas, pattern, 'numpy')
+        elapsed = time.perf_counter() - start
+        print(f'  {numFrames:5d} frames: {elapsed:7.2f} s   {numFrames / elapsed:8.1f} frames/s')
+
+
+if __name__ == '__main__':
+    main()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.